@@ -1,15 +1,50 @@
 """The secret santa app."""
 
+import os
 import time
+from contextlib import nullcontext
+from datetime import time as time_of_day
 from pathlib import Path
 from typing import Annotated
 
 import pyfiglet
-from typer import Option, Typer
+from typer import Option, Typer, echo
 
+from secret_santa.const import LOOKUP_CACHE_FILE_NAME, REVEAL_SECRET, SMTP_HOST, TWILIO_AUTH_TOKEN
+from secret_santa.delivery.estimate import estimate_messages, get_sample_recipients
+from secret_santa.delivery.export import open_export_sink
+from secret_santa.delivery.failover import CircuitBreaker, FailoverMessagingService
+from secret_santa.delivery.fair_share import FairShareScheduler
+from secret_santa.delivery.lookup import DEFAULT_LOOKUP_TTL_SECONDS, LookupCache, LookupClient, PhoneLookup
+from secret_santa.delivery.reconcile import DeliveryReconciler
+from secret_santa.delivery.reveal import RevealHTTPServer, RevealStore
+from secret_santa.delivery.run_state import RunStateStore
+from secret_santa.delivery.schedule import DeliveryScheduler, DeliveryWindow
+from secret_santa.delivery.spool import SpoolMessagingService
+from secret_santa.delivery.status_callback import StatusCallbackReceiver
+from secret_santa.draw.cycles import DEFAULT_MIN_CYCLE_LENGTH
+from secret_santa.draw.mixing import MixingAttribute  # noqa: TC001 - typer resolves the annotations at runtime
+from secret_santa.draw_service import DrawHTTPServer, DrawService, DrawUnixHTTPServer
+from secret_santa.email_messaging_service import EmailMessagingService
+from secret_santa.roster import loader
+from secret_santa.roster.binary import write_binary_roster
+from secret_santa.roster.cache import RosterCache
+from secret_santa.roster.dedup import DuplicatePolicy, PhoneNumberIndex
+from secret_santa.roster.diff import DEFAULT_WATCH_INTERVAL, RosterDiff, RosterWatcher
+from secret_santa.roster.ingest import (
+    OPTIONAL_FIELDS,
+    REQUIRED_FIELDS,
+    MalformedRow,
+    RosterFormat,
+    iter_participants,
+)
+from secret_santa.roster.loader import RosterOptions
 from secret_santa.secret_santa_module import SecretSanta, load_env
+from secret_santa.twilio_messaging_service import TwilioMessagingService
 from secret_santa.util import logging
 from secret_santa.util.logging import LoggingLevel
+from secret_santa.util.profiling import Profiler
+from secret_santa.util.tracing import FileSpanExporter, Tracer
 
 secret_santa_app = Typer(
     short_help="Secret Santa client app.",
@@ -22,8 +57,232 @@ secret_santa_app = Typer(
 )
 
 
+CacheDirOption = Annotated[
+    Path | None,
+    Option(..., help="path to the roster cache directory [default: {project_root}/.secret_santa_cache]"),
+]
+CsvColumnsOption = Annotated[
+    list[str] | None,
+    Option(..., "--csv-column", help="map a participant field to a CSV column, as FIELD=COLUMN (repeatable)"),
+]
+DuplicatePolicyOption = Annotated[
+    DuplicatePolicy,
+    Option(..., case_sensitive=False, help="reject / merge participants sharing the same phone number"),
+]
+DefaultCountryCodeOption = Annotated[
+    str | None,
+    Option(..., help="country code to prefix national phone numbers (without an international prefix) with"),
+]
+StateDirOption = Annotated[
+    Path | None,
+    Option(..., help="path to the runs' state directory [default: {project_root}/.secret_santa_runs]"),
+]
+ProfileOption = Annotated[
+    Path | None,
+    Option(
+        ...,
+        help="profile the CPU time (of every thread, including the pipeline's stages), writing the cProfile stats to "
+        "this path",
+    ),
+]
+CollapsedStacksOption = Annotated[
+    bool,
+    Option(..., help="write the CPU profile as flamegraph-ready collapsed stacks as well (next to the stats)"),
+]
+TraceMallocOption = Annotated[
+    Path | None,
+    Option(..., help="trace the memory allocations, writing the top allocations of every stage to this path"),
+]
+TraceOption = Annotated[
+    Path | None,
+    Option(
+        ...,
+        help="trace the run's stages and every message sent, writing the spans to this path as OTLP JSON lines "
+        "(loadable by OpenTelemetry tools, no collector needed)",
+    ),
+]
+UseCacheOption = Annotated[
+    bool,
+    Option(..., "--use-cache/--no-cache", help="load unchanged participants files from the roster cache"),
+]
+
+
+def get_roster_options(
+    csv_columns: list[str] | None,
+    on_duplicate: DuplicatePolicy,
+    default_country_code: str | None,
+) -> RosterOptions:
+    """Build the roster options out of the command-line options.
+
+    Args:
+        csv_columns: The ``--csv-column`` values passed, if any.
+        on_duplicate: The ``--on-duplicate`` value passed.
+        default_country_code: The ``--default-country-code`` value passed, if any.
+
+    Returns:
+        The roster options to load the participants with.
+
+    """
+    return RosterOptions(
+        column_mapping=parse_column_mapping(csv_columns),
+        duplicate_policy=on_duplicate,
+        default_country_code=default_country_code,
+    )
+
+
+def parse_column_mapping(csv_columns: list[str] | None) -> dict[str, str] | None:
+    """Parse the ``--csv-column`` ``FIELD=COLUMN`` values into a mapping of participant fields to CSV columns.
+
+    Args:
+        csv_columns: The ``--csv-column`` values passed, if any.
+
+    Returns:
+        A mapping of participant fields to CSV columns, or ``None`` in case no values were passed.
+
+    """
+    if not csv_columns:
+        return None
+    assert all("=" in csv_column for csv_column in csv_columns), (
+        f"CSV columns should be passed as FIELD=COLUMN, got: {csv_columns}"
+    )
+    column_mapping = dict(csv_column.split("=", 1) for csv_column in csv_columns)
+    unknown_fields = [field for field in column_mapping if field not in REQUIRED_FIELDS + OPTIONAL_FIELDS]
+    assert not unknown_fields, (
+        f"CSV columns can only be mapped to the participant fields {[*REQUIRED_FIELDS, *OPTIONAL_FIELDS]}, "
+        f"got: {unknown_fields}"
+    )
+    return column_mapping
+
+
+def parse_tenant_weights(tenant_weights: list[str] | None) -> dict[str, float]:
+    """Parse the ``--tenant-weight`` ``TENANT=WEIGHT`` values into a mapping of tenants to their weights.
+
+    Args:
+        tenant_weights: The ``--tenant-weight`` values passed, if any.
+
+    Returns:
+        A mapping of tenants to their weights.
+
+    """
+    parsed_weights = {}
+    for tenant_weight in tenant_weights or []:
+        tenant, _, weight = tenant_weight.rpartition("=")
+        assert tenant, f"Tenant weights should be passed as TENANT=WEIGHT, got: {tenant_weight}"
+        parsed_weights[tenant] = float(weight)
+        assert parsed_weights[tenant] > 0, f"Tenant weights should be positive, got: {tenant_weight}"
+    return parsed_weights
+
+
+def parse_delivery_window(delivery_window: str) -> DeliveryWindow:
+    """Parse the ``--delivery-window`` ``HH:MM-HH:MM`` value into a delivery window.
+
+    Args:
+        delivery_window: The ``--delivery-window`` value passed.
+
+    Returns:
+        The delivery window.
+
+    """
+    start, separator, end = delivery_window.partition("-")
+    assert separator, f"The delivery window should be passed as HH:MM-HH:MM, got: {delivery_window}"
+    return DeliveryWindow(start=time_of_day.fromisoformat(start.strip()), end=time_of_day.fromisoformat(end.strip()))
+
+
+def get_email_client() -> EmailMessagingService | None:
+    """Get an email messaging client, in case the SMTP server is configured in the environment.
+
+    Returns:
+        The email messaging client, or ``None`` if no SMTP server is configured.
+
+    """
+    return EmailMessagingService() if os.getenv(SMTP_HOST) else None
+
+
+def get_phone_lookup(cache_dir: Path | None, ttl_days: float) -> PhoneLookup:
+    """Build the phone lookup checking the participants' numbers, caching the results in the roster cache directory.
+
+    Args:
+        cache_dir: The ``--cache-dir`` value passed, if any.
+        ttl_days: The number of days to cache the lookups' results for.
+
+    Returns:
+        The phone lookup.
+
+    """
+    return PhoneLookup(
+        LookupClient(),
+        cache=LookupCache(cache_dir / LOOKUP_CACHE_FILE_NAME if cache_dir else None, ttl=ttl_days * 24 * 60 * 60),
+    )
+
+
+def get_run_state(run_id: str | None, state_dir: Path | None) -> RunStateStore:
+    """Open the state of the run to resume, or of a new run.
+
+    Args:
+        run_id: The ID of the interrupted run to resume. If omitted, a new run is started.
+        state_dir: The directory of the runs' states. If omitted, the default directory will be used.
+
+    Returns:
+        The run's state.
+
+    """
+    if run_id:
+        assert RunStateStore.get_log_path(run_id, state_dir).exists(), f"Could not find the state of run {run_id}"
+        run_state = RunStateStore(run_id, state_dir=state_dir)
+        echo(f"Resuming run ID: {run_state.run_id}")
+    else:
+        run_state = RunStateStore(RunStateStore.new_run_id(), state_dir=state_dir)
+        echo(f"Run ID: {run_state.run_id}")
+    return run_state
+
+
+def get_reveal_store(store_path: Path, default_country_code: str | None = None) -> RevealStore:
+    """Open the reveal store at the ``store_path``, keyed by the secret configured in the environment.
+
+    Args:
+        store_path: The path of the reveal store.
+        default_country_code: The country code to prefix national phone numbers with. (Defaults to None).
+
+    Returns:
+        The reveal store.
+
+    """
+    secret = os.getenv(REVEAL_SECRET)
+    assert secret, f"Revealing the assignments on demand requires the {REVEAL_SECRET} environment variable"
+    return RevealStore(store_path, secret, default_country_code=default_country_code)
+
+
+def get_messaging_client(
+    spool_path: Path | None = None,
+    send_timeout: float | None = None,
+) -> TwilioMessagingService | FailoverMessagingService:
+    """Get the messaging client, failing over from Twilio to a spool on disk in case a spool path is passed.
+
+    Args:
+        spool_path: Path of the spool to fail the messages over to, while Twilio's circuit is open. If omitted,
+            the messages are sent by Twilio only. (Defaults to None).
+        send_timeout: The number of seconds to wait for Twilio to respond, if any. (Defaults to None).
+
+    Returns:
+        The messaging client.
+
+    """
+    twilio_client = TwilioMessagingService(alphanumeric_id="SecretSanta", timeout=send_timeout)
+    if not spool_path:
+        return twilio_client
+    return FailoverMessagingService(
+        [
+            (
+                twilio_client,
+                CircuitBreaker("Twilio", latency_threshold=send_timeout / 2 if send_timeout else 10.0),
+            ),
+            (SpoolMessagingService(spool_path), CircuitBreaker("Spool")),
+        ],
+    )
+
+
 @secret_santa_app.command(help="run the secret santa game", no_args_is_help=True)
-def run(
+def run(  # noqa: PLR0913
     participants_path: Annotated[Path, Option(..., help="path to the 'Secret Santa' participants JSON")],
     env_path: Annotated[Path | None, Option(..., help="path to the 'Secret Santa' environment")] = None,
     show_arrangement: Annotated[
@@ -34,6 +293,106 @@ def run(
     ] = False,
     logging_level: Annotated[LoggingLevel, Option(..., case_sensitive=False, help="logging level")] = LoggingLevel.info,
     dry_run: Annotated[bool, Option(..., help="run the program without actually sending the message")] = False,
+    use_cache: UseCacheOption = False,
+    cache_dir: CacheDirOption = None,
+    csv_columns: CsvColumnsOption = None,
+    on_duplicate: DuplicatePolicyOption = DuplicatePolicy.reject,
+    default_country_code: DefaultCountryCodeOption = None,
+    state_dir: StateDirOption = None,
+    run_id: Annotated[
+        str | None,
+        Option(..., help="ID of an interrupted run to resume, messaging only the participants it didn't message"),
+    ] = None,
+    status_callback_url: Annotated[
+        str | None,
+        Option(
+            ...,
+            help="public URL forwarding to the local status callback receiver, to track the messages' delivery",
+        ),
+    ] = None,
+    callback_host: Annotated[str, Option(..., help="host the status callback receiver listens on")] = "127.0.0.1",
+    callback_port: Annotated[int, Option(..., help="port the status callback receiver listens on")] = 8081,
+    wait_for_delivery: Annotated[
+        float,
+        Option(..., min=0, help="seconds to wait for the messages' delivery status callbacks once sent"),
+    ] = 60,
+    delivery_window: Annotated[
+        str | None,
+        Option(
+            ...,
+            help="schedule the messages within this local time window (HH:MM-HH:MM) of each participant, "
+            "spread evenly across it, instead of sending them all at once",
+        ),
+    ] = None,
+    default_time_zone: Annotated[
+        str,
+        Option(..., help="time zone of the participants without one, for scheduling their messages"),
+    ] = "UTC",
+    spool_path: Annotated[
+        Path | None,
+        Option(
+            ...,
+            help="spool the messages to this file while Twilio is failing or too slow (its circuit is open), "
+            "to be sent later by drain-spool",
+        ),
+    ] = None,
+    send_timeout: Annotated[
+        float | None,
+        Option(..., min=0, help="seconds to wait for Twilio to respond to each message sent"),
+    ] = None,
+    reveal_store: Annotated[
+        Path | None,
+        Option(..., help="path to seal the assignments at, to be revealed on demand (keyed by REVEAL_SECRET)"),
+    ] = None,
+    reveal_url: Annotated[
+        str | None,
+        Option(
+            ...,
+            help="public URL of the reveal endpoint (see reveal-serve): seal the assignments in --reveal-store and "
+            "only send every participant a link with a one-time code to reveal their assignment",
+        ),
+    ] = None,
+    single_cycle: Annotated[
+        bool,
+        Option(..., "--single-cycle/--any-cycles", help="draw everyone into a single loop of givers and recipients"),
+    ] = False,
+    min_cycle_length: Annotated[
+        int,
+        Option(..., min=2, help="minimal length of every loop of givers and recipients, e.g. 3 rules out swaps"),
+    ] = DEFAULT_MIN_CYCLE_LENGTH,
+    mix_by: Annotated[
+        list[MixingAttribute] | None,
+        Option(
+            ...,
+            case_sensitive=False,
+            help="match every giver with a recipient outside of their team / office wherever possible (repeatable)",
+        ),
+    ] = None,
+    lookup_numbers: Annotated[
+        bool,
+        Option(
+            ...,
+            "--lookup-numbers/--no-lookup-numbers",
+            help="look up the participants' numbers before the draw (Twilio Lookup, or TWILIO_LOOKUP_URL), leaving "
+            "out the participants whose number can't be messaged",
+        ),
+    ] = False,
+    lookup_ttl_days: Annotated[
+        float,
+        Option(..., min=0, help="days to cache the numbers' lookups for (in the roster cache directory)"),
+    ] = DEFAULT_LOOKUP_TTL_SECONDS / (24 * 60 * 60),
+    export: Annotated[
+        Path | None,
+        Option(
+            ...,
+            help="export the arrangement's pairs and the messages' results to this file as they're produced, by its "
+            "suffix as CSV (.csv), JSON Lines (.jsonl) or Parquet (.parquet, requires pyarrow)",
+        ),
+    ] = None,
+    profile: ProfileOption = None,
+    collapsed_stacks: CollapsedStacksOption = False,
+    trace_malloc: TraceMallocOption = None,
+    trace: TraceOption = None,
 ) -> int:
     """Run the secret santa game."""
     secret_santa_figlet = pyfiglet.figlet_format("Secret  Santa")
@@ -41,16 +400,469 @@ def run(
     time.sleep(0.5)
     logging.get_logger(add_common_handler=False).setLevel(str(logging_level).upper())
     load_env(env_path)
-    return SecretSanta(
-        participants_json_path=participants_path,
-        show_arrangement=show_arrangement,
-        dry_run=dry_run,
-    ).run()
+    run_state = None if dry_run else get_run_state(run_id, state_dir)
+    status_callback_receiver = (
+        StatusCallbackReceiver(
+            run_state,
+            public_url=status_callback_url,
+            host=callback_host,
+            port=callback_port,
+            auth_token=os.getenv(TWILIO_AUTH_TOKEN),
+        )
+        if run_state and status_callback_url
+        else None
+    )
+    assert bool(reveal_store) == bool(reveal_url), "Both --reveal-store and --reveal-url are required to reveal"
+    email_client = get_email_client()
+    sealed_store = get_reveal_store(reveal_store, default_country_code) if reveal_store else None
+    export_sink = open_export_sink(export, run_id=run_state.run_id if run_state else None) if export else None
+    tracer = Tracer(FileSpanExporter(trace)) if trace else None
+    try:
+        # The root span of the run, whose context the run's stages, messages and status callbacks are traced within
+        with tracer.start_span("run", run_id=run_state.run_id if run_state else "") if tracer else nullcontext():
+            if status_callback_receiver:
+                status_callback_receiver.start()
+            with Profiler(profile, collapsed_stacks=collapsed_stacks, trace_malloc_path=trace_malloc) as profiler:
+                exit_code = SecretSanta(
+                    participants_json_path=participants_path,
+                    show_arrangement=show_arrangement,
+                    dry_run=dry_run,
+                    roster_cache=RosterCache(cache_dir) if use_cache else None,
+                    roster_options=get_roster_options(csv_columns, on_duplicate, default_country_code),
+                    messaging_client=get_messaging_client(spool_path, send_timeout),
+                    run_state=run_state,
+                    status_callback_url=status_callback_url if status_callback_receiver else None,
+                    delivery_scheduler=(
+                        DeliveryScheduler(parse_delivery_window(delivery_window), default_time_zone=default_time_zone)
+                        if delivery_window
+                        else None
+                    ),
+                    email_client=email_client,
+                    profiler=profiler,
+                    reveal_store=sealed_store,
+                    reveal_url=reveal_url,
+                    single_cycle=single_cycle,
+                    min_cycle_length=min_cycle_length,
+                    mixing_attributes=mix_by or (),
+                    phone_lookup=get_phone_lookup(cache_dir, lookup_ttl_days) if lookup_numbers else None,
+                    export_sink=export_sink,
+                ).run()
+            if status_callback_receiver:
+                echo(f"Delivery status: {status_callback_receiver.wait_for_delivery(wait_for_delivery)}")
+    finally:
+        if status_callback_receiver:
+            status_callback_receiver.stop()
+        if email_client:
+            email_client.close()
+        if sealed_store:
+            sealed_store.close()
+        if export_sink:
+            export_sink.close()
+        if tracer:
+            tracer.close()
+        if run_state:
+            run_state.close()
+    return exit_code
+
+
+@secret_santa_app.command(help="send the messages spooled while Twilio was failing", no_args_is_help=True)
+def drain_spool(
+    spool_path: Annotated[Path, Option(..., help="path of the spool to send the messages of")],
+    env_path: Annotated[Path | None, Option(..., help="path to the 'Secret Santa' environment")] = None,
+    dry_run: Annotated[bool, Option(..., help="show the spooled messages without sending them")] = False,
+    logging_level: Annotated[LoggingLevel, Option(..., case_sensitive=False, help="logging level")] = LoggingLevel.info,
+) -> int:
+    """Send the messages spooled while Twilio was failing."""
+    logging.get_logger(add_common_handler=False).setLevel(str(logging_level).upper())
+    assert spool_path.exists(), f"Could not find the spool @ {spool_path}"
+    load_env(env_path)
+    spool = SpoolMessagingService(spool_path)
+    responses = spool.drain(TwilioMessagingService(alphanumeric_id="SecretSanta"), dry_run=dry_run)
+    echo(f"Sent {len(responses)} spooled messages, {len(spool.load_messages())} remain spooled")
+    return 0
+
+
+@secret_santa_app.command(
+    help="repair a run's arrangement after participants joined or dropped out, messaging only the givers reassigned",
+    no_args_is_help=True,
+)
+def repair(  # noqa: PLR0913
+    run_id: Annotated[str, Option(..., help="ID of the run to repair")],
+    participants_path: Annotated[Path, Option(..., help="path to the updated 'Secret Santa' participants JSON")],
+    env_path: Annotated[Path | None, Option(..., help="path to the 'Secret Santa' environment")] = None,
+    show_arrangement: Annotated[
+        bool,
+        Option(..., "--show-arrangement/--hide-arrangement", help="show the arrangement changes (giver -> receiver)"),
+    ] = False,
+    logging_level: Annotated[LoggingLevel, Option(..., case_sensitive=False, help="logging level")] = LoggingLevel.info,
+    dry_run: Annotated[bool, Option(..., help="show the repair without recording it or sending the messages")] = False,
+    use_cache: UseCacheOption = False,
+    cache_dir: CacheDirOption = None,
+    csv_columns: CsvColumnsOption = None,
+    on_duplicate: DuplicatePolicyOption = DuplicatePolicy.reject,
+    default_country_code: DefaultCountryCodeOption = None,
+    state_dir: StateDirOption = None,
+) -> int:
+    """Repair a run's arrangement after participants joined or dropped out."""
+    logging.get_logger(add_common_handler=False).setLevel(str(logging_level).upper())
+    assert RunStateStore.get_log_path(run_id, state_dir).exists(), f"Could not find the state of run {run_id}"
+    load_env(env_path)
+    email_client = get_email_client()
+    try:
+        with RunStateStore(run_id, state_dir=state_dir) as run_state:
+            exit_code = SecretSanta(
+                participants_json_path=participants_path,
+                show_arrangement=show_arrangement,
+                dry_run=dry_run,
+                roster_cache=RosterCache(cache_dir) if use_cache else None,
+                roster_options=get_roster_options(csv_columns, on_duplicate, default_country_code),
+                run_state=run_state,
+                email_client=email_client,
+            ).repair()
+    finally:
+        if email_client:
+            email_client.close()
+    return exit_code
 
 
-@secret_santa_app.command(help="run the secret santa game", no_args_is_help=True, hidden=True)
-def validate() -> None:
+@secret_santa_app.command(help="validate the secret santa game's participants", no_args_is_help=True)
+def validate(  # noqa: PLR0913
+    participants_path: Annotated[Path, Option(..., help="path to the 'Secret Santa' participants JSON")],
+    logging_level: Annotated[LoggingLevel, Option(..., case_sensitive=False, help="logging level")] = LoggingLevel.info,
+    use_cache: UseCacheOption = False,
+    cache_dir: CacheDirOption = None,
+    csv_columns: CsvColumnsOption = None,
+    on_duplicate: DuplicatePolicyOption = DuplicatePolicy.reject,
+    default_country_code: DefaultCountryCodeOption = None,
+    profile: ProfileOption = None,
+    collapsed_stacks: CollapsedStacksOption = False,
+    trace_malloc: TraceMallocOption = None,
+) -> int:
     """Validate the secret santa game's participants."""
+    logging.get_logger(add_common_handler=False).setLevel(str(logging_level).upper())
+    with Profiler(profile, collapsed_stacks=collapsed_stacks, trace_malloc_path=trace_malloc) as profiler:
+        participants = loader.load_participants(
+            participants_path,
+            roster_cache=RosterCache(cache_dir) if use_cache else None,
+            options=get_roster_options(csv_columns, on_duplicate, default_country_code),
+        )
+        profiler.snapshot("load")
+    echo(f"{participants_path} is valid: {len(participants)} participants")
+    return 0
+
+
+def echo_roster_diff(roster_diff: RosterDiff, roster_watcher: RosterWatcher) -> None:
+    """Echo the differences between two versions of a roster, and the current version's malformed rows.
+
+    Args:
+        roster_diff: The differences between the versions.
+        roster_watcher: The watcher which loaded the current version.
+
+    """
+    echo(f"{roster_watcher.participants_path}: {len(roster_watcher.participants)} participants ({roster_diff})")
+    for participant in roster_diff.added:
+        echo(f"  + {participant.full_name} ({participant.phone_number})")
+    for participant in roster_diff.removed:
+        echo(f"  - {participant.full_name} ({participant.phone_number})")
+    for participant_change in roster_diff.modified:
+        echo(
+            f"  ~ {participant_change.current.full_name} ({participant_change.current.phone_number}): "
+            f"{', '.join(participant_change.changed_fields)}",
+        )
+    for malformed_row in roster_watcher.malformed_rows:
+        echo(f"  ! Malformed row at {malformed_row.location}: {malformed_row.reason}", err=True)
+
+
+@secret_santa_app.command(
+    help="show the changes of the participants file since it was last cached, and cache its current version",
+    no_args_is_help=True,
+)
+def diff(  # noqa: PLR0913
+    participants_path: Annotated[Path, Option(..., help="path to the 'Secret Santa' participants JSON")],
+    logging_level: Annotated[LoggingLevel, Option(..., case_sensitive=False, help="logging level")] = LoggingLevel.info,
+    cache_dir: CacheDirOption = None,
+    csv_columns: CsvColumnsOption = None,
+    on_duplicate: DuplicatePolicyOption = DuplicatePolicy.reject,
+    default_country_code: DefaultCountryCodeOption = None,
+) -> int:
+    """Show the changes of the participants file since it was last cached, and cache its current version."""
+    logging.get_logger(add_common_handler=False).setLevel(str(logging_level).upper())
+    roster_watcher = RosterWatcher(
+        participants_path,
+        options=get_roster_options(csv_columns, on_duplicate, default_country_code),
+        roster_cache=RosterCache(cache_dir),
+    )
+    echo_roster_diff(roster_watcher.reload(), roster_watcher)
+    return 1 if roster_watcher.malformed_rows else 0
+
+
+@secret_santa_app.command(
+    help="watch the participants file, re-validating its changed rows and showing the changes as it's edited",
+    no_args_is_help=True,
+)
+def watch(  # noqa: PLR0913
+    participants_path: Annotated[Path, Option(..., help="path to the 'Secret Santa' participants JSON")],
+    interval: Annotated[
+        float, Option(..., min=0.1, help="number of seconds between checks of the participants file")
+    ] = DEFAULT_WATCH_INTERVAL,
+    logging_level: Annotated[LoggingLevel, Option(..., case_sensitive=False, help="logging level")] = LoggingLevel.info,
+    use_cache: UseCacheOption = False,
+    cache_dir: CacheDirOption = None,
+    csv_columns: CsvColumnsOption = None,
+    on_duplicate: DuplicatePolicyOption = DuplicatePolicy.reject,
+    default_country_code: DefaultCountryCodeOption = None,
+) -> int:
+    """Watch the participants file, re-validating its changed rows and showing the changes as it's edited."""
+    logging.get_logger(add_common_handler=False).setLevel(str(logging_level).upper())
+    roster_watcher = RosterWatcher(
+        participants_path,
+        options=get_roster_options(csv_columns, on_duplicate, default_country_code),
+        roster_cache=RosterCache(cache_dir) if use_cache else None,
+    )
+    echo(f"Watching {participants_path}, press Ctrl+C to stop")
+    try:
+        for roster_diff in roster_watcher.watch(interval):
+            echo_roster_diff(roster_diff, roster_watcher)
+    except KeyboardInterrupt:
+        echo("Stopped watching")
+    return 0
+
+
+@secret_santa_app.command(
+    help="estimate the messages' encoding, segments and cost, without sending them",
+    no_args_is_help=True,
+)
+def estimate(  # noqa: PLR0913
+    participants_path: Annotated[Path, Option(..., help="path to the 'Secret Santa' participants JSON")],
+    run_id: Annotated[
+        str | None,
+        Option(..., help="ID of a drawn run to estimate the messages of, instead of a sample arrangement"),
+    ] = None,
+    price_per_segment: Annotated[
+        float | None,
+        Option(..., min=0, help="price of a single message segment, to estimate the total cost"),
+    ] = None,
+    worst_offenders: Annotated[
+        int, Option(..., min=0, help="number of messages taking the most segments to show")
+    ] = 10,
+    logging_level: Annotated[LoggingLevel, Option(..., case_sensitive=False, help="logging level")] = LoggingLevel.info,
+    use_cache: UseCacheOption = False,
+    cache_dir: CacheDirOption = None,
+    csv_columns: CsvColumnsOption = None,
+    on_duplicate: DuplicatePolicyOption = DuplicatePolicy.reject,
+    default_country_code: DefaultCountryCodeOption = None,
+    state_dir: StateDirOption = None,
+) -> int:
+    """Estimate the messages' encoding, segments and cost, without sending them."""
+    logging.get_logger(add_common_handler=False).setLevel(str(logging_level).upper())
+    participants = loader.load_participants(
+        participants_path,
+        roster_cache=RosterCache(cache_dir) if use_cache else None,
+        options=get_roster_options(csv_columns, on_duplicate, default_country_code),
+    )
+    if run_id:
+        assert RunStateStore.get_log_path(run_id, state_dir).exists(), f"Could not find the state of run {run_id}"
+        with RunStateStore(run_id, state_dir=state_dir) as run_state:
+            assert run_state.arrangement is not None, f"Run {run_id} has no arrangement to estimate"
+            arrangement = run_state.arrangement
+        phone_numbers = PhoneNumberIndex(default_country_code=default_country_code)
+        for participant in participants:
+            phone_numbers.add(participant)
+        drawn_recipients = [
+            phone_numbers.get(arrangement.get(phone_numbers.normalize(participant.phone_number), ""))
+            for participant in participants
+        ]
+        assert all(drawn_recipients), f"The participants changed since run {run_id} was drawn, repair it first"
+        recipients = [recipient for recipient in drawn_recipients if recipient]
+    else:
+        echo("Estimating a sample arrangement, pass --run-id to estimate the messages of a drawn run")
+        recipients = get_sample_recipients(participants)
+
+    cost_estimate = estimate_messages(
+        (
+            (participant, SecretSanta.get_secret_santa_message(participant, recipient))
+            for participant, recipient in zip(participants, recipients, strict=True)
+        ),
+        price_per_segment=price_per_segment,
+        worst_offenders=worst_offenders,
+    )
+    echo(f"Messages: {cost_estimate.messages}, segments: {cost_estimate.segments}")
+    echo(f"Encodings: {', '.join(f'{encoding}: {count}' for encoding, count in cost_estimate.encodings.items())}")
+    echo(f"Segments per message: {cost_estimate.segments_histogram}")
+    if cost_estimate.cost is not None:
+        echo(f"Estimated cost: {cost_estimate.cost:.2f}")
+    for message_estimate in cost_estimate.worst_offenders:
+        non_gsm_7_characters = (
+            f" (non GSM-7 characters: {message_estimate.non_gsm_7_characters!r})"
+            if message_estimate.non_gsm_7_characters
+            else ""
+        )
+        echo(
+            f"{message_estimate.participant.full_name} ({message_estimate.participant.phone_number}): "
+            f"{message_estimate.segments} segments, {message_estimate.encoding}, {message_estimate.length} units"
+            f"{non_gsm_7_characters}",
+        )
+    return 0
+
+
+@secret_santa_app.command("cache-stats", help="show the roster cache statistics")
+def cache_stats(cache_dir: CacheDirOption = None) -> int:
+    """Show the roster cache statistics."""
+    stats = RosterCache(cache_dir).stats()
+    echo(f"Directory: {stats.directory}")
+    echo(f"Cached rosters: {stats.entries}")
+    echo(f"Total size: {stats.total_bytes} bytes")
+    return 0
+
+
+@secret_santa_app.command("cache-clear", help="remove all the cached rosters")
+def cache_clear(cache_dir: CacheDirOption = None) -> int:
+    """Remove all the cached rosters."""
+    removed_entries = RosterCache(cache_dir).clear()
+    echo(f"Removed {removed_entries} cached rosters")
+    return 0
+
+
+@secret_santa_app.command(help="convert a JSON, JSON Lines or CSV roster into the binary roster format")
+def convert(
+    input_path: Annotated[Path, Option(..., help="path to the roster to convert")],
+    output_path: Annotated[Path, Option(..., help="path of the binary roster to write")],
+    input_format: Annotated[
+        RosterFormat | None,
+        Option(..., case_sensitive=False, help="the input roster format [default: detected by the file suffix]"),
+    ] = None,
+    csv_columns: CsvColumnsOption = None,
+) -> int:
+    """Convert a JSON, JSON Lines or CSV roster into the binary roster format."""
+    malformed_rows: list[MalformedRow] = []
+    participants_count = write_binary_roster(
+        iter_participants(
+            input_path,
+            input_format,
+            column_mapping=parse_column_mapping(csv_columns),
+            malformed_rows=malformed_rows,
+        ),
+        output_path,
+    )
+    for malformed_row in malformed_rows:
+        echo(f"Skipped malformed row at {malformed_row.location}: {malformed_row.reason}", err=True)
+    echo(f"Converted {participants_count} participants from {input_path} to {output_path}")
+    return 0
+
+
+@secret_santa_app.command(help="reconcile the delivery status of a run's messages", no_args_is_help=True)
+def reconcile(
+    run_id: Annotated[str, Option(..., help="ID of the run to reconcile")],
+    env_path: Annotated[Path | None, Option(..., help="path to the 'Secret Santa' environment")] = None,
+    state_dir: StateDirOption = None,
+    workers: Annotated[int, Option(..., min=1, help="number of days to fetch the messages of concurrently")] = 4,
+    logging_level: Annotated[LoggingLevel, Option(..., case_sensitive=False, help="logging level")] = LoggingLevel.info,
+) -> int:
+    """Reconcile the delivery status of a run's messages."""
+    logging.get_logger(add_common_handler=False).setLevel(str(logging_level).upper())
+    assert RunStateStore.get_log_path(run_id, state_dir).exists(), f"Could not find the state of run {run_id}"
+    load_env(env_path)
+    with RunStateStore(run_id, state_dir=state_dir) as run_state:
+        result = DeliveryReconciler(
+            TwilioMessagingService(alphanumeric_id="SecretSanta"),
+            run_state,
+            max_workers=workers,
+        ).reconcile()
+    echo(f"Updated {result.updated_messages} messages sent over {result.fetched_days} days")
+    echo(f"Delivery status: {result.counts}")
+    return 0
+
+
+@secret_santa_app.command(help="serve draw jobs over HTTP, keeping the messaging client warm between draws")
+def serve(  # noqa: PLR0913
+    host: Annotated[str, Option(..., help="host to listen on")] = "127.0.0.1",
+    port: Annotated[int, Option(..., help="port to listen on")] = 8080,
+    unix_socket: Annotated[
+        Path | None,
+        Option(..., help="path of a Unix domain socket to listen on, instead of the host and port"),
+    ] = None,
+    workers: Annotated[int, Option(..., min=1, help="number of draw jobs to run concurrently")] = 4,
+    env_path: Annotated[Path | None, Option(..., help="path to the 'Secret Santa' environment")] = None,
+    logging_level: Annotated[LoggingLevel, Option(..., case_sensitive=False, help="logging level")] = LoggingLevel.info,
+    on_duplicate: DuplicatePolicyOption = DuplicatePolicy.reject,
+    default_country_code: DefaultCountryCodeOption = None,
+    shared_rate: Annotated[
+        float | None,
+        Option(
+            ...,
+            min=0.01,
+            help="share this many text messages per second fairly between the jobs' tenants (the job's 'tenant'), "
+            "instead of letting the biggest job take the whole throughput",
+        ),
+    ] = None,
+    tenant_weights: Annotated[
+        list[str] | None,
+        Option(..., "--tenant-weight", help="a tenant's share of --shared-rate, as TENANT=WEIGHT (repeatable)"),
+    ] = None,
+    tenant_quota: Annotated[
+        int | None,
+        Option(..., min=0, help="maximal number of text messages every tenant may send through --shared-rate"),
+    ] = None,
+    trace: TraceOption = None,
+) -> int:
+    """Serve draw jobs over HTTP, keeping the messaging client warm between draws."""
+    logging.get_logger(add_common_handler=False).setLevel(str(logging_level).upper())
+    load_env(env_path)
+    draw_service = DrawService(
+        TwilioMessagingService(alphanumeric_id="SecretSanta"),
+        email_client=get_email_client(),
+        max_workers=workers,
+        roster_options=get_roster_options(None, on_duplicate, default_country_code),
+        fair_share_scheduler=FairShareScheduler(shared_rate) if shared_rate else None,
+        tenant_weights=parse_tenant_weights(tenant_weights),
+        tenant_quota=tenant_quota,
+        tracer=Tracer(FileSpanExporter(trace)) if trace else None,
+    )
+    server: DrawHTTPServer | DrawUnixHTTPServer
+    if unix_socket:
+        unix_socket.unlink(missing_ok=True)
+        server = DrawUnixHTTPServer(str(unix_socket), draw_service)
+        echo(f"Serving draw jobs on unix://{unix_socket}")
+    else:
+        server = DrawHTTPServer((host, port), draw_service)
+        echo(f"Serving draw jobs on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        echo("Shutting down, waiting for the running draw jobs to finish")
+    finally:
+        server.server_close()
+        draw_service.shutdown()
+        if unix_socket:
+            unix_socket.unlink(missing_ok=True)
+    return 0
+
+
+@secret_santa_app.command(
+    help="serve the sealed assignments, for every participant to reveal their own", no_args_is_help=True
+)
+def reveal_serve(  # noqa: PLR0913
+    reveal_store: Annotated[Path, Option(..., help="path to the sealed store of the assignments")],
+    host: Annotated[str, Option(..., help="host to listen on")] = "127.0.0.1",
+    port: Annotated[int, Option(..., help="port to listen on")] = 8082,
+    env_path: Annotated[Path | None, Option(..., help="path to the 'Secret Santa' environment")] = None,
+    logging_level: Annotated[LoggingLevel, Option(..., case_sensitive=False, help="logging level")] = LoggingLevel.info,
+    default_country_code: DefaultCountryCodeOption = None,
+) -> int:
+    """Serve the sealed assignments, for every participant to reveal their own."""
+    logging.get_logger(add_common_handler=False).setLevel(str(logging_level).upper())
+    assert reveal_store.exists(), f"Could not find the reveal store @ {reveal_store}"
+    load_env(env_path)
+    with get_reveal_store(reveal_store, default_country_code) as sealed_store:
+        server = RevealHTTPServer((host, port), sealed_store)
+        echo(f"Serving {len(sealed_store)} sealed assignments on http://{host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            echo("Shutting down")
+        finally:
+            server.server_close()
+    return 0
 
 
 if __name__ == "__main__":
@@ -3,7 +3,25 @@
 TWILIO_ACCOUNT_SID = "TWILIO_ACCOUNT_SID"
 TWILIO_AUTH_TOKEN = "TWILIO_AUTH_TOKEN"
 TWILIO_NUMBER = "TWILIO_NUMBER"
+TWILIO_SENDER_POOL = "TWILIO_SENDER_POOL"
+TWILIO_SENDER_RATE = "TWILIO_SENDER_RATE"
+TWILIO_LOOKUP_URL = "TWILIO_LOOKUP_URL"
 
 MINIMUM_NUMBER_OF_PARTICIPANTS = 3
 
 ENCODING = "utf-8"
+# Decodes UTF-8, skipping a leading BOM
+ROSTER_ENCODING = "utf-8-sig"
+
+ROSTER_CACHE_DIRECTORY_NAME = ".secret_santa_cache"
+RUN_STATE_DIRECTORY_NAME = ".secret_santa_runs"
+LOOKUP_CACHE_FILE_NAME = "lookups.jsonl"
+
+SMTP_HOST = "SMTP_HOST"
+SMTP_PORT = "SMTP_PORT"
+SMTP_USERNAME = "SMTP_USERNAME"
+SMTP_PASSWORD = "SMTP_PASSWORD"
+SMTP_SENDER = "SMTP_SENDER"
+SMTP_STARTTLS = "SMTP_STARTTLS"
+
+REVEAL_SECRET = "REVEAL_SECRET"
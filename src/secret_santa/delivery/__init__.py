@@ -0,0 +1 @@
+"""Message delivery package."""
@@ -0,0 +1,44 @@
+"""Messaging channels the participants could be messaged through."""
+
+from enum import StrEnum, auto
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from secret_santa.model.participant import Participant
+
+
+class Channel(StrEnum):
+    """Supported messaging channels."""
+
+    sms = auto()
+    email = auto()
+
+
+class InvalidChannelError(ValueError):
+    """Raised when a participant's channel preference is unknown, or can't be used to reach the participant."""
+
+
+def get_participant_channel(participant: Participant) -> Channel:
+    """Get the channel the ``participant`` prefers to be messaged through.
+
+    Args:
+        participant: The participant's details.
+
+    Returns:
+        The participant's preferred channel, or SMS if the participant has no preference.
+
+    Raises:
+        InvalidChannelError: If the participant's channel is unknown, or is email while the participant has no email.
+
+    """
+    if not participant.channel:
+        return Channel.sms
+    try:
+        channel = Channel(participant.channel.strip().lower())
+    except ValueError as err:
+        unknown_channel_err = f"{participant.channel!r} is not a known channel (one of: {', '.join(Channel)})"
+        raise InvalidChannelError(unknown_channel_err) from err
+    if channel == Channel.email and not participant.email:
+        missing_email_err = "the email channel is preferred, yet no email address is set"
+        raise InvalidChannelError(missing_email_err)
+    return channel
@@ -0,0 +1,213 @@
+"""Pre-send estimation of the messages' encoding, segments and cost.
+
+An SMS is sent in GSM-7 (160 septets per single segment, 153 per segment of a multipart message) unless its body has
+a character outside of the GSM-7 alphabet, in which case the whole message is sent in UCS-2 (70 / 67 UTF-16 code
+units per segment). Hence a single non GSM-7 character in a name more than doubles its message's segments (and
+cost). The GSM-7 extension table characters (e.g. ``€``, ``[``) take two septets.
+
+The messages are classified with compiled regular expressions, so a whole roster is estimated in a single batched
+pass without a per-character Python loop.
+"""
+
+import heapq
+import math
+import random
+import re
+from collections import Counter
+from collections.abc import Iterable
+from enum import StrEnum
+from typing import TYPE_CHECKING
+
+from attr import dataclass
+
+if TYPE_CHECKING:
+    from secret_santa.model.participant import Participant
+
+GSM_7_BASIC_CHARACTERS = (
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM_7_EXTENSION_CHARACTERS = "\f^{}\\[~]|€"
+
+NON_GSM_7_PATTERN = re.compile(f"[^{re.escape(GSM_7_BASIC_CHARACTERS + GSM_7_EXTENSION_CHARACTERS)}]")
+GSM_7_EXTENSION_PATTERN = re.compile(f"[{re.escape(GSM_7_EXTENSION_CHARACTERS)}]")
+
+GSM_7_SINGLE_SEGMENT_LENGTH = 160
+GSM_7_MULTIPART_SEGMENT_LENGTH = 153
+UCS_2_SINGLE_SEGMENT_LENGTH = 70
+UCS_2_MULTIPART_SEGMENT_LENGTH = 67
+
+
+class Encoding(StrEnum):
+    """SMS encodings."""
+
+    gsm_7 = "GSM-7"
+    ucs_2 = "UCS-2"
+
+
+@dataclass(frozen=True, kw_only=True)
+class MessageEstimate:
+    """The estimate of a single message.
+
+    Attributes:
+        participant: The participant the message is sent to.
+        encoding: The message's encoding.
+        length: The message's length, in the encoding's units (septets / UTF-16 code units).
+        segments: The number of segments the message is sent in.
+        non_gsm_7_characters: The characters forcing the message into UCS-2, if any.
+
+    """
+
+    participant: Participant
+    encoding: Encoding
+    length: int
+    segments: int
+    non_gsm_7_characters: str = ""
+
+
+@dataclass(kw_only=True)
+class CostEstimate:
+    """The estimate of all the messages of a roster.
+
+    Attributes:
+        messages: The number of messages.
+        segments: The total number of segments.
+        encodings: The number of messages per encoding.
+        segments_histogram: The number of messages per number of segments.
+        worst_offenders: The messages taking the most segments, the worst first.
+        cost: The total cost, if the price per segment is known.
+
+    """
+
+    messages: int
+    segments: int
+    encodings: dict[Encoding, int]
+    segments_histogram: dict[int, int]
+    worst_offenders: list[MessageEstimate]
+    cost: float | None = None
+
+
+def classify_message(body: str) -> tuple[Encoding, int]:
+    """Classify the message's encoding, and get its length in the encoding's units.
+
+    Args:
+        body: The message's body.
+
+    Returns:
+        The message's encoding, and its length in septets (GSM-7) / UTF-16 code units (UCS-2).
+
+    """
+    if NON_GSM_7_PATTERN.search(body):
+        return Encoding.ucs_2, len(body.encode("utf-16-le")) // 2
+    return Encoding.gsm_7, len(body) + len(GSM_7_EXTENSION_PATTERN.findall(body))
+
+
+def count_segments(encoding: Encoding, length: int) -> int:
+    """Count the segments a message of the ``length`` is sent in.
+
+    Args:
+        encoding: The message's encoding.
+        length: The message's length, in the encoding's units.
+
+    Returns:
+        The number of segments.
+
+    """
+    single_segment_length, multipart_segment_length = (
+        (GSM_7_SINGLE_SEGMENT_LENGTH, GSM_7_MULTIPART_SEGMENT_LENGTH)
+        if encoding == Encoding.gsm_7
+        else (UCS_2_SINGLE_SEGMENT_LENGTH, UCS_2_MULTIPART_SEGMENT_LENGTH)
+    )
+    return 1 if length <= single_segment_length else math.ceil(length / multipart_segment_length)
+
+
+def estimate_message(participant: Participant, body: str) -> MessageEstimate:
+    """Estimate a single message.
+
+    Args:
+        participant: The participant the message is sent to.
+        body: The message's body.
+
+    Returns:
+        The message's estimate.
+
+    """
+    encoding, length = classify_message(body)
+    return MessageEstimate(
+        participant=participant,
+        encoding=encoding,
+        length=length,
+        segments=count_segments(encoding, length),
+        non_gsm_7_characters="".join(dict.fromkeys(NON_GSM_7_PATTERN.findall(body))),
+    )
+
+
+def get_sample_recipients(participants: list[Participant], rng: random.Random | None = None) -> list[Participant]:
+    """Draw a sample arrangement, in O(n), to estimate the messages of a roster which was not drawn yet.
+
+    The participants are shuffled into a single cycle, each giving to the next, which is always a derangement.
+
+    Args:
+        participants: The participants.
+        rng: The random number generator to shuffle with. (Defaults to None).
+
+    Returns:
+        The recipients, parallel to the participants list.
+
+    """
+    order = list(range(len(participants)))
+    (rng or random.Random()).shuffle(order)
+    recipients: list[Participant] = [participants[0]] * len(participants)
+    for giver_index, recipient_index in zip(order, order[1:] + order[:1], strict=True):
+        recipients[giver_index] = participants[recipient_index]
+    return recipients
+
+
+def estimate_messages(
+    messages: Iterable[tuple[Participant, str]],
+    *,
+    price_per_segment: float | None = None,
+    worst_offenders: int = 10,
+) -> CostEstimate:
+    """Estimate the encoding, segments and cost of the ``messages``, without sending them.
+
+    Args:
+        messages: The participants to message, and the bodies of their messages.
+        price_per_segment: The price of a single segment. If omitted, the cost is not estimated. (Defaults to None).
+        worst_offenders: The number of messages taking the most segments to report. (Defaults to 10).
+
+    Returns:
+        The estimate of the messages.
+
+    """
+    # The messages are tallied by their (encoding, length), hence the segments are counted once per distinct length
+    message_counts: Counter[tuple[Encoding, int]] = Counter()
+    segments_by_length: dict[tuple[Encoding, int], int] = {}
+    # A min-heap of the messages taking the most segments: (segments, length, -message number, participant, body)
+    worst_messages: list[tuple[int, int, int, Participant, str]] = []
+    for message_number, (participant, body) in enumerate(messages):
+        encoding_length = classify_message(body)
+        message_counts[encoding_length] += 1
+        if (segments := segments_by_length.get(encoding_length)) is None:
+            segments = segments_by_length[encoding_length] = count_segments(*encoding_length)
+        if len(worst_messages) < worst_offenders:
+            heapq.heappush(worst_messages, (segments, encoding_length[1], -message_number, participant, body))
+        elif worst_offenders and (segments, encoding_length[1]) > worst_messages[0][:2]:
+            heapq.heapreplace(worst_messages, (segments, encoding_length[1], -message_number, participant, body))
+
+    encodings: Counter[Encoding] = Counter()
+    segments_histogram: Counter[int] = Counter()
+    for (encoding, length), count in message_counts.items():
+        encodings[encoding] += count
+        segments_histogram[segments_by_length[encoding, length]] += count
+    total_segments = sum(segments * count for segments, count in segments_histogram.items())
+    return CostEstimate(
+        messages=sum(encodings.values()),
+        segments=total_segments,
+        encodings=dict(encodings),
+        segments_histogram=dict(sorted(segments_histogram.items())),
+        worst_offenders=[
+            estimate_message(participant, body) for *_, participant, body in sorted(worst_messages, reverse=True)
+        ],
+        cost=total_segments * price_per_segment if price_per_segment is not None else None,
+    )
@@ -0,0 +1,351 @@
+"""Streaming export of a run's arrangement and send results, for analytics and auditing.
+
+Every pair of the arrangement is exported as it's drawn (streamed to the render stage), and every message's result as
+its response is recorded, as rows of a single schema (see ``ExportRow``). The rows are buffered, and written in
+batches (a single write, or a Parquet row group, per batch), hence exporting a huge run takes a bounded amount of
+memory and a write per batch rather than per row.
+
+CSV and JSON Lines exports need no extra dependencies, while Parquet exports need ``pyarrow`` to be installed (the
+``parquet`` extra).
+"""
+
+import csv
+import json
+import threading
+from abc import ABC, abstractmethod
+from datetime import UTC, datetime
+from enum import StrEnum, auto
+from os import PathLike
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Self
+
+import attr
+from attr import dataclass
+
+from secret_santa.const import ENCODING
+from secret_santa.util import logging
+
+if TYPE_CHECKING:
+    from secret_santa.delivery.pipeline import OutgoingMessage
+    from secret_santa.model.participant import Participant
+    from secret_santa.twilio_messaging_service import MessageResponse
+
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(StrEnum):
+    """Supported export file formats."""
+
+    csv = auto()
+    jsonl = auto()
+    parquet = auto()
+
+
+EXPORT_FORMAT_SUFFIXES: dict[str, ExportFormat] = {
+    ".csv": ExportFormat.csv,
+    ".jsonl": ExportFormat.jsonl,
+    ".ndjson": ExportFormat.jsonl,
+    ".parquet": ExportFormat.parquet,
+}
+
+
+class ExportEvent(StrEnum):
+    """The kinds of exported rows."""
+
+    pair = auto()
+    send = auto()
+
+
+class ExportError(Exception):
+    """Raised when a run could not be exported in the requested format."""
+
+
+@dataclass(frozen=True, kw_only=True)
+class ExportRow:
+    """An exported row: a pair of the arrangement, or the result of a message sent.
+
+    Attributes:
+        event: Whether the row is a pair of the arrangement, or the result of a message sent.
+        recorded_at: When the row was recorded (UTC, ISO 8601).
+        run_id: The ID of the run, if it has one (dry runs don't).
+        phone_number: The giver's normalized phone number.
+        giver: The giver's full name.
+        recipient: The recipient's full name.
+        channel: The channel the message was sent through (``send`` rows only).
+        status: The message's status (``send`` rows only).
+        sid: The message's SID, if it was actually sent (``send`` rows only).
+
+    """
+
+    event: ExportEvent
+    recorded_at: str
+    run_id: str | None
+    phone_number: str
+    giver: str
+    recipient: str
+    channel: str | None = None
+    status: str | None = None
+    sid: str | None = None
+
+
+EXPORT_FIELDS = tuple(field.name for field in attr.fields(ExportRow))
+
+
+def detect_export_format(export_path: PathLike) -> ExportFormat:
+    """Detect the format of the export file at ``export_path`` by its suffix.
+
+    Args:
+        export_path: Path to the export file.
+
+    Returns:
+        The format of the export file.
+
+    Raises:
+        ExportError: If the suffix is not of a supported format.
+
+    """
+    suffix = Path(export_path).suffix.lower()
+    if suffix not in EXPORT_FORMAT_SUFFIXES:
+        unknown_format_err = f"Unknown export format {suffix!r}, use one of: {', '.join(EXPORT_FORMAT_SUFFIXES)}"
+        raise ExportError(unknown_format_err)
+    return EXPORT_FORMAT_SUFFIXES[suffix]
+
+
+class ExportSink(ABC):
+    """Buffers the exported rows, and writes them in batches. Subclassed per export format.
+
+    The sink is thread safe, as the pairs are exported by the pipeline's draw stage while the results are exported
+    by its record stage.
+
+    Attributes:
+        logger: The class logger.
+        export_path: The path of the export file.
+        run_id: The ID of the run exported, if it has one.
+        batch_size: The number of buffered rows which triggers a write.
+        rows: The number of rows exported.
+
+    """
+
+    def __init__(
+        self,
+        export_path: PathLike,
+        *,
+        run_id: str | None = None,
+        batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+    ) -> None:
+        """Initialize the sink.
+
+        Args:
+            export_path: The path of the export file. It's overwritten if it already exists.
+            run_id: The ID of the run exported, if it has one. (Defaults to None).
+            batch_size: The number of buffered rows which triggers a write. (Defaults to 1000).
+
+        """
+        assert batch_size > 0, "The export's batches should hold at least one row"
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.export_path = Path(export_path)
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.rows = 0
+        self._buffer: list[ExportRow] = []
+        self._lock = threading.Lock()
+
+    def write(self, row: ExportRow) -> None:
+        """Buffer the ``row``, writing the buffered rows in case the batch is full.
+
+        Args:
+            row: The row to export.
+
+        """
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self.write_buffer()
+
+    def write_pair(self, phone_number: str, participant: Participant, recipient: Participant) -> None:
+        """Export a pair of the arrangement.
+
+        Args:
+            phone_number: The giver's normalized phone number.
+            participant: The giver.
+            recipient: The giver's recipient.
+
+        """
+        self.write(
+            ExportRow(
+                event=ExportEvent.pair,
+                recorded_at=datetime.now(tz=UTC).isoformat(),
+                run_id=self.run_id,
+                phone_number=phone_number,
+                giver=participant.full_name,
+                recipient=recipient.full_name,
+            ),
+        )
+
+    def write_result(self, message: OutgoingMessage, response: MessageResponse) -> None:
+        """Export the result of a message sent.
+
+        Args:
+            message: The message sent.
+            response: The message's response.
+
+        """
+        self.write(
+            ExportRow(
+                event=ExportEvent.send,
+                recorded_at=datetime.now(tz=UTC).isoformat(),
+                run_id=self.run_id,
+                phone_number=message.phone_number,
+                giver=message.participant.full_name,
+                recipient=message.recipient.full_name,
+                channel=str(message.channel),
+                status=response.status,
+                sid=response.sid,
+            ),
+        )
+
+    def write_buffer(self) -> None:
+        """Write the buffered rows. Should be called while holding the lock."""
+        if not self._buffer:
+            return
+        self.write_rows(self._buffer)
+        self.rows += len(self._buffer)
+        self._buffer.clear()
+
+    @abstractmethod
+    def write_rows(self, rows: list[ExportRow]) -> None:
+        """Write a batch of rows to the export file. Implemented by every export format."""
+
+    def flush(self) -> None:
+        """Write the buffered rows."""
+        with self._lock:
+            self.write_buffer()
+
+    def close(self) -> None:
+        """Write the buffered rows and close the export file."""
+        with self._lock:
+            self.write_buffer()
+            self.close_file()
+        self.logger.info(f"Exported {self.rows} rows to {self.export_path}")
+
+    @abstractmethod
+    def close_file(self) -> None:
+        """Close the export file. Implemented by every export format."""
+
+    def __enter__(self) -> Self:
+        """Enter the sink's context."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Close the sink on exiting its context."""
+        self.close()
+
+
+class CsvExportSink(ExportSink):
+    """Exports the rows to a CSV file, with a header row."""
+
+    def __init__(self, export_path: PathLike, **kwargs: Any) -> None:  # noqa: ANN401
+        """Open the export file and write its header (see ``ExportSink`` for the arguments)."""
+        super().__init__(export_path, **kwargs)
+        self._file = self.export_path.open("w", encoding=ENCODING, newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(EXPORT_FIELDS)
+
+    def write_rows(self, rows: list[ExportRow]) -> None:
+        """Write a batch of rows to the export file."""
+        self._writer.writerows(attr.astuple(row, recurse=False) for row in rows)
+        self._file.flush()
+
+    def close_file(self) -> None:
+        """Close the export file."""
+        self._file.close()
+
+
+class JsonLinesExportSink(ExportSink):
+    """Exports the rows to a JSON Lines file, a JSON object per row."""
+
+    def __init__(self, export_path: PathLike, **kwargs: Any) -> None:  # noqa: ANN401
+        """Open the export file (see ``ExportSink`` for the arguments)."""
+        super().__init__(export_path, **kwargs)
+        self._file = self.export_path.open("w", encoding=ENCODING)
+
+    def write_rows(self, rows: list[ExportRow]) -> None:
+        """Write a batch of rows to the export file."""
+        self._file.write(
+            "".join(f"{json.dumps(attr.asdict(row, recurse=False), separators=(',', ':'))}\n" for row in rows),
+        )
+        self._file.flush()
+
+    def close_file(self) -> None:
+        """Close the export file."""
+        self._file.close()
+
+
+class ParquetExportSink(ExportSink):
+    """Exports the rows to a Parquet file, a row group per batch. Requires ``pyarrow``."""
+
+    def __init__(self, export_path: PathLike, **kwargs: Any) -> None:  # noqa: ANN401
+        """Open the export file (see ``ExportSink`` for the arguments).
+
+        Raises:
+            ExportError: If ``pyarrow`` is not installed.
+
+        """
+        super().__init__(export_path, **kwargs)
+        try:
+            import pyarrow as pa  # noqa: PLC0415 - an optional dependency
+            import pyarrow.parquet as pq  # noqa: PLC0415
+        except ImportError as err:
+            missing_pyarrow_err = "Exporting to Parquet requires pyarrow, install the parquet extra"
+            raise ExportError(missing_pyarrow_err) from err
+        self._pa = pa
+        self._schema = pa.schema([(field, pa.string()) for field in EXPORT_FIELDS])
+        self._writer = pq.ParquetWriter(self.export_path, self._schema)
+
+    def write_rows(self, rows: list[ExportRow]) -> None:
+        """Write a batch of rows to the export file, as a row group."""
+        columns = zip(*(attr.astuple(row, recurse=False) for row in rows), strict=True)
+        self._writer.write_table(
+            self._pa.Table.from_arrays(
+                [self._pa.array(column, type=self._pa.string()) for column in columns],
+                schema=self._schema,
+            ),
+        )
+
+    def close_file(self) -> None:
+        """Close the export file."""
+        self._writer.close()
+
+
+EXPORT_SINKS: dict[ExportFormat, type[ExportSink]] = {
+    ExportFormat.csv: CsvExportSink,
+    ExportFormat.jsonl: JsonLinesExportSink,
+    ExportFormat.parquet: ParquetExportSink,
+}
+
+
+def open_export_sink(
+    export_path: PathLike,
+    export_format: ExportFormat | None = None,
+    *,
+    run_id: str | None = None,
+    batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+) -> ExportSink:
+    """Open an export sink writing to the file at ``export_path``.
+
+    Args:
+        export_path: The path of the export file. It's overwritten if it already exists.
+        export_format: The format of the export file. If omitted, it'll be detected by the file's suffix.
+            (Defaults to None).
+        run_id: The ID of the run exported, if it has one. (Defaults to None).
+        batch_size: The number of buffered rows which triggers a write. (Defaults to 1000).
+
+    Returns:
+        The export sink.
+
+    Raises:
+        ExportError: If the format could not be detected, or its dependencies are not installed.
+
+    """
+    export_format = export_format or detect_export_format(export_path)
+    return EXPORT_SINKS[export_format](export_path, run_id=run_id, batch_size=batch_size)
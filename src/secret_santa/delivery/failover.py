@@ -0,0 +1,340 @@
+"""Circuit breaking and failover of the messaging providers.
+
+Every provider of an ordered failover chain (e.g. Twilio, then a spool to disk) is guarded by a circuit breaker,
+which opens once the provider's recent calls fail (or are too slow) at a high enough rate. While a provider's
+circuit is open the messages skip it without waiting for it, hence a degraded provider doesn't stall the run. Once
+the circuit has been open for a while, a single probe call is let through (half-open): the circuit closes if it
+succeeds, and opens again otherwise.
+
+A message fails over to the next provider only in case it was definitely not sent (e.g. the connection was refused,
+or the provider responded with a server error). A timeout while waiting for the provider's response is ambiguous,
+as the provider might have accepted the message, hence it counts against the provider's health but isn't retried
+on the next provider, so no participant is messaged twice.
+"""
+
+import functools
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from datetime import date
+from enum import StrEnum
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from twilio.base.exceptions import TwilioRestException
+
+from secret_santa.util import logging, tracing
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from secret_santa.delivery.spool import SpoolMessagingService
+    from secret_santa.twilio_messaging_service import MessageResponse, TwilioMessagingService
+
+
+class CircuitState(StrEnum):
+    """The states of a circuit breaker."""
+
+    closed = "closed"
+    open = "open"
+    half_open = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is attempted through an open circuit."""
+
+
+class NoHealthyProviderError(Exception):
+    """Raised when no provider of the failover chain could send a message."""
+
+
+def is_unsent_failure(error: BaseException) -> bool:
+    """Check whether the ``error`` is a provider failure which definitely left the message unsent.
+
+    Args:
+        error: The error raised by the provider.
+
+    Returns:
+        Whether the provider failed before accepting the message (a refused connection, a server error, or being
+        rate limited), i.e. the message could be sent by another provider.
+
+    """
+    if isinstance(error, TwilioRestException):
+        return bool(
+            error.status >= HTTPStatus.INTERNAL_SERVER_ERROR or error.status == HTTPStatus.TOO_MANY_REQUESTS,
+        )
+    # A connection error (including a connection timeout) is raised before the request is sent
+    return isinstance(error, RequestsConnectionError | CircuitOpenError | ConnectionRefusedError)
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Check whether the ``error`` indicates the provider is unhealthy, rather than the message being rejected.
+
+    Args:
+        error: The error raised by the provider.
+
+    Returns:
+        Whether the error counts against the provider's health, i.e. it isn't a rejection of the message itself
+        (e.g. an invalid phone number).
+
+    """
+    if isinstance(error, TwilioRestException):
+        return is_unsent_failure(error)
+    return isinstance(error, OSError | TimeoutError)
+
+
+class CircuitBreaker:
+    """A (thread safe) circuit breaker, opening on the failure rate (or the latency) of its recent calls.
+
+    Attributes:
+        name: The name of the guarded provider.
+        failure_rate_threshold: The rate of failed (or slow) calls in the window which opens the circuit.
+        latency_threshold: Calls taking longer than this (in seconds) count as failed.
+        window_size: The number of most recent calls the failure rate is computed over.
+        minimum_calls: The minimal number of calls in the window before the circuit could open.
+        open_seconds: The number of seconds the circuit stays open before letting a probe call through.
+        clock: Returns a monotonic time, in seconds.
+
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        name: str,
+        *,
+        failure_rate_threshold: float = 0.5,
+        latency_threshold: float = 10.0,
+        window_size: int = 20,
+        minimum_calls: int = 5,
+        open_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize a closed circuit breaker.
+
+        Args:
+            name: The name of the guarded provider.
+            failure_rate_threshold: The rate of failed (or slow) calls in the window which opens the circuit.
+                (Defaults to 0.5).
+            latency_threshold: Calls taking longer than this (in seconds) count as failed. (Defaults to 10).
+            window_size: The number of most recent calls the failure rate is computed over. (Defaults to 20).
+            minimum_calls: The minimal number of calls in the window before the circuit could open. (Defaults to 5).
+            open_seconds: The number of seconds the circuit stays open before letting a probe call through.
+                (Defaults to 30).
+            clock: Returns a monotonic time, in seconds. (Defaults to ``time.monotonic``).
+
+        """
+        assert 0 < failure_rate_threshold <= 1, "The failure rate threshold should be in (0, 1]"
+        assert 0 < minimum_calls <= window_size, "The minimal number of calls should fit in the window"
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.latency_threshold = latency_threshold
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self._state = CircuitState.closed
+        self._opened_at = 0.0
+        self._probing = False
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        """The circuit's state, moving an open circuit to half-open once it has been open for long enough."""
+        with self._lock:
+            if self._state == CircuitState.open and self.clock() - self._opened_at >= self.open_seconds:
+                self._state = CircuitState.half_open
+                self.logger.info(f"{self.name} circuit is half-open, probing the provider")
+            return self._state
+
+    def allow(self) -> bool:
+        """Check whether a call could go through the circuit, reserving the probe call if the circuit is half-open.
+
+        Returns:
+            True if the circuit is closed, or if it's half-open and no probe call is in flight. False otherwise.
+
+        """
+        state = self.state
+        with self._lock:
+            if state == CircuitState.closed:
+                return True
+            if state == CircuitState.half_open and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, *, failed: bool, latency: float = 0) -> None:
+        """Record the outcome of a call through the circuit.
+
+        Args:
+            failed: Whether the call failed.
+            latency: The call's latency, in seconds. A call slower than the latency threshold counts as failed.
+                (Defaults to 0).
+
+        """
+        failed = failed or latency > self.latency_threshold
+        with self._lock:
+            if self._state == CircuitState.half_open:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self._state = CircuitState.closed
+                    self._outcomes.clear()
+                    self.logger.info(f"{self.name} circuit is closed, the provider recovered")
+                return
+            self._outcomes.append(failed)
+            if (
+                self._state == CircuitState.closed
+                and len(self._outcomes) >= self.minimum_calls
+                and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate_threshold
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        """Open the circuit (while holding the lock)."""
+        self._state = CircuitState.open
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self.logger.warning(f"{self.name} circuit is open, skipping the provider for {self.open_seconds} seconds")
+
+    def call[T](self, function: Callable[[], T]) -> T:
+        """Call the ``function`` through the circuit, recording its outcome.
+
+        Args:
+            function: The call to make.
+
+        Returns:
+            The call's result.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+
+        """
+        if not self.allow():
+            circuit_open_err = f"The {self.name} circuit is open"
+            raise CircuitOpenError(circuit_open_err)
+        started_at = self.clock()
+        try:
+            result = function()
+        except Exception as error:
+            # A rejected message is a healthy response of the provider
+            self.record(failed=is_provider_failure(error), latency=self.clock() - started_at)
+            raise
+        self.record(failed=False, latency=self.clock() - started_at)
+        return result
+
+
+class FailoverMessagingService:
+    """Sends the messages through an ordered failover chain of messaging providers, each behind a circuit breaker.
+
+    Attributes:
+        logger: The class logger.
+        providers: The chain's providers, in failover order, and their circuit breakers.
+
+    """
+
+    def __init__(
+        self,
+        providers: list[tuple[TwilioMessagingService | SpoolMessagingService, CircuitBreaker]],
+    ) -> None:
+        """Initialize the failover chain.
+
+        Args:
+            providers: The messaging providers, in failover order, and their circuit breakers. The first provider
+                should be a ``TwilioMessagingService``, which picks the messages' senders and lists them.
+
+        """
+        assert providers, "The failover chain needs at least one provider"
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.providers = providers
+
+    @property
+    def primary(self) -> TwilioMessagingService:
+        """The chain's primary (first) provider."""
+        return self.providers[0][0]  # type: ignore[return-value]
+
+    @property
+    def senders(self) -> list[str]:
+        """The senders the messages are sent from by the primary provider."""
+        return self.primary.senders
+
+    def get_sender(self, to: str) -> str:
+        """Get the sender the primary provider messages the recipient from.
+
+        Args:
+            to: The recipient's phone number.
+
+        Returns:
+            The recipient's sender.
+
+        """
+        return self.primary.get_sender(to)
+
+    def send_message(
+        self,
+        body: str,
+        to: str,
+        *,
+        dry_run: bool,
+        status_callback: str | None = None,
+    ) -> MessageResponse:
+        """Send the message through the first provider of the chain which is healthy, and manages to send it.
+
+        Args:
+            body: The message to be sent.
+            to: The number of the recipient of the message.
+            dry_run: If True, the invocation would be a dry run, i.e. the message won't actually be sent.
+            status_callback: A URL the provider will call back on every status change of the message, if provided.
+                (Defaults to None).
+
+        Returns:
+            The response of the provider which sent the message.
+
+        Raises:
+            NoHealthyProviderError: If every provider's circuit is open, or every provider failed without sending.
+
+        """
+        last_error: BaseException | None = None
+        for attempt, (provider, circuit_breaker) in enumerate(self.providers, start=1):
+            tracing.set_attributes(attempt=attempt, provider=circuit_breaker.name)
+            try:
+                return circuit_breaker.call(
+                    functools.partial(
+                        provider.send_message,
+                        body,
+                        to,
+                        dry_run=dry_run,
+                        status_callback=status_callback,
+                    ),
+                )
+            except Exception as error:
+                if not is_unsent_failure(error):
+                    # The message was rejected, or might have been sent
+                    raise
+                self.logger.debug(f"Failing over the message to {to} from {circuit_breaker.name}: {error}")
+                last_error = error
+        no_healthy_provider_err = f"No messaging provider could send the message to {to}"
+        raise NoHealthyProviderError(no_healthy_provider_err) from last_error
+
+    def list_messages(
+        self,
+        date_sent: date,
+        *,
+        sender: str | None = None,
+        page_size: int = 1000,
+    ) -> Iterator[MessageResponse]:
+        """Iterate over the messages the primary provider sent on ``date_sent``.
+
+        Args:
+            date_sent: The (UTC) date the messages were sent on.
+            sender: If provided, only the messages sent from this sender are listed. (Defaults to None).
+            page_size: The number of messages fetched per request. (Defaults to 1000).
+
+        Returns:
+            An iterator over the messages sent on ``date_sent``.
+
+        """
+        return self.primary.list_messages(date_sent, sender=sender, page_size=page_size)
@@ -0,0 +1,366 @@
+"""Fair sharing of a single rate budget between the messages of concurrent runs (tenants).
+
+Runs sharing the same messaging credentials share the account's throughput as well, hence a huge run dispatching as
+fast as it can starves the runs started after it. Instead, every run's messages wait in its tenant's queue, and a
+dispatcher grants the shared budget's send slots (at the budget's rate) to the tenants by deficit round-robin:
+
+* Every tenant with waiting messages gets a turn in a round-robin, and every turn adds its weight (times the quantum)
+  to the tenant's deficit, the number of messages it may send. A tenant sends while its deficit lasts, hence the
+  tenants send in proportion to their weights, whatever their queues' lengths.
+* A tenant with no waiting messages is skipped, so an idle tenant doesn't hold back the others: a big run gets the
+  whole budget while it runs alone, and a small run started alongside it gets its share right away, finishing within
+  a few rounds. A run keeps a message or so in flight per send worker (i.e. its queue empties on every grant), hence
+  an idle tenant keeps its place in the round-robin (and its deficit) for a grace period, and only leaves it (dropping
+  its deficit) once idle for longer, so its weight still counts while its workers send.
+
+Every pick of the next tenant is O(1) amortized, and tenants may be capped by a quota of messages.
+"""
+
+import collections
+import threading
+import time
+from collections.abc import Callable
+
+from attr import dataclass
+
+from secret_santa.delivery.sender_pool import TokenBucket
+from secret_santa.util import logging
+
+DEFAULT_QUANTUM = 1.0
+DEFAULT_IDLE_GRACE_SECONDS = 1.0
+
+
+class FairShareError(Exception):
+    """Base class of the fair share scheduler's errors."""
+
+
+class TenantQuotaExceededError(FairShareError):
+    """Raised when a tenant asks to send beyond its quota of messages."""
+
+
+class SchedulerClosedError(FairShareError):
+    """Raised when waiting for a send slot of a closed scheduler."""
+
+
+@dataclass(frozen=True, kw_only=True)
+class TenantMetrics:
+    """A snapshot of a tenant's metrics.
+
+    Attributes:
+        tenant: The tenant's name.
+        weight: The tenant's share of the budget, relative to the other tenants' weights.
+        quota: The maximal number of messages the tenant may send, if capped.
+        queued: The number of the tenant's messages waiting for a send slot.
+        sent: The number of send slots granted to the tenant.
+        rejected: The number of the tenant's messages rejected for exceeding its quota.
+        total_wait: The total number of seconds the tenant's messages waited for their send slots.
+        max_wait: The longest number of seconds one of the tenant's messages waited for its send slot.
+
+    """
+
+    tenant: str
+    weight: float
+    quota: int | None
+    queued: int
+    sent: int
+    rejected: int
+    total_wait: float
+    max_wait: float
+
+    @property
+    def mean_wait(self) -> float:
+        """The mean number of seconds the tenant's messages waited for their send slots."""
+        return self.total_wait / self.sent if self.sent else 0.0
+
+
+class SendSlotRequest:
+    """A message waiting in a tenant's queue for a send slot.
+
+    Attributes:
+        queued_at: When the message was queued (by the scheduler's clock).
+        granted_at: When the message was granted its send slot, if it was.
+
+    """
+
+    def __init__(self, queued_at: float) -> None:
+        """Initialize the request.
+
+        Args:
+            queued_at: When the message was queued (by the scheduler's clock).
+
+        """
+        self.queued_at = queued_at
+        self.granted_at: float | None = None
+        self._event = threading.Event()
+
+    def grant(self, granted_at: float | None) -> None:
+        """Wake the waiting message up, granting it its send slot (or not, if the scheduler was closed)."""
+        self.granted_at = granted_at
+        self._event.set()
+
+    def wait(self) -> None:
+        """Wait for the request to be granted."""
+        self._event.wait()
+
+
+class TenantQueue:
+    """A tenant's queue of messages waiting for their send slots, and its metrics.
+
+    Attributes:
+        name: The tenant's name.
+        weight: The tenant's share of the budget, relative to the other tenants' weights.
+        quota: The maximal number of messages the tenant may send, if capped.
+        scheduler: The scheduler the tenant's messages are scheduled by.
+
+    """
+
+    def __init__(self, name: str, scheduler: FairShareScheduler, *, weight: float, quota: int | None) -> None:
+        """Initialize an empty tenant queue.
+
+        Args:
+            name: The tenant's name.
+            scheduler: The scheduler the tenant's messages are scheduled by.
+            weight: The tenant's share of the budget, relative to the other tenants' weights.
+            quota: The maximal number of messages the tenant may send. If ``None``, the tenant is not capped.
+
+        """
+        assert weight > 0, "A tenant's weight should be positive"
+        self.name = name
+        self.scheduler = scheduler
+        self.weight = weight
+        self.quota = quota
+        self.deficit = 0.0
+        self.requests: collections.deque[SendSlotRequest] = collections.deque()
+        # Whether the tenant is in the round-robin, and since when it has no waiting messages
+        self.active = False
+        self.idle_since = 0.0
+        self.admitted = 0
+        self.sent = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self) -> float:
+        """Wait for the tenant's turn to send a message, within the shared budget.
+
+        Returns:
+            The number of seconds waited.
+
+        Raises:
+            TenantQuotaExceededError: If the tenant already used up its quota.
+            SchedulerClosedError: If the scheduler was closed while waiting.
+
+        """
+        return self.scheduler.acquire(self)
+
+    def metrics(self) -> TenantMetrics:
+        """Get a snapshot of the tenant's metrics.
+
+        Returns:
+            The tenant's metrics.
+
+        """
+        return TenantMetrics(
+            tenant=self.name,
+            weight=self.weight,
+            quota=self.quota,
+            queued=len(self.requests),
+            sent=self.sent,
+            rejected=self.rejected,
+            total_wait=self.total_wait,
+            max_wait=self.max_wait,
+        )
+
+
+class FairShareScheduler:
+    """Shares a single rate budget between tenants by deficit round-robin, on a dispatcher thread of its own.
+
+    Attributes:
+        logger: The class logger.
+        messages_per_second: The shared rate budget.
+        quantum: The number of messages a tenant of weight 1 may send per round.
+        idle_grace_seconds: The number of seconds a tenant without waiting messages keeps its place in the
+            round-robin (and its deficit).
+        clock: Returns a monotonic time, in seconds.
+
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        messages_per_second: float,
+        *,
+        burst: int = 1,
+        quantum: float = DEFAULT_QUANTUM,
+        idle_grace_seconds: float = DEFAULT_IDLE_GRACE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize the scheduler and start its dispatcher thread.
+
+        Args:
+            messages_per_second: The shared rate budget, e.g. the account's throughput.
+            burst: The maximal number of send slots granted at once, after the budget was idle. (Defaults to 1).
+            quantum: The number of messages a tenant of weight 1 may send per round. (Defaults to 1).
+            idle_grace_seconds: The number of seconds a tenant without waiting messages keeps its place in the
+                round-robin (and its deficit). (Defaults to 1).
+            clock: Returns a monotonic time, in seconds. (Defaults to ``time.monotonic``).
+            sleep: Sleeps for the given number of seconds. (Defaults to ``time.sleep``).
+
+        """
+        assert quantum > 0, "The quantum should be positive"
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.messages_per_second = messages_per_second
+        self.quantum = quantum
+        self.idle_grace_seconds = idle_grace_seconds
+        self.clock = clock
+        self._rate_limit = TokenBucket(messages_per_second, burst=burst, clock=clock, sleep=sleep)
+        self._tenants: dict[str, TenantQueue] = {}
+        # The tenants with waiting messages (or idle within their grace period), in their round-robin order
+        self._active: collections.deque[TenantQueue] = collections.deque()
+        self._queued = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._dispatcher = threading.Thread(target=self.dispatch, name="fair-share-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def get_tenant(self, name: str, *, weight: float = 1.0, quota: int | None = None) -> TenantQueue:
+        """Get the queue of the tenant ``name``, registering the tenant on its first call.
+
+        Args:
+            name: The tenant's name, e.g. the organizer's team.
+            weight: The tenant's share of the budget, relative to the other tenants' weights. Updates the weight of
+                an already registered tenant. (Defaults to 1).
+            quota: The maximal number of messages the tenant may send (over the scheduler's lifetime). If omitted,
+                the tenant is not capped, or keeps its quota if already registered. (Defaults to None).
+
+        Returns:
+            The tenant's queue.
+
+        """
+        with self._condition:
+            if (tenant := self._tenants.get(name)) is None:
+                tenant = self._tenants[name] = TenantQueue(name, self, weight=weight, quota=quota)
+            else:
+                tenant.weight = weight
+                tenant.quota = quota if quota is not None else tenant.quota
+            return tenant
+
+    def acquire(self, tenant: TenantQueue) -> float:
+        """Queue a message of the ``tenant``, and wait for its send slot.
+
+        Args:
+            tenant: The tenant's queue.
+
+        Returns:
+            The number of seconds waited.
+
+        Raises:
+            TenantQuotaExceededError: If the tenant already used up its quota.
+            SchedulerClosedError: If the scheduler is (or was, while waiting) closed.
+
+        """
+        with self._condition:
+            if self._closed:
+                closed_err = "The fair share scheduler is closed"
+                raise SchedulerClosedError(closed_err)
+            if tenant.quota is not None and tenant.admitted >= tenant.quota:
+                tenant.rejected += 1
+                quota_err = f"Tenant {tenant.name!r} used up its quota of {tenant.quota} messages"
+                raise TenantQuotaExceededError(quota_err)
+            tenant.admitted += 1
+            request = SendSlotRequest(self.clock())
+            if not tenant.active:
+                tenant.active = True
+                self._active.append(tenant)
+            tenant.requests.append(request)
+            self._queued += 1
+            self._condition.notify_all()
+        request.wait()
+        if request.granted_at is None:
+            closed_err = "The fair share scheduler was closed while waiting for a send slot"
+            raise SchedulerClosedError(closed_err)
+        return request.granted_at - request.queued_at
+
+    def next_tenant(self) -> TenantQueue:
+        """Pick the tenant to grant the next send slot to, by deficit round-robin. Should be called while locked.
+
+        Should only be called while some tenant has waiting messages.
+
+        Returns:
+            The tenant, whose deficit was charged for the send slot.
+
+        """
+        while True:
+            tenant = self._active[0]
+            if not tenant.requests:
+                if self.clock() - tenant.idle_since > self.idle_grace_seconds:
+                    # A tenant idle for longer than the grace period leaves the round-robin, dropping its deficit
+                    self._active.popleft()
+                    tenant.active = False
+                    tenant.deficit = 0.0
+                else:
+                    self._active.rotate(-1)
+                continue
+            if tenant.deficit < 1:
+                # A new turn of the tenant
+                tenant.deficit += self.quantum * tenant.weight
+                if tenant.deficit < 1:
+                    # A tenant of a small weight saves its deficit up over several rounds
+                    self._active.rotate(-1)
+                    continue
+            tenant.deficit -= 1
+            return tenant
+
+    def grant(self) -> None:
+        """Grant the next send slot to the next tenant's first waiting message. Should be called while locked."""
+        tenant = self.next_tenant()
+        request = tenant.requests.popleft()
+        granted_at = self.clock()
+        wait = granted_at - request.queued_at
+        tenant.sent += 1
+        tenant.total_wait += wait
+        tenant.max_wait = max(tenant.max_wait, wait)
+        self._queued -= 1
+        if not tenant.requests:
+            # The tenant keeps its turn (and deficit) for its next message, unless idle beyond the grace period
+            tenant.idle_since = granted_at
+        if tenant.deficit < 1:
+            self._active.rotate(-1)
+        request.grant(granted_at)
+
+    def dispatch(self) -> None:
+        """Grant the send slots at the budget's rate, until the scheduler is closed."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queued or self._closed)
+                if self._closed:
+                    return
+            # Wait for the budget outside of the lock, so new messages could be queued meanwhile
+            self._rate_limit.acquire()
+            with self._condition:
+                if self._closed:
+                    return
+                self.grant()
+
+    def metrics(self) -> list[TenantMetrics]:
+        """Get a snapshot of every tenant's metrics.
+
+        Returns:
+            The tenants' metrics, in their registration order.
+
+        """
+        with self._condition:
+            return [tenant.metrics() for tenant in self._tenants.values()]
+
+    def close(self) -> None:
+        """Stop the dispatcher, failing the messages still waiting for their send slots."""
+        with self._condition:
+            self._closed = True
+            for tenant in self._active:
+                while tenant.requests:
+                    tenant.requests.popleft().grant(None)
+                tenant.active = False
+            self._active.clear()
+            self._queued = 0
+            self._condition.notify_all()
+        self._dispatcher.join()
@@ -0,0 +1,464 @@
+"""Pre-flight lookup of the participants' phone numbers, filtering out the numbers which can't be messaged.
+
+Every number is looked up through a Lookup-style API (Twilio's Lookup v2 line type intelligence, or a local stand-in
+of it), which tells whether the number is valid and its line type (e.g. ``mobile`` / ``landline``), before the run
+sends anything. Hence invalid and landline numbers are dropped up front, instead of failing in the middle of the run
+(each failure wasting an API call and a retry).
+
+The numbers are looked up concurrently, in batches, and the results are kept in a persistent cache (an append-only
+JSON Lines file) for a while, so later runs only look up the numbers which are new to the cache (or expired).
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import PathLike
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, unquote, urlsplit
+from urllib.request import Request, urlopen
+
+from attr import dataclass
+
+from secret_santa.const import (
+    ENCODING,
+    LOOKUP_CACHE_FILE_NAME,
+    ROSTER_CACHE_DIRECTORY_NAME,
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_LOOKUP_URL,
+)
+from secret_santa.delivery.channel import Channel, get_participant_channel
+from secret_santa.util import logging, path, tracing
+
+if TYPE_CHECKING:
+    from secret_santa.model.participant import Participant
+
+DEFAULT_LOOKUP_URL = "https://lookups.twilio.com"
+# Line types which can't receive text messages. Any other line type (or an unknown one) is considered messageable
+UNMESSAGEABLE_LINE_TYPES = frozenset({"landline", "pager", "premium", "sharedCost", "tollFree", "uan", "voicemail"})
+DEFAULT_LOOKUP_TTL_SECONDS = 30 * 24 * 60 * 60
+DEFAULT_LOOKUP_TIMEOUT_SECONDS = 10.0
+
+
+class PhoneLookupError(Exception):
+    """Raised when a phone number could not be looked up (e.g. the API is unreachable)."""
+
+
+@dataclass(frozen=True, kw_only=True)
+class LookupResult:
+    """The result of a phone number lookup.
+
+    Attributes:
+        phone_number: The (normalized) phone number looked up.
+        valid: Whether the phone number is valid.
+        line_type: The line type of the phone number (e.g. ``mobile`` / ``landline``), if known.
+        looked_up_at: When the phone number was looked up, as a Unix timestamp.
+
+    """
+
+    phone_number: str
+    valid: bool
+    line_type: str | None = None
+    looked_up_at: float = 0.0
+
+    @property
+    def messageable(self) -> bool:
+        """Whether the phone number could be sent text messages."""
+        return self.valid and self.line_type not in UNMESSAGEABLE_LINE_TYPES
+
+
+class LookupClient:
+    """A client of a Lookup-style API (Twilio's Lookup v2 API, or a local stand-in of it).
+
+    Attributes:
+        base_url: The base URL of the API.
+        timeout: The number of seconds to wait for the API to respond to a lookup.
+
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        *,
+        account_sid: str | None = None,
+        auth_token: str | None = None,
+        timeout: float = DEFAULT_LOOKUP_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize the lookup client.
+
+        Args:
+            base_url: The base URL of the API. If omitted, ``TWILIO_LOOKUP_URL`` from the environment will be used if
+                set, and Twilio's Lookup API otherwise. (Defaults to None).
+            account_sid: The Twilio account SID to authenticate with. If omitted, ``TWILIO_ACCOUNT_SID`` from the
+                environment will be used. (Defaults to None).
+            auth_token: The Twilio auth token to authenticate with. If omitted, ``TWILIO_AUTH_TOKEN`` from the
+                environment will be used. (Defaults to None).
+            timeout: The number of seconds to wait for the API to respond to a lookup. (Defaults to 10).
+            clock: Returns the current time, as a Unix timestamp. (Defaults to ``time.time``).
+
+        """
+        self.base_url = (base_url or os.getenv(TWILIO_LOOKUP_URL) or DEFAULT_LOOKUP_URL).rstrip("/")
+        self.timeout = timeout
+        self.clock = clock
+        account_sid = account_sid or os.getenv(TWILIO_ACCOUNT_SID) or ""
+        auth_token = auth_token or os.getenv(TWILIO_AUTH_TOKEN) or ""
+        self._authorization = f"Basic {base64.b64encode(f'{account_sid}:{auth_token}'.encode()).decode()}"
+
+    def lookup(self, phone_number: str) -> LookupResult:
+        """Look up the validity and the line type of the ``phone_number``.
+
+        Args:
+            phone_number: The (normalized) phone number to look up.
+
+        Returns:
+            The result of the lookup.
+
+        Raises:
+            PhoneLookupError: If the API could not be reached, or it failed to look up the number.
+
+        """
+        request = Request(
+            f"{self.base_url}/v2/PhoneNumbers/{quote(phone_number, safe='')}?Fields=line_type_intelligence",
+            headers={"Authorization": self._authorization, "Accept": "application/json"},
+        )
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                body = json.load(response)
+        except HTTPError as err:
+            # Twilio answers numbers it can't even parse with a 404
+            if err.code == HTTPStatus.NOT_FOUND:
+                return LookupResult(phone_number=phone_number, valid=False, looked_up_at=self.clock())
+            lookup_err = f"Failed to look up {phone_number}: HTTP {err.code}"
+            raise PhoneLookupError(lookup_err) from err
+        except (URLError, TimeoutError, json.JSONDecodeError) as err:
+            lookup_err = f"Failed to look up {phone_number}: {err}"
+            raise PhoneLookupError(lookup_err) from err
+        line_type_intelligence = body.get("line_type_intelligence") or {}
+        return LookupResult(
+            phone_number=phone_number,
+            valid=bool(body.get("valid")),
+            line_type=line_type_intelligence.get("type"),
+            looked_up_at=self.clock(),
+        )
+
+
+class LookupCache:
+    """A persistent cache of phone number lookups, whose results expire after a while.
+
+    The results are appended to a JSON Lines file, a batch of results per write, and the file is compacted (its
+    expired and superseded results dropped) when it's loaded, in case they outnumber the live results.
+
+    Attributes:
+        logger: The class logger.
+        cache_path: The path of the cache file.
+        ttl: The number of seconds a result is kept for.
+        clock: Returns the current time, as a Unix timestamp.
+
+    """
+
+    def __init__(
+        self,
+        cache_path: PathLike | None = None,
+        *,
+        ttl: float = DEFAULT_LOOKUP_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize the cache, loading the results which didn't expire yet.
+
+        Args:
+            cache_path: The path of the cache file. If omitted, ``{project_root}/.secret_santa_cache/lookups.jsonl``
+                will be used. (Defaults to None).
+            ttl: The number of seconds to keep a result for. (Defaults to 30 days).
+            clock: Returns the current time, as a Unix timestamp. (Defaults to ``time.time``).
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.cache_path = (
+            Path(cache_path)
+            if cache_path
+            else path.get_project_root() / ROSTER_CACHE_DIRECTORY_NAME / LOOKUP_CACHE_FILE_NAME
+        )
+        self.ttl = ttl
+        self.clock = clock
+        self._results: dict[str, LookupResult] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Load the results which didn't expire yet, compacting the cache file if most of its results are stale."""
+        if not self.cache_path.exists():
+            return
+        expires_before = self.clock() - self.ttl
+        lines = 0
+        with self.cache_path.open(encoding=ENCODING) as cache_file:
+            for line in cache_file:
+                lines += 1
+                try:
+                    result = LookupResult(**json.loads(line))
+                except (json.JSONDecodeError, TypeError):
+                    # A line cut short by an interrupted write
+                    continue
+                if result.looked_up_at >= expires_before:
+                    self._results[result.phone_number] = result
+        self.logger.debug(f"Loaded {len(self._results)} cached lookups out of {lines} from {self.cache_path}")
+        if lines > 2 * len(self._results):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the cache file with its live results only."""
+        with self._lock:
+            temp_cache_path = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+            temp_cache_path.write_text(
+                "".join(f"{self.encode(result)}\n" for result in self._results.values()),
+                encoding=ENCODING,
+            )
+            temp_cache_path.replace(self.cache_path)
+
+    @staticmethod
+    def encode(result: LookupResult) -> str:
+        """Encode a result as a line of the cache file."""
+        return json.dumps(
+            {
+                "phone_number": result.phone_number,
+                "valid": result.valid,
+                "line_type": result.line_type,
+                "looked_up_at": result.looked_up_at,
+            },
+            separators=(",", ":"),
+        )
+
+    def get(self, phone_number: str) -> LookupResult | None:
+        """Get the cached result of the ``phone_number``'s lookup.
+
+        Args:
+            phone_number: The (normalized) phone number.
+
+        Returns:
+            The cached result in case it didn't expire yet, ``None`` otherwise.
+
+        """
+        result = self._results.get(phone_number)
+        return result if result and result.looked_up_at >= self.clock() - self.ttl else None
+
+    def put_many(self, results: Iterable[LookupResult]) -> None:
+        """Cache the ``results``, with a single write.
+
+        Args:
+            results: The results to cache.
+
+        """
+        results = list(results)
+        if not results:
+            return
+        with self._lock:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.cache_path.open("a", encoding=ENCODING) as cache_file:
+                cache_file.write("".join(f"{self.encode(result)}\n" for result in results))
+            for result in results:
+                self._results[result.phone_number] = result
+
+    def __len__(self) -> int:
+        """Get the number of cached results (including the expired ones which were not dropped yet)."""
+        return len(self._results)
+
+
+class PhoneLookup:
+    """Looks up the participants' phone numbers concurrently and in batches, through a persistent cache.
+
+    Attributes:
+        logger: The class logger.
+        client: The client of the Lookup API.
+        cache: The cache of the lookups' results, if any.
+        max_workers: The maximal number of concurrent lookups.
+        batch_size: The number of numbers looked up (and cached) per batch.
+
+    """
+
+    def __init__(
+        self,
+        client: LookupClient,
+        *,
+        cache: LookupCache | None = None,
+        max_workers: int = 8,
+        batch_size: int = 100,
+    ) -> None:
+        """Initialize the phone lookup.
+
+        Args:
+            client: The client of the Lookup API.
+            cache: The cache to keep the lookups' results in. If omitted, every number is looked up on every run.
+                (Defaults to None).
+            max_workers: The maximal number of concurrent lookups. (Defaults to 8).
+            batch_size: The number of numbers to look up (and cache) per batch. (Defaults to 100).
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.client = client
+        self.cache = cache
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+
+    def try_lookup(self, phone_number: str) -> LookupResult | None:
+        """Look up the ``phone_number``, logging the failure rather than raising it.
+
+        Args:
+            phone_number: The (normalized) phone number to look up.
+
+        Returns:
+            The result of the lookup, or ``None`` in case it failed.
+
+        """
+        with tracing.start_span("phone_lookup", kind=tracing.SpanKind.client, phone_number=phone_number) as span:
+            try:
+                result = self.client.lookup(phone_number)
+            except PhoneLookupError as err:
+                self.logger.warning(err)
+                return None
+            if span:
+                span.set_attributes(valid=result.valid, line_type=result.line_type or "")
+            return result
+
+    def lookup_many(self, phone_numbers: Iterable[str]) -> dict[str, LookupResult]:
+        """Look up the ``phone_numbers``, only calling the API for the numbers which are not cached.
+
+        The numbers whose lookup failed are left out of the results (and of the cache), hence they're looked up
+        again on the next run.
+
+        Args:
+            phone_numbers: The (normalized) phone numbers to look up.
+
+        Returns:
+            The results of the lookups, by phone number.
+
+        """
+        results: dict[str, LookupResult] = {}
+        uncached_numbers = []
+        for phone_number in dict.fromkeys(phone_numbers):
+            if self.cache is not None and (cached_result := self.cache.get(phone_number)):
+                results[phone_number] = cached_result
+            else:
+                uncached_numbers.append(phone_number)
+        self.logger.info(f"Looking up {len(uncached_numbers)} phone numbers ({len(results)} cached)")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="lookup") as executor:
+            for batch_start in range(0, len(uncached_numbers), self.batch_size):
+                batch = uncached_numbers[batch_start : batch_start + self.batch_size]
+                batch_results = [
+                    result for result in executor.map(tracing.bind_context(self.try_lookup), batch) if result
+                ]
+                if self.cache is not None:
+                    self.cache.put_many(batch_results)
+                results.update((result.phone_number, result) for result in batch_results)
+        return results
+
+    def filter_messageable(self, participants: Iterable[Participant]) -> list[Participant]:
+        """Drop the participants whose phone number can't be messaged.
+
+        The participants messaged by email are kept as they are, and so are the participants whose number could not
+        be looked up (the lookup is a pre-flight check, which shouldn't fail the run on its own).
+
+        Args:
+            participants: The (validated) participants.
+
+        Returns:
+            The participants which could be messaged.
+
+        """
+        participants = list(participants)
+        results = self.lookup_many(
+            participant.phone_number
+            for participant in participants
+            if get_participant_channel(participant) == Channel.sms
+        )
+        messageable_participants = []
+        for participant in participants:
+            if (result := results.get(participant.phone_number)) and not result.messageable:
+                reason = f"a {result.line_type} number" if result.valid else "an invalid number"
+                self.logger.warning(f"Not playing with {participant}, as its phone number is {reason}")
+                continue
+            messageable_participants.append(participant)
+        return messageable_participants
+
+
+class LookupStandInRequestHandler(BaseHTTPRequestHandler):
+    """HTTP request handler of the Lookup API stand-in."""
+
+    server: LookupStandInServer
+
+    def do_GET(self) -> None:
+        """Handle the lookups: ``GET /v2/PhoneNumbers/{phone_number}``."""
+        url = urlsplit(self.path)
+        prefix = "/v2/PhoneNumbers/"
+        if not url.path.startswith(prefix):
+            self.send_json(HTTPStatus.NOT_FOUND, {"message": f"No such endpoint: {url.path}"})
+            return
+        phone_number = unquote(url.path.removeprefix(prefix))
+        with self.server.lock:
+            self.server.lookups.append(phone_number)
+        line_type = self.server.line_types.get(phone_number)
+        self.send_json(
+            HTTPStatus.OK,
+            {
+                "phone_number": phone_number,
+                "valid": line_type is not None,
+                "line_type_intelligence": {"type": line_type} if line_type else None,
+            },
+        )
+
+    def send_json(self, status: HTTPStatus, body: object) -> None:
+        """Send a JSON response.
+
+        Args:
+            status: The response's status.
+            body: The response's body, to be encoded as JSON.
+
+        """
+        encoded_body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded_body)))
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Don't log the requests to ``stderr``."""
+
+
+class LookupStandInServer(ThreadingHTTPServer):
+    """A local stand-in of the Lookup API, for tests and rehearsals without a Twilio account.
+
+    Attributes:
+        line_types: The line type of every valid phone number. Any other number is invalid.
+        lookups: The phone numbers looked up, in the order they were requested.
+        lock: Guards the lookups recorded.
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address: tuple[str, int], line_types: Mapping[str, str]) -> None:
+        """Bind the server to the ``server_address``.
+
+        Args:
+            server_address: The host and port to bind to.
+            line_types: The line type of every valid phone number (e.g. ``{"+15550001": "mobile"}``).
+
+        """
+        self.line_types = dict(line_types)
+        self.lookups: list[str] = []
+        self.lock = threading.Lock()
+        super().__init__(server_address, LookupStandInRequestHandler)
+
+    @property
+    def url(self) -> str:
+        """The base URL of the stand-in."""
+        return f"http://{self.socket.getsockname()[0]}:{self.server_port}"
@@ -0,0 +1,231 @@
+"""Staged, streaming dispatch of the messages.
+
+The messages flow through four stages, each running on its own thread(s) and connected by bounded queues:
+
+* draw: yields the participants and their recipients, one pair at a time.
+* render: renders every pair's message, and routes it to its send queue.
+* send: a worker per send queue (e.g. per channel / sender) sends the queue's messages.
+* record: records the responses of the messages sent.
+
+Hence the first message is sent as soon as the first pair is drawn rather than once the whole roster is drawn,
+and a full queue blocks the stage feeding it (backpressure), so the number of messages in flight stays bounded
+however big the roster is. The first error raised by any stage stops the whole pipeline, and is re-raised.
+Every stage runs within the context the pipeline was run in, so its spans (if tracing) are children of the current span.
+"""
+
+import functools
+import queue
+import threading
+import time
+from collections.abc import Callable, Hashable, Iterable
+from typing import TYPE_CHECKING
+
+import attr
+from attr import dataclass
+
+from secret_santa.util import logging, tracing
+
+if TYPE_CHECKING:
+    from secret_santa.delivery.channel import Channel
+    from secret_santa.model.participant import Participant
+    from secret_santa.twilio_messaging_service import MessageResponse
+
+DEFAULT_QUEUE_SIZE = 256
+# How often (in seconds) a stage blocked on a queue checks whether the pipeline was stopped
+STOP_CHECK_INTERVAL = 0.1
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+@dataclass(frozen=True, kw_only=True)
+class OutgoingMessage:
+    """A rendered message, on its way to be sent.
+
+    Attributes:
+        phone_number: The participant's normalized phone number.
+        participant: The participant to message, i.e. the gift giver.
+        recipient: The participant's recipient, i.e. the gift receiver.
+        body: The message's body.
+        channel: The channel the message is sent through.
+        rendered_at: When the message was rendered (by ``time.monotonic``), to tell how long it waited to be sent.
+
+    """
+
+    phone_number: str
+    participant: Participant
+    recipient: Participant
+    body: str
+    channel: Channel
+    rendered_at: float = attr.field(factory=time.monotonic, eq=False)
+
+
+class MessagePipeline:
+    """Streams the messages through the draw, render, send and record stages, connected by bounded queues.
+
+    Attributes:
+        logger: The class logger.
+        render: Renders the message of a participant (given its phone number) and its recipient.
+        get_route: Gets the send queue a message is sent through, e.g. its channel and sender.
+        send: Sends a message, returning its response, or ``None`` if the message was not sent.
+        record: Records the response of a message sent.
+        queue_size: The capacity of every queue.
+
+    """
+
+    def __init__(
+        self,
+        *,
+        render: Callable[[str, Participant, Participant], OutgoingMessage],
+        get_route: Callable[[OutgoingMessage], Hashable],
+        send: Callable[[OutgoingMessage], MessageResponse | None],
+        record: Callable[[OutgoingMessage, MessageResponse], None],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        """Initialize the pipeline.
+
+        Args:
+            render: Renders the message of a participant (given its phone number) and its recipient.
+            get_route: Gets the send queue a message is sent through. Every send queue gets its own worker.
+            send: Sends a message, returning its response, or ``None`` if the message was not sent.
+            record: Records the response of a message sent.
+            queue_size: The capacity of every queue. (Defaults to 256).
+
+        """
+        assert queue_size > 0, "The pipeline's queues should be bounded"
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.render = render
+        self.get_route = get_route
+        self.send = send
+        self.record = record
+        self.queue_size = queue_size
+        self._stopped = threading.Event()
+        self._errors: list[Exception] = []
+        self._errors_lock = threading.Lock()
+        self._send_workers: list[threading.Thread] = []
+        self._sent_messages = 0
+
+    def _put(self, stage_queue: queue.Queue, item: object) -> bool:
+        """Put the ``item`` in the ``stage_queue``, waiting for room in it unless the pipeline is stopped.
+
+        Returns:
+            Whether the item was put, i.e. False if the pipeline was stopped.
+
+        """
+        while not self._stopped.is_set():
+            try:
+                stage_queue.put(item, timeout=STOP_CHECK_INTERVAL)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def _get(self, stage_queue: queue.Queue) -> object:
+        """Get an item from the ``stage_queue``, waiting for one unless the pipeline is stopped.
+
+        Returns:
+            The item, or the end of the input marker if the pipeline was stopped.
+
+        """
+        while not self._stopped.is_set():
+            try:
+                return stage_queue.get(timeout=STOP_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _start_stage(self, name: str, stage: Callable[[], None]) -> threading.Thread:
+        """Run the ``stage`` on a new thread, stopping the pipeline in case it raises.
+
+        Returns:
+            The stage's thread.
+
+        """
+
+        def run_stage() -> None:
+            try:
+                stage()
+            except Exception as error:  # noqa: BLE001 - re-raised once the pipeline is stopped
+                with self._errors_lock:
+                    self._errors.append(error)
+                self._stopped.set()
+                self.logger.debug(f"The {name} stage failed, stopping the pipeline: {error!r}")
+
+        thread = threading.Thread(target=tracing.bind_context(run_stage), name=f"pipeline-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _draw(self, pairs: Iterable[tuple[str, Participant, Participant]], render_queue: queue.Queue) -> None:
+        """The draw stage: feed the pairs to the render stage."""
+        for pair in pairs:
+            if not self._put(render_queue, pair):
+                return
+        self._put(render_queue, _DONE)
+
+    def _render(self, render_queue: queue.Queue, record_queue: queue.Queue) -> None:
+        """The render stage: render the pairs' messages, and route them to their send queues."""
+        send_queues: dict[Hashable, queue.Queue] = {}
+        while (pair := self._get(render_queue)) is not _DONE:
+            message = self.render(*pair)  # type: ignore[misc]
+            route = self.get_route(message)
+            if route not in send_queues:
+                send_queue = send_queues[route] = queue.Queue(self.queue_size)
+                self._send_workers.append(
+                    self._start_stage(
+                        f"send-{len(send_queues)}",
+                        functools.partial(self._send, send_queue, record_queue),
+                    ),
+                )
+            if not self._put(send_queues[route], message):
+                return
+        for send_queue in send_queues.values():
+            self._put(send_queue, _DONE)
+
+    def _send(self, send_queue: queue.Queue, record_queue: queue.Queue) -> None:
+        """The send stage (of a single send queue): send the queue's messages, and pass their responses on."""
+        while (message := self._get(send_queue)) is not _DONE:
+            response = self.send(message)  # type: ignore[arg-type]
+            if response is not None and not self._put(record_queue, (message, response)):
+                return
+
+    def _record(self, record_queue: queue.Queue) -> None:
+        """The record stage: record the responses of the messages sent."""
+        while (sent_message := self._get(record_queue)) is not _DONE:
+            self.record(*sent_message)  # type: ignore[misc]
+            self._sent_messages += 1
+
+    def run(self, pairs: Iterable[tuple[str, Participant, Participant]]) -> int:
+        """Stream the ``pairs`` through the pipeline, until all their messages are sent and recorded.
+
+        Args:
+            pairs: The phone numbers of the participants to message, the participants and their recipients. The
+                pairs are drawn lazily, as the render stage makes room for them.
+
+        Returns:
+            The number of messages sent.
+
+        """
+        self._stopped.clear()
+        self._errors.clear()
+        self._send_workers.clear()
+        self._sent_messages = 0
+        render_queue: queue.Queue = queue.Queue(self.queue_size)
+        record_queue: queue.Queue = queue.Queue(self.queue_size)
+
+        draw_thread = self._start_stage("draw", lambda: self._draw(pairs, render_queue))
+        render_thread = self._start_stage("render", lambda: self._render(render_queue, record_queue))
+        record_thread = self._start_stage("record", lambda: self._record(record_queue))
+        draw_thread.join()
+        render_thread.join()
+        # The send workers are all started by now, as the render stage is done
+        for send_worker in self._send_workers:
+            send_worker.join()
+        self._put(record_queue, _DONE)
+        record_thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+        self.logger.debug(
+            f"The pipeline sent {self._sent_messages} messages over {len(self._send_workers)} send queues",
+        )
+        return self._sent_messages
@@ -0,0 +1,184 @@
+"""Bulk reconciliation of a run's message delivery statuses.
+
+Rather than fetching every message by its SID (a request per message), the messages sent on each day of the run
+are listed page by page (up to 1000 messages per request), and matched to the run's messages through their SIDs.
+Every day is listed per sender, the (day, sender) listings being fetched concurrently, and a listing stops paging
+once all of its day's pending messages were matched. A message is recorded once its send returned, hence a message
+recorded close to midnight (UTC) is looked up on the adjacent day as well. Messages which already reached a final
+status are never fetched again, as their statuses are kept in the run's state.
+"""
+
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, date, datetime, timedelta
+from typing import TYPE_CHECKING
+
+from attr import dataclass
+
+from secret_santa.util import logging
+
+if TYPE_CHECKING:
+    from secret_santa.delivery.run_state import DeliveryCounts, MessageState, RunStateStore
+    from secret_santa.twilio_messaging_service import TwilioMessagingService
+
+DEFAULT_DATE_MARGIN = timedelta(hours=1)
+
+
+@dataclass(frozen=True, kw_only=True)
+class ReconciliationResult:
+    """The result of a delivery status reconciliation.
+
+    Attributes:
+        fetched_days: The number of days the messages were listed for.
+        updated_messages: The number of messages whose status was updated.
+        counts: The run's delivery counts after the reconciliation.
+
+    """
+
+    fetched_days: int
+    updated_messages: int
+    counts: DeliveryCounts
+
+
+class PendingMessages:
+    """The (thread safe) pending messages of a reconciliation, by the days they might have been sent on.
+
+    Attributes:
+        days_by_sid: The days every pending message might have been sent on, by the message's SID.
+        remaining_by_day: The number of pending messages which might have been sent on every day.
+
+    """
+
+    def __init__(self, messages: list[MessageState], *, date_margin: timedelta) -> None:
+        """Index the pending ``messages`` by the days they might have been sent on.
+
+        Args:
+            messages: The pending messages.
+            date_margin: A message recorded within this margin of midnight (UTC) might have been sent on the
+                adjacent day.
+
+        """
+        self.days_by_sid: dict[str, set[date]] = {}
+        self.remaining_by_day: dict[date, int] = defaultdict(int)
+        for message in messages:
+            recorded_at = datetime.fromisoformat(message.sent_at).astimezone(UTC)
+            days = {(recorded_at - date_margin).date(), recorded_at.date(), (recorded_at + date_margin).date()}
+            self.days_by_sid[message.sid] = days
+            for day in days:
+                self.remaining_by_day[day] += 1
+        self._lock = threading.Lock()
+
+    def match(self, sid: str) -> bool:
+        """Match a message listed to a pending message, unless it's not one (or was already matched).
+
+        Args:
+            sid: The SID of the message listed.
+
+        Returns:
+            Whether the message was pending.
+
+        """
+        with self._lock:
+            if (days := self.days_by_sid.pop(sid, None)) is None:
+                return False
+            for day in days:
+                self.remaining_by_day[day] -= 1
+            return True
+
+    def is_day_matched(self, day: date) -> bool:
+        """Check whether all the pending messages which might have been sent on ``day`` were matched."""
+        with self._lock:
+            return self.remaining_by_day[day] == 0
+
+
+class DeliveryReconciler:
+    """Reconciles the delivery statuses of a run's pending messages with the messaging provider.
+
+    Attributes:
+        logger: The class logger.
+        messaging_client: The messaging client to list the messages sent with.
+        run_state: The state of the run to reconcile.
+        max_workers: The maximal number of (day, sender) listings to fetch concurrently.
+        page_size: The number of messages to fetch per request.
+        date_margin: A message recorded within this margin of midnight (UTC) is looked up on the adjacent day too.
+
+    """
+
+    def __init__(
+        self,
+        messaging_client: TwilioMessagingService,
+        run_state: RunStateStore,
+        *,
+        max_workers: int = 4,
+        page_size: int = 1000,
+        date_margin: timedelta = DEFAULT_DATE_MARGIN,
+    ) -> None:
+        """Initialize the delivery reconciler.
+
+        Args:
+            messaging_client: The messaging client to list the messages sent with.
+            run_state: The state of the run to reconcile.
+            max_workers: The maximal number of (day, sender) listings to fetch concurrently. (Defaults to 4).
+            page_size: The number of messages to fetch per request. (Defaults to 1000).
+            date_margin: A message recorded within this margin of midnight (UTC) is looked up on the adjacent day
+                too. (Defaults to 1 hour).
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.messaging_client = messaging_client
+        self.run_state = run_state
+        self.max_workers = max_workers
+        self.page_size = page_size
+        self.date_margin = date_margin
+
+    def reconcile(self) -> ReconciliationResult:
+        """Fetch the current statuses of the run's pending messages and record them into the run's state.
+
+        Returns:
+            The result of the reconciliation.
+
+        """
+        # Index the pending messages by the days they might have been sent on, as the messages are listed by day
+        pending_messages = PendingMessages(self.run_state.pending_messages(), date_margin=self.date_margin)
+        days = sorted(pending_messages.remaining_by_day)
+        self.logger.info(
+            f"Reconciling {len(pending_messages.days_by_sid)} pending messages sent over {len(days)} days",
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="reconcile") as executor:
+            futures = [
+                executor.submit(self.reconcile_day, date_sent, sender, pending_messages)
+                for date_sent in days
+                for sender in self.messaging_client.senders
+            ]
+            updated_messages = sum(future.result() for future in futures)
+        return ReconciliationResult(
+            fetched_days=len(days),
+            updated_messages=updated_messages,
+            counts=self.run_state.counts(),
+        )
+
+    def reconcile_day(self, date_sent: date, sender: str, pending_messages: PendingMessages) -> int:
+        """List the messages sent from ``sender`` on ``date_sent`` and record the statuses of the pending ones.
+
+        Args:
+            date_sent: The day to list the messages sent on.
+            sender: The sender to list the messages sent from.
+            pending_messages: The run's pending messages. Shared by the listings, which match them concurrently.
+
+        Returns:
+            The number of messages whose status was updated.
+
+        """
+        updated_messages = 0
+        if pending_messages.is_day_matched(date_sent):
+            return updated_messages
+        for message in self.messaging_client.list_messages(date_sent, sender=sender, page_size=self.page_size):
+            if message.sid is not None and pending_messages.match(message.sid):
+                updated_messages += self.run_state.record_status(message.sid, message.status, message.error_code)
+            # Stop paging once all the day's pending messages were matched (by any of the day's listings)
+            if pending_messages.is_day_matched(date_sent):
+                break
+        self.logger.debug(f"Reconciled the messages sent from {sender} on {date_sent}: {updated_messages} updated")
+        return updated_messages
@@ -0,0 +1,390 @@
+"""Reveal-on-demand of the participants' assignments.
+
+Instead of texting every participant their assignment, the assignments are sealed in a store, and every
+participant looks up only their own assignment from a small HTTP endpoint, with a one-time code (sent in a single
+short message with the endpoint's link, or handed out by the organizer).
+
+The store is an append-only JSON Lines event log, indexed by a keyed (salted) hash of the participants' phone
+numbers, and every recipient's name is encrypted with a key derived from the participant's one-time code. The codes
+are never stored, hence neither the store nor the organizer (without the codes) reveal the assignments. The keys
+are derived from the store's secret with HMAC-SHA256, and the names are encrypted with a SHAKE-256 keystream and
+authenticated with an HMAC tag, using the standard library only.
+
+Every lookup is a single dictionary access and a couple of HMACs, i.e. O(1).
+"""
+
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import PathLike
+from pathlib import Path
+from typing import Any, Self
+from urllib.parse import parse_qs
+
+from attr import dataclass
+
+from secret_santa.const import ENCODING
+from secret_santa.delivery.run_state import BatchedEventWriter
+from secret_santa.util import logging
+from secret_santa.util.phone import InvalidPhoneNumberError, normalize_phone_number
+
+# An unambiguous alphabet (no 0 / O, 1 / I / L), for codes read off a message
+CODE_ALPHABET = "23456789ABCDEFGHJKMNPQRSTUVWXYZ"
+CODE_LENGTH = 8
+NONCE_SIZE = 16
+TAG_SIZE = 16
+MAX_REQUEST_BODY_SIZE = 4096
+
+
+class RevealError(Exception):
+    """Raised when an assignment could not be revealed."""
+
+
+class InvalidCodeError(RevealError):
+    """Raised when the participant is unknown, or the code doesn't match the participant's code."""
+
+
+class AlreadyRevealedError(RevealError):
+    """Raised when the participant's one-time code was already used."""
+
+
+class RevealLockedError(RevealError):
+    """Raised when the participant's assignment is locked after too many invalid codes."""
+
+
+@dataclass(kw_only=True)
+class SealedAssignment:
+    """A participant's sealed assignment.
+
+    Attributes:
+        nonce: The encryption's nonce.
+        ciphertext: The encrypted name of the participant's recipient.
+        tag: The ciphertext's authentication tag.
+        revealed: Whether the assignment was already revealed, i.e. the one-time code was used.
+        failed_attempts: The number of invalid codes the assignment was looked up with.
+
+    """
+
+    nonce: bytes
+    ciphertext: bytes
+    tag: bytes
+    revealed: bool = False
+    failed_attempts: int = 0
+
+
+def normalize_code(code: str) -> str:
+    """Normalize a one-time code as typed by a participant, e.g. ``abcd-2345`` -> ``ABCD2345``.
+
+    Args:
+        code: The code.
+
+    Returns:
+        The normalized code.
+
+    """
+    return "".join(character for character in code.upper() if character.isalnum())
+
+
+class RevealStore:
+    """A sealed store of the participants' assignments.
+
+    Attributes:
+        logger: The class logger.
+        store_path: The path of the store's event log.
+        default_country_code: The country code national numbers are prefixed with when normalized, if any.
+        max_attempts: The number of invalid codes after which a participant's assignment is locked.
+
+    """
+
+    def __init__(
+        self,
+        store_path: PathLike,
+        secret: str,
+        *,
+        default_country_code: str | None = None,
+        max_attempts: int = 5,
+    ) -> None:
+        """Open the store, loading the assignments already sealed in it.
+
+        Args:
+            store_path: The path of the store's event log. It's created if it doesn't exist.
+            secret: The store's secret, which the lookup keys and the encryption keys are derived from. It should be
+                kept apart from the store.
+            default_country_code: The country code national numbers are prefixed with when normalized.
+                (Defaults to None).
+            max_attempts: The number of invalid codes after which a participant's assignment is locked.
+                (Defaults to 5).
+
+        """
+        assert secret, "The reveal store needs a secret"
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.store_path = Path(store_path)
+        self.default_country_code = default_country_code
+        self.max_attempts = max_attempts
+        self._secret = secret.encode()
+        self._assignments: dict[str, SealedAssignment] = {}
+        self._lock = threading.Lock()
+        self.load()
+        self._writer = BatchedEventWriter(self.store_path)
+
+    def __len__(self) -> int:
+        """Get the number of assignments sealed in the store."""
+        return len(self._assignments)
+
+    def load(self) -> None:
+        """Load the store by replaying its event log."""
+        if not self.store_path.exists():
+            return
+        with self.store_path.open(encoding=ENCODING) as store_file:
+            for line in store_file:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                match event["event"]:
+                    case "seal":
+                        self._assignments[event["key"]] = SealedAssignment(
+                            nonce=bytes.fromhex(event["nonce"]),
+                            ciphertext=bytes.fromhex(event["ciphertext"]),
+                            tag=bytes.fromhex(event["tag"]),
+                        )
+                    case "reveal" if event["key"] in self._assignments:
+                        self._assignments[event["key"]].revealed = True
+                    case "failed" if event["key"] in self._assignments:
+                        self._assignments[event["key"]].failed_attempts += 1
+        self.logger.debug(f"Loaded {len(self._assignments)} sealed assignments from {self.store_path}")
+
+    def derive_key(self, purpose: bytes, *parts: bytes) -> bytes:
+        """Derive a key for the ``purpose`` from the store's secret.
+
+        Args:
+            purpose: The key's purpose, e.g. ``lookup``.
+            parts: The values the key is bound to.
+
+        Returns:
+            The derived (32 bytes) key.
+
+        """
+        return hmac.new(self._secret, b"\0".join((purpose, *parts)), hashlib.sha256).digest()
+
+    def get_lookup_key(self, phone_number: str) -> str:
+        """Get the keyed hash the assignment of the participant with the ``phone_number`` is indexed by.
+
+        Args:
+            phone_number: The participant's phone number, in any format.
+
+        Returns:
+            The lookup key.
+
+        """
+        normalized_phone_number = normalize_phone_number(phone_number, self.default_country_code)
+        return self.derive_key(b"lookup", normalized_phone_number.encode()).hex()[:32]
+
+    def encrypt(self, key: bytes, nonce: bytes, data: bytes) -> tuple[bytes, bytes]:
+        """Encrypt (or decrypt) the ``data`` with the ``key``'s keystream, and get the ciphertext's tag.
+
+        Returns:
+            The encrypted data, and the (encrypted data's) authentication tag.
+
+        """
+        keystream = hashlib.shake_256(key + nonce).digest(len(data))
+        ciphertext = bytes(data_byte ^ key_byte for data_byte, key_byte in zip(data, keystream, strict=True))
+        return ciphertext, self.get_tag(key, nonce, ciphertext)
+
+    @staticmethod
+    def get_tag(key: bytes, nonce: bytes, ciphertext: bytes) -> bytes:
+        """Get the authentication tag of the ``ciphertext``.
+
+        Returns:
+            The tag.
+
+        """
+        return hmac.new(key, nonce + ciphertext, hashlib.sha256).digest()[:TAG_SIZE]
+
+    def seal(self, phone_number: str, recipient_name: str) -> str:
+        """Seal the assignment of the participant with the ``phone_number``, replacing its previous assignment (if any).
+
+        The assignment is written to the store before returning, as its code is sent out right after.
+
+        Args:
+            phone_number: The participant's phone number.
+            recipient_name: The name of the participant's recipient.
+
+        Returns:
+            The participant's new one-time code.
+
+        """
+        code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        lookup_key = self.get_lookup_key(phone_number)
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        ciphertext, tag = self.encrypt(
+            self.derive_key(b"seal", lookup_key.encode(), code.encode()),
+            nonce,
+            recipient_name.encode(),
+        )
+        with self._lock:
+            self._assignments[lookup_key] = SealedAssignment(nonce=nonce, ciphertext=ciphertext, tag=tag)
+            self._writer.append(
+                {
+                    "event": "seal",
+                    "key": lookup_key,
+                    "nonce": nonce.hex(),
+                    "ciphertext": ciphertext.hex(),
+                    "tag": tag.hex(),
+                },
+            )
+            self._writer.flush()
+        return code
+
+    def reveal(self, phone_number: str, code: str) -> str:
+        """Reveal the assignment of the participant with the ``phone_number``, using up its one-time ``code``.
+
+        Args:
+            phone_number: The participant's phone number, in any format.
+            code: The participant's one-time code.
+
+        Returns:
+            The name of the participant's recipient.
+
+        Raises:
+            InvalidCodeError: If the participant is unknown (or the phone number is invalid), or the code is invalid.
+            AlreadyRevealedError: If the participant's code was already used.
+            RevealLockedError: If the participant's assignment is locked after too many invalid codes.
+
+        """
+        try:
+            lookup_key = self.get_lookup_key(phone_number)
+        except InvalidPhoneNumberError as err:
+            invalid_phone_number_err = "Invalid phone number or code"
+            raise InvalidCodeError(invalid_phone_number_err) from err
+        key = self.derive_key(b"seal", lookup_key.encode(), normalize_code(code).encode())
+        with self._lock:
+            if (assignment := self._assignments.get(lookup_key)) is None:
+                unknown_participant_err = "Invalid phone number or code"
+                raise InvalidCodeError(unknown_participant_err)
+            if assignment.failed_attempts >= self.max_attempts:
+                locked_err = "Too many invalid codes, ask the organizer for a new code"
+                raise RevealLockedError(locked_err)
+            if not hmac.compare_digest(self.get_tag(key, assignment.nonce, assignment.ciphertext), assignment.tag):
+                assignment.failed_attempts += 1
+                # Written right away, so the lockout outlives a restart of the endpoint
+                self._writer.append({"event": "failed", "key": lookup_key})
+                self._writer.flush()
+                invalid_code_err = "Invalid phone number or code"
+                raise InvalidCodeError(invalid_code_err)
+            if assignment.revealed:
+                already_revealed_err = "The code was already used"
+                raise AlreadyRevealedError(already_revealed_err)
+            assignment.revealed = True
+            self._writer.append({"event": "reveal", "key": lookup_key})
+            self._writer.flush()
+        recipient_name, _ = self.encrypt(key, assignment.nonce, assignment.ciphertext)
+        return recipient_name.decode()
+
+    def close(self) -> None:
+        """Write the store's pending events and close it."""
+        self._writer.close()
+
+    def __enter__(self) -> Self:
+        """Enter the store's context."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Close the store on exiting its context."""
+        self.close()
+
+
+class RevealRequestHandler(BaseHTTPRequestHandler):
+    """HTTP request handler of the reveal endpoint."""
+
+    server: RevealHTTPServer
+
+    def do_GET(self) -> None:
+        """Handle the health checks."""
+        if self.path.rstrip("/") == "/health":
+            self.send_json(HTTPStatus.OK, {"status": "ok", "assignments": len(self.server.reveal_store)})
+        else:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"No such endpoint: {self.path}"})
+
+    def do_POST(self) -> None:
+        """Handle the reveal requests, given as JSON or as a form: ``phone_number`` and ``code``."""
+        if self.path.rstrip("/") != "/reveal":
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"No such endpoint: {self.path}"})
+            return
+        if (body := self.read_body()) is None:
+            return
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+                request = {field: values[0] for field, values in parse_qs(body).items()}
+            else:
+                request = json.loads(body)
+            recipient_name = self.server.reveal_store.reveal(str(request["phone_number"]), str(request["code"]))
+        except (json.JSONDecodeError, KeyError, TypeError):
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": "Both a phone_number and a code are required"})
+        except InvalidCodeError as err:
+            self.send_json(HTTPStatus.FORBIDDEN, {"error": str(err)})
+        except AlreadyRevealedError as err:
+            self.send_json(HTTPStatus.GONE, {"error": str(err)})
+        except RevealLockedError as err:
+            self.send_json(HTTPStatus.TOO_MANY_REQUESTS, {"error": str(err)})
+        else:
+            self.send_json(HTTPStatus.OK, {"recipient": recipient_name})
+
+    def read_body(self) -> str | None:
+        """Read the request's body, answering the request with an error in case its ``Content-Length`` is invalid.
+
+        Returns:
+            The request's body, or ``None`` if the request was answered with an error.
+
+        """
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"})
+            return None
+        if content_length > MAX_REQUEST_BODY_SIZE:
+            self.send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "The request is too large"})
+            return None
+        return self.rfile.read(content_length).decode(ENCODING, errors="replace")
+
+    def send_json(self, status: HTTPStatus, body: object) -> None:
+        """Send a JSON response.
+
+        Args:
+            status: The response's status.
+            body: The response's body, to be encoded as JSON.
+
+        """
+        encoded_body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded_body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Log the requests through the store's logger rather than to ``stderr``."""
+        self.server.reveal_store.logger.debug(f"{self.address_string()} {format % args}")
+
+
+class RevealHTTPServer(ThreadingHTTPServer):
+    """An HTTP server of the reveal endpoint."""
+
+    daemon_threads = True
+
+    def __init__(self, server_address: tuple[str, int], reveal_store: RevealStore) -> None:
+        """Bind the server to the ``server_address``.
+
+        Args:
+            server_address: The host and port to bind to.
+            reveal_store: The store the assignments are revealed from.
+
+        """
+        self.reveal_store = reveal_store
+        super().__init__(server_address, RevealRequestHandler)
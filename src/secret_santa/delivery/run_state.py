@@ -0,0 +1,573 @@
+"""Persistent state of a Secret Santa run.
+
+A run's state is kept as an append-only JSON Lines event log (one file per run), so recording an event never
+rewrites the file, and the state of a past run is rebuilt by replaying its log.
+"""
+
+import hashlib
+import json
+import threading
+import uuid
+from datetime import UTC, datetime
+from os import PathLike
+from pathlib import Path
+from typing import Self
+
+from attr import dataclass
+
+from secret_santa.const import ENCODING, RUN_STATE_DIRECTORY_NAME
+from secret_santa.draw.cycles import DEFAULT_MIN_CYCLE_LENGTH
+from secret_santa.util import logging, path
+
+RUN_STATE_SUFFIX = ".jsonl"
+
+# The order in which a message progresses through Twilio's statuses. Status callbacks are not guaranteed to arrive
+# in order, hence an update is only applied if it moves the message forward.
+DELIVERY_STATUS_RANKS: dict[str, int] = {
+    "accepted": 0,
+    "scheduled": 0,
+    "queued": 1,
+    "sending": 2,
+    "sent": 3,
+    "delivered": 4,
+    "read": 5,
+    "undelivered": 4,
+    "failed": 4,
+    "canceled": 4,
+}
+DELIVERED_STATUSES = frozenset({"delivered", "read"})
+FAILED_STATUSES = frozenset({"undelivered", "failed", "canceled"})
+FINAL_STATUSES = DELIVERED_STATUSES | FAILED_STATUSES
+
+
+@dataclass(kw_only=True)
+class MessageState:
+    """The delivery state of a message sent during a run.
+
+    Attributes:
+        sid: The message's SID, as given by the messaging provider.
+        phone_number: The number the message was sent to.
+        status: The message's latest known status.
+        sent_at: When the message was sent (UTC, ISO 8601).
+        error_code: The provider's error code, in case the message was not delivered.
+
+    """
+
+    sid: str
+    phone_number: str
+    status: str
+    sent_at: str
+    error_code: str | None = None
+
+    @property
+    def is_final(self) -> bool:
+        """Whether the message reached a final status (delivered / failed)."""
+        return self.status in FINAL_STATUSES
+
+
+@dataclass(frozen=True, kw_only=True)
+class DrawOptions:
+    """The options a run's arrangement was drawn with, which the arrangement's repairs keep.
+
+    Attributes:
+        single_cycle: Whether the arrangement was drawn as a single cycle of all the participants.
+        min_cycle_length: The minimal length of every cycle of the arrangement.
+        mixing_attributes: The group attributes (e.g. ``team``) the arrangement mixes, if any.
+
+    """
+
+    single_cycle: bool = False
+    min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH
+    mixing_attributes: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True, kw_only=True)
+class DeliveryCounts:
+    """The delivery counts of a run's messages.
+
+    Attributes:
+        delivered: The number of messages delivered.
+        failed: The number of messages which failed to be delivered.
+        pending: The number of messages yet to reach a final status.
+
+    """
+
+    delivered: int
+    failed: int
+    pending: int
+
+    def __str__(self) -> str:
+        """Format the counts for display."""
+        return f"{self.delivered} delivered, {self.failed} failed, {self.pending} pending"
+
+
+def is_forward_status(current_status: str, status: str) -> bool:
+    """Check whether a message's ``status`` update moves it forward from its ``current_status``.
+
+    Args:
+        current_status: The message's latest known status.
+        status: The message's updated status.
+
+    Returns:
+        Whether the update should be applied, rather than being stale.
+
+    """
+    return DELIVERY_STATUS_RANKS.get(status, 0) > DELIVERY_STATUS_RANKS.get(current_status, 0)
+
+
+def get_idempotency_key(run_id: str, phone_number: str, revision: int = 0) -> str:
+    """Get the deterministic idempotency key of the message sent to ``phone_number`` during the run with ``run_id``.
+
+    Args:
+        run_id: The run's ID.
+        phone_number: The (normalized) phone number the message is sent to.
+        revision: The revision of the arrangement the participant's recipient was assigned at, as a participant
+            reassigned by a repair of the arrangement is messaged again. (Defaults to 0, the original draw).
+
+    Returns:
+        The message's idempotency key.
+
+    """
+    message_id = f"{run_id}\0{phone_number}" if not revision else f"{run_id}\0{phone_number}\0{revision}"
+    return hashlib.sha256(message_id.encode()).hexdigest()[:32]
+
+
+class BatchedEventWriter:
+    """Appends events to a JSON Lines file in batches.
+
+    Events are buffered and written with a single ``write`` once ``batch_size`` events are buffered, or at the latest
+    ``flush_interval`` seconds after they were appended, instead of paying a write (and a flush) per event.
+
+    Attributes:
+        log_path: The path of the file the events are appended to.
+        batch_size: The number of buffered events which triggers a write.
+        flush_interval: The maximal number of seconds an event stays buffered.
+
+    """
+
+    def __init__(self, log_path: PathLike, *, batch_size: int = 100, flush_interval: float = 1.0) -> None:
+        """Initialize the writer and start its periodic flushing thread.
+
+        Args:
+            log_path: The path of the file to append the events to.
+            batch_size: The number of buffered events which triggers a write. (Defaults to 100).
+            flush_interval: The maximal number of seconds an event stays buffered. (Defaults to 1.0).
+
+        """
+        self.log_path = Path(log_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: list[str] = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flush_thread = threading.Thread(target=self.flush_periodically, name="run-state-writer", daemon=True)
+        self._flush_thread.start()
+
+    def append(self, event: dict) -> None:
+        """Buffer the ``event``, writing the buffered events in case the batch is full.
+
+        Args:
+            event: The event to append.
+
+        """
+        encoded_event = json.dumps(event, separators=(",", ":"))
+        with self._lock:
+            self._buffer.append(encoded_event)
+            if len(self._buffer) >= self.batch_size:
+                self.write_buffer()
+
+    def flush(self) -> None:
+        """Write the buffered events."""
+        with self._lock:
+            self.write_buffer()
+
+    def write_buffer(self) -> None:
+        """Write the buffered events. Should be called while holding the lock."""
+        if not self._buffer:
+            return
+        with self.log_path.open("a", encoding=ENCODING) as log_file:
+            log_file.write("\n".join(self._buffer) + "\n")
+        self._buffer.clear()
+
+    def flush_periodically(self) -> None:
+        """Flush the buffered events every ``flush_interval`` seconds, until the writer is closed."""
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the periodic flushing and write the remaining buffered events."""
+        self._closed.set()
+        self._flush_thread.join()
+        self.flush()
+
+
+class RunStateStore:
+    """The state of a single Secret Santa run, backed by the run's event log.
+
+    Attributes:
+        logger: The class logger.
+        run_id: The run's ID.
+        log_path: The path of the run's event log.
+        messages: The states of the messages sent during the run, by their SIDs.
+        claimed_keys: The idempotency keys of the messages claimed to be sent during the run.
+        arrangement: The run's arrangement, as a mapping of the participants' phone numbers to their recipients'
+            phone numbers, once drawn.
+        draw_options: The options the run's arrangement was drawn with, once drawn.
+        arrangement_revision: The number of times the run's arrangement was repaired.
+        assignment_revisions: The arrangement revisions the participants reassigned by the repairs were assigned
+            their current recipients at.
+        schedule: The run's dispatch schedule, as a mapping of the phone numbers to message to their send times
+            (UNIX timestamps), in case the run's messages are scheduled.
+
+    """
+
+    def __init__(self, run_id: str, *, state_dir: PathLike | None = None, batch_size: int = 100) -> None:
+        """Open the state of the run with the ``run_id``, replaying its event log if it already exists.
+
+        Args:
+            run_id: The run's ID.
+            state_dir: The directory the runs' event logs are stored at.
+                If omitted, ``{project_root}/.secret_santa_runs`` will be used. (Defaults to None).
+            batch_size: The number of events written to the event log at once. (Defaults to 100).
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.run_id = run_id
+        self.log_path = self.get_log_path(run_id, state_dir)
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self.messages: dict[str, MessageState] = {}
+        self.claimed_keys: set[str] = set()
+        self.arrangement: dict[str, str] | None = None
+        self.draw_options: DrawOptions | None = None
+        self.arrangement_revision = 0
+        self.assignment_revisions: dict[str, int] = {}
+        self.schedule: dict[str, float] | None = None
+        # The latest status updates of the messages not recorded yet, as a status callback might arrive before its
+        # message is recorded (messages are recorded once their send returns, on another thread)
+        self._early_statuses: dict[str, dict] = {}
+        # Kept up to date by every message and status event, so counting the messages doesn't scan them
+        self._delivered = 0
+        self._failed = 0
+        self._lock = threading.Lock()
+
+        if self.log_path.exists():
+            self.replay()
+        self._writer = BatchedEventWriter(self.log_path, batch_size=batch_size)
+
+    @staticmethod
+    def get_log_path(run_id: str, state_dir: PathLike | None = None) -> Path:
+        """Get the path of the event log of the run with the ``run_id``.
+
+        Args:
+            run_id: The run's ID.
+            state_dir: The directory the runs' event logs are stored at.
+                If omitted, ``{project_root}/.secret_santa_runs`` will be used. (Defaults to None).
+
+        Returns:
+            The path of the run's event log.
+
+        """
+        state_dir = Path(state_dir) if state_dir else path.get_project_root() / RUN_STATE_DIRECTORY_NAME
+        return state_dir / f"{run_id}{RUN_STATE_SUFFIX}"
+
+    @staticmethod
+    def new_run_id() -> str:
+        """Generate a new, unique and chronologically sortable run ID.
+
+        Returns:
+            A new run ID.
+
+        """
+        return f"{datetime.now(tz=UTC).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def replay(self) -> None:
+        """Rebuild the run's state out of its event log."""
+        with self.log_path.open(encoding=ENCODING) as log_file:
+            for line in log_file:
+                if line.strip():
+                    self.apply(json.loads(line))
+        self.logger.debug(f"Replayed the state of run {self.run_id}: {len(self.messages)} messages")
+
+    def apply(self, event: dict) -> bool:
+        """Apply the ``event`` to the run's in-memory state.
+
+        Args:
+            event: The event to apply.
+
+        Returns:
+            ``True`` if the event changed the state, ``False`` otherwise.
+
+        """
+        apply_event = {
+            "message": self.apply_message_event,
+            "status": self.apply_status_event,
+            "claim": self.apply_claim_event,
+            "release": self.apply_release_event,
+            "arrangement": self.apply_arrangement_event,
+            "repair": self.apply_repair_event,
+            "schedule": self.apply_schedule_event,
+        }.get(event["event"])
+        return apply_event is not None and apply_event(event)
+
+    def apply_message_event(self, event: dict) -> bool:
+        """Apply a message sent event, along with the latest status update which arrived before it."""
+        if (previous_message := self.messages.get(event["sid"])) is not None:
+            self.update_counts(previous_message.status, -1)
+        self.messages[event["sid"]] = MessageState(
+            sid=event["sid"],
+            phone_number=event["phone_number"],
+            status=event["status"],
+            sent_at=event["recorded_at"],
+        )
+        self.update_counts(event["status"], 1)
+        if (early_status_event := self._early_statuses.pop(event["sid"], None)) is not None:
+            self.apply_status_event(early_status_event)
+        return True
+
+    def apply_status_event(self, event: dict) -> bool:
+        """Apply a delivery status update event, unless it's stale.
+
+        The update of a message which is not recorded yet is kept until the message is recorded (unless a later
+        update of the message was already kept).
+        """
+        message = self.messages.get(event["sid"])
+        if message is None:
+            early_status_event = self._early_statuses.get(event["sid"])
+            if early_status_event is not None and not is_forward_status(early_status_event["status"], event["status"]):
+                return False
+            self._early_statuses[event["sid"]] = event
+            return True
+        if not is_forward_status(message.status, event["status"]):
+            return False
+        self.update_counts(message.status, -1)
+        self.update_counts(event["status"], 1)
+        message.status = event["status"]
+        message.error_code = event.get("error_code")
+        return True
+
+    def update_counts(self, status: str, increment: int) -> None:
+        """Add the ``increment`` to the delivery count of the messages with the ``status`` (if final)."""
+        if status in DELIVERED_STATUSES:
+            self._delivered += increment
+        elif status in FAILED_STATUSES:
+            self._failed += increment
+
+    def apply_claim_event(self, event: dict) -> bool:
+        """Apply a message claim event, unless the message was already claimed."""
+        if event["key"] in self.claimed_keys:
+            return False
+        self.claimed_keys.add(event["key"])
+        return True
+
+    def apply_release_event(self, event: dict) -> bool:
+        """Apply a message claim release event, unless the message is not claimed."""
+        if event["key"] not in self.claimed_keys:
+            return False
+        self.claimed_keys.discard(event["key"])
+        return True
+
+    def apply_arrangement_event(self, event: dict) -> bool:
+        """Apply an arrangement drawn event."""
+        self.arrangement = dict(event["pairs"])
+        # The runs drawn before the options were recorded were drawn with the default options
+        options = event.get("options", {})
+        self.draw_options = DrawOptions(
+            single_cycle=options.get("single_cycle", False),
+            min_cycle_length=options.get("min_cycle_length", DEFAULT_MIN_CYCLE_LENGTH),
+            mixing_attributes=tuple(options.get("mixing_attributes", ())),
+        )
+        return True
+
+    def apply_repair_event(self, event: dict) -> bool:
+        """Apply an arrangement repaired event."""
+        if self.arrangement is None:
+            return False
+        self.arrangement_revision = event["revision"]
+        for leaver in event["removed"]:
+            self.arrangement.pop(leaver, None)
+            self.assignment_revisions.pop(leaver, None)
+        for giver, recipient in event["pairs"]:
+            self.arrangement[giver] = recipient
+            self.assignment_revisions[giver] = event["revision"]
+        return True
+
+    def apply_schedule_event(self, event: dict) -> bool:
+        """Apply a dispatch schedule planned event."""
+        self.schedule = dict(event["entries"])
+        return True
+
+    def record(self, event: dict) -> bool:
+        """Apply the ``event`` to the run's state and append it to the event log.
+
+        Args:
+            event: The event to record.
+
+        Returns:
+            ``True`` if the event changed the state, ``False`` otherwise (in which case it's not logged).
+
+        """
+        event = {**event, "recorded_at": datetime.now(tz=UTC).isoformat()}
+        with self._lock:
+            if not self.apply(event):
+                return False
+        self._writer.append(event)
+        return True
+
+    def record_message(self, sid: str, phone_number: str, status: str) -> None:
+        """Record a message sent during the run.
+
+        Args:
+            sid: The message's SID.
+            phone_number: The number the message was sent to.
+            status: The message's status when it was sent.
+
+        """
+        self.record({"event": "message", "sid": sid, "phone_number": phone_number, "status": status})
+
+    def record_arrangement(self, arrangement: dict[str, str], draw_options: DrawOptions | None = None) -> None:
+        """Record the run's arrangement, so resuming the run messages the same recipients.
+
+        Args:
+            arrangement: A mapping of the participants' phone numbers to their recipients' phone numbers.
+            draw_options: The options the arrangement was drawn with, for its repairs to keep. If omitted, the
+                default options are recorded. (Defaults to None).
+
+        """
+        draw_options = draw_options or DrawOptions()
+        self.record(
+            {
+                "event": "arrangement",
+                "pairs": list(arrangement.items()),
+                "options": {
+                    "single_cycle": draw_options.single_cycle,
+                    "min_cycle_length": draw_options.min_cycle_length,
+                    "mixing_attributes": list(draw_options.mixing_attributes),
+                },
+            },
+        )
+        self._writer.flush()
+
+    def record_repair(self, changes: dict[str, str], removed: list[str]) -> int:
+        """Record a repair of the run's arrangement, as a new revision of it.
+
+        Only the changes are recorded, rather than the whole (repaired) arrangement.
+
+        Args:
+            changes: A mapping of the givers reassigned by the repair to their new recipients.
+            removed: The participants removed from the arrangement.
+
+        Returns:
+            The arrangement's new revision.
+
+        """
+        assert self.arrangement is not None, f"Run {self.run_id} has no arrangement to repair"
+        revision = self.arrangement_revision + 1
+        self.record({"event": "repair", "revision": revision, "pairs": list(changes.items()), "removed": removed})
+        self._writer.flush()
+        return revision
+
+    def get_message_key(self, phone_number: str) -> str:
+        """Get the idempotency key of the participant's message about its current recipient.
+
+        Args:
+            phone_number: The participant's (normalized) phone number.
+
+        Returns:
+            The message's idempotency key.
+
+        """
+        return get_idempotency_key(self.run_id, phone_number, self.assignment_revisions.get(phone_number, 0))
+
+    def record_schedule(self, schedule: dict[str, float]) -> None:
+        """Record the run's dispatch schedule, so resuming the run keeps the messages' send times.
+
+        Args:
+            schedule: A mapping of the phone numbers to message to their send times (UNIX timestamps).
+
+        """
+        self.record({"event": "schedule", "entries": list(schedule.items())})
+        self._writer.flush()
+
+    def claim(self, key: str, phone_number: str) -> bool:
+        """Claim the message with the idempotency ``key`` to be sent, unless it was already claimed.
+
+        The claim is written to the event log before returning (rather than batched), as it has to outlive a crash
+        right after the message is sent.
+
+        Args:
+            key: The message's idempotency key.
+            phone_number: The phone number the message is sent to.
+
+        Returns:
+            ``True`` if the message was claimed and should be sent, ``False`` if it was already claimed.
+
+        """
+        if not self.record({"event": "claim", "key": key, "phone_number": phone_number}):
+            return False
+        self._writer.flush()
+        return True
+
+    def release(self, key: str) -> None:
+        """Release the claim of the message with the idempotency ``key``, e.g. after it was definitely not sent.
+
+        Args:
+            key: The message's idempotency key.
+
+        """
+        self.record({"event": "release", "key": key})
+        self._writer.flush()
+
+    def record_status(self, sid: str, status: str, error_code: str | None = None) -> bool:
+        """Record a delivery status update of a message sent during the run.
+
+        Args:
+            sid: The message's SID.
+            status: The message's new status.
+            error_code: The provider's error code, if any. (Defaults to None).
+
+        Returns:
+            ``True`` if the update was applied (or kept until its message is recorded), ``False`` if it's stale.
+
+        """
+        return self.record({"event": "status", "sid": sid, "status": status, "error_code": error_code})
+
+    def pending_messages(self) -> list[MessageState]:
+        """Get the run's messages which are yet to reach a final status.
+
+        Returns:
+            The run's pending messages.
+
+        """
+        with self._lock:
+            return [message for message in self.messages.values() if not message.is_final]
+
+    def counts(self) -> DeliveryCounts:
+        """Count the run's messages by their delivery status.
+
+        Returns:
+            The delivery counts of the run's messages.
+
+        """
+        with self._lock:
+            return DeliveryCounts(
+                delivered=self._delivered,
+                failed=self._failed,
+                pending=len(self.messages) - self._delivered - self._failed,
+            )
+
+    def close(self) -> None:
+        """Write the remaining buffered events to the event log."""
+        self._writer.close()
+
+    def __enter__(self) -> Self:
+        """Enter the run state's context.
+
+        Returns:
+            The run state itself.
+
+        """
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Close the run state on exiting its context."""
+        self.close()
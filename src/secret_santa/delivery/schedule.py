@@ -0,0 +1,170 @@
+"""Time zone aware scheduling of the messages' dispatch.
+
+Instead of messaging the whole roster at once (hitting the provider's rate limits, and texting participants in the
+middle of their night), every message gets a send time within its participant's local delivery window.
+The messages sharing a delivery window are spread evenly across it, flattening the peak throughput, and are
+dispatched in order of their send times off a min-heap.
+"""
+
+import heapq
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from datetime import UTC, datetime, timedelta
+from datetime import time as time_of_day
+from zoneinfo import ZoneInfo
+
+from attr import dataclass
+
+from secret_santa.util import logging
+from secret_santa.util.time_zone import get_time_zone
+
+
+@dataclass(frozen=True, kw_only=True)
+class DeliveryWindow:
+    """The local time of day messages may be delivered in.
+
+    Attributes:
+        start: The (local) time the window opens.
+        end: The (local) time the window closes.
+
+    """
+
+    start: time_of_day = time_of_day(9)
+    end: time_of_day = time_of_day(20)
+
+    def get_opening(self, now: datetime, time_zone: ZoneInfo) -> tuple[datetime, datetime]:
+        """Get the window a message could be sent in, in the ``time_zone``: the current one if open, or the next one.
+
+        Args:
+            now: The current (aware) time.
+            time_zone: The time zone of the window.
+
+        Returns:
+            The time the window opens (or ``now``, if it's already open) and the time it closes.
+
+        """
+        local_now = now.astimezone(time_zone)
+        start = datetime.combine(local_now.date(), self.start, tzinfo=time_zone)
+        end = datetime.combine(local_now.date(), self.end, tzinfo=time_zone)
+        if local_now >= end:
+            start, end = start + timedelta(days=1), end + timedelta(days=1)
+        return max(start, local_now), end
+
+
+class DeliveryScheduler:
+    """Schedules the messages within their participants' delivery windows, and dispatches them once due.
+
+    Attributes:
+        logger: The class logger.
+        window: The local delivery window.
+        default_time_zone: The time zone of participants without one.
+        clock: Returns the current time as a UNIX timestamp.
+        sleep: Sleeps for the given number of seconds.
+
+    """
+
+    def __init__(
+        self,
+        window: DeliveryWindow | None = None,
+        *,
+        default_time_zone: str = "UTC",
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize the delivery scheduler.
+
+        Args:
+            window: The local delivery window. If omitted, 09:00 - 20:00 will be used. (Defaults to None).
+            default_time_zone: The time zone of participants without one. (Defaults to ``UTC``).
+            clock: Returns the current time as a UNIX timestamp. (Defaults to ``time.time``).
+            sleep: Sleeps for the given number of seconds. (Defaults to ``time.sleep``).
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.window = window or DeliveryWindow()
+        assert self.window.start < self.window.end, (
+            f"The delivery window should open before it closes: {self.window.start} - {self.window.end}"
+        )
+        self.default_time_zone = get_time_zone(default_time_zone)
+        self.clock = clock
+        self.sleep = sleep
+
+    def plan(self, recipients: Iterable[tuple[str, str | None]]) -> dict[str, float]:
+        """Plan the send times of the messages, spreading the messages of each delivery window evenly across it.
+
+        Args:
+            recipients: The phone numbers to message, and the time zones of their participants (if any).
+
+        Returns:
+            A mapping of the phone numbers to message to their send times (UNIX timestamps).
+
+        """
+        now = datetime.fromtimestamp(self.clock(), tz=UTC)
+        phone_numbers_by_window: dict[tuple[datetime, datetime], list[str]] = defaultdict(list)
+        for phone_number, time_zone in recipients:
+            window = self.window.get_opening(now, get_time_zone(time_zone) if time_zone else self.default_time_zone)
+            phone_numbers_by_window[window].append(phone_number)
+
+        schedule = {}
+        for (start, end), phone_numbers in phone_numbers_by_window.items():
+            interval = (end - start).total_seconds() / len(phone_numbers)
+            start_timestamp = start.timestamp()
+            for position, phone_number in enumerate(phone_numbers):
+                schedule[phone_number] = start_timestamp + position * interval
+        self.logger.info(
+            f"Scheduled {len(schedule)} messages over {len(phone_numbers_by_window)} delivery windows",
+        )
+        return schedule
+
+    def reschedule(
+        self,
+        schedule: dict[str, float],
+        recipients: Iterable[tuple[str, str | None]],
+    ) -> dict[str, float]:
+        """Plan the overdue messages of a resumed run's schedule again (see ``plan``), keeping the others' send times.
+
+        A message whose send time passed (e.g. as its run crashed, and was resumed hours later) is not sent right
+        away, as its participant's delivery window might have closed since.
+
+        Args:
+            schedule: The send times of the messages, as planned by the original run.
+            recipients: The phone numbers to message, and the time zones of their participants (if any).
+
+        Returns:
+            A mapping of the phone numbers to message to their send times (UNIX timestamps).
+
+        """
+        now = self.clock()
+        recipients = list(recipients)
+        overdue_recipients = [
+            (phone_number, time_zone) for phone_number, time_zone in recipients if schedule.get(phone_number, 0) <= now
+        ]
+        rescheduled = {
+            phone_number: schedule[phone_number] for phone_number, _ in recipients if phone_number in schedule
+        }
+        if overdue_recipients:
+            self.logger.info(f"Rescheduling {len(overdue_recipients)} overdue messages")
+            rescheduled.update(self.plan(overdue_recipients))
+        return rescheduled
+
+    def dispatch(self, schedule: dict[str, float], send: Callable[[str], None], *, dry_run: bool = False) -> None:
+        """Send the scheduled messages once they're due, in order of their send times.
+
+        Args:
+            schedule: A mapping of the phone numbers to message to their send times (UNIX timestamps).
+            send: Sends the message of the given phone number.
+            dry_run: If True, the messages are sent (i.e. shown) in order without waiting for their send times.
+                (Defaults to False).
+
+        """
+        send_queue = [(send_at, phone_number) for phone_number, send_at in schedule.items()]
+        heapq.heapify(send_queue)
+        while send_queue:
+            send_at, phone_number = send_queue[0]
+            if not dry_run and (delay := send_at - self.clock()) > 0:
+                self.logger.debug(f"Next message is due in {delay:.0f} seconds ({len(send_queue)} messages left)")
+                self.sleep(delay)
+                continue
+            heapq.heappop(send_queue)
+            send(phone_number)
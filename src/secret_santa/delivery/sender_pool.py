@@ -0,0 +1,214 @@
+"""Sharding of the messages across a pool of senders.
+
+Messaging providers cap the throughput of every sender (e.g. a long code sends about one message per second),
+hence a run messaging from a single sender is bound by that sender's cap. A pool of senders (numbers or messaging
+identities) multiplies it: every recipient is assigned a sticky sender by a consistent hash ring, and every sender
+sends at its own rate, so the aggregate throughput scales with the number of senders.
+
+The ring keeps the assignments sticky across runs and pool changes: adding or removing a sender only moves the
+recipients of the ring's arcs it takes or gives up (about ``1 / senders`` of them), rather than reshuffling everyone.
+"""
+
+import bisect
+import hashlib
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Self
+
+from secret_santa.util import logging
+
+DEFAULT_VIRTUAL_NODES = 128
+
+
+def get_ring_position(key: str) -> int:
+    """Get the position of the ``key`` on the hash ring.
+
+    Args:
+        key: The key to hash, e.g. a recipient's phone number.
+
+    Returns:
+        The key's (stable, across processes) position on the ring.
+
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest())
+
+
+class ConsistentHashRing:
+    """A consistent hash ring, mapping keys to their sticky nodes.
+
+    Every node is placed on the ring at several (virtual) positions, so the keys are spread evenly between the nodes.
+
+    Attributes:
+        nodes: The ring's nodes.
+        virtual_nodes: The number of positions of every node on the ring.
+
+    """
+
+    def __init__(self, nodes: Iterable[str], *, virtual_nodes: int = DEFAULT_VIRTUAL_NODES) -> None:
+        """Place the ``nodes`` on the ring.
+
+        Args:
+            nodes: The ring's nodes.
+            virtual_nodes: The number of positions of every node on the ring. (Defaults to 128).
+
+        """
+        self.nodes = list(dict.fromkeys(nodes))
+        self.virtual_nodes = virtual_nodes
+        assert self.nodes, "A hash ring needs at least one node"
+        assert virtual_nodes > 0, "Every node needs at least one position on the ring"
+        ring = sorted(
+            (get_ring_position(f"{node}#{replica}"), node) for node in self.nodes for replica in range(virtual_nodes)
+        )
+        self._positions = [position for position, _ in ring]
+        self._ring_nodes = [node for _, node in ring]
+
+    def get_node(self, key: str) -> str:
+        """Get the ``key``'s node: the node at the first position clockwise from the key's position.
+
+        Args:
+            key: The key to map.
+
+        Returns:
+            The key's node.
+
+        """
+        index = bisect.bisect(self._positions, get_ring_position(key))
+        return self._ring_nodes[index % len(self._ring_nodes)]
+
+
+class TokenBucket:
+    """A (thread safe) token bucket, limiting the rate of an action.
+
+    Attributes:
+        rate: The number of tokens added per second.
+        burst: The maximum number of tokens in the bucket, i.e. the maximum burst of actions.
+        clock: Returns a monotonic time, in seconds.
+        sleep: Sleeps for the given number of seconds.
+
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        *,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize a full token bucket.
+
+        Args:
+            rate: The number of tokens added per second.
+            burst: The maximum number of tokens in the bucket. (Defaults to 1).
+            clock: Returns a monotonic time, in seconds. (Defaults to ``time.monotonic``).
+            sleep: Sleeps for the given number of seconds. (Defaults to ``time.sleep``).
+
+        """
+        assert rate > 0, "The token bucket's rate should be positive"
+        assert burst >= 1, "The token bucket should hold at least one token"
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token from the bucket, waiting for one to be added if the bucket is empty.
+
+        Returns:
+            The number of seconds waited.
+
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            # The token is taken right away, the caller waits for the deficit (if any) to be refilled
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            self.sleep(wait)
+        return wait
+
+
+class SenderPool:
+    """A pool of senders, each assigned its recipients by a consistent hash and sending at its own rate.
+
+    Attributes:
+        logger: The class logger.
+        senders: The pool's senders (phone numbers / alphanumeric sender IDs).
+        messages_per_second: The rate budget of every sender.
+
+    """
+
+    def __init__(
+        self,
+        senders: Iterable[str],
+        *,
+        messages_per_second: float = 1.0,
+        virtual_nodes: int = DEFAULT_VIRTUAL_NODES,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize the sender pool.
+
+        Args:
+            senders: The pool's senders (phone numbers / alphanumeric sender IDs).
+            messages_per_second: The rate budget of every sender. (Defaults to 1, a long code's typical cap).
+            virtual_nodes: The number of positions of every sender on the hash ring. (Defaults to 128).
+            clock: Returns a monotonic time, in seconds. (Defaults to ``time.monotonic``).
+            sleep: Sleeps for the given number of seconds. (Defaults to ``time.sleep``).
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self._ring = ConsistentHashRing(
+            (sender.strip() for sender in senders if sender.strip()),
+            virtual_nodes=virtual_nodes,
+        )
+        self.senders = self._ring.nodes
+        self.messages_per_second = messages_per_second
+        self._rate_limits = {
+            sender: TokenBucket(messages_per_second, clock=clock, sleep=sleep) for sender in self.senders
+        }
+        self.logger.debug(f"Sender pool of {len(self.senders)} senders, {messages_per_second} messages/s each")
+
+    @classmethod
+    def from_string(cls, senders: str, *, messages_per_second: float = 1.0) -> Self:
+        """Initialize a sender pool from a comma separated list of senders, e.g. ``+15550001,+15550002``.
+
+        Args:
+            senders: The comma separated senders.
+            messages_per_second: The rate budget of every sender. (Defaults to 1).
+
+        Returns:
+            The sender pool.
+
+        """
+        return cls(senders.split(","), messages_per_second=messages_per_second)
+
+    def get_sender(self, to: str) -> str:
+        """Get the recipient's sticky sender.
+
+        Args:
+            to: The recipient's phone number.
+
+        Returns:
+            The sender to message the recipient from.
+
+        """
+        return self._ring.get_node(to)
+
+    def acquire(self, sender: str) -> float:
+        """Wait for the ``sender``'s rate budget to allow another message.
+
+        Args:
+            sender: The sender about to send a message.
+
+        Returns:
+            The number of seconds waited.
+
+        """
+        return self._rate_limits[sender].acquire()
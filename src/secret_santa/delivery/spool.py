@@ -0,0 +1,188 @@
+"""Spooling of messages to disk, as the last resort of the messaging failover chain.
+
+A message which no messaging provider could send is appended to a JSON Lines spool file rather than failing the
+run, and the spool is drained (i.e. its messages are sent) once a provider is healthy again. Messages the provider
+rejects while draining are quarantined to a ``.rejected`` file next to the spool.
+"""
+
+import json
+import os
+import threading
+from datetime import UTC, datetime
+from os import PathLike
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from secret_santa.const import ENCODING
+from secret_santa.delivery.failover import is_provider_failure
+from secret_santa.twilio_messaging_service import MessageResponse
+from secret_santa.util import logging
+
+if TYPE_CHECKING:
+    from secret_santa.twilio_messaging_service import TwilioMessagingService
+
+SPOOLED_STATUS = "spooled"
+
+
+class SpoolMessagingService:
+    """Spools the messages to a JSON Lines file, to be sent later.
+
+    A drain's progress is saved after every message (as the number of spooled messages drained so far), so a drain
+    interrupted midway resumes after the last message it sent rather than sending every message again. Messages
+    which the provider rejects (e.g. for an invalid number) are quarantined to a separate file rather than blocking
+    the spool.
+
+    Attributes:
+        logger: The class logger.
+        spool_path: The path of the spool file.
+        drained_path: The path of the file holding the number of spooled messages drained so far.
+        rejected_path: The path of the JSON Lines file the rejected messages are quarantined to.
+
+    """
+
+    def __init__(self, spool_path: PathLike) -> None:
+        """Initialize the spool messaging service.
+
+        Args:
+            spool_path: The path of the spool file. The messages are appended to it if it already exists.
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.spool_path = Path(spool_path)
+        self.drained_path = self.spool_path.with_name(f"{self.spool_path.name}.drained")
+        self.rejected_path = self.spool_path.with_name(f"{self.spool_path.stem}.rejected{self.spool_path.suffix}")
+        self._lock = threading.Lock()
+
+    def send_message(
+        self,
+        body: str,
+        to: str,
+        *,
+        dry_run: bool,
+        status_callback: str | None = None,
+    ) -> MessageResponse:
+        """Spool the message with the ``body`` to the number specified in ``to``.
+
+        Args:
+            body: The message to be sent.
+            to: The number of the recipient of the message.
+            dry_run: If True, the message is not spooled.
+            status_callback: A URL the provider will call back on every status change of the message, once sent.
+                (Defaults to None).
+
+        Returns:
+            A message response with the spooled status.
+
+        """
+        if dry_run:
+            return MessageResponse(status="Not executed (DRY RUN)")
+        spooled_message = {
+            "to": to,
+            "body": body,
+            "status_callback": status_callback,
+            "spooled_at": datetime.now(UTC).isoformat(),
+        }
+        with self._lock, self.spool_path.open("a", encoding=ENCODING) as spool_file:
+            spool_file.write(json.dumps(spooled_message) + "\n")
+        self.logger.warning(f"Spooled the message to {to} at {self.spool_path}")
+        return MessageResponse(status=SPOOLED_STATUS)
+
+    def load_messages(self) -> list[dict[str, str | None]]:
+        """Load the spooled messages which were not drained yet.
+
+        Returns:
+            The spooled messages, in the order they were spooled.
+
+        """
+        if not self.spool_path.exists():
+            return []
+        with self.spool_path.open(encoding=ENCODING) as spool_file:
+            spooled_messages = [json.loads(line) for line in spool_file if line.strip()]
+        return spooled_messages[self.load_drained_count() :]
+
+    def load_drained_count(self) -> int:
+        """Load the number of spooled messages drained so far by an unfinished drain.
+
+        Returns:
+            The number of (leading) messages of the spool file which were drained.
+
+        """
+        if not self.drained_path.exists():
+            return 0
+        return int(self.drained_path.read_text(encoding=ENCODING))
+
+    def save_drained_count(self, drained_count: int) -> None:
+        """Save the number of spooled messages drained so far, replacing the file at once so it's never partial.
+
+        Args:
+            drained_count: The number of (leading) messages of the spool file which were drained.
+
+        """
+        temp_drained_path = self.drained_path.with_suffix(f".{os.getpid()}.tmp")
+        temp_drained_path.write_text(str(drained_count), encoding=ENCODING)
+        temp_drained_path.replace(self.drained_path)
+
+    def quarantine(self, spooled_message: dict[str, str | None], error: Exception) -> None:
+        """Quarantine a spooled message the provider rejected, so it doesn't block the rest of the spool.
+
+        Args:
+            spooled_message: The rejected message.
+            error: The provider's rejection.
+
+        """
+        rejected_message = {
+            **spooled_message,
+            "error": f"{type(error).__name__}: {error}",
+            "rejected_at": datetime.now(UTC).isoformat(),
+        }
+        with self.rejected_path.open("a", encoding=ENCODING) as rejected_file:
+            rejected_file.write(json.dumps(rejected_message) + "\n")
+        self.logger.error(f"Quarantined the spooled message to {spooled_message['to']} at {self.rejected_path}")
+
+    def drain(self, messaging_client: TwilioMessagingService, *, dry_run: bool) -> list[MessageResponse]:
+        """Send the spooled messages with the ``messaging_client``, keeping only the messages it failed to send.
+
+        The drain stops at the first failure indicating the provider is unhealthy, while the messages it rejects are
+        quarantined (see ``quarantine``) and the drain goes on.
+
+        Args:
+            messaging_client: The messaging client to send the spooled messages with.
+            dry_run: If True, the messages are not sent, and are kept in the spool.
+
+        Returns:
+            The responses of the messages sent.
+
+        """
+        with self._lock:
+            drained_count = self.load_drained_count()
+            spooled_messages = self.load_messages()
+            if not spooled_messages:
+                return []
+            responses: list[MessageResponse] = []
+            remaining_messages = []
+            for index, spooled_message in enumerate(spooled_messages):
+                try:
+                    response = messaging_client.send_message(
+                        spooled_message["body"],  # type: ignore[arg-type]
+                        spooled_message["to"],  # type: ignore[arg-type]
+                        dry_run=dry_run,
+                        status_callback=spooled_message["status_callback"],
+                    )
+                except Exception as error:
+                    if dry_run or is_provider_failure(error):
+                        self.logger.exception(f"Failed to send the spooled message to {spooled_message['to']}")
+                        remaining_messages.extend(spooled_messages[index:])
+                        break
+                    self.quarantine(spooled_message, error)
+                else:
+                    responses.append(response)
+                    if dry_run:
+                        remaining_messages.append(spooled_message)
+                        continue
+                # Saved after every message, so an interrupted drain doesn't send the messages it sent again
+                self.save_drained_count(drained_count + index + 1)
+            with self.spool_path.open("w", encoding=ENCODING) as spool_file:
+                spool_file.writelines(json.dumps(spooled_message) + "\n" for spooled_message in remaining_messages)
+            self.drained_path.unlink(missing_ok=True)
+        self.logger.info(f"Drained {len(responses)} spooled messages, {len(remaining_messages)} remain spooled")
+        return responses
@@ -0,0 +1,188 @@
+"""Local receiver of the messaging provider's delivery status callbacks.
+
+Instead of polling the provider for the status of every message sent (an API call per message), the URL of the
+receiver is registered on every message sent, and the provider calls it back on every status change.
+The receiver is a small ``asyncio`` HTTP server, run on a thread of its own alongside the (synchronous) run, within
+the context the receiver was started in, hence every callback is traced (if tracing) as a child span of the run.
+"""
+
+import asyncio
+import threading
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qsl
+
+from twilio.request_validator import RequestValidator
+
+from secret_santa.util import logging, tracing
+
+if TYPE_CHECKING:
+    from secret_santa.delivery.run_state import DeliveryCounts, RunStateStore
+
+MAX_CALLBACK_BODY_SIZE = 64 * 1024
+STATUS_CALLBACK_READ_TIMEOUT_SECONDS = 10
+
+
+class StatusCallbackReceiver:
+    """Receives delivery status callbacks and records them into the run's state.
+
+    Attributes:
+        logger: The class logger.
+        run_state: The state of the run the messages were sent in.
+        host: The host the receiver listens on.
+        port: The port the receiver listens on (the port actually bound once started, if ``0`` was passed).
+        public_url: The URL the provider calls back, which forwards to the receiver (e.g. through a tunnel).
+        request_validator: Validates the callbacks' signatures, if an auth token was passed.
+
+    """
+
+    def __init__(
+        self,
+        run_state: RunStateStore,
+        *,
+        public_url: str,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        auth_token: str | None = None,
+    ) -> None:
+        """Initialize the status callback receiver.
+
+        Args:
+            run_state: The state of the run to record the status updates into.
+            public_url: The URL the provider calls back, which forwards to the receiver.
+            host: The host to listen on. (Defaults to ``127.0.0.1``).
+            port: The port to listen on. If ``0``, a free port will be picked. (Defaults to 0).
+            auth_token: The provider's auth token. If provided, callbacks with an invalid signature are rejected.
+                (Defaults to None).
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.run_state = run_state
+        self.public_url = public_url
+        self.host = host
+        self.port = port
+        self.request_validator = RequestValidator(auth_token) if auth_token else None
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._start_error: OSError | None = None
+        self._stopped: asyncio.Event | None = None
+        self._thread: threading.Thread | None = None
+        self._updated = threading.Condition()
+
+    def run_event_loop(self) -> None:
+        """Run the receiver's event loop until the receiver is stopped."""
+        self._loop.run_until_complete(self.serve())
+
+    async def serve(self) -> None:
+        """Serve the status callbacks until the receiver is stopped."""
+        self._stopped = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        except OSError as err:
+            self._start_error = err
+            self._started.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self.logger.info(f"Receiving status callbacks on {self.host}:{self.port} (public URL: {self.public_url})")
+        self._started.set()
+        async with server:
+            await self._stopped.wait()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Handle a single status callback request.
+
+        Args:
+            reader: The connection's reader.
+            writer: The connection's writer.
+
+        """
+        with tracing.start_span("status_callback") as span:
+            try:
+                status_line = await asyncio.wait_for(self.handle_request(reader), STATUS_CALLBACK_READ_TIMEOUT_SECONDS)
+            except (TimeoutError, ValueError, asyncio.IncompleteReadError) as err:
+                self.logger.debug(f"Malformed status callback request: {err!r}")
+                status_line = "400 Bad Request"
+            if span:
+                span.set_attributes(response_status=status_line)
+        writer.write(f"HTTP/1.1 {status_line}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    async def handle_request(self, reader: asyncio.StreamReader) -> str:
+        """Read a status callback request and record the status update it holds.
+
+        Args:
+            reader: The connection's reader.
+
+        Returns:
+            The response's status line.
+
+        """
+        method, *_ = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        while (header_line := (await reader.readline()).decode("latin-1").strip()) != "":
+            name, _, value = header_line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if method != "POST":
+            return "405 Method Not Allowed"
+        content_length = int(headers.get("content-length", 0))
+        if content_length > MAX_CALLBACK_BODY_SIZE:
+            return "413 Content Too Large"
+        params = dict(parse_qsl((await reader.readexactly(content_length)).decode()))
+
+        if self.request_validator and not self.request_validator.validate(
+            self.public_url,
+            params,
+            headers.get("x-twilio-signature", ""),
+        ):
+            self.logger.warning("Rejected a status callback with an invalid signature")
+            return "403 Forbidden"
+        if "MessageSid" not in params or "MessageStatus" not in params:
+            return "400 Bad Request"
+
+        tracing.set_attributes(sid=params["MessageSid"], status=params["MessageStatus"])
+        if self.run_state.record_status(params["MessageSid"], params["MessageStatus"], params.get("ErrorCode")):
+            self.logger.info(f"Delivery status: {self.run_state.counts()}")
+            with self._updated:
+                self._updated.notify_all()
+        return "204 No Content"
+
+    def start(self) -> None:
+        """Start receiving the status callbacks (on a thread of its own).
+
+        Raises:
+            OSError: If the receiver could not listen on its host and port.
+
+        """
+        self._thread = threading.Thread(
+            target=tracing.bind_context(self.run_event_loop),
+            name="status-callback-receiver",
+            daemon=True,
+        )
+        self._thread.start()
+        self._started.wait()
+        if self._start_error:
+            self._thread.join()
+            raise self._start_error
+
+    def stop(self) -> None:
+        """Stop receiving the status callbacks."""
+        if self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread:
+            self._thread.join()
+        self._loop.close()
+
+    def wait_for_delivery(self, timeout: float) -> DeliveryCounts:
+        """Wait for all the run's messages to reach a final status, or for the ``timeout`` to pass.
+
+        Args:
+            timeout: The maximal number of seconds to wait.
+
+        Returns:
+            The delivery counts once done waiting.
+
+        """
+        with self._updated:
+            self._updated.wait_for(lambda: self.run_state.counts().pending == 0, timeout=timeout)
+        return self.run_state.counts()
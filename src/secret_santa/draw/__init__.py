@@ -0,0 +1 @@
+"""Draw package."""
@@ -0,0 +1,228 @@
+"""Drawing arrangements with a controlled cycle structure.
+
+An arrangement is a permutation of the participants (every giver's recipient) without fixed points, hence a set of
+disjoint cycles of givers and recipients, e.g. a cycle of two is a pair of participants swapping gifts. The
+arrangements are drawn directly with the requested structure, rather than shuffling until a shuffle happens to have
+it (as the chance of a random shuffle forming a single cycle, for example, is ``1 / n``):
+
+* A single cycle (everyone in one loop) is a random cyclic order of the participants.
+* A derangement whose cycles are all at least ``k`` long is drawn uniformly, cycle by cycle: the length of the
+  next cycle is drawn by the number of arrangements of the rest of the participants it leaves, and the cycle takes
+  the next participants of a random order.
+
+Both take O(n) time.
+"""
+
+import random
+from collections import Counter
+
+from attr import dataclass
+
+DEFAULT_MIN_CYCLE_LENGTH = 2
+
+
+@dataclass(frozen=True, kw_only=True)
+class CycleStats:
+    """The cycle statistics of an arrangement.
+
+    Attributes:
+        cycles: The number of cycles.
+        shortest: The length of the shortest cycle.
+        longest: The length of the longest cycle.
+        lengths: The number of cycles of every length.
+
+    """
+
+    cycles: int
+    shortest: int
+    longest: int
+    lengths: dict[int, int]
+
+    def __str__(self) -> str:
+        """Get a summary of the cycle statistics."""
+        lengths = ", ".join(f"{count} x {length}" for length, count in sorted(self.lengths.items()))
+        return f"{self.cycles} cycles (shortest: {self.shortest}, longest: {self.longest}; {lengths})"
+
+
+def get_cycle_lengths(recipient_indices: list[int]) -> list[int]:
+    """Get the lengths of the cycles of an arrangement.
+
+    Args:
+        recipient_indices: The index of every participant's recipient.
+
+    Returns:
+        The lengths of the arrangement's cycles, in the order of their first participants.
+
+    """
+    visited = [False] * len(recipient_indices)
+    cycle_lengths = []
+    for start in range(len(recipient_indices)):
+        length = 0
+        index = start
+        while not visited[index]:
+            visited[index] = True
+            index = recipient_indices[index]
+            length += 1
+        if length:
+            cycle_lengths.append(length)
+    return cycle_lengths
+
+
+def get_cycle_stats(recipient_indices: list[int]) -> CycleStats:
+    """Get the cycle statistics of an arrangement.
+
+    Args:
+        recipient_indices: The index of every participant's recipient.
+
+    Returns:
+        The arrangement's cycle statistics.
+
+    """
+    cycle_lengths = get_cycle_lengths(recipient_indices)
+    assert cycle_lengths, "An empty arrangement has no cycles"
+    return CycleStats(
+        cycles=len(cycle_lengths),
+        shortest=min(cycle_lengths),
+        longest=max(cycle_lengths),
+        lengths=dict(Counter(cycle_lengths)),
+    )
+
+
+def link_cycles(order: list[int], cycle_lengths: list[int]) -> list[int]:
+    """Link the participants into cycles, each taking the next ``cycle_lengths`` participants of the ``order``.
+
+    Args:
+        order: The participants' indices, in order.
+        cycle_lengths: The lengths of the cycles, summing up to the number of participants.
+
+    Returns:
+        The index of every participant's recipient.
+
+    """
+    recipient_indices = [0] * len(order)
+    start = 0
+    for cycle_length in cycle_lengths:
+        cycle = order[start : start + cycle_length]
+        for giver, recipient in zip(cycle, cycle[1:] + cycle[:1], strict=True):
+            recipient_indices[giver] = recipient
+        start += cycle_length
+    return recipient_indices
+
+
+def draw_single_cycle(participants: int, *, rng: random.Random | None = None) -> list[int]:
+    """Draw an arrangement of a single cycle, i.e. a random cyclic order of the participants.
+
+    Args:
+        participants: The number of participants.
+        rng: The random number generator to draw with. If omitted, a new generator will be used. (Defaults to None).
+
+    Returns:
+        The index of every participant's recipient.
+
+    """
+    assert participants > 1, "A cycle needs at least two participants"
+    order = list(range(participants))
+    (rng or random.Random()).shuffle(order)
+    return link_cycles(order, [participants])
+
+
+def get_arrangement_weights(participants: int, min_cycle_length: int) -> list[float]:
+    """Get the (normalized) number of arrangements of up to ``participants`` with cycles of at least the given length.
+
+    ``weights[m]`` is the number of such arrangements of ``m`` participants divided by ``m!``. It satisfies
+    ``m * weights[m] = weights[0] + ... + weights[m - min_cycle_length]``, as the cycle of the first participant
+    takes ``j`` of them in ``(m - 1)! / (m - j)!`` ways. Dividing by ``m!`` keeps the weights bounded (they converge
+    to ``exp(-(1 + 1/2 + ... + 1/(min_cycle_length - 1)))``), rather than growing like ``m!``.
+
+    Args:
+        participants: The maximal number of participants.
+        min_cycle_length: The minimal length of every cycle.
+
+    Returns:
+        The weights, of 0 to ``participants`` participants.
+
+    """
+    weights = [1.0] + [0.0] * participants
+    prefix_sums = [1.0] + [0.0] * participants
+    for m in range(1, participants + 1):
+        if m >= min_cycle_length:
+            weights[m] = prefix_sums[m - min_cycle_length] / m
+        prefix_sums[m] = prefix_sums[m - 1] + weights[m]
+    return weights
+
+
+def draw_cycle_lengths(
+    participants: int,
+    *,
+    min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+    rng: random.Random | None = None,
+    weights: list[float] | None = None,
+) -> list[int]:
+    """Draw the cycle lengths of a uniformly random arrangement whose cycles are all at least ``min_cycle_length`` long.
+
+    Linking a uniformly random order of the participants by the cycle lengths (see ``link_cycles``) draws the
+    arrangement itself.
+
+    Args:
+        participants: The number of participants.
+        min_cycle_length: The minimal length of every cycle. (Defaults to 2).
+        rng: The random number generator to draw with. If omitted, a new generator will be used. (Defaults to None).
+        weights: The arrangement weights of (at least) the participants and the minimal cycle length (see
+            ``get_arrangement_weights``), e.g. when drawing many times. If omitted, they're computed.
+            (Defaults to None).
+
+    Returns:
+        The lengths of the cycles, in order.
+
+    """
+    assert min_cycle_length >= DEFAULT_MIN_CYCLE_LENGTH, "Every cycle should be at least two participants long"
+    assert participants >= min_cycle_length, f"A cycle of {min_cycle_length} needs as many participants"
+    rng = rng or random.Random()
+    if weights is None:
+        weights = get_arrangement_weights(participants, min_cycle_length)
+    cycle_lengths = []
+    remaining = participants
+    while remaining > 0:
+        # A cycle of j leaves weights[remaining - j] arrangements (normalized) of the rest of the participants
+        threshold = rng.random() * remaining * weights[remaining]
+        cycle_length = remaining
+        cumulative_weight = 0.0
+        for length in range(min_cycle_length, remaining + 1):
+            cumulative_weight += weights[remaining - length]
+            if cumulative_weight > threshold:
+                cycle_length = length
+                break
+        cycle_lengths.append(cycle_length)
+        remaining -= cycle_length
+    return cycle_lengths
+
+
+def draw_derangement(
+    participants: int,
+    *,
+    min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+    rng: random.Random | None = None,
+    weights: list[float] | None = None,
+) -> list[int]:
+    """Draw a uniformly random arrangement whose cycles are all at least ``min_cycle_length`` long.
+
+    Args:
+        participants: The number of participants.
+        min_cycle_length: The minimal length of every cycle. 2 allows any arrangement, 3 rules out the participants
+            swapping gifts, etc. (Defaults to 2).
+        rng: The random number generator to draw with. If omitted, a new generator will be used. (Defaults to None).
+        weights: The arrangement weights of (at least) the participants and the minimal cycle length (see
+            ``get_arrangement_weights``), e.g. when drawing many times. If omitted, they're computed.
+            (Defaults to None).
+
+    Returns:
+        The index of every participant's recipient.
+
+    """
+    rng = rng or random.Random()
+    order = list(range(participants))
+    rng.shuffle(order)
+    return link_cycles(
+        order,
+        draw_cycle_lengths(participants, min_cycle_length=min_cycle_length, rng=rng, weights=weights),
+    )
@@ -0,0 +1,175 @@
+"""A reusable draw engine, decoupled from any I/O.
+
+The engine is built once from an in-memory roster, without loading files, reading the environment or initializing
+a messaging client, and precomputes what every draw of the roster shares (e.g. the arrangement weights of the
+minimal cycle length). Hence drawing the same roster many times (e.g. for previews or simulations) only pays for the
+draws themselves.
+"""
+
+import random
+from collections.abc import Iterator, Sequence
+from typing import TYPE_CHECKING
+
+from secret_santa.draw.cycles import (
+    DEFAULT_MIN_CYCLE_LENGTH,
+    CycleStats,
+    draw_cycle_lengths,
+    draw_derangement,
+    draw_single_cycle,
+    get_arrangement_weights,
+    get_cycle_stats,
+)
+from secret_santa.draw.mixing import MixingAttribute, get_group_keys, get_mixing_score, mix_arrangement
+
+if TYPE_CHECKING:
+    from secret_santa.model.participant import Participant
+
+
+class DrawEngine:
+    """Draws arrangements of an in-memory roster, with a controlled cycle structure.
+
+    Attributes:
+        participants: The roster's participants.
+        single_cycle: Whether every arrangement is a single cycle of all the participants.
+        min_cycle_length: The minimal length of every cycle of the arrangements.
+        mixing_attributes: The group attributes (e.g. ``team``) the arrangements mix, if any.
+
+    """
+
+    def __init__(
+        self,
+        participants: Sequence[Participant],
+        *,
+        single_cycle: bool = False,
+        min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+        mixing_attributes: Sequence[MixingAttribute] = (),
+        rng: random.Random | None = None,
+    ) -> None:
+        """Initialize the engine, precomputing what the draws share.
+
+        Args:
+            participants: The roster's (already validated) participants.
+            single_cycle: Whether to draw every arrangement as a single cycle (everyone in one loop), rather than
+                any derangement. (Defaults to False).
+            min_cycle_length: The minimal length of every cycle of the arrangements, e.g. 3 rules out two
+                participants swapping gifts. (Defaults to 2, i.e. any derangement).
+            mixing_attributes: The group attributes (e.g. ``team``) to mix, i.e. to avoid matching a giver with a
+                recipient sharing their groups wherever possible (see ``secret_santa.draw.mixing``). If omitted, the
+                arrangements are uniformly random. (Defaults to no attributes).
+            rng: The random number generator to draw with, e.g. a seeded one for reproducible simulations. If
+                omitted, a new generator will be used. (Defaults to None).
+
+        """
+        assert len(participants) >= DEFAULT_MIN_CYCLE_LENGTH, "A draw needs at least two participants"
+        assert single_cycle or len(participants) >= min_cycle_length, (
+            f"A cycle of {min_cycle_length} needs at least as many participants"
+        )
+        self.participants = list(participants)
+        self.single_cycle = single_cycle
+        self.min_cycle_length = min_cycle_length
+        self._rng = rng or random.Random()
+        self.mixing_attributes = list(mixing_attributes)
+        self._weights = None if single_cycle else get_arrangement_weights(len(self.participants), min_cycle_length)
+        self._group_keys = get_group_keys(self.participants, self.mixing_attributes) if self.mixing_attributes else None
+
+    def draw_indices(self) -> list[int]:
+        """Draw an arrangement of the participants' indices.
+
+        Returns:
+            The index of every participant's recipient, parallel to the participants list.
+
+        """
+        if self._group_keys is not None:
+            return self.draw_mixed_indices(self._group_keys)
+        if self.single_cycle:
+            return draw_single_cycle(len(self.participants), rng=self._rng)
+        return draw_derangement(
+            len(self.participants),
+            min_cycle_length=self.min_cycle_length,
+            rng=self._rng,
+            weights=self._weights,
+        )
+
+    def draw_mixed_indices(self, group_keys: list[tuple[int, ...]]) -> list[int]:
+        """Draw an arrangement of the participants' indices, mixing their groups.
+
+        Args:
+            group_keys: The participants' group keys (see ``get_group_keys``).
+
+        Returns:
+            The index of every participant's recipient, parallel to the participants list.
+
+        """
+        participants = len(self.participants)
+        order = list(range(participants))
+        self._rng.shuffle(order)
+        if self.single_cycle:
+            cycle_lengths = [participants]
+        else:
+            cycle_lengths = draw_cycle_lengths(
+                participants,
+                min_cycle_length=self.min_cycle_length,
+                rng=self._rng,
+                weights=self._weights,
+            )
+        return mix_arrangement(order, cycle_lengths, group_keys, rng=self._rng)
+
+    def draw(self) -> list[Participant]:
+        """Draw an arrangement of the participants.
+
+        Returns:
+            The recipients, parallel to the participants list.
+
+        """
+        participants = self.participants
+        return [participants[recipient_index] for recipient_index in self.draw_indices()]
+
+    def draw_many(self, draws: int) -> list[list[Participant]]:
+        """Draw several independent arrangements of the participants.
+
+        Args:
+            draws: The number of arrangements to draw.
+
+        Returns:
+            The arrangements, each as the recipients parallel to the participants list.
+
+        """
+        return [self.draw() for _ in range(draws)]
+
+    def iter_pairs(self) -> Iterator[tuple[Participant, Participant]]:
+        """Draw an arrangement of the participants, iterating over its givers and recipients.
+
+        Yields:
+            Every participant (the giver), and its recipient (the receiver).
+
+        """
+        participants = self.participants
+        for giver_index, recipient_index in enumerate(self.draw_indices()):
+            yield participants[giver_index], participants[recipient_index]
+
+    def get_cycle_stats(self, recipients: Sequence[Participant]) -> CycleStats:
+        """Get the cycle statistics of an arrangement of the participants.
+
+        Args:
+            recipients: The recipients, parallel to the participants list.
+
+        Returns:
+            The arrangement's cycle statistics.
+
+        """
+        index_by_participant = {id(participant): index for index, participant in enumerate(self.participants)}
+        return get_cycle_stats([index_by_participant[id(recipient)] for recipient in recipients])
+
+    def get_mixing_score(self, recipients: Sequence[Participant]) -> float:
+        """Get the share of the pairs of an arrangement of the participants which don't share any mixed group.
+
+        Args:
+            recipients: The recipients, parallel to the participants list.
+
+        Returns:
+            The share of the givers whose recipient is from other groups, between 0 and 1.
+
+        """
+        assert self._group_keys is not None, "The engine doesn't mix any group attributes"
+        index_by_participant = {id(participant): index for index, participant in enumerate(self.participants)}
+        return get_mixing_score([index_by_participant[id(recipient)] for recipient in recipients], self._group_keys)
@@ -0,0 +1,311 @@
+"""Drawing arrangements which mix the participants' groups (e.g. teams or offices).
+
+A mixing draw keeps the requested cycle structure (its cycle lengths are drawn as usual), and links the
+participants into the cycles in two randomized steps:
+
+* A greedy chaining: every cycle is filled one participant at a time, each drawn at random among the remaining
+  participants sharing no group with the previous one (by rejection sampling, so every draw takes O(1) expected time).
+* A local search (min-conflicts) repairing the pairs the chaining left sharing a group: the recipient of a random
+  such giver is swapped with the best of a few random participants elsewhere in the arrangement, as long as the swap
+  doesn't raise the number of pairs sharing a group (sideways swaps let the search escape plateaus). Every swap
+  affects at most four pairs, so its effect is computed in O(1).
+
+Pairs sharing a group are only kept when the groups make them unavoidable (e.g. a team of more than half of the
+participants), and the arrangement stays random otherwise.
+"""
+
+import random
+from collections.abc import Sequence
+from enum import StrEnum
+from operator import eq
+from typing import TYPE_CHECKING
+
+from secret_santa.draw.cycles import link_cycles
+
+if TYPE_CHECKING:
+    from secret_santa.model.participant import Participant
+
+
+class MixingAttribute(StrEnum):
+    """The participants' group attributes an arrangement could mix."""
+
+    team = "team"
+    office = "office"
+
+
+# The number of random participants drawn for every position of the greedy chaining, before settling for a pair
+# sharing a group
+DEFAULT_CHAIN_ATTEMPTS = 16
+# The number of random swaps evaluated per step of the search
+DEFAULT_SWAP_CANDIDATES = 16
+# The number of steps (per participant) the search stops after without mixing the groups better
+DEFAULT_PATIENCE = 0.1
+
+
+def get_group_keys(participants: Sequence[Participant], attributes: Sequence[str]) -> list[tuple[int, ...]]:
+    """Get the participants' group keys: an integer per group attribute (e.g. ``team``), equal for equal groups.
+
+    A participant without a group (e.g. without a team) gets a group of its own, i.e. it mixes with anyone.
+
+    Args:
+        participants: The participants.
+        attributes: The participants' attributes to mix by.
+
+    Returns:
+        The participants' group keys, parallel to the participants list.
+
+    """
+    group_ids: list[dict[str, int]] = [{} for _ in attributes]
+    group_keys = []
+    for index, participant in enumerate(participants):
+        key = []
+        for attribute, ids in zip(attributes, group_ids, strict=True):
+            group = getattr(participant, attribute)
+            key.append(ids.setdefault(group, len(ids)) if group is not None else -1 - index)
+        group_keys.append(tuple(key))
+    return group_keys
+
+
+def get_shared_groups(group_keys: list[tuple[int, ...]], giver: int, recipient: int) -> int:
+    """Get the number of groups the ``giver`` and its ``recipient`` share.
+
+    Returns:
+        The number of group attributes the giver and recipient are equal in.
+
+    """
+    return sum(
+        giver_group == recipient_group
+        for giver_group, recipient_group in zip(group_keys[giver], group_keys[recipient], strict=True)
+    )
+
+
+def get_mixing_score(recipient_indices: list[int], group_keys: list[tuple[int, ...]]) -> float:
+    """Get the share of the pairs of an arrangement which don't share any group.
+
+    Args:
+        recipient_indices: The index of every participant's recipient.
+        group_keys: The participants' group keys (see ``get_group_keys``).
+
+    Returns:
+        The share of the givers whose recipient is from other groups, between 0 and 1.
+
+    """
+    mixed_pairs = sum(
+        not get_shared_groups(group_keys, giver, recipient) for giver, recipient in enumerate(recipient_indices)
+    )
+    return mixed_pairs / len(recipient_indices)
+
+
+def chain_groups(
+    order: list[int],
+    cycle_lengths: list[int],
+    group_keys: list[tuple[int, ...]],
+    *,
+    rng: random.Random | None = None,
+    attempts: int = DEFAULT_CHAIN_ATTEMPTS,
+) -> list[int]:
+    """Greedily reorder the participants, so the consecutive participants of every cycle share no group.
+
+    Args:
+        order: The participants' indices, in (random) order.
+        cycle_lengths: The lengths of the arrangement's cycles.
+        group_keys: The participants' group keys (see ``get_group_keys``).
+        rng: The random number generator drawing the participants. If omitted, a new generator will be used.
+            (Defaults to None).
+        attempts: The number of random participants drawn for every position, before settling for one sharing a
+            group with the previous participant. (Defaults to 16).
+
+    Returns:
+        The participants' indices, in the new order.
+
+    """
+    rng = rng or random.Random()
+    remaining = order[:]
+    chained_order = []
+    for cycle_length in cycle_lengths:
+        first = remaining.pop()
+        chained_order.append(first)
+        previous = first
+        for cycle_position in range(1, cycle_length):
+            # The last participant of the cycle gives to the first one
+            is_last = cycle_position == cycle_length - 1
+            for _ in range(attempts):
+                index = rng.randrange(len(remaining))
+                candidate_groups = group_keys[remaining[index]]
+                if not any(map(eq, group_keys[previous], candidate_groups)) and not (
+                    is_last and any(map(eq, candidate_groups, group_keys[first]))
+                ):
+                    break
+            # Remove the drawn participant in O(1), by moving the last remaining participant into its place
+            previous = remaining[index]
+            remaining[index] = remaining[-1]
+            remaining.pop()
+            chained_order.append(previous)
+    return chained_order
+
+
+class ArrangementMixer:
+    """Mixes the groups of an arrangement in place, by swapping the participants' positions within its cycles.
+
+    Attributes:
+        order: The participants' indices, in order. Every consecutive ``cycle_lengths`` of them form a cycle.
+        cycle_lengths: The lengths of the arrangement's cycles.
+        group_keys: The participants' group keys (see ``get_group_keys``).
+
+    """
+
+    def __init__(
+        self,
+        order: list[int],
+        cycle_lengths: list[int],
+        group_keys: list[tuple[int, ...]],
+        *,
+        rng: random.Random | None = None,
+    ) -> None:
+        """Index the positions of the arrangement's cycles, and the pairs sharing a group.
+
+        Args:
+            order: The participants' indices, in (random) order. It's reordered in place.
+            cycle_lengths: The lengths of the arrangement's cycles.
+            group_keys: The participants' group keys (see ``get_group_keys``).
+            rng: The random number generator picking the swaps. If omitted, a new generator will be used.
+                (Defaults to None).
+
+        """
+        self.order = order
+        self.cycle_lengths = cycle_lengths
+        self.group_keys = group_keys
+        self._rng = rng or random.Random()
+        # The position of every position's recipient and giver, within its cycle
+        self._next_position = [0] * len(order)
+        self._previous_position = [0] * len(order)
+        start = 0
+        for cycle_length in cycle_lengths:
+            for position in range(start, start + cycle_length):
+                next_position = start + (position - start + 1) % cycle_length
+                self._next_position[position] = next_position
+                self._previous_position[next_position] = position
+            start += cycle_length
+        # The positions of the givers sharing a group with their recipients, and their indices in the list (for
+        # picking a random one, and removing one, in O(1))
+        self._shared_positions: list[int] = []
+        self._shared_indices: dict[int, int] = {}
+        for position in range(len(order)):
+            self.update_shared(position)
+
+    def get_cost(self, position: int) -> int:
+        """Get the number of groups shared by the giver at the ``position`` and its recipient."""
+        order = self.order
+        return sum(
+            map(eq, self.group_keys[order[position]], self.group_keys[order[self._next_position[position]]]),
+        )
+
+    def update_shared(self, position: int) -> None:
+        """Update whether the giver at the ``position`` shares a group with its recipient."""
+        shared = self.get_cost(position) > 0
+        if shared and position not in self._shared_indices:
+            self._shared_indices[position] = len(self._shared_positions)
+            self._shared_positions.append(position)
+        elif not shared and position in self._shared_indices:
+            # Move the last shared position into the removed one's place
+            index = self._shared_indices.pop(position)
+            last_position = self._shared_positions.pop()
+            if last_position != position:
+                self._shared_positions[index] = last_position
+                self._shared_indices[last_position] = index
+
+    def swap(self, first: int, second: int) -> None:
+        """Swap the participants at the ``first`` and ``second`` positions."""
+        self.order[first], self.order[second] = self.order[second], self.order[first]
+
+    def get_affected_positions(self, first: int, second: int) -> set[int]:
+        """Get the positions of the givers whose pairs change by swapping the participants at the positions."""
+        return {self._previous_position[first], first, self._previous_position[second], second}
+
+    def get_swap_delta(self, first: int, second: int) -> int:
+        """Get the change in the number of shared groups by swapping the participants at the positions.
+
+        Returns:
+            The change in the number of shared groups, negative if the swap mixes the groups better.
+
+        """
+        affected = self.get_affected_positions(first, second)
+        cost_before = sum(map(self.get_cost, affected))
+        self.swap(first, second)
+        cost_after = sum(map(self.get_cost, affected))
+        self.swap(first, second)
+        return cost_after - cost_before
+
+    def step(self, swap_candidates: int) -> int:
+        """Swap the recipient of a random giver sharing a group with it, with the best of a few random participants.
+
+        Args:
+            swap_candidates: The number of random participants to evaluate swapping with.
+
+        Returns:
+            The change in the number of shared groups (0 if no swap was made, or the swap was sideways).
+
+        """
+        position = self._shared_positions[self._rng.randrange(len(self._shared_positions))]
+        recipient_position = self._next_position[position]
+        giver_groups = self.group_keys[self.order[position]]
+        best_delta, best_position = 1, recipient_position
+        for _ in range(swap_candidates):
+            other_position = self._rng.randrange(len(self.order))
+            # Only a participant sharing no group with the giver could mix the pair
+            if other_position == recipient_position or any(
+                map(eq, giver_groups, self.group_keys[self.order[other_position]])
+            ):
+                continue
+            if (delta := self.get_swap_delta(recipient_position, other_position)) <= min(best_delta, 0):
+                best_delta, best_position = delta, other_position
+        if best_position == recipient_position:
+            return 0
+        self.swap(recipient_position, best_position)
+        for affected_position in self.get_affected_positions(recipient_position, best_position):
+            self.update_shared(affected_position)
+        return best_delta
+
+    def mix(self, *, swap_candidates: int = DEFAULT_SWAP_CANDIDATES, patience: float = DEFAULT_PATIENCE) -> list[int]:
+        """Mix the arrangement's groups, until no pair shares a group, or the search stops mixing them better.
+
+        Args:
+            swap_candidates: The number of random swaps evaluated per step. (Defaults to 16).
+            patience: The number of steps (per participant) to stop after without mixing the groups better.
+                (Defaults to 0.1).
+
+        Returns:
+            The index of every participant's recipient.
+
+        """
+        max_stalled_steps = max(int(patience * len(self.order)), 1)
+        stalled_steps = 0
+        while self._shared_positions and stalled_steps < max_stalled_steps:
+            stalled_steps = 0 if self.step(swap_candidates) < 0 else stalled_steps + 1
+        return link_cycles(self.order, self.cycle_lengths)
+
+
+def mix_arrangement(
+    order: list[int],
+    cycle_lengths: list[int],
+    group_keys: list[tuple[int, ...]],
+    *,
+    rng: random.Random | None = None,
+) -> list[int]:
+    """Mix the groups of the arrangement linking the ``order`` by the ``cycle_lengths`` (see ``link_cycles``).
+
+    Args:
+        order: The participants' indices, in (random) order.
+        cycle_lengths: The lengths of the arrangement's cycles.
+        group_keys: The participants' group keys (see ``get_group_keys``).
+        rng: The random number generator drawing the participants and the swaps. If omitted, a new generator will be
+            used. (Defaults to None).
+
+    Returns:
+        The index of every participant's recipient.
+
+    """
+    rng = rng or random.Random()
+    return ArrangementMixer(
+        chain_groups(order, cycle_lengths, group_keys, rng=rng), cycle_lengths, group_keys, rng=rng
+    ).mix()
@@ -0,0 +1,242 @@
+"""Incremental repair of an arrangement after participants join or drop out.
+
+An arrangement (a derangement of the participants) is a set of disjoint cycles of givers and recipients. Instead of
+drawing it again from scratch (and messaging everyone again), it's repaired locally:
+
+* A leaver is spliced out of their cycle: their giver gets the leaver's recipient.
+  In case the leaver's cycle is left shorter than the arrangement's minimal cycle length (e.g. a cycle of two leaves
+  its other participant on its own), the cycle is dissolved, and its participants are spliced into other cycles.
+* A joiner is spliced into a random position of the arrangement: a random giver gets the joiner, and the joiner
+  gets that giver's former recipient.
+
+Splicing keeps a single cycle a single cycle, and never shortens the cycles it splices participants into, hence the
+repaired arrangement keeps the cycle structure it was drawn with. In case the arrangement mixes the participants'
+groups (e.g. teams), every participant is spliced into the best of a few random positions, and a leaver's giver and
+recipient sharing a group are split up (by splicing the recipient elsewhere) wherever the cycle allows it.
+
+Hence every change reassigns a handful of givers (at most the minimal cycle length), and the repair takes
+O(changes) work once the arrangement is indexed.
+"""
+
+import random
+from collections.abc import Iterable, Mapping
+
+from secret_santa.draw.cycles import DEFAULT_MIN_CYCLE_LENGTH
+
+# The number of random positions evaluated for every participant spliced into an arrangement mixing groups
+DEFAULT_POSITION_CANDIDATES = 16
+
+
+class ArrangementRepair:
+    """Repairs an arrangement in place, keeping track of the givers reassigned.
+
+    Attributes:
+        arrangement: The (repaired) arrangement, as a mapping of the givers to their recipients.
+        reassigned_givers: The givers whose recipients changed by the repair (including the joiners).
+        min_cycle_length: The minimal length of every cycle of the arrangement.
+        group_keys: The participants' group keys (see ``get_group_keys``), if the arrangement mixes their groups.
+
+    """
+
+    def __init__(
+        self,
+        arrangement: dict[str, str],
+        *,
+        min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+        group_keys: Mapping[str, tuple[int, ...]] | None = None,
+        rng: random.Random | None = None,
+    ) -> None:
+        """Index the ``arrangement`` to be repaired.
+
+        Args:
+            arrangement: The arrangement to repair, as a mapping of the givers to their recipients.
+            min_cycle_length: The minimal length of every cycle of the arrangement, which the repair keeps.
+                (Defaults to 2, i.e. any derangement).
+            group_keys: The group keys of the participants (including the joiners), by their phone numbers, in case
+                the arrangement mixes their groups. (Defaults to None).
+            rng: The random number generator picking the joiners' positions. If omitted, a new generator will be
+                used. (Defaults to None).
+
+        """
+        assert min_cycle_length >= DEFAULT_MIN_CYCLE_LENGTH, "Every cycle should be at least two participants long"
+        self.arrangement = dict(arrangement)
+        self.reassigned_givers: set[str] = set()
+        self.min_cycle_length = min_cycle_length
+        self.group_keys = group_keys
+        self._original_arrangement = arrangement
+        self._rng = rng or random.Random()
+        self._givers_of = {recipient: giver for giver, recipient in arrangement.items()}
+        # A list of the givers (and their positions in it), to pick a random giver in O(1)
+        self._givers = list(self.arrangement)
+        self._giver_positions = {giver: position for position, giver in enumerate(self._givers)}
+
+    def assign(self, giver: str, recipient: str) -> None:
+        """Assign the ``recipient`` to the ``giver``.
+
+        Args:
+            giver: The giver.
+            recipient: The giver's new recipient.
+
+        """
+        if giver not in self._giver_positions:
+            self._giver_positions[giver] = len(self._givers)
+            self._givers.append(giver)
+        self.arrangement[giver] = recipient
+        self._givers_of[recipient] = giver
+        self.reassigned_givers.add(giver)
+
+    def detach(self, participant: str) -> None:
+        """Remove the ``participant`` from the arrangement's index, as a giver and as a recipient.
+
+        Args:
+            participant: The participant to remove.
+
+        """
+        del self.arrangement[participant]
+        self._givers_of.pop(participant, None)
+        self.reassigned_givers.discard(participant)
+        # Swap the participant with the last giver, so it's removed from the givers list in O(1)
+        position = self._giver_positions.pop(participant)
+        last_giver = self._givers.pop()
+        if last_giver != participant:
+            self._givers[position] = last_giver
+            self._giver_positions[last_giver] = position
+
+    def get_cycle(self, participant: str, max_length: int) -> list[str]:
+        """Walk the ``participant``'s cycle, up to ``max_length`` participants.
+
+        Args:
+            participant: The participant to start walking from.
+            max_length: The maximal number of participants to walk.
+
+        Returns:
+            The participants of the cycle, in its order. The whole cycle is returned only if it's shorter than
+            ``max_length``.
+
+        """
+        cycle = [participant]
+        member = self.arrangement[participant]
+        while member != participant and len(cycle) < max_length:
+            cycle.append(member)
+            member = self.arrangement[member]
+        return cycle
+
+    def count_shared_groups(self, giver: str, recipient: str) -> int:
+        """Count the groups the ``giver`` and its ``recipient`` share, if the arrangement mixes groups.
+
+        Returns:
+            The number of group attributes the giver and recipient are equal in, or 0 if not mixing groups.
+
+        """
+        if self.group_keys is None:
+            return 0
+        return sum(
+            giver_group == recipient_group
+            for giver_group, recipient_group in zip(self.group_keys[giver], self.group_keys[recipient], strict=True)
+        )
+
+    def remove(self, leaver: str) -> None:
+        """Splice the ``leaver`` out of their cycle, dissolving the cycle in case it's left too short.
+
+        Args:
+            leaver: The participant dropping out.
+
+        """
+        giver, recipient = self._givers_of[leaver], self.arrangement[leaver]
+        self.detach(leaver)
+        # In case the leaver was in a cycle of two, its giver is left giving to itself (and dissolved below)
+        self.assign(giver, recipient)
+        cycle = self.get_cycle(giver, self.min_cycle_length + 1)
+        if len(cycle) < self.min_cycle_length:
+            self.dissolve(cycle)
+        elif len(cycle) > self.min_cycle_length and self.count_shared_groups(giver, recipient):
+            # The cycle could spare the recipient, which is spliced elsewhere unless its own recipient mixes worse
+            next_recipient = self.arrangement[recipient]
+            if self.count_shared_groups(giver, next_recipient) < self.count_shared_groups(giver, recipient):
+                self.detach(recipient)
+                self.assign(giver, next_recipient)
+                self.add(recipient)
+
+    def dissolve(self, cycle: list[str]) -> None:
+        """Dissolve a too short ``cycle``, splicing its participants into the other cycles.
+
+        Args:
+            cycle: The participants of the cycle.
+
+        """
+        for participant in cycle:
+            self.detach(participant)
+        for participant in cycle:
+            self.add(participant)
+
+    def add(self, joiner: str) -> None:
+        """Splice the ``joiner`` into a random position of the arrangement (the best of a few, if mixing groups).
+
+        Args:
+            joiner: The participant joining.
+
+        """
+        assert joiner not in self.arrangement, f"{joiner} is already in the arrangement"
+        assert self._givers, f"{joiner} can't be added to an empty arrangement"
+        candidates = DEFAULT_POSITION_CANDIDATES if self.group_keys is not None else 1
+        giver = min(
+            (self._givers[self._rng.randrange(len(self._givers))] for _ in range(candidates)),
+            key=lambda giver: (
+                self.count_shared_groups(giver, joiner) + self.count_shared_groups(joiner, self.arrangement[giver])
+            ),
+        )
+        recipient = self.arrangement[giver]
+        self.assign(giver, joiner)
+        self.assign(joiner, recipient)
+
+    def get_changes(self) -> dict[str, str]:
+        """Get the new recipients of the givers reassigned by the repair.
+
+        Returns:
+            A mapping of the givers whose recipients changed (including the joiners) to their new recipients.
+
+        """
+        return {
+            giver: self.arrangement[giver]
+            for giver in self.reassigned_givers
+            if self._original_arrangement.get(giver) != self.arrangement[giver]
+        }
+
+
+def repair_arrangement(  # noqa: PLR0913
+    arrangement: dict[str, str],
+    *,
+    leavers: Iterable[str] = (),
+    joiners: Iterable[str] = (),
+    min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+    group_keys: Mapping[str, tuple[int, ...]] | None = None,
+    rng: random.Random | None = None,
+) -> dict[str, str]:
+    """Repair the ``arrangement`` after the ``leavers`` dropped out and the ``joiners`` joined.
+
+    Args:
+        arrangement: The arrangement to repair, as a mapping of the givers to their recipients.
+        leavers: The participants dropping out.
+        joiners: The participants joining.
+        min_cycle_length: The minimal length of every cycle of the arrangement, which the repair keeps.
+            (Defaults to 2, i.e. any derangement).
+        group_keys: The group keys of the participants (including the joiners), by their phone numbers, in case the
+            arrangement mixes their groups. (Defaults to None).
+        rng: The random number generator picking the joiners' positions. (Defaults to None).
+
+    Returns:
+        A mapping of the givers whose recipients changed (including the joiners) to their new recipients.
+
+    """
+    arrangement_repair = ArrangementRepair(
+        arrangement,
+        min_cycle_length=min_cycle_length,
+        group_keys=group_keys,
+        rng=rng,
+    )
+    # Remove the leavers first, so the joiners are never spliced next to a leaver
+    for leaver in leavers:
+        arrangement_repair.remove(leaver)
+    for joiner in joiners:
+        arrangement_repair.add(joiner)
+    return arrangement_repair.get_changes()
@@ -0,0 +1,402 @@
+"""Long-running Secret Santa draw service.
+
+The service keeps a single messaging client (and its HTTP connection pool) warm, and runs the draw jobs it
+accepts over HTTP on a pool of worker threads, so every draw is spared the start-up cost of a fresh process.
+
+Endpoints:
+    * ``POST /draws``: submit a draw job. The body is a JSON object with a ``participants`` array and the optional
+      ``dry_run`` and ``show_arrangement`` flags, and the ``tenant`` (e.g. the organizer's team) the job's messages
+      share the rate budget as. Responds with the job (``202 Accepted``).
+    * ``GET /draws``: list the jobs (the running jobs, and the latest finished ones).
+    * ``GET /draws/{job_id}``: get a job's status.
+    * ``GET /tenants``: get the tenants' metrics, in case the jobs share a rate budget.
+    * ``GET /health``: a liveness check.
+"""
+
+import json
+import socketserver
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import UTC, datetime
+from enum import StrEnum, auto
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any
+
+import attr
+from attr import dataclass
+
+from secret_santa.roster import loader
+from secret_santa.roster.ingest import MalformedRowError
+from secret_santa.secret_santa_module import SecretSanta
+from secret_santa.util import logging
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from secret_santa.delivery.fair_share import FairShareScheduler, TenantMetrics
+    from secret_santa.email_messaging_service import EmailMessagingService
+    from secret_santa.model.participant import Participant
+    from secret_santa.twilio_messaging_service import TwilioMessagingService
+    from secret_santa.util.tracing import Tracer
+
+MAX_REQUEST_BODY_SIZE = 16 * 1024 * 1024
+DEFAULT_TENANT = "default"
+DEFAULT_MAX_FINISHED_JOBS = 1000
+
+
+class DrawJobStatus(StrEnum):
+    """Draw job statuses."""
+
+    queued = auto()
+    running = auto()
+    succeeded = auto()
+    failed = auto()
+
+
+@dataclass(kw_only=True)
+class DrawJob:
+    """A draw job submitted to the draw service.
+
+    Attributes:
+        job_id: The job's unique ID.
+        participants_count: The number of participants in the job's roster.
+        dry_run: Whether the job runs without actually sending the messages.
+        tenant: The tenant the job's messages share the rate budget as.
+        status: The job's current status.
+        error: The reason the job failed, if it did.
+        submitted_at: When the job was submitted (UTC, ISO 8601).
+        finished_at: When the job finished (UTC, ISO 8601), if it did.
+
+    """
+
+    job_id: str
+    participants_count: int
+    dry_run: bool
+    tenant: str = DEFAULT_TENANT
+    status: DrawJobStatus = DrawJobStatus.queued
+    error: str | None = None
+    submitted_at: str = attr.Factory(lambda: datetime.now(tz=UTC).isoformat())
+    finished_at: str | None = None
+
+
+class DrawService:
+    """Runs draw jobs on a pool of worker threads, sharing a single warm messaging client.
+
+    Attributes:
+        logger: The class logger.
+        messaging_client: The messaging client shared by all the jobs.
+        email_client: The email messaging client (and its SMTP connection pool) shared by all the jobs, if any.
+        roster_options: The options the jobs' rosters are validated with.
+        fair_share_scheduler: The scheduler sharing the rate budget between the jobs' tenants, if any.
+        tenant_weights: The tenants' shares of the rate budget, relative to each other (1 if not set).
+        tenant_quota: The maximal number of messages every tenant may send, if capped.
+        tracer: The tracer tracing every job by a trace of its own, if tracing.
+        max_finished_jobs: The number of finished jobs kept, for their statuses to be looked up.
+
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        messaging_client: TwilioMessagingService,
+        *,
+        email_client: EmailMessagingService | None = None,
+        max_workers: int = 4,
+        roster_options: loader.RosterOptions | None = None,
+        max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS,
+        fair_share_scheduler: FairShareScheduler | None = None,
+        tenant_weights: Mapping[str, float] | None = None,
+        tenant_quota: int | None = None,
+        tracer: Tracer | None = None,
+    ) -> None:
+        """Initialize the draw service.
+
+        Args:
+            messaging_client: The messaging client to share between all the jobs.
+            email_client: The email messaging client to share between all the jobs. (Defaults to None).
+            max_workers: The maximal number of jobs to run concurrently. (Defaults to 4).
+            roster_options: The options to validate the jobs' rosters with. If omitted, the default options will be
+                used. (Defaults to None).
+            fair_share_scheduler: If provided, the jobs' text messages share the scheduler's rate budget fairly
+                between the jobs' tenants, rather than the biggest job taking it all. (Defaults to None).
+            tenant_weights: The tenants' shares of the rate budget, relative to each other. The tenants which are not
+                set get a weight of 1. (Defaults to None).
+            tenant_quota: The maximal number of messages every tenant may send. If omitted, the tenants are not
+                capped. (Defaults to None).
+            tracer: If provided, every job is traced by a root span of its own, spanning the job's stages and
+                messages. (Defaults to None).
+            max_finished_jobs: The number of finished jobs to keep, for their statuses to be looked up. Once
+                exceeded, the oldest finished jobs are forgotten. (Defaults to 1000).
+
+        """
+        assert max_finished_jobs > 0, "At least one finished job should be kept"
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.messaging_client = messaging_client
+        self.email_client = email_client
+        self.roster_options = roster_options
+        self.max_finished_jobs = max_finished_jobs
+        self.fair_share_scheduler = fair_share_scheduler
+        self.tenant_weights = dict(tenant_weights or {})
+        self.tenant_quota = tenant_quota
+        self.tracer = tracer
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="draw-worker")
+        self._jobs: dict[str, DrawJob] = {}
+        # The IDs of the finished jobs, in their finishing order
+        self._finished_job_ids: deque[str] = deque()
+        self._jobs_lock = threading.Lock()
+
+    def submit(self, payload: Any) -> DrawJob:  # noqa: ANN401
+        """Validate the draw job's ``payload`` and queue the job.
+
+        Args:
+            payload: The job's payload (the decoded JSON request body).
+
+        Returns:
+            A snapshot of the job queued.
+
+        Raises:
+            MalformedRowError: If the payload or one of its participants is malformed.
+
+        """
+        if not isinstance(payload, dict) or not isinstance(payload.get("participants"), list):
+            payload_err = "The draw job should be an object holding a 'participants' array"
+            raise MalformedRowError(payload_err)
+        participants = loader.parse_participants(payload["participants"], options=self.roster_options)
+        dry_run = bool(payload.get("dry_run", False))
+        show_arrangement = bool(payload.get("show_arrangement", False))
+        tenant = payload.get("tenant", DEFAULT_TENANT)
+        if not isinstance(tenant, str) or not tenant:
+            tenant_err = "The draw job's 'tenant' should be a non-empty string"
+            raise MalformedRowError(tenant_err)
+
+        job = DrawJob(job_id=uuid.uuid4().hex, participants_count=len(participants), dry_run=dry_run, tenant=tenant)
+        with self._jobs_lock:
+            self._jobs[job.job_id] = job
+            queued_job = attr.evolve(job)
+        self._executor.submit(self.run_job, job, participants, show_arrangement=show_arrangement)
+        self.logger.info(f"Draw job {job.job_id} queued ({job.participants_count} participants)")
+        return queued_job
+
+    def run_job(self, job: DrawJob, participants: list[Participant], *, show_arrangement: bool) -> None:
+        """Run the draw ``job``, updating its status along the way.
+
+        Args:
+            job: The job to run.
+            participants: The job's validated participants.
+            show_arrangement: Whether to log the job's arrangement.
+
+        """
+        with self._jobs_lock:
+            job.status = DrawJobStatus.running
+        try:
+            with (
+                self.tracer.start_span("draw_job", job_id=job.job_id, tenant=job.tenant, dry_run=job.dry_run)
+                if self.tracer
+                else nullcontext()
+            ):
+                SecretSanta(
+                    participants=participants,
+                    messaging_client=self.messaging_client,
+                    email_client=self.email_client,
+                    show_arrangement=show_arrangement,
+                    dry_run=job.dry_run,
+                    tenant_queue=(
+                        self.fair_share_scheduler.get_tenant(
+                            job.tenant,
+                            weight=self.tenant_weights.get(job.tenant, 1.0),
+                            quota=self.tenant_quota,
+                        )
+                        if self.fair_share_scheduler
+                        else None
+                    ),
+                ).run()
+        except Exception as err:
+            self.logger.exception(f"Draw job {job.job_id} failed")
+            self.finish_job(job, DrawJobStatus.failed, error=str(err))
+        else:
+            self.finish_job(job, DrawJobStatus.succeeded)
+
+    def finish_job(self, job: DrawJob, status: DrawJobStatus, *, error: str | None = None) -> None:
+        """Mark the ``job`` as finished, forgetting the oldest finished jobs beyond the ones kept.
+
+        Args:
+            job: The finished job.
+            status: The job's final status.
+            error: The reason the job failed, if it did. (Defaults to None).
+
+        """
+        with self._jobs_lock:
+            job.status = status
+            job.error = error
+            job.finished_at = datetime.now(tz=UTC).isoformat()
+            self._finished_job_ids.append(job.job_id)
+            while len(self._finished_job_ids) > self.max_finished_jobs:
+                del self._jobs[self._finished_job_ids.popleft()]
+
+    def get(self, job_id: str) -> DrawJob | None:
+        """Get the job with the ``job_id``.
+
+        Args:
+            job_id: The job's ID.
+
+        Returns:
+            A snapshot of the job if exists (and wasn't forgotten), ``None`` otherwise.
+
+        """
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            return attr.evolve(job) if job else None
+
+    def list_jobs(self) -> list[DrawJob]:
+        """Get all the jobs submitted, but the finished jobs forgotten.
+
+        Returns:
+            Snapshots of the jobs, in their submission order.
+
+        """
+        with self._jobs_lock:
+            return [attr.evolve(job) for job in self._jobs.values()]
+
+    def tenant_metrics(self) -> list[TenantMetrics]:
+        """Get the metrics of the tenants sharing the rate budget.
+
+        Returns:
+            The tenants' metrics, or no metrics if the jobs don't share a rate budget.
+
+        """
+        return self.fair_share_scheduler.metrics() if self.fair_share_scheduler else []
+
+    def shutdown(self) -> None:
+        """Wait for the queued jobs to finish and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+        if self.fair_share_scheduler:
+            self.fair_share_scheduler.close()
+        if self.tracer:
+            self.tracer.close()
+        if self.email_client:
+            self.email_client.close()
+
+
+class DrawRequestHandler(BaseHTTPRequestHandler):
+    """HTTP request handler of the draw service."""
+
+    server: DrawHTTPServer | DrawUnixHTTPServer
+
+    def do_GET(self) -> None:
+        """Handle the status requests."""
+        draw_service = self.server.draw_service
+        match self.path.rstrip("/").split("/"):
+            case ["", "health"]:
+                self.send_json(HTTPStatus.OK, {"status": "ok"})
+            case ["", "draws"]:
+                self.send_json(HTTPStatus.OK, [attr.asdict(job) for job in draw_service.list_jobs()])
+            case ["", "tenants"]:
+                self.send_json(
+                    HTTPStatus.OK,
+                    [
+                        attr.asdict(metrics) | {"mean_wait": metrics.mean_wait}
+                        for metrics in draw_service.tenant_metrics()
+                    ],
+                )
+            case ["", "draws", job_id]:
+                if (job := draw_service.get(job_id)) is None:
+                    self.send_json(HTTPStatus.NOT_FOUND, {"error": f"No such draw job: {job_id}"})
+                else:
+                    self.send_json(HTTPStatus.OK, attr.asdict(job))
+            case _:
+                self.send_json(HTTPStatus.NOT_FOUND, {"error": f"No such endpoint: {self.path}"})
+
+    def do_POST(self) -> None:
+        """Handle the draw job submissions."""
+        if self.path.rstrip("/") != "/draws":
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"No such endpoint: {self.path}"})
+            return
+        if (body := self.read_body()) is None:
+            return
+        try:
+            job = self.server.draw_service.submit(json.loads(body))
+        except (json.JSONDecodeError, MalformedRowError, AssertionError, ValueError) as err:
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(err)})
+            return
+        self.send_json(HTTPStatus.ACCEPTED, attr.asdict(job))
+
+    def read_body(self) -> bytes | None:
+        """Read the request's body, answering the request with an error in case its ``Content-Length`` is invalid.
+
+        Returns:
+            The request's body, or ``None`` if the request was answered with an error.
+
+        """
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"})
+            return None
+        if content_length > MAX_REQUEST_BODY_SIZE:
+            self.send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "The draw job is too large"})
+            return None
+        return self.rfile.read(content_length)
+
+    def send_json(self, status: HTTPStatus, body: object) -> None:
+        """Send a JSON response.
+
+        Args:
+            status: The response's status.
+            body: The response's body, to be encoded as JSON.
+
+        """
+        encoded_body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded_body)))
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+    def address_string(self) -> str:
+        """Get the client's address, for logging (the clients of a Unix domain socket have no address)."""
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Log the requests through the service's logger rather than to ``stderr``."""
+        logger = self.server.draw_service.logger
+        if logger.isEnabledFor(logging.LOGGING_LEVEL_TO_NUMBER[logging.LoggingLevel.debug]):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+
+class DrawHTTPServer(ThreadingHTTPServer):
+    """A TCP HTTP server of the draw service."""
+
+    daemon_threads = True
+
+    def __init__(self, server_address: tuple[str, int], draw_service: DrawService) -> None:
+        """Bind the server to the ``server_address``.
+
+        Args:
+            server_address: The host and port to bind to.
+            draw_service: The draw service serving the requests.
+
+        """
+        self.draw_service = draw_service
+        super().__init__(server_address, DrawRequestHandler)
+
+
+class DrawUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A Unix domain socket HTTP server of the draw service."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, draw_service: DrawService) -> None:
+        """Bind the server to the Unix domain socket at ``socket_path``.
+
+        Args:
+            socket_path: The path of the socket to bind to.
+            draw_service: The draw service serving the requests.
+
+        """
+        self.draw_service = draw_service
+        super().__init__(socket_path, DrawRequestHandler)
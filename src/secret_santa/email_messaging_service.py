@@ -0,0 +1,383 @@
+"""Email messaging service module.
+
+The messages are sent over a pool of persistent SMTP connections, so the connection set-up (TCP, ``STARTTLS`` and
+authentication) is paid once per connection rather than once per message. In case the server supports the
+``PIPELINING`` extension (RFC 2920), the envelope commands of each message are sent in a single round trip.
+"""
+
+import contextlib
+import os
+import queue
+import re
+import smtplib
+import threading
+import time
+from collections.abc import Iterator
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import make_msgid
+from typing import Self
+
+from attr import dataclass
+
+from secret_santa.const import (
+    SMTP_HOST,
+    SMTP_PASSWORD,
+    SMTP_PORT,
+    SMTP_SENDER,
+    SMTP_STARTTLS,
+    SMTP_USERNAME,
+)
+from secret_santa.twilio_messaging_service import MessageResponse
+from secret_santa.util import logging
+
+DEFAULT_SUBJECT = "Secret Santa"
+
+# Errors on which the server definitely did not accept the message
+EMAIL_REJECTED_ERRORS = (smtplib.SMTPSenderRefused, smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError)
+
+
+@dataclass(kw_only=True)
+class PooledConnection:
+    """An SMTP connection held by the pool.
+
+    Attributes:
+        smtp: The SMTP connection.
+        messages_sent: The number of messages sent over the connection.
+        last_used: When the connection was last used (``time.monotonic``).
+
+    """
+
+    smtp: smtplib.SMTP
+    messages_sent: int = 0
+    last_used: float = 0.0
+
+
+class SMTPConnectionPool:
+    """A bounded pool of persistent SMTP connections, reused for many messages each.
+
+    Attributes:
+        logger: The class logger.
+        host: The SMTP server's host.
+        port: The SMTP server's port.
+        username: The username to authenticate with, if any.
+        password: The password to authenticate with, if any.
+        starttls: Whether to upgrade the connections with ``STARTTLS``.
+        size: The maximal number of connections open at once.
+        max_messages_per_connection: The number of messages sent over a connection before it's replaced.
+        max_idle_seconds: Idle connections older than this are replaced rather than reused, as the server has
+            likely dropped them.
+        timeout: The connections' socket timeout, in seconds.
+
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str,
+        port: int = 25,
+        *,
+        username: str | None = None,
+        password: str | None = None,
+        starttls: bool = False,
+        size: int = 2,
+        max_messages_per_connection: int = 100,
+        max_idle_seconds: float = 30,
+        timeout: float = 30,
+    ) -> None:
+        """Initialize the SMTP connection pool.
+
+        Args:
+            host: The SMTP server's host.
+            port: The SMTP server's port. (Defaults to 25).
+            username: The username to authenticate with. If omitted, no authentication takes place.
+                (Defaults to None).
+            password: The password to authenticate with. (Defaults to None).
+            starttls: If True, upgrade the connections with ``STARTTLS``. (Defaults to False).
+            size: The maximal number of connections open at once. (Defaults to 2).
+            max_messages_per_connection: The number of messages to send over a connection before replacing it.
+                (Defaults to 100).
+            max_idle_seconds: Replace idle connections older than this rather than reusing them. (Defaults to 30).
+            timeout: The connections' socket timeout, in seconds. (Defaults to 30).
+
+        """
+        assert size > 0, f"The SMTP connection pool size should be positive, got: {size}"
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_idle_seconds = max_idle_seconds
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[PooledConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def connect(self) -> PooledConnection:
+        """Open a new SMTP connection, upgrading and authenticating it as configured.
+
+        Returns:
+            The new connection.
+
+        """
+        self.logger.debug(f"Connecting to the SMTP server at {self.host}:{self.port}")
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.starttls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+        except BaseException:
+            smtp.close()
+            raise
+        return PooledConnection(smtp=smtp)
+
+    @staticmethod
+    def disconnect(connection: PooledConnection) -> None:
+        """Close the ``connection``, politely if possible.
+
+        Args:
+            connection: The connection to close.
+
+        """
+        try:
+            connection.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.smtp.close()
+
+    def get_idle_connection(self) -> PooledConnection | None:
+        """Get the most recently used idle connection which is still fresh, closing the stale ones on the way.
+
+        Returns:
+            An idle connection if there's a fresh one, ``None`` otherwise.
+
+        """
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - connection.last_used <= self.max_idle_seconds:
+                return connection
+            self.disconnect(connection)
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """Borrow a connection from the pool, blocking while all the connections are in use.
+
+        The connection is returned to the pool once done (or once the server refused the message), unless it failed
+        or has sent its share of messages, in which case it's closed.
+
+        Yields:
+            The SMTP connection borrowed.
+
+        """
+        with self._slots:
+            connection = self.get_idle_connection() or self.connect()
+            try:
+                yield connection.smtp
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server replied (refusing the message), hence the connection is still usable
+                self.reset(connection)
+                raise
+            except BaseException:
+                connection.smtp.close()
+                raise
+            connection.messages_sent += 1
+            if connection.messages_sent >= self.max_messages_per_connection:
+                self.disconnect(connection)
+            else:
+                self.release(connection)
+
+    def reset(self, connection: PooledConnection) -> None:
+        """Reset the ``connection``'s (failed) mail transaction, and return it to the pool if it's still usable.
+
+        Args:
+            connection: The connection to reset.
+
+        """
+        try:
+            connection.smtp.rset()
+        except (smtplib.SMTPException, OSError):
+            connection.smtp.close()
+        else:
+            self.release(connection)
+
+    def release(self, connection: PooledConnection) -> None:
+        """Return the ``connection`` to the pool's idle connections.
+
+        Args:
+            connection: The connection to return.
+
+        """
+        connection.last_used = time.monotonic()
+        self._idle.put(connection)
+
+    def close(self) -> None:
+        """Close all the idle connections."""
+        while (connection := self.get_idle_connection()) is not None:
+            self.disconnect(connection)
+
+    def __enter__(self) -> Self:
+        """Enter the pool's context."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Close the pool's idle connections on exiting its context."""
+        self.close()
+
+
+def quote_message_data(message: bytes) -> bytes:
+    """Prepare the ``message`` to be sent as a ``DATA`` payload, terminated by the end of data line.
+
+    Args:
+        message: The message, with CRLF line endings.
+
+    Returns:
+        The message with its leading periods doubled (RFC 5321 §4.5.2), followed by the ``.`` line.
+
+    """
+    message = re.sub(rb"(?m)^\.", b"..", message)
+    if not message.endswith(b"\r\n"):
+        message += b"\r\n"
+    return message + b".\r\n"
+
+
+def send_pipelined(smtp: smtplib.SMTP, sender: str, recipient: str, message: bytes) -> None:
+    """Send the ``message`` with its ``MAIL``, ``RCPT`` and ``DATA`` commands pipelined into a single round trip.
+
+    Args:
+        smtp: The connection to send the message over, which should support the ``PIPELINING`` extension.
+        sender: The envelope sender.
+        recipient: The envelope recipient.
+        message: The message, with CRLF line endings.
+
+    Raises:
+        SMTPSenderRefused: If the server refused the sender.
+        SMTPRecipientsRefused: If the server refused the recipient.
+        SMTPDataError: If the server refused the message.
+
+    """
+    smtp.send(f"MAIL FROM:<{sender}>\r\nRCPT TO:<{recipient}>\r\nDATA\r\n")
+    # The server replies to each of the pipelined commands, in order
+    (mail_code, mail_reply), (rcpt_code, rcpt_reply), (data_code, data_reply) = (smtp.getreply() for _ in range(3))
+    if data_code == 354:  # noqa: PLR2004
+        # The server expects the message data regardless of the earlier replies, send it to close the transaction
+        smtp.send(quote_message_data(message))
+        data_code, data_reply = smtp.getreply()
+    if mail_code != 250:  # noqa: PLR2004
+        raise smtplib.SMTPSenderRefused(mail_code, mail_reply, sender)
+    if rcpt_code not in {250, 251}:
+        raise smtplib.SMTPRecipientsRefused({recipient: (rcpt_code, rcpt_reply)})
+    if data_code != 250:  # noqa: PLR2004
+        raise smtplib.SMTPDataError(data_code, data_reply)
+
+
+class EmailMessagingService:
+    """Email Messaging Service Class.
+
+    Attributes:
+        logger: The class logger.
+        sender: The email address the messages will be sent from.
+        connection_pool: The pool of SMTP connections the messages are sent over.
+
+    """
+
+    def __init__(self, connection_pool: SMTPConnectionPool | None = None, *, sender: str | None = None) -> None:
+        """Initialize the email messaging service.
+
+        Args:
+            connection_pool: The pool of SMTP connections to send the messages over.
+                If omitted, a pool will be configured by the environment variables. (Defaults to None).
+            sender: The email address to send the messages from. If omitted, the sender will be taken from the
+                environment. (Defaults to None).
+
+        """
+        # Set up the class logger
+        self.logger = logging.get_logger(self.__class__.__name__)
+
+        self.logger.debug("Initializing the email messaging client")
+        if connection_pool is None or sender is None:
+            smtp_sender, smtp_connection_pool = self.load_smtp_config()
+            connection_pool = connection_pool or smtp_connection_pool
+            sender = sender or smtp_sender
+        self.sender = sender
+        self.connection_pool = connection_pool
+
+        self.logger.debug("Email messaging client initialized")
+
+    def load_smtp_config(self) -> tuple[str, SMTPConnectionPool]:
+        """Load the SMTP configuration / secrets from the environment variables.
+
+        This function asserts everything needed is present.
+
+        Returns:
+            The loaded ``SMTP_SENDER``, and a connection pool configured by the rest of the SMTP variables.
+
+        """
+        self.logger.debug("Loading SMTP configuration")
+        smtp_host = os.getenv(SMTP_HOST)
+        smtp_sender = os.getenv(SMTP_SENDER)
+
+        # Assert the environment variables needed are present
+        assert all([smtp_host, smtp_sender]), f"Required environment variables {SMTP_HOST} or {SMTP_SENDER} missing."
+
+        connection_pool = SMTPConnectionPool(
+            smtp_host,  # type: ignore[arg-type]
+            int(os.getenv(SMTP_PORT) or 25),
+            username=os.getenv(SMTP_USERNAME),
+            password=os.getenv(SMTP_PASSWORD),
+            starttls=(os.getenv(SMTP_STARTTLS) or "").lower() in {"1", "true", "yes"},
+        )
+        return smtp_sender, connection_pool  # type: ignore[return-value]
+
+    def build_message(self, body: str, to: str, subject: str) -> EmailMessage:
+        """Build the email message.
+
+        Args:
+            body: The message's (plain text) body.
+            to: The recipient's email address.
+            subject: The message's subject.
+
+        Returns:
+            The email message.
+
+        """
+        message = EmailMessage(policy=SMTP)
+        message["From"] = self.sender
+        message["To"] = to
+        message["Subject"] = subject
+        message["Message-ID"] = make_msgid(domain=self.sender.rpartition("@")[2] or None)
+        message.set_content(body)
+        return message
+
+    def send_message(self, body: str, to: str, *, dry_run: bool, subject: str = DEFAULT_SUBJECT) -> MessageResponse:
+        """Send an email with the string specified in the ``body`` to the address specified in ``to``.
+
+        Args:
+            body: The message to be sent to the address specified in the ``to`` parameter.
+            to: The email address of the recipient of the message specified in the ``body`` parameter.
+            dry_run: If True, the invocation would be a dry run, i.e. the service won't actually send the message.
+            subject: The email's subject. (Defaults to ``DEFAULT_SUBJECT``).
+
+        Returns:
+            A message response instance as a response of the message sent (or not sent in case of a dry run).
+
+        """
+        if dry_run:
+            # No need to actually send a message
+            return MessageResponse(status="Not executed (DRY RUN)")
+        message = self.build_message(body, to, subject).as_bytes()
+        with self.connection_pool.connection() as smtp:
+            if smtp.has_extn("pipelining"):
+                send_pipelined(smtp, self.sender, to, message)
+            else:
+                smtp.sendmail(self.sender, [to], message)
+        return MessageResponse(status="sent")
+
+    def close(self) -> None:
+        """Close the service's idle SMTP connections."""
+        self.connection_pool.close()
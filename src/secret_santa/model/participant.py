@@ -11,9 +11,20 @@ class Participant:
         full_name: The participant's full name.
         phone_number: The participant's phone number.
         nickname: The participant's nickname which will be used.
+        time_zone: The participant's IANA time zone (e.g. ``Europe/London``), which scheduled messages are sent by.
+        email: The participant's email address, which the email channel messages the participant at.
+        channel: The channel the participant prefers to be messaged through (``sms`` / ``email``).
+            If omitted, the participant is messaged by SMS.
+        team: The participant's team, which a mixing draw avoids matching the participant within.
+        office: The participant's office, which a mixing draw avoids matching the participant within.
 
     """
 
     full_name: str
     phone_number: str
     nickname: str | None = None
+    time_zone: str | None = None
+    email: str | None = None
+    channel: str | None = None
+    team: str | None = None
+    office: str | None = None
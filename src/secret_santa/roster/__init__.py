@@ -0,0 +1 @@
+"""Participants roster package."""
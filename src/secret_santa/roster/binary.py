@@ -0,0 +1,194 @@
+"""Memory-mapped binary roster format.
+
+A binary roster file is laid out as follows (all integers are little-endian):
+
+* A fixed size header: the ``SSRB`` magic, the format version, the number of fields stored per participant and
+  the number of participants.
+* The field names table: for each field, its UTF-8 encoded name prefixed with its length (``uint16``).
+* The offsets table: for each participant and each of its fields, the field value's offset in the string blob
+  (``uint32``) and its length (``int32``, ``-1`` for a missing value).
+* The string blob: all the field values, UTF-8 encoded and concatenated.
+
+Since the file is loaded through ``mmap``, participants are decoded lazily (only when accessed), and several
+processes loading the same file share the same (read-only) pages. Loading a binary roster as a list of validated
+participants (``loader.load_participants``) decodes all of them, as validating and drawing the roster need every
+participant, hence it only saves the text parsing.
+"""
+
+import mmap
+import struct
+from collections.abc import Iterable, Iterator, Sequence
+from os import PathLike
+from pathlib import Path
+from types import TracebackType
+from typing import Self, overload
+
+import attr
+
+from secret_santa.const import ENCODING
+from secret_santa.model.participant import Participant
+
+BINARY_ROSTER_MAGIC = b"SSRB"
+BINARY_ROSTER_VERSION = 1
+BINARY_ROSTER_SUFFIX = ".ssrb"
+
+HEADER = struct.Struct("<4sHHI")
+FIELD_NAME_LENGTH = struct.Struct("<H")
+OFFSET_ENTRY = struct.Struct("<Ii")
+MISSING_VALUE_LENGTH = -1
+
+
+def is_binary_roster(roster_path: PathLike) -> bool:
+    """Check whether the file at ``roster_path`` is a binary roster by its magic bytes.
+
+    Args:
+        roster_path: Path to the file to check.
+
+    Returns:
+        True in case the file starts with the binary roster magic bytes.
+
+    """
+    with Path(roster_path).open("rb") as roster_file:
+        return roster_file.read(len(BINARY_ROSTER_MAGIC)) == BINARY_ROSTER_MAGIC
+
+
+def write_binary_roster(participants: Iterable[Participant], output_path: PathLike) -> int:
+    """Write the ``participants`` to ``output_path`` in the binary roster format.
+
+    Args:
+        participants: The participants to write.
+        output_path: Path of the binary roster file to write.
+
+    Returns:
+        The number of participants written.
+
+    """
+    field_names = [field.name for field in attr.fields(Participant)]
+    offsets = bytearray()
+    blob = bytearray()
+    participants_count = 0
+    for participant in participants:
+        for field_name in field_names:
+            value = getattr(participant, field_name)
+            if value is None:
+                offsets += OFFSET_ENTRY.pack(len(blob), MISSING_VALUE_LENGTH)
+                continue
+            encoded_value = value.encode(ENCODING)
+            offsets += OFFSET_ENTRY.pack(len(blob), len(encoded_value))
+            blob += encoded_value
+        participants_count += 1
+
+    with Path(output_path).open("wb") as output_file:
+        output_file.write(HEADER.pack(BINARY_ROSTER_MAGIC, BINARY_ROSTER_VERSION, len(field_names), participants_count))
+        for field_name in field_names:
+            encoded_field_name = field_name.encode(ENCODING)
+            output_file.write(FIELD_NAME_LENGTH.pack(len(encoded_field_name)) + encoded_field_name)
+        output_file.write(offsets)
+        output_file.write(blob)
+    return participants_count
+
+
+class MappedRoster(Sequence[Participant]):
+    """A read-only sequence of the participants of a memory-mapped binary roster file.
+
+    Participants are decoded on access by their index, hence only the participants actually accessed are
+    ever turned into Python objects.
+
+    Attributes:
+        field_names: The names of the participant fields stored in the file.
+
+    """
+
+    def __init__(self, roster_path: PathLike) -> None:
+        """Map the binary roster file at ``roster_path`` into memory.
+
+        Args:
+            roster_path: Path to the binary roster file.
+
+        """
+        with Path(roster_path).open("rb") as roster_file:
+            self._mmap = mmap.mmap(roster_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, fields_count, participants_count = HEADER.unpack_from(self._mmap, 0)
+        assert magic == BINARY_ROSTER_MAGIC, f"{roster_path} is not a binary roster file"
+        assert version == BINARY_ROSTER_VERSION, f"Unsupported binary roster version: {version}"
+
+        position = HEADER.size
+        field_names = []
+        for _ in range(fields_count):
+            (field_name_length,) = FIELD_NAME_LENGTH.unpack_from(self._mmap, position)
+            position += FIELD_NAME_LENGTH.size
+            field_names.append(self._mmap[position : position + field_name_length].decode(ENCODING))
+            position += field_name_length
+        self.field_names = tuple(field_names)
+        assert set(self.field_names) <= {field.name for field in attr.fields(Participant)}, (
+            f"{roster_path} contains unknown participant fields: {self.field_names}"
+        )
+
+        self._participants_count: int = participants_count
+        self._offsets_position = position
+        self._blob_position = position + self._participants_count * fields_count * OFFSET_ENTRY.size
+
+    def __len__(self) -> int:
+        """Get the number of participants in the roster."""
+        return self._participants_count
+
+    @overload
+    def __getitem__(self, index: int) -> Participant: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Participant]: ...
+
+    def __getitem__(self, index: int | slice) -> Participant | list[Participant]:
+        """Decode the participant(s) at ``index``."""
+        if isinstance(index, slice):
+            return [self.get_participant(i) for i in range(*index.indices(self._participants_count))]
+        position = index + self._participants_count if index < 0 else index
+        if not 0 <= position < self._participants_count:
+            index_err = f"Participant index out of range: {index}"
+            raise IndexError(index_err)
+        return self.get_participant(position)
+
+    def __iter__(self) -> Iterator[Participant]:
+        """Decode the participants one by one."""
+        for index in range(self._participants_count):
+            yield self.get_participant(index)
+
+    def get_participant(self, index: int) -> Participant:
+        """Decode the participant at ``index`` (assumed to be in range).
+
+        Args:
+            index: The index of the participant to decode.
+
+        Returns:
+            The participant at ``index``.
+
+        """
+        entry_position = self._offsets_position + index * len(self.field_names) * OFFSET_ENTRY.size
+        participant_fields: dict[str, str | None] = {}
+        for field_name in self.field_names:
+            offset, length = OFFSET_ENTRY.unpack_from(self._mmap, entry_position)
+            entry_position += OFFSET_ENTRY.size
+            if length == MISSING_VALUE_LENGTH:
+                participant_fields[field_name] = None
+            else:
+                value_position = self._blob_position + offset
+                participant_fields[field_name] = self._mmap[value_position : value_position + length].decode(ENCODING)
+        return Participant(**participant_fields)  # type: ignore[arg-type]
+
+    def close(self) -> None:
+        """Unmap the roster file."""
+        self._mmap.close()
+
+    def __enter__(self) -> Self:
+        """Enter the runtime context, returning the roster itself."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        """Unmap the roster file on exiting the runtime context."""
+        self.close()
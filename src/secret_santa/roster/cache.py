@@ -0,0 +1,239 @@
+"""On-disk cache of parsed and validated participant rosters."""
+
+import hashlib
+import marshal
+import os
+from os import PathLike
+from pathlib import Path
+
+import attr
+from attr import dataclass
+
+from secret_santa.const import ROSTER_CACHE_DIRECTORY_NAME
+from secret_santa.model.participant import Participant
+from secret_santa.util import logging, path
+
+# Bumped whenever the layout of a cache entry changes, so stale entries are simply ignored
+CACHE_ENTRY_FORMAT_VERSION = 1
+CACHE_ENTRY_SUFFIX = ".roster"
+
+
+@dataclass(frozen=True, kw_only=True)
+class RosterFingerprint:
+    """The fingerprint of a roster file which a cache entry is keyed by.
+
+    Attributes:
+        size: The size of the roster file in bytes.
+        mtime_ns: The last modification time of the roster file in nanoseconds.
+        sha256: The SHA-256 hex digest of the roster file's content.
+
+    """
+
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+@dataclass(frozen=True, kw_only=True)
+class RosterCacheStats:
+    """Statistics of the roster cache directory.
+
+    Attributes:
+        directory: The cache directory.
+        entries: The number of cached rosters.
+        total_bytes: The total size of the cached rosters in bytes.
+
+    """
+
+    directory: Path
+    entries: int
+    total_bytes: int
+
+
+def hash_file(file_path: PathLike) -> str:
+    """Calculate the SHA-256 hex digest of the file at ``file_path`` without reading it whole into memory.
+
+    Args:
+        file_path: Path to the file to hash.
+
+    Returns:
+        The SHA-256 hex digest of the file's content.
+
+    """
+    with Path(file_path).open("rb") as file_obj:
+        return hashlib.file_digest(file_obj, "sha256").hexdigest()
+
+
+class RosterCache:
+    """A cache of parsed and validated participant rosters, stored in a compact binary form.
+
+    Each roster file gets a single cache entry holding the roster's fingerprint (size, mtime and content hash)
+    and the participants' field values. An entry is considered valid as long as the file's size and mtime are
+    unchanged, or, in case only the mtime changed (e.g. the file was touched / copied), as long as its content hash
+    is unchanged. Otherwise, it is considered stale and gets overwritten on the next ``put``.
+
+    Attributes:
+        logger: The class logger.
+        cache_dir: The directory in which the cache entries are stored.
+
+    """
+
+    def __init__(self, cache_dir: PathLike | None = None) -> None:
+        """Initialize the roster cache.
+
+        Args:
+            cache_dir: The directory to store the cache entries at.
+                If omitted, ``{project_root}/.secret_santa_cache`` will be used. (Defaults to None).
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.cache_dir = Path(cache_dir) if cache_dir else path.get_project_root() / ROSTER_CACHE_DIRECTORY_NAME
+
+    def get_entry_path(self, roster_path: PathLike, options_key: str = "") -> Path:
+        """Get the path of the cache entry of the roster file at ``roster_path``.
+
+        Args:
+            roster_path: Path to the roster file.
+            options_key: A key of the options the roster was loaded with, in case they affect the result.
+                (Defaults to an empty string).
+
+        Returns:
+            The path of the cache entry of the roster file.
+
+        """
+        roster_key = hashlib.sha256(f"{Path(roster_path).resolve()}\0{options_key}".encode()).hexdigest()[:32]
+        return self.cache_dir / f"{roster_key}{CACHE_ENTRY_SUFFIX}"
+
+    def get(
+        self,
+        roster_path: PathLike,
+        *,
+        options_key: str = "",
+        allow_stale: bool = False,
+    ) -> list[Participant] | None:
+        """Get the cached participants of the roster file at ``roster_path``.
+
+        Args:
+            roster_path: Path to the roster file.
+            options_key: A key of the options the roster was loaded with. (Defaults to an empty string).
+            allow_stale: Whether to get the participants even if the roster file changed since they were cached,
+                e.g. to diff the file against its previous version. (Defaults to False).
+
+        Returns:
+            The cached list of participants in case a valid cache entry exists, ``None`` otherwise.
+
+        """
+        entry_path = self.get_entry_path(roster_path, options_key)
+        try:
+            # The cache entries are written by ``write_entry`` only, hence it's safe to unmarshal them
+            entry = marshal.loads(entry_path.read_bytes())
+            version, marshal_version, size, mtime_ns, sha256, field_names, rows = entry
+        except (OSError, EOFError, ValueError, TypeError):
+            self.logger.debug(f"No usable cache entry found for {roster_path}")
+            return None
+
+        if (version, marshal_version) != (CACHE_ENTRY_FORMAT_VERSION, marshal.version) or field_names != tuple(
+            field.name for field in attr.fields(Participant)
+        ):
+            self.logger.debug(f"The cache entry of {roster_path} was written in an older format")
+            return None
+
+        if allow_stale:
+            return [Participant(**dict(zip(field_names, row, strict=True))) for row in rows]
+        roster_stat = Path(roster_path).stat()
+        if roster_stat.st_size != size:
+            self.logger.debug(f"The cache entry of {roster_path} is stale (size changed)")
+            return None
+        if roster_stat.st_mtime_ns != mtime_ns:
+            # Only the modification time changed, fall back to comparing the content hash
+            if hash_file(roster_path) != sha256:
+                self.logger.debug(f"The cache entry of {roster_path} is stale (content changed)")
+                return None
+            self.write_entry(
+                entry_path,
+                RosterFingerprint(size=size, mtime_ns=roster_stat.st_mtime_ns, sha256=sha256),
+                field_names,
+                rows,
+            )
+
+        self.logger.debug(f"Cache hit for {roster_path}")
+        return [Participant(**dict(zip(field_names, row, strict=True))) for row in rows]
+
+    def put(self, roster_path: PathLike, participants: list[Participant], *, options_key: str = "") -> None:
+        """Cache the ``participants`` parsed from the roster file at ``roster_path``.
+
+        Args:
+            roster_path: Path to the roster file the participants were parsed from.
+            participants: The parsed and validated participants.
+            options_key: A key of the options the roster was loaded with. (Defaults to an empty string).
+
+        """
+        roster_stat = Path(roster_path).stat()
+        fingerprint = RosterFingerprint(
+            size=roster_stat.st_size,
+            mtime_ns=roster_stat.st_mtime_ns,
+            sha256=hash_file(roster_path),
+        )
+        field_names = tuple(field.name for field in attr.fields(Participant))
+        rows = [attr.astuple(participant, recurse=False) for participant in participants]
+        self.write_entry(self.get_entry_path(roster_path, options_key), fingerprint, field_names, rows)
+        self.logger.debug(f"Cached {len(participants)} participants of {roster_path}")
+
+    def write_entry(
+        self,
+        entry_path: Path,
+        fingerprint: RosterFingerprint,
+        field_names: tuple[str, ...],
+        rows: list[tuple],
+    ) -> None:
+        """Write a cache entry atomically, so a concurrent reader never sees a partially written entry.
+
+        Args:
+            entry_path: Path of the cache entry to write.
+            fingerprint: The fingerprint of the cached roster file.
+            field_names: The names of the participant fields, in the order they appear in each row.
+            rows: The participants' field values.
+
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = (
+            CACHE_ENTRY_FORMAT_VERSION,
+            marshal.version,
+            fingerprint.size,
+            fingerprint.mtime_ns,
+            fingerprint.sha256,
+            field_names,
+            rows,
+        )
+        temp_entry_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        temp_entry_path.write_bytes(marshal.dumps(entry))
+        temp_entry_path.replace(entry_path)
+
+    def stats(self) -> RosterCacheStats:
+        """Get the statistics of the cache directory.
+
+        Returns:
+            The statistics of the cache directory.
+
+        """
+        entries = list(self.cache_dir.glob(f"*{CACHE_ENTRY_SUFFIX}")) if self.cache_dir.exists() else []
+        return RosterCacheStats(
+            directory=self.cache_dir,
+            entries=len(entries),
+            total_bytes=sum(entry.stat().st_size for entry in entries),
+        )
+
+    def clear(self) -> int:
+        """Remove all the cache entries.
+
+        Returns:
+            The number of cache entries removed.
+
+        """
+        if not self.cache_dir.exists():
+            return 0
+        entries = list(self.cache_dir.glob(f"*{CACHE_ENTRY_SUFFIX}"))
+        for entry in entries:
+            entry.unlink(missing_ok=True)
+        self.logger.info(f"Removed {len(entries)} cache entries from {self.cache_dir}")
+        return len(entries)
@@ -0,0 +1,150 @@
+"""Participants deduplication by their normalized phone numbers."""
+
+from collections.abc import Iterable
+from enum import StrEnum, auto
+
+import attr
+
+from secret_santa.model.participant import Participant
+from secret_santa.roster.ingest import MalformedRow
+from secret_santa.util.phone import InvalidPhoneNumberError, normalize_phone_number
+
+
+class DuplicatePolicy(StrEnum):
+    """How participants sharing the same (normalized) phone number are handled."""
+
+    reject = auto()
+    merge = auto()
+
+
+class PhoneNumberIndex:
+    """A hash index of participants by their normalized phone number.
+
+    Attributes:
+        default_country_code: The country code national numbers are prefixed with when normalized, if any.
+
+    """
+
+    def __init__(self, default_country_code: str | None = None) -> None:
+        """Initialize an empty phone number index.
+
+        Args:
+            default_country_code: The country code national numbers are prefixed with when normalized.
+                (Defaults to None).
+
+        """
+        self.default_country_code = default_country_code
+        self._participants: dict[str, Participant] = {}
+
+    def normalize(self, phone_number: str) -> str:
+        """Normalize the ``phone_number`` the same way the index keys are normalized.
+
+        Args:
+            phone_number: The phone number to normalize.
+
+        Returns:
+            The normalized phone number.
+
+        """
+        return normalize_phone_number(phone_number, self.default_country_code)
+
+    def add(self, participant: Participant) -> Participant | None:
+        """Index the ``participant`` by its phone number, unless another participant is indexed by the same number.
+
+        Args:
+            participant: The participant to index.
+
+        Returns:
+            The participant already indexed by the same phone number in case there is one, ``None`` otherwise.
+
+        """
+        indexed_participant = self._participants.setdefault(self.normalize(participant.phone_number), participant)
+        return indexed_participant if indexed_participant is not participant else None
+
+    def get(self, phone_number: str) -> Participant | None:
+        """Get the participant indexed by the (normalized) ``phone_number``.
+
+        Args:
+            phone_number: The phone number to look up, in any format.
+
+        Returns:
+            The participant indexed by the phone number if any, ``None`` otherwise.
+
+        """
+        return self._participants.get(self.normalize(phone_number))
+
+    def __contains__(self, phone_number: object) -> bool:
+        """Check whether a participant is indexed by the (normalized) ``phone_number``."""
+        return isinstance(phone_number, str) and self.get(phone_number) is not None
+
+    def __len__(self) -> int:
+        """Get the number of participants indexed."""
+        return len(self._participants)
+
+
+def merge_participants(participant: Participant, duplicate: Participant) -> Participant:
+    """Merge the ``duplicate`` participant into the ``participant``, filling the fields it misses.
+
+    Args:
+        participant: The participant to merge into (its values win).
+        duplicate: The participant with the same phone number to merge.
+
+    Returns:
+        The merged participant.
+
+    """
+    missing_fields = {
+        field.name: getattr(duplicate, field.name)
+        for field in attr.fields(Participant)
+        if getattr(participant, field.name) is None and getattr(duplicate, field.name) is not None
+    }
+    return attr.evolve(participant, **missing_fields) if missing_fields else participant
+
+
+def deduplicate_participants(
+    participants: Iterable[Participant],
+    *,
+    duplicate_policy: DuplicatePolicy = DuplicatePolicy.reject,
+    default_country_code: str | None = None,
+    malformed_rows: list[MalformedRow] | None = None,
+) -> list[Participant]:
+    """Normalize the participants' phone numbers and handle participants sharing the same number in O(n).
+
+    Args:
+        participants: The participants to deduplicate.
+        duplicate_policy: Whether to reject participants sharing the same phone number, or to merge them into
+            the first one. (Defaults to ``DuplicatePolicy.reject``).
+        default_country_code: The country code national numbers are prefixed with. (Defaults to None).
+        malformed_rows: If provided, participants with an invalid phone number will be appended to this list and
+            skipped, instead of raising an ``InvalidPhoneNumberError``. (Defaults to None).
+
+    Returns:
+        The participants, with their phone numbers normalized and without duplicates.
+
+    """
+    normalized_participants: dict[str, Participant] = {}
+    duplicates: list[Participant] = []
+    for participant in participants:
+        try:
+            phone_number = normalize_phone_number(participant.phone_number, default_country_code)
+        except InvalidPhoneNumberError as err:
+            if malformed_rows is None:
+                raise
+            malformed_rows.append(MalformedRow(location=f"participant {participant.full_name!r}", reason=str(err)))
+            continue
+        if phone_number != participant.phone_number:
+            participant = attr.evolve(participant, phone_number=phone_number)  # noqa: PLW2901
+
+        if (existing_participant := normalized_participants.get(phone_number)) is None:
+            normalized_participants[phone_number] = participant
+        elif duplicate_policy == DuplicatePolicy.merge:
+            normalized_participants[phone_number] = merge_participants(existing_participant, participant)
+        else:
+            duplicates.append(participant)
+
+    assert not duplicates, (
+        f"Participants should not share the same phone number. Duplicates found: "
+        f"{[(duplicate.full_name, duplicate.phone_number) for duplicate in duplicates]}"
+    )
+    # Dicts keep their insertion order, hence the participants' order is kept as well
+    return list(normalized_participants.values())
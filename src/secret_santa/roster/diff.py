@@ -0,0 +1,271 @@
+"""Roster diffing, and watching a roster file for changes.
+
+A roster is diffed against its previous version by the participants' normalized phone numbers in O(n): the
+previous participants are indexed by their numbers once, and every current participant is looked up in the index.
+
+A watched roster keeps the validated participant of every raw row it parsed, so when the file changes only the new or
+edited rows are validated again (normalizing their phone numbers and checking their time zones and channels), while
+the unchanged rows reuse their validated participants.
+"""
+
+import time
+from collections.abc import Iterator, Sequence
+from os import PathLike
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import attr
+from attr import dataclass
+
+from secret_santa.const import MINIMUM_NUMBER_OF_PARTICIPANTS
+from secret_santa.model.participant import Participant
+from secret_santa.roster.binary import MappedRoster, is_binary_roster
+from secret_santa.roster.dedup import DuplicatePolicy, deduplicate_participants, merge_participants
+from secret_santa.roster.ingest import MalformedRow, iter_participants
+from secret_santa.roster.loader import RosterOptions, validate_optional_fields
+from secret_santa.util import logging
+
+if TYPE_CHECKING:
+    from secret_santa.roster.cache import RosterCache
+
+DEFAULT_WATCH_INTERVAL = 1.0
+
+
+@dataclass(frozen=True, kw_only=True)
+class ParticipantChange:
+    """A participant whose details changed between two versions of a roster.
+
+    Attributes:
+        previous: The participant, as it was in the previous version.
+        current: The participant, as it is in the current version.
+
+    """
+
+    previous: Participant
+    current: Participant
+
+    @property
+    def changed_fields(self) -> list[str]:
+        """The names of the participant's fields which changed."""
+        return [
+            field.name
+            for field in attr.fields(Participant)
+            if getattr(self.previous, field.name) != getattr(self.current, field.name)
+        ]
+
+
+@dataclass(frozen=True, kw_only=True)
+class RosterDiff:
+    """The differences between two versions of a roster.
+
+    Attributes:
+        added: The participants which were added, in the current roster's order.
+        removed: The participants which were removed, in the previous roster's order.
+        modified: The participants whose details changed, in the current roster's order.
+
+    """
+
+    added: list[Participant]
+    removed: list[Participant]
+    modified: list[ParticipantChange]
+
+    def __bool__(self) -> bool:
+        """Check whether the versions differ."""
+        return bool(self.added or self.removed or self.modified)
+
+    def __str__(self) -> str:
+        """Summarize the differences."""
+        return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.modified)} modified"
+
+
+def diff_rosters(previous: Sequence[Participant], current: Sequence[Participant]) -> RosterDiff:
+    """Diff two versions of a validated roster by the participants' (normalized) phone numbers in O(n).
+
+    Args:
+        previous: The participants of the previous version.
+        current: The participants of the current version.
+
+    Returns:
+        The differences between the versions.
+
+    """
+    previous_by_phone_number = {participant.phone_number: participant for participant in previous}
+    added = []
+    modified = []
+    for participant in current:
+        # Whatever is left in the index once every current participant was looked up was removed
+        previous_participant = previous_by_phone_number.pop(participant.phone_number, None)
+        if previous_participant is None:
+            added.append(participant)
+        elif previous_participant != participant:
+            modified.append(ParticipantChange(previous=previous_participant, current=participant))
+    return RosterDiff(added=added, removed=list(previous_by_phone_number.values()), modified=modified)
+
+
+class RosterWatcher:
+    """Reloads a roster file as it's edited, validating only its changed rows and diffing every version.
+
+    Unlike ``load_participants``, a roster which doesn't validate doesn't fail the reload, as it's likely mid-edit:
+    its invalid rows and duplicate phone numbers are reported as malformed rows, and it may have too few
+    participants to play.
+
+    Attributes:
+        logger: The class logger.
+        participants_path: Path to the watched roster file.
+        options: The options the roster is loaded with.
+        roster_cache: The cache holding the roster's previous version, if any.
+        participants: The validated participants of the last version loaded.
+        malformed_rows: The malformed rows of the last version loaded.
+
+    """
+
+    def __init__(
+        self,
+        participants_path: PathLike,
+        *,
+        options: RosterOptions | None = None,
+        roster_cache: RosterCache | None = None,
+    ) -> None:
+        """Initialize the watcher, starting from the roster's cached previous version (if any).
+
+        Args:
+            participants_path: Path to the roster file to watch.
+            options: The options to load the roster with. If omitted, the default options will be used.
+                (Defaults to None).
+            roster_cache: If provided, the roster is diffed against its cached version first, and every valid version
+                of the roster is cached, to be diffed against by the next watcher. Otherwise, the first version
+                loaded is diffed against an empty roster. (Defaults to None).
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.participants_path = Path(participants_path)
+        self.options = options or RosterOptions()
+        self.roster_cache = roster_cache
+        self.participants: list[Participant] = []
+        if roster_cache:
+            self.participants = (
+                roster_cache.get(self.participants_path, options_key=self.options.cache_key(), allow_stale=True) or []
+            )
+        self.malformed_rows: list[MalformedRow] = []
+        # The validated participant (or the reason it's malformed) of every raw row of the last version loaded
+        self._validated_rows: dict[Participant, Participant | MalformedRow] = {}
+        self._file_stat: tuple[int, int] | None = None
+
+    def has_changed(self) -> bool:
+        """Check whether the roster file changed (by its size and modification time) since it was last loaded.
+
+        Returns:
+            Whether the roster file changed.
+
+        """
+        roster_stat = self.participants_path.stat()
+        return (roster_stat.st_size, roster_stat.st_mtime_ns) != self._file_stat
+
+    def validate_row(self, row: Participant) -> Participant | MalformedRow:
+        """Validate a single raw roster row, normalizing its phone number.
+
+        Args:
+            row: The participant parsed out of the row.
+
+        Returns:
+            The validated participant, or the malformed row in case the row is invalid.
+
+        """
+        malformed_rows: list[MalformedRow] = []
+        validated_participants = deduplicate_participants(
+            validate_optional_fields([row], malformed_rows=malformed_rows),
+            default_country_code=self.options.default_country_code,
+            malformed_rows=malformed_rows,
+        )
+        return validated_participants[0] if validated_participants else malformed_rows[0]
+
+    def iter_rows(self) -> Iterator[Participant]:
+        """Iterate over the raw participants of the roster file, reporting its unparsable rows as malformed rows.
+
+        Yields:
+            The participants parsed out of the roster's rows.
+
+        """
+        if is_binary_roster(self.participants_path):
+            with MappedRoster(self.participants_path) as mapped_roster:
+                yield from mapped_roster
+        else:
+            yield from iter_participants(
+                self.participants_path,
+                column_mapping=self.options.column_mapping,
+                malformed_rows=self.malformed_rows,
+            )
+
+    def reload(self) -> RosterDiff:
+        """Load the roster file's current version, validating only the rows which changed since the last version.
+
+        Returns:
+            The differences between the previous version and the current one.
+
+        """
+        roster_stat = self.participants_path.stat()
+        self._file_stat = (roster_stat.st_size, roster_stat.st_mtime_ns)
+        self.malformed_rows = []
+        previous_rows = self._validated_rows
+        validated_rows: dict[Participant, Participant | MalformedRow] = {}
+        participants_by_phone_number: dict[str, Participant] = {}
+        for row in self.iter_rows():
+            if (validated_row := validated_rows.get(row)) is None:
+                validated_row = previous_rows.get(row) or self.validate_row(row)
+                validated_rows[row] = validated_row
+            if isinstance(validated_row, MalformedRow):
+                self.malformed_rows.append(validated_row)
+            elif (existing_participant := participants_by_phone_number.get(validated_row.phone_number)) is None:
+                participants_by_phone_number[validated_row.phone_number] = validated_row
+            elif self.options.duplicate_policy == DuplicatePolicy.merge:
+                participants_by_phone_number[validated_row.phone_number] = merge_participants(
+                    existing_participant,
+                    validated_row,
+                )
+            else:
+                self.malformed_rows.append(
+                    MalformedRow(
+                        location=f"participant {validated_row.full_name!r}",
+                        reason=f"shares the phone number {validated_row.phone_number} with "
+                        f"{existing_participant.full_name!r}",
+                    ),
+                )
+        self.logger.debug(
+            f"Validated {sum(row not in previous_rows for row in validated_rows)} changed rows out of "
+            f"{len(validated_rows)}",
+        )
+        self._validated_rows = validated_rows
+
+        # Dicts keep their insertion order, hence the participants' order is kept as well
+        participants = list(participants_by_phone_number.values())
+        roster_diff = diff_rosters(self.participants, participants)
+        self.participants = participants
+        if len(participants) < MINIMUM_NUMBER_OF_PARTICIPANTS:
+            self.logger.warning(
+                f"Secret Santa should have at least 3 participants. Current number of participants: "
+                f"{len(participants)}",
+            )
+        elif self.roster_cache and not self.malformed_rows:
+            self.roster_cache.put(self.participants_path, participants, options_key=self.options.cache_key())
+        return roster_diff
+
+    def watch(self, interval: float = DEFAULT_WATCH_INTERVAL) -> Iterator[RosterDiff]:
+        """Watch the roster file, reloading it whenever it changes.
+
+        Args:
+            interval: The number of seconds between checking whether the roster file changed. (Defaults to 1).
+
+        Yields:
+            The differences between every version loaded and the previous one, starting with the current version.
+
+        """
+        while True:
+            try:
+                roster_diff = self.reload() if self.has_changed() else None
+            except (OSError, ValueError) as err:
+                # The file is likely mid-edit (e.g. replaced by the editor, or a JSON array not closed yet)
+                self.logger.warning(f"Could not reload {self.participants_path}: {err}")
+                roster_diff = None
+            if roster_diff is not None:
+                yield roster_diff
+            time.sleep(interval)
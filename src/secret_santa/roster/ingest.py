@@ -0,0 +1,249 @@
+"""Participants roster ingestion from the supported roster file formats.
+
+CSV and JSON Lines rosters are parsed in a streaming fashion (one row at a time), hence the memory used while
+ingesting them is bounded by the participants built rather than by the size of the file.
+"""
+
+import csv
+import json
+import operator
+from collections.abc import Callable, Iterator, Mapping
+from enum import StrEnum, auto
+from os import PathLike
+from pathlib import Path
+from typing import TextIO
+
+import attr
+from attr import dataclass
+
+from secret_santa.const import ROSTER_ENCODING
+from secret_santa.model.participant import Participant
+
+REQUIRED_FIELDS = tuple(field.name for field in attr.fields(Participant) if field.default is attr.NOTHING)
+OPTIONAL_FIELDS = tuple(field.name for field in attr.fields(Participant) if field.default is not attr.NOTHING)
+
+
+class RosterFormat(StrEnum):
+    """Supported roster file formats."""
+
+    json = auto()
+    jsonl = auto()
+    csv = auto()
+
+
+ROSTER_FORMAT_SUFFIXES: dict[str, RosterFormat] = {
+    ".json": RosterFormat.json,
+    ".jsonl": RosterFormat.jsonl,
+    ".ndjson": RosterFormat.jsonl,
+    ".csv": RosterFormat.csv,
+}
+
+
+@dataclass(frozen=True, kw_only=True)
+class MalformedRow:
+    """A roster row which could not be turned into a participant.
+
+    Attributes:
+        location: Where the row is in the roster file (e.g. ``line 3`` / ``record 2``).
+        reason: Why the row is malformed.
+
+    """
+
+    location: str
+    reason: str
+
+
+class MalformedRowError(ValueError):
+    """Raised on a malformed roster row when malformed rows are not collected."""
+
+
+type MalformedRowReporter = Callable[[str, str], None]
+
+
+def detect_roster_format(roster_path: PathLike) -> RosterFormat:
+    """Detect the format of the roster file at ``roster_path`` by its suffix.
+
+    Args:
+        roster_path: Path to the roster file.
+
+    Returns:
+        The format of the roster file. Files with an unknown suffix are considered JSON files.
+
+    """
+    return ROSTER_FORMAT_SUFFIXES.get(Path(roster_path).suffix.lower(), RosterFormat.json)
+
+
+def build_participant(record: object) -> Participant:
+    """Build a participant out of a raw roster record, validating it on the way.
+
+    Args:
+        record: The participant's fields.
+
+    Returns:
+        The participant built.
+
+    Raises:
+        MalformedRowError: If the record is not a mapping, has unknown fields or misses a required field.
+
+    """
+    if not isinstance(record, dict):
+        record_type_err = f"expected an object, got {type(record).__name__}"
+        raise MalformedRowError(record_type_err)
+    try:
+        participant = Participant(**record)
+    except TypeError as err:
+        raise MalformedRowError(str(err)) from err
+    if not all(
+        isinstance(getattr(participant, field), str) and getattr(participant, field) for field in REQUIRED_FIELDS
+    ):
+        missing_fields_err = f"the required fields {list(REQUIRED_FIELDS)} should be non-empty strings"
+        raise MalformedRowError(missing_fields_err)
+    if not all(isinstance(getattr(participant, field), str | None) for field in OPTIONAL_FIELDS):
+        optional_fields_err = f"the optional fields {list(OPTIONAL_FIELDS)} should be strings (or missing)"
+        raise MalformedRowError(optional_fields_err)
+    return participant
+
+
+def iter_json_records(roster_file: TextIO, report_malformed_row: MalformedRowReporter) -> Iterator[Participant]:
+    """Iterate over the participants of a JSON array roster file (which is read whole).
+
+    Args:
+        roster_file: The opened roster file.
+        report_malformed_row: Called with the location and the reason of each malformed record.
+
+    Yields:
+        The participants built out of the well-formed records.
+
+    """
+    records = json.load(roster_file)
+    if not isinstance(records, list):
+        roster_type_err = f"a JSON roster should hold an array of participants, got {type(records).__name__}"
+        raise MalformedRowError(roster_type_err)
+    for record_number, record in enumerate(records, start=1):
+        try:
+            yield build_participant(record)
+        except MalformedRowError as err:
+            report_malformed_row(f"record {record_number}", str(err))
+
+
+def iter_jsonl_records(roster_file: TextIO, report_malformed_row: MalformedRowReporter) -> Iterator[Participant]:
+    """Iterate over the participants of a JSON Lines roster file, one line at a time.
+
+    Args:
+        roster_file: The opened roster file.
+        report_malformed_row: Called with the location and the reason of each malformed line.
+
+    Yields:
+        The participants built out of the well-formed lines.
+
+    """
+    for line_number, line in enumerate(roster_file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield build_participant(json.loads(line))
+        except json.JSONDecodeError as err:
+            report_malformed_row(f"line {line_number}", f"invalid JSON: {err.msg}")
+        except MalformedRowError as err:
+            report_malformed_row(f"line {line_number}", str(err))
+
+
+def iter_csv_records(
+    roster_file: TextIO,
+    report_malformed_row: MalformedRowReporter,
+    column_mapping: Mapping[str, str] | None = None,
+) -> Iterator[Participant]:
+    """Iterate over the participants of a CSV roster file, one row at a time.
+
+    Args:
+        roster_file: The opened roster file.
+        report_malformed_row: Called with the location and the reason of each malformed row.
+        column_mapping: A mapping of participant field names to the CSV columns holding them.
+            Fields which are not mapped are read from the column of the same name. (Defaults to None).
+
+    Yields:
+        The participants built out of the well-formed rows.
+
+    """
+    column_mapping = column_mapping or {}
+    reader = csv.reader(roster_file)
+    header = next(reader, [])
+    if missing_columns := [
+        column_mapping.get(field, field) for field in REQUIRED_FIELDS if column_mapping.get(field, field) not in header
+    ]:
+        missing_columns_err = f"the CSV roster is missing the required columns: {missing_columns}"
+        raise MalformedRowError(missing_columns_err)
+    # A mapped column is expected to exist, e.g. a typo in the column of an optional field would lose all its values
+    if missing_mapped_columns := [
+        column for field, column in column_mapping.items() if field in OPTIONAL_FIELDS and column not in header
+    ]:
+        missing_mapped_columns_err = f"the CSV roster is missing the mapped columns: {missing_mapped_columns}"
+        raise MalformedRowError(missing_mapped_columns_err)
+    # Resolve the columns of the participant fields once. As the header validation above covers the unknown and
+    # missing fields checks of ``build_participant``, only the required values need to be checked for every row
+    required_values = operator.itemgetter(
+        *[header.index(column_mapping.get(field, field)) for field in REQUIRED_FIELDS]
+    )
+    optional_fields = tuple(field for field in OPTIONAL_FIELDS if column_mapping.get(field, field) in header)
+    field_names = REQUIRED_FIELDS + optional_fields
+    field_values = operator.itemgetter(*[header.index(column_mapping.get(field, field)) for field in field_names])
+    columns_count = len(header)
+
+    for row in reader:
+        if len(row) != columns_count:
+            if row:
+                report_malformed_row(f"line {reader.line_num}", f"expected {columns_count} cells, got {len(row)}")
+        elif "" in required_values(row):
+            report_malformed_row(f"line {reader.line_num}", f"missing required values: {list(REQUIRED_FIELDS)}")
+        else:
+            participant_fields = dict(zip(field_names, field_values(row), strict=True))
+            # Empty CSV cells stand for missing (optional) values
+            for field in optional_fields:
+                if not participant_fields[field]:
+                    participant_fields[field] = None
+            yield Participant(**participant_fields)
+
+
+def iter_participants(
+    roster_path: PathLike,
+    roster_format: RosterFormat | None = None,
+    *,
+    column_mapping: Mapping[str, str] | None = None,
+    malformed_rows: list[MalformedRow] | None = None,
+) -> Iterator[Participant]:
+    """Iterate over the participants of the roster file at ``roster_path``.
+
+    Args:
+        roster_path: Path to the roster file.
+        roster_format: The format of the roster file. If omitted, it'll be detected by the file's suffix.
+            (Defaults to None).
+        column_mapping: A mapping of participant field names to the CSV columns holding them (CSV rosters only).
+            (Defaults to None).
+        malformed_rows: If provided, malformed rows will be appended to this list and skipped, instead of
+            raising a ``MalformedRowError``. (Defaults to None).
+
+    Yields:
+        The participants of the roster file.
+
+    Raises:
+        MalformedRowError: On the first malformed row, in case ``malformed_rows`` was not provided.
+
+    """
+
+    def report_malformed_row(location: str, reason: str) -> None:
+        if malformed_rows is None:
+            malformed_row_err = f"Malformed roster row at {location} of {roster_path}: {reason}"
+            raise MalformedRowError(malformed_row_err)
+        malformed_rows.append(MalformedRow(location=location, reason=reason))
+
+    roster_format = roster_format or detect_roster_format(roster_path)
+    # Spreadsheet applications (e.g. Excel) prefix their UTF-8 exports with a BOM, which would otherwise end up in the
+    # first column's name (or fail the JSON decoding)
+    with Path(roster_path).open(encoding=ROSTER_ENCODING, newline="") as roster_file:
+        match roster_format:
+            case RosterFormat.json:
+                yield from iter_json_records(roster_file, report_malformed_row)
+            case RosterFormat.jsonl:
+                yield from iter_jsonl_records(roster_file, report_malformed_row)
+            case RosterFormat.csv:
+                yield from iter_csv_records(roster_file, report_malformed_row, column_mapping)
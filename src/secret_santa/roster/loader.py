@@ -0,0 +1,187 @@
+"""Participants roster loading."""
+
+import json
+import logging
+from collections.abc import Iterable, Mapping
+from os import PathLike
+from typing import TYPE_CHECKING
+
+import attr
+from attr import dataclass
+
+from secret_santa.const import MINIMUM_NUMBER_OF_PARTICIPANTS
+from secret_santa.delivery.channel import InvalidChannelError, get_participant_channel
+from secret_santa.roster.binary import MappedRoster, is_binary_roster
+from secret_santa.roster.dedup import DuplicatePolicy, deduplicate_participants
+from secret_santa.roster.ingest import MalformedRow, build_participant, iter_participants
+from secret_santa.util import logging as logging_util
+from secret_santa.util.time_zone import InvalidTimeZoneError, get_time_zone
+
+if TYPE_CHECKING:
+    from secret_santa.model.participant import Participant
+    from secret_santa.roster.cache import RosterCache
+
+logger = logging_util.get_logger("roster")
+
+
+@dataclass(frozen=True, kw_only=True)
+class RosterOptions:
+    """Options controlling how a roster file is loaded.
+
+    Attributes:
+        column_mapping: A mapping of participant field names to the CSV columns holding them (CSV rosters only).
+        duplicate_policy: Whether participants sharing the same (normalized) phone number are rejected or merged.
+        default_country_code: The country code national phone numbers are prefixed with, if any.
+
+    """
+
+    column_mapping: Mapping[str, str] | None = None
+    duplicate_policy: DuplicatePolicy = DuplicatePolicy.reject
+    default_country_code: str | None = None
+
+    def cache_key(self) -> str:
+        """Get a key of the options which affect the participants loaded, to key the roster cache by.
+
+        Returns:
+            A key of the options, empty for the default options.
+
+        """
+        return "" if self == RosterOptions() else json.dumps(attr.asdict(self), sort_keys=True)
+
+
+def load_participants(
+    participants_path: PathLike,
+    *,
+    roster_cache: RosterCache | None = None,
+    options: RosterOptions | None = None,
+) -> list[Participant]:
+    """Read the roster file at ``participants_path`` and load it into a list of validated participants.
+
+    JSON, JSON Lines and CSV rosters are told apart by their suffix, while binary rosters are recognized by their
+    magic bytes. Malformed rows are reported (logged) and skipped rather than aborting the whole load.
+    The participants' phone numbers are normalized (E.164) and participants sharing the same number are
+    handled according to the duplicate policy.
+
+    Args:
+        participants_path: Path to the "Secret Santa" participants roster file.
+        roster_cache: If provided, the participants will be taken from the cache in case the file hasn't changed
+            since it was last loaded, and cached otherwise. (Defaults to None).
+        options: The options to load the roster with. If omitted, the default options will be used.
+            (Defaults to None).
+
+    Returns:
+        List of participants loaded from the file at ``participants_path``.
+
+    """
+    options = options or RosterOptions()
+    if (
+        roster_cache
+        and (cached_participants := roster_cache.get(participants_path, options_key=options.cache_key())) is not None
+    ):
+        logger.debug(f"Loaded {len(cached_participants)} participants from the roster cache")
+        return cached_participants
+
+    malformed_rows: list[MalformedRow] = []
+    if is_binary_roster(participants_path):
+        # Binary rosters need no parsing, but every participant is decoded here nonetheless: validating the roster
+        # and drawing it need all of them, hence the mmap only saves the text parsing, while the lazy decoding pays
+        # off for callers accessing a few participants of a MappedRoster
+        with MappedRoster(participants_path) as mapped_roster:
+            participants = list(mapped_roster)
+    else:
+        participants = list(
+            iter_participants(participants_path, column_mapping=options.column_mapping, malformed_rows=malformed_rows),
+        )
+    participants = validate_participants(participants, options=options, malformed_rows=malformed_rows)
+
+    # Rosters with malformed rows are not cached, so the rows keep getting reported until they're fixed
+    if roster_cache and not malformed_rows:
+        roster_cache.put(participants_path, participants, options_key=options.cache_key())
+    return participants
+
+
+def parse_participants(records: Iterable[object], *, options: RosterOptions | None = None) -> list[Participant]:
+    """Build and validate a list of participants out of in-memory roster records (e.g. a request's payload).
+
+    Unlike ``load_participants``, malformed records are not skipped, as there's no file to go back to and fix.
+
+    Args:
+        records: The participants' records, as dicts of the participants' fields.
+        options: The options to validate the roster with. If omitted, the default options will be used.
+            (Defaults to None).
+
+    Returns:
+        List of the validated participants.
+
+    Raises:
+        MalformedRowError: If one of the records is malformed.
+
+    """
+    return validate_participants([build_participant(record) for record in records], options=options or RosterOptions())
+
+
+def validate_participants(
+    participants: list[Participant],
+    *,
+    options: RosterOptions,
+    malformed_rows: list[MalformedRow] | None = None,
+) -> list[Participant]:
+    """Normalize and deduplicate the participants, and validate there are enough of them to play.
+
+    Args:
+        participants: The participants to validate.
+        options: The options to validate the roster with.
+        malformed_rows: If provided, participants with an invalid phone number, time zone or channel will be
+            appended to this list and skipped. (Defaults to None).
+
+    Returns:
+        The validated participants.
+
+    """
+    participants = deduplicate_participants(
+        validate_optional_fields(participants, malformed_rows=malformed_rows),
+        duplicate_policy=options.duplicate_policy,
+        default_country_code=options.default_country_code,
+        malformed_rows=malformed_rows,
+    )
+    for malformed_row in malformed_rows or []:
+        logger.warning(f"Skipping malformed row at {malformed_row.location}: {malformed_row.reason}")
+    assert len(participants) >= MINIMUM_NUMBER_OF_PARTICIPANTS, (
+        f"Secret Santa should have at least 3 participants. Current number of participants: {len(participants)}"
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        for participant in participants:
+            logger.debug(f"Loaded: {participant}")
+    return participants
+
+
+def validate_optional_fields(
+    participants: list[Participant],
+    *,
+    malformed_rows: list[MalformedRow] | None = None,
+) -> list[Participant]:
+    """Validate the participants' time zones (if any) are known IANA time zones, and their channels can be used.
+
+    Args:
+        participants: The participants to validate.
+        malformed_rows: If provided, participants with an unknown time zone or an unusable channel will be appended
+            to this list and skipped, instead of raising an ``InvalidTimeZoneError`` / ``InvalidChannelError``.
+            (Defaults to None).
+
+    Returns:
+        The participants with valid optional fields.
+
+    """
+    valid_participants = []
+    for participant in participants:
+        try:
+            if participant.time_zone:
+                get_time_zone(participant.time_zone)
+            get_participant_channel(participant)
+        except (InvalidTimeZoneError, InvalidChannelError) as err:
+            if malformed_rows is None:
+                raise
+            malformed_rows.append(MalformedRow(location=f"participant {participant.full_name!r}", reason=str(err)))
+            continue
+        valid_participants.append(participant)
+    return valid_participants
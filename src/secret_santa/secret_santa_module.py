@@ -1,19 +1,47 @@
 """Base secret santa module."""
 
-import copy
-import json
 import os
-import random
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from functools import cached_property
 from os import PathLike
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from dotenv import load_dotenv
+from twilio.base.exceptions import TwilioRestException
 
 from secret_santa.const import MINIMUM_NUMBER_OF_PARTICIPANTS, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_NUMBER
-from secret_santa.model.participant import Participant
+from secret_santa.delivery.channel import Channel, get_participant_channel
+from secret_santa.delivery.failover import NoHealthyProviderError
+from secret_santa.delivery.fair_share import FairShareError
+from secret_santa.delivery.pipeline import MessagePipeline, OutgoingMessage
+from secret_santa.delivery.run_state import DrawOptions
+from secret_santa.draw.cycles import DEFAULT_MIN_CYCLE_LENGTH
+from secret_santa.draw.engine import DrawEngine
+from secret_santa.draw.mixing import get_group_keys
+from secret_santa.draw.repair import repair_arrangement
+from secret_santa.email_messaging_service import EMAIL_REJECTED_ERRORS
+from secret_santa.roster import loader
+from secret_santa.roster.dedup import PhoneNumberIndex
 from secret_santa.twilio_messaging_service import TwilioMessagingService
-from secret_santa.util import file, misc, path
 from secret_santa.util import logging as logging_util
+from secret_santa.util import path, tracing
+
+if TYPE_CHECKING:
+    from secret_santa.delivery.export import ExportSink
+    from secret_santa.delivery.failover import FailoverMessagingService
+    from secret_santa.delivery.fair_share import TenantQueue
+    from secret_santa.delivery.lookup import PhoneLookup
+    from secret_santa.delivery.reveal import RevealStore
+    from secret_santa.delivery.run_state import RunStateStore
+    from secret_santa.delivery.schedule import DeliveryScheduler
+    from secret_santa.draw.mixing import MixingAttribute
+    from secret_santa.email_messaging_service import EmailMessagingService
+    from secret_santa.model.participant import Participant
+    from secret_santa.roster.cache import RosterCache
+    from secret_santa.twilio_messaging_service import MessageResponse
+    from secret_santa.util.profiling import Profiler
 
 # Set up the main logger
 logger = logging_util.get_logger("main")
@@ -26,18 +54,50 @@ class SecretSanta:
         logger: The class logger.
         participants: A list of the Secret Santa participants.
         messaging_client: An instance of the messaging client.
+        email_client: An instance of the email messaging client, if the participants could be emailed.
+        profiler: The profiler taking memory snapshots at the run's stage boundaries, if the run is profiled.
         show_arrangement: If ``True``, the relevant method will print the arrangement once it's calculated.
         dry_run: If ``True``, the class methods will run a dry run (not execute some things,
             e.g. it won't actually send a message).
+        roster_cache: The cache the participants are loaded from / stored at, if any.
+        roster_options: The options the participants are loaded with, if any.
+        run_state: The state store of the run, which the messages sent are recorded into, if any.
+        status_callback_url: The URL the messaging provider reports the messages' delivery status to, if any.
+        delivery_scheduler: The scheduler the messages are dispatched by, if they're scheduled.
+        reveal_store: The store the assignments are sealed in, if the participants reveal them on demand.
+        reveal_url: The URL of the reveal endpoint the participants are sent to, if they reveal their assignments.
+        single_cycle: If ``True``, the arrangement is drawn as a single cycle of all the participants.
+        min_cycle_length: The minimal length of every cycle of the arrangement drawn, e.g. 3 rules out swaps.
+        mixing_attributes: The group attributes (e.g. ``team``) the arrangement drawn mixes, if any.
+        phone_lookup: The lookup the participants' phone numbers are checked with before the draw, if any.
+        tenant_queue: The tenant queue the text messages wait in for their share of a shared rate budget, if any.
+        export_sink: The sink the arrangement's pairs and the messages' results are exported to, if any.
 
     """
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         participants_json_path: PathLike | None = None,
         *,
         show_arrangement: bool = False,
         dry_run: bool,
+        roster_cache: RosterCache | None = None,
+        roster_options: loader.RosterOptions | None = None,
+        participants: list[Participant] | None = None,
+        messaging_client: TwilioMessagingService | FailoverMessagingService | None = None,
+        run_state: RunStateStore | None = None,
+        status_callback_url: str | None = None,
+        delivery_scheduler: DeliveryScheduler | None = None,
+        email_client: EmailMessagingService | None = None,
+        profiler: Profiler | None = None,
+        reveal_store: RevealStore | None = None,
+        reveal_url: str | None = None,
+        single_cycle: bool = False,
+        min_cycle_length: int = DEFAULT_MIN_CYCLE_LENGTH,
+        mixing_attributes: Sequence[MixingAttribute] = (),
+        phone_lookup: PhoneLookup | None = None,
+        tenant_queue: TenantQueue | None = None,
+        export_sink: ExportSink | None = None,
     ) -> None:
         """Initialize the Secret Santa game class.
 
@@ -46,14 +106,106 @@ class SecretSanta:
                 If omitted, will try to look for the file at ``{project_root}/participants.json``.
             show_arrangement: Whether the arrangement will be shown once it's calculated.
             dry_run: If ``True``, the class methods will run a dry run (not execute some things).
+            roster_cache: If provided, unchanged participants files will be loaded from this cache instead of being
+                parsed and validated again. (Defaults to None).
+            roster_options: The options to load the participants with (CSV column mapping, duplicate phone
+                numbers policy, etc.). If omitted, the default options will be used. (Defaults to None).
+            participants: The participants to play with. If provided, no participants file is loaded, and the
+                participants are validated (their phone numbers normalized, and the participants sharing a number
+                rejected or merged) with the ``roster_options``. (Defaults to None).
+            messaging_client: The messaging client to send the messages with, e.g. a long-lived client shared
+                between games. If omitted, a new Twilio messaging client will be initialized. (Defaults to None).
+            run_state: The state store of the run to record the messages sent into. (Defaults to None).
+            status_callback_url: The URL for the messaging provider to report the messages' delivery status to,
+                e.g. the public URL of a ``StatusCallbackReceiver``. (Defaults to None).
+            delivery_scheduler: If provided, the messages are dispatched within the participants' local delivery
+                windows instead of all at once. (Defaults to None).
+            email_client: The email messaging client to message the participants preferring the email channel with.
+                If omitted, all the participants are messaged by SMS. (Defaults to None).
+            profiler: If provided, its memory snapshots are taken after the participants are loaded, after the draw
+                and after the messages are dispatched. (Defaults to None).
+            reveal_store: If provided, the assignments are sealed in this store, and every participant is only sent
+                a link to the reveal endpoint with their one-time code, rather than their assignment.
+                (Defaults to None).
+            reveal_url: The URL of the reveal endpoint, required along with the ``reveal_store``. (Defaults to None).
+            single_cycle: Whether to draw the arrangement as a single cycle (everyone in one loop), rather than any
+                derangement. (Defaults to False).
+            min_cycle_length: The minimal length of every cycle of the arrangement drawn, e.g. 3 rules out two
+                participants swapping gifts. (Defaults to 2, i.e. any derangement).
+            mixing_attributes: The group attributes (e.g. ``team``) to mix, i.e. to match every giver with a
+                recipient outside of their groups wherever possible. (Defaults to no attributes).
+            phone_lookup: If provided, the participants' phone numbers are looked up before the draw, and the
+                participants whose number can't be messaged (e.g. invalid or landline numbers) are left out of the
+                game. (Defaults to None).
+            tenant_queue: If provided, every text message waits in this queue of a ``FairShareScheduler`` for its
+                send slot, sharing the scheduler's rate budget fairly with the other runs (tenants) sending through
+                the same credentials. (Defaults to None).
+            export_sink: If provided, every pair of the arrangement is exported to this sink as it's drawn, and
+                every message's result as it's recorded. (Defaults to None).
 
         """
         # Set up the class logger
         self.logger = logging_util.get_logger(self.__class__.__name__)
+        self.roster_cache = roster_cache
+        self.roster_options = roster_options
+        self.run_state = run_state
+        self.status_callback_url = status_callback_url
+        self.delivery_scheduler = delivery_scheduler
+        self.profiler = profiler
+        assert reveal_store is None or reveal_url, "Revealing the assignments on demand requires the reveal URL"
+        self.reveal_store = reveal_store
+        self.reveal_url = reveal_url
+        self.single_cycle = single_cycle
+        self.min_cycle_length = min_cycle_length
+        self.mixing_attributes = mixing_attributes
+        self.phone_lookup = phone_lookup
+        self.tenant_queue = tenant_queue
+        self.export_sink = export_sink
 
         self.logger.debug("Initializing the Secret Santa class")
 
         # Load the participants
+        with tracing.start_span("load"):
+            if participants is not None:
+                # Validated as a loaded roster is, so a number shared by several participants never reaches the draw
+                self.participants = loader.validate_participants(
+                    participants,
+                    options=self.roster_options or loader.RosterOptions(),
+                )
+            else:
+                self.participants = self.load_participants_file(participants_json_path)
+            self.logger.info(f"A total of {len(self.participants)} participants have been loaded")
+            if self.phone_lookup:
+                self.participants = self.phone_lookup.filter_messageable(self.participants)
+                assert len(self.participants) >= MINIMUM_NUMBER_OF_PARTICIPANTS, (
+                    f"Secret Santa should have at least 3 participants which could be messaged. Current number of "
+                    f"participants: {len(self.participants)}"
+                )
+            tracing.set_attributes(participants=len(self.participants))
+        if self.profiler:
+            self.profiler.snapshot("load")
+
+        # Initialize the Twilio messaging client, unless an already initialized client was passed
+        self.messaging_client = messaging_client or TwilioMessagingService(alphanumeric_id="SecretSanta")
+        self.email_client = email_client
+        # Set whether the arrangement will be shown once it's decided
+        self.show_arrangement = show_arrangement
+        # Set whether the class methods should run a dry run or not
+        self.dry_run = dry_run
+
+        self.logger.info("SecretSanta class initialized")
+
+    def load_participants_file(self, participants_json_path: PathLike | None) -> list[Participant]:
+        """Locate the participants file and load the participants from it.
+
+        Args:
+            participants_json_path: Path to the "Secret Santa" participants JSON.
+                If omitted, will try to look for the file at ``{project_root}/participants.json``.
+
+        Returns:
+            List of participants loaded from the participants file.
+
+        """
         if not participants_json_path:
             self.logger.warning("No path to the participants JSON has been passed")
             participants_json_path = path.get_project_root() / "participants.json"
@@ -63,41 +215,46 @@ class SecretSanta:
         ).exists(), f"Could not find the participants JSON file @ {participants_json_path}"
 
         self.logger.debug("Loading the participants")
-        self.participants = self.load_participants(participants_json_path=participants_json_path)
-        self.logger.info(f"A total of {len(self.participants)} participants have been loaded")
-
-        # Initialize the Twilio messaging client
-        self.messaging_client = TwilioMessagingService(alphanumeric_id="SecretSanta")
-        # Set whether the arrangement will be shown once it's decided
-        self.show_arrangement = show_arrangement
-        # Set whether the class methods should run a dry run or not
-        self.dry_run = dry_run
-
-        self.logger.info("SecretSanta class initialized")
+        return self.load_participants(participants_json_path=participants_json_path)
 
     def load_participants(self, participants_json_path: PathLike) -> list[Participant]:
-        """Read the JSON file at ``participants_json_path`` and load it into a list of participants.
+        """Read the roster file at ``participants_json_path`` and load it into a list of participants.
 
         Args:
-            participants_json_path: Path to the "Secret Santa" participants JSON.
+            participants_json_path: Path to the "Secret Santa" participants JSON (or any other supported roster file).
 
         Returns:
             List of participants loaded from the file at ``participants_json_path``.
 
         """
-        # Read the JSON file
-        participants_json: str = file.read_file(Path(participants_json_path))
-        # Convert the JSON string to a list of dicts
-        participants_dict_list = json.loads(participants_json)
-        assert len(participants_dict_list) >= MINIMUM_NUMBER_OF_PARTICIPANTS, (
-            f"Secret Santa should have at least 3 participants. "
-            f"Current number of participants: {len(participants_dict_list)}"
+        return loader.load_participants(
+            participants_json_path,
+            roster_cache=self.roster_cache,
+            options=self.roster_options,
+        )
+
+    @cached_property
+    def draw_engine(self) -> DrawEngine:
+        """The engine the participants' arrangements are drawn by, built on the first draw."""
+        return DrawEngine(
+            self.participants,
+            single_cycle=self.single_cycle,
+            min_cycle_length=self.min_cycle_length,
+            mixing_attributes=self.mixing_attributes,
         )
-        # Load the participants' dicts to a list of ``Participant``s
-        participants = [Participant(**participant_dict) for participant_dict in participants_dict_list]
-        for participant in participants:
-            self.logger.debug(f"Loaded: {participant}")
-        return participants
+
+    def get_derangement_indices(self) -> list[int]:
+        """Draw a random derangement permutation of the participants' indices, with the requested cycle structure.
+
+        Only the indices are drawn (rather than copies of the participants), so the draw allocates a single list
+        of integers however big the participants are. The derangement is sampled directly (see
+        ``secret_santa.draw.cycles``), rather than shuffled until the shuffle happens to be a derangement.
+
+        Returns:
+            The index of every participant's recipient, parallel to the participants list.
+
+        """
+        return self.draw_engine.draw_indices()
 
     def get_participants_derangement(self) -> list[Participant]:
         """Create and return a new list of the participants loaded to the class after a random derangement permutation.
@@ -108,13 +265,7 @@ class SecretSanta:
             List of participants loaded to the class after a random derangement permutation.
 
         """
-        # Create a new, deep copy of the participants loaded
-        recipients = copy.deepcopy(self.participants)
-        # Keep shuffling the copy until a derangement permutation of the participants is achieved
-        # i.e. No two participants parallel to each other in the participants and the new list are the same
-        while not misc.is_derangement(self.participants, recipients):
-            random.shuffle(recipients)
-        return recipients
+        return self.draw_engine.draw()
 
     @staticmethod
     def get_participant_message_name(participant: Participant) -> str:
@@ -149,6 +300,64 @@ class SecretSanta:
         recipient_msg_name = SecretSanta.get_participant_message_name(recipient)
         return f"Hello {participant_msg_name},\nYou'll be {recipient_msg_name}'s Secret Santa!"
 
+    @staticmethod
+    def get_reveal_message(participant: Participant, reveal_url: str, code: str) -> str:
+        """Construct a message inviting the participant to reveal their recipient on demand.
+
+        Args:
+            participant: The participant's data, i.e. the gift giver.
+            reveal_url: The URL of the reveal endpoint.
+            code: The participant's one-time code.
+
+        Returns:
+            A customized message with the link to the reveal endpoint and the participant's code.
+
+        """
+        participant_msg_name = SecretSanta.get_participant_message_name(participant)
+        return f"Hello {participant_msg_name},\nFind out whose Secret Santa you'll be at {reveal_url} (code: {code})"
+
+    def get_arrangement(self, phone_numbers: PhoneNumberIndex) -> list[Participant]:
+        """Get the recipients of the participants, parallel to the participants list.
+
+        A new derangement is drawn, unless the run already has an arrangement (i.e. the run is resumed), in which
+        case the run's arrangement is used, so the participants messaged on the resumed run get the same recipients.
+
+        Args:
+            phone_numbers: An index of the participants by their phone numbers.
+
+        Returns:
+            List of the recipients, parallel to the participants list.
+
+        """
+        if self.run_state is None:
+            return self.get_participants_derangement()
+        if self.run_state.arrangement is None:
+            recipients = self.get_participants_derangement()
+            self.run_state.record_arrangement(
+                {
+                    phone_numbers.normalize(participant.phone_number): phone_numbers.normalize(recipient.phone_number)
+                    for participant, recipient in zip(self.participants, recipients, strict=True)
+                },
+                DrawOptions(
+                    single_cycle=self.single_cycle,
+                    min_cycle_length=self.min_cycle_length,
+                    mixing_attributes=tuple(self.mixing_attributes),
+                ),
+            )
+            return recipients
+
+        participants_by_number = {
+            phone_numbers.normalize(participant.phone_number): participant for participant in self.participants
+        }
+        assert set(self.run_state.arrangement) == set(participants_by_number), (
+            f"The participants changed since run {self.run_state.run_id} started, hence it can't be resumed"
+        )
+        self.logger.info(f"Resuming the arrangement of run {self.run_state.run_id}")
+        return [
+            participants_by_number[self.run_state.arrangement[phone_numbers.normalize(participant.phone_number)]]
+            for participant in self.participants
+        ]
+
     def run(self) -> int:
         """Find a recipient for each participant and send the participant a message.
 
@@ -160,23 +369,383 @@ class SecretSanta:
         """
         self.logger.info("Running the Secret Santa allocator")
 
+        # Index the participants by their (validated, hence unique) numbers, to message every number once
+        phone_numbers = PhoneNumberIndex(
+            default_country_code=self.roster_options.default_country_code if self.roster_options else None,
+        )
+        for participant in self.participants:
+            phone_numbers.add(participant)
         # Get a "Participant"s derangement to be used as the recipients
-        participants_derangement = self.get_participants_derangement()
-        # Go over the participants and recipients in the participants and participants_derangement lists respectively,
-        # and send the participant a customized message
-        for participant, recipient in zip(self.participants, participants_derangement, strict=True):
+        with tracing.start_span("draw"):
+            participants_derangement = self.get_arrangement(phone_numbers)
+            self.log_arrangement_stats(participants_derangement)
+        if self.profiler:
+            self.profiler.snapshot("draw")
+        messages = self.iter_messages(phone_numbers, participants_derangement)
+        with tracing.start_span("dispatch"):
+            if self.delivery_scheduler:
+                # The whole schedule is planned up front, hence the scheduled messages are not streamed
+                scheduled_messages = {
+                    phone_number: (participant, recipient) for phone_number, participant, recipient in messages
+                }
+                self.delivery_scheduler.dispatch(
+                    self.get_schedule(scheduled_messages),
+                    lambda phone_number: self.message_participant(*scheduled_messages[phone_number], phone_number),
+                    dry_run=self.dry_run,
+                )
+            else:
+                tracing.set_attributes(sent_messages=self.dispatch(messages))
+        if self.profiler:
+            self.profiler.snapshot("dispatch")
+        return 0
+
+    def log_arrangement_stats(self, recipients: list[Participant]) -> None:
+        """Log the cycle statistics of the arrangement, and how well it mixes the groups (if it mixes any).
+
+        Args:
+            recipients: The recipients, parallel to the participants list.
+
+        """
+        self.logger.info(f"The arrangement has {self.draw_engine.get_cycle_stats(recipients)}")
+        if self.mixing_attributes:
+            self.logger.info(
+                f"{self.draw_engine.get_mixing_score(recipients):.1%} of the givers' recipients are outside of their "
+                f"{' / '.join(self.mixing_attributes)}",
+            )
+
+    def iter_messages(
+        self,
+        phone_numbers: PhoneNumberIndex,
+        recipients: list[Participant],
+    ) -> Iterator[tuple[str, Participant, Participant]]:
+        """Iterate over the messages to send, a single message per (validated, hence unique) phone number.
+
+        Args:
+            phone_numbers: An index of the participants by their phone numbers.
+            recipients: The recipients, parallel to the participants list.
+
+        Yields:
+            The normalized phone number of each participant to message, the participant and its recipient.
+
+        """
+        messaged_numbers: set[str] = set()
+        for participant, recipient in zip(self.participants, recipients, strict=True):
+            phone_number = phone_numbers.normalize(participant.phone_number)
+            # Skipping a duplicate would leave its recipient without a Santa, hence the participants are validated
+            assert phone_number not in messaged_numbers, (
+                f"{participant} shares its number with {phone_numbers.get(phone_number)}, which was already messaged"
+            )
+            messaged_numbers.add(phone_number)
             if self.show_arrangement:
                 self.logger.info(
                     f"{SecretSanta.get_participant_message_name(participant)} -> "
                     f"{SecretSanta.get_participant_message_name(recipient)}",
                 )
-            response = self.messaging_client.send_message(
-                SecretSanta.get_secret_santa_message(participant, recipient),
+            if self.export_sink:
+                self.export_sink.write_pair(phone_number, participant, recipient)
+            yield phone_number, participant, recipient
+
+    def repair(self) -> int:
+        """Repair the run's arrangement after participants joined or dropped out, messaging only the givers reassigned.
+
+        The leavers are spliced out of the run's arrangement and the joiners are spliced into it (see
+        ``repair_arrangement``), hence only the few givers around each change get new messages, rather than
+        everyone. The repair keeps the options the arrangement was drawn with (its cycle structure and the groups it
+        mixes), rather than this instance's. Givers reassigned by an earlier (interrupted) repair, which were not
+        messaged yet, are messaged too.
+
+        Returns:
+            0 in case everything runs successfully. Non-Zero code otherwise.
+
+        """
+        assert self.run_state, "Only a run with a state could be repaired"
+        assert self.run_state.arrangement is not None, f"Run {self.run_state.run_id} has no arrangement to repair"
+        phone_numbers = PhoneNumberIndex(
+            default_country_code=self.roster_options.default_country_code if self.roster_options else None,
+        )
+        participants_by_number: dict[str, Participant] = {}
+        for participant in self.participants:
+            participants_by_number.setdefault(phone_numbers.normalize(participant.phone_number), participant)
+        arrangement = self.run_state.arrangement
+        leavers = [phone_number for phone_number in arrangement if phone_number not in participants_by_number]
+        joiners = [phone_number for phone_number in participants_by_number if phone_number not in arrangement]
+        self.logger.info(
+            f"{len(joiners)} participants joined and {len(leavers)} dropped out of run {self.run_state.run_id}",
+        )
+
+        changes = self.repair_arrangement(participants_by_number, leavers, joiners) if leavers or joiners else {}
+        if self.show_arrangement or self.dry_run:
+            for giver, recipient in changes.items():
+                self.logger.info(
+                    f"{SecretSanta.get_participant_message_name(participants_by_number[giver])} -> "
+                    f"{SecretSanta.get_participant_message_name(participants_by_number[recipient])}",
+                )
+        if self.dry_run:
+            self.logger.info(f"Not recording the repair (DRY RUN), {len(changes)} participants would be messaged")
+            return 0
+        if changes or leavers:
+            revision = self.run_state.record_repair(changes, leavers)
+            self.logger.info(f"Repaired the arrangement of run {self.run_state.run_id} (revision {revision})")
+
+        claimed_keys = self.run_state.claimed_keys
+        self.dispatch(
+            (giver, participants_by_number[giver], participants_by_number[arrangement[giver]])
+            for giver in self.run_state.assignment_revisions
+            if self.run_state.get_message_key(giver) not in claimed_keys
+        )
+        return 0
+
+    def repair_arrangement(
+        self,
+        participants_by_number: dict[str, Participant],
+        leavers: list[str],
+        joiners: list[str],
+    ) -> dict[str, str]:
+        """Repair the run's arrangement, keeping the options it was drawn with (see ``repair_arrangement``).
+
+        Args:
+            participants_by_number: The current participants, by their normalized phone numbers.
+            leavers: The phone numbers of the participants who dropped out.
+            joiners: The phone numbers of the participants who joined.
+
+        Returns:
+            A mapping of the givers whose recipients changed (including the joiners) to their new recipients.
+
+        """
+        assert self.run_state, "Only a run with a state could be repaired"
+        assert self.run_state.arrangement is not None, f"Run {self.run_state.run_id} has no arrangement to repair"
+        draw_options = self.run_state.draw_options or DrawOptions()
+        group_keys = None
+        if draw_options.mixing_attributes:
+            group_keys = dict(
+                zip(
+                    participants_by_number,
+                    get_group_keys(list(participants_by_number.values()), draw_options.mixing_attributes),
+                    strict=True,
+                ),
+            )
+        return repair_arrangement(
+            self.run_state.arrangement,
+            leavers=leavers,
+            joiners=joiners,
+            # A single cycle stays a single cycle by splicing alone, however short it gets
+            min_cycle_length=DEFAULT_MIN_CYCLE_LENGTH if draw_options.single_cycle else draw_options.min_cycle_length,
+            group_keys=group_keys,
+        )
+
+    def get_channel(self, participant: Participant) -> Channel:
+        """Get the channel to message the ``participant`` through.
+
+        Args:
+            participant: The participant's details.
+
+        Returns:
+            The participant's preferred channel, or SMS if the participant prefers email while no email client is
+            set.
+
+        """
+        channel = get_participant_channel(participant)
+        if channel == Channel.email and self.email_client is None:
+            self.logger.warning(f"{participant} prefers to be emailed, but no email client is set, messaging by SMS")
+            return Channel.sms
+        return channel
+
+    def dispatch(self, messages: Iterable[tuple[str, Participant, Participant]]) -> int:
+        """Stream the messages through the draw, render, send and record stages (see ``MessagePipeline``).
+
+        The messages are sent as soon as they're drawn, through a send queue (and worker) per channel, with the SMS
+        queue sharded by the messages' senders, so every sender of the messaging client's sender pool (if
+        configured) sends its recipients' messages within its own rate budget.
+
+        Args:
+            messages: The normalized phone numbers of the participants to message, the participants and their
+                recipients.
+
+        Returns:
+            The number of messages sent.
+
+        """
+        return MessagePipeline(
+            render=self.render_message,
+            get_route=self.get_route,
+            send=self.send_message,
+            record=self.record_response,
+        ).run(messages)
+
+    def render_message(self, phone_number: str, participant: Participant, recipient: Participant) -> OutgoingMessage:
+        """Render the message of who the ``participant``'s recipient is.
+
+        Args:
+            phone_number: The participant's normalized phone number.
+            participant: The participant to message, i.e. the gift giver.
+            recipient: The participant's recipient, i.e. the gift receiver.
+
+        Returns:
+            The rendered message, along with the channel it's sent through (see ``get_channel``). If the assignments
+            are revealed on demand, the assignment is sealed (unless it's a dry run), and the message only holds the
+            link to the reveal endpoint and the participant's new one-time code.
+
+        """
+        with tracing.start_span("render", phone_number=phone_number):
+            if self.reveal_store is not None:
+                # A participant already messaged by the run keeps its sealed assignment (and code), as it's not
+                # messaged
+                already_messaged = bool(self.run_state) and (
+                    self.run_state.get_message_key(phone_number) in self.run_state.claimed_keys  # type: ignore[union-attr]
+                )
+                if self.dry_run or already_messaged:
+                    code = "-"
+                else:
+                    code = self.reveal_store.seal(phone_number, recipient.full_name)
+                body = SecretSanta.get_reveal_message(participant, self.reveal_url, code)  # type: ignore[arg-type]
+            else:
+                body = SecretSanta.get_secret_santa_message(participant, recipient)
+            return OutgoingMessage(
+                phone_number=phone_number,
+                participant=participant,
+                recipient=recipient,
+                body=body,
+                channel=self.get_channel(participant),
+            )
+
+    def get_route(self, message: OutgoingMessage) -> tuple[Channel, str | None]:
+        """Get the send queue of the ``message``: its channel, and its sender in case it's sent by SMS.
+
+        Args:
+            message: The rendered message.
+
+        Returns:
+            The message's channel and sender.
+
+        """
+        if message.channel == Channel.sms:
+            return message.channel, self.messaging_client.get_sender(message.participant.phone_number)
+        return message.channel, None
+
+    def get_schedule(self, messages: dict[str, tuple[Participant, Participant]]) -> dict[str, float]:
+        """Get the send times of the run's messages which are yet to be sent.
+
+        The messages are scheduled once per run, so a resumed run keeps the send times planned by the original run,
+        except for the overdue messages, which are planned again within their participants' next delivery windows.
+
+        Args:
+            messages: The messages to send, as a mapping of the phone numbers to message to their participants and
+                recipients.
+
+        Returns:
+            A mapping of the phone numbers to message to their send times (UNIX timestamps).
+
+        """
+        assert self.delivery_scheduler, "The messages can only be scheduled with a delivery scheduler"
+        recipients = [
+            (phone_number, participant.time_zone)
+            for phone_number, (participant, _) in messages.items()
+            if not self.run_state or self.run_state.get_message_key(phone_number) not in self.run_state.claimed_keys
+        ]
+        if not self.run_state:
+            return self.delivery_scheduler.plan(recipients)
+        if (resumed_schedule := self.run_state.schedule) is None:
+            schedule = self.delivery_scheduler.plan(recipients)
+            self.run_state.record_schedule(schedule)
+            return schedule
+
+        self.logger.info(f"Resuming the schedule of run {self.run_state.run_id}")
+        schedule = self.delivery_scheduler.reschedule(resumed_schedule, recipients)
+        if any(send_at != resumed_schedule.get(phone_number) for phone_number, send_at in schedule.items()):
+            self.run_state.record_schedule({**resumed_schedule, **schedule})
+        return schedule
+
+    def message_participant(self, participant: Participant, recipient: Participant, phone_number: str) -> None:
+        """Send the ``participant`` the message of who their ``recipient`` is, unless the run already did.
+
+        Args:
+            participant: The participant to message, i.e. the gift giver.
+            recipient: The participant's recipient, i.e. the gift receiver.
+            phone_number: The participant's normalized phone number.
+
+        """
+        message = self.render_message(phone_number, participant, recipient)
+        if response := self.send_message(message):
+            self.record_response(message, response)
+
+    def send_message(self, message: OutgoingMessage) -> MessageResponse | None:
+        """Send the rendered ``message`` through its channel, unless the run already did.
+
+        The message is claimed in the run's state (by its idempotency key) before being sent, so a resumed run,
+        or a retried send, never messages the same number twice. The claim is released only in case the
+        messaging provider rejected the message (or no provider of the failover chain could send it), i.e. the message
+        was definitely not sent. On any other failure (e.g. a timeout after the provider accepted the message) the
+        claim is kept. A text message waits for its tenant's send slot (if the run shares a rate budget) after being
+        claimed, and the claim is released in case the tenant's quota is used up.
+
+        If tracing, the send is traced by a span of its own, recording the message's channel and sender, the time it
+        waited in its send queue (and for its tenant's send slot), the failover attempt it was sent on (annotated by
+        the messaging client, along with the provider's latency) and its response.
+
+        Args:
+            message: The rendered message.
+
+        Returns:
+            The message's response, or ``None`` if the run already messaged the participant.
+
+        """
+        with tracing.start_span("send_message", kind=tracing.SpanKind.client) as span:
+            if span:
+                span.set_attributes(
+                    phone_number=message.phone_number,
+                    channel=str(message.channel),
+                    sender=self.get_route(message)[1] or "",
+                    queue_wait_ms=(time.monotonic() - message.rendered_at) * 1000,
+                )
+            response = self.claim_and_send(message)
+            if span and response:
+                span.set_attributes(status=response.status, sid=response.sid or "")
+            return response
+
+    def claim_and_send(self, message: OutgoingMessage) -> MessageResponse | None:
+        """Claim the rendered ``message`` in the run's state and send it (see ``send_message``).
+
+        Args:
+            message: The rendered message.
+
+        Returns:
+            The message's response, or ``None`` if the run already messaged the participant.
+
+        """
+        participant = message.participant
+        idempotency_key = self.run_state.get_message_key(message.phone_number) if self.run_state else None
+        if self.run_state and idempotency_key and not self.run_state.claim(idempotency_key, message.phone_number):
+            self.logger.info(f"Not messaging {participant}, as it was already messaged in run {self.run_state.run_id}")
+            return None
+        try:
+            if message.channel == Channel.email and self.email_client and participant.email:
+                return self.email_client.send_message(message.body, participant.email, dry_run=self.dry_run)
+            if self.tenant_queue and not self.dry_run:
+                tracing.set_attributes(tenant_wait_ms=self.tenant_queue.acquire() * 1000)
+            return self.messaging_client.send_message(
+                message.body,
                 participant.phone_number,
                 dry_run=self.dry_run,
+                status_callback=self.status_callback_url,
             )
-            logger.info(f"Message sent to: {participant}, Status: {response.status}")
-        return 0
+        except (TwilioRestException, NoHealthyProviderError, FairShareError, *EMAIL_REJECTED_ERRORS):
+            if self.run_state and idempotency_key:
+                self.run_state.release(idempotency_key)
+            raise
+
+    def record_response(self, message: OutgoingMessage, response: MessageResponse) -> None:
+        """Record the ``response`` of the ``message`` sent in the run's state, and export it (if exporting).
+
+        Args:
+            message: The message sent.
+            response: The message's response.
+
+        """
+        logger.info(f"Message sent to: {message.participant} ({message.channel}), Status: {response.status}")
+        if self.run_state and response.sid:
+            self.run_state.record_message(response.sid, message.participant.phone_number, response.status)
+        if self.export_sink:
+            self.export_sink.write_result(message, response)
 
 
 def load_env(dotenv_path: PathLike | None = None, override_system: bool = False) -> None:
@@ -2,12 +2,23 @@
 
 import os
 import re
+import time
+from collections.abc import Iterator
+from datetime import date
 
 from attr import dataclass
+from twilio.http.http_client import TwilioHttpClient
 from twilio.rest import Client
 
-from secret_santa.const import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_NUMBER
-from secret_santa.util import logging
+from secret_santa.const import (
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_NUMBER,
+    TWILIO_SENDER_POOL,
+    TWILIO_SENDER_RATE,
+)
+from secret_santa.delivery.sender_pool import SenderPool
+from secret_santa.util import logging, tracing
 
 
 @dataclass(kw_only=True)
@@ -16,10 +27,14 @@ class MessageResponse:
 
     Attributes:
         status: The status of the send message call.
+        sid: The SID of the message sent, if it was actually sent.
+        error_code: The error code of the message, in case it failed to be delivered.
 
     """
 
     status: str
+    sid: str | None = None
+    error_code: str | None = None
 
 
 class TwilioMessagingService:
@@ -33,10 +48,18 @@ class TwilioMessagingService:
             Warning: Please see the Twilio article on countries permitted to use the alphanumeric sender ID /
             whether pre-registration is needed.
         twilio_client: An instance of the twilio messaging client.
+        sender_pool: The pool of senders the messages are sharded across, if configured. Each recipient is
+            messaged from its sticky sender in the pool (instead of the number / alphanumeric sender ID).
 
     """
 
-    def __init__(self, alphanumeric_id: str | None = None) -> None:
+    def __init__(
+        self,
+        alphanumeric_id: str | None = None,
+        *,
+        sender_pool: SenderPool | None = None,
+        timeout: float | None = None,
+    ) -> None:
         """Initialize the Twilio messaging service.
 
         Args:
@@ -45,6 +68,11 @@ class TwilioMessagingService:
 
                 Warning: Please see the Twilio article on countries permitted to use the alphanumeric sender ID /
                 whether pre-registration is needed.
+            sender_pool: The pool of senders to shard the messages across. If omitted, the pool configured in the
+                environment (``TWILIO_SENDER_POOL``, sending ``TWILIO_SENDER_RATE`` messages per second per sender)
+                will be used, if any. (Defaults to None).
+            timeout: The number of seconds to wait for Twilio to connect / respond to a request. If omitted, the
+                requests never time out. (Defaults to None).
 
         """
         # Set up the class logger
@@ -76,8 +104,12 @@ class TwilioMessagingService:
                 "4) Spaces\n"
             )
 
+        self.sender_pool = sender_pool or self.load_sender_pool()
+
         # Initialize the Twilio client
-        self.twilio_client = Client(username=twilio_account_sid, password=twilio_auth_token)
+        # Only pass an HTTP client if a timeout is set, leaving Twilio's default client otherwise
+        optional_params = {"http_client": TwilioHttpClient(timeout=timeout)} if timeout else {}
+        self.twilio_client = Client(username=twilio_account_sid, password=twilio_auth_token, **optional_params)
 
         self.logger.debug("Twilio client initialized")
 
@@ -103,12 +135,52 @@ class TwilioMessagingService:
 
         return twilio_number, twilio_account_sid, twilio_auth_token  # type: ignore
 
+    def load_sender_pool(self) -> SenderPool | None:
+        """Load the sender pool from the environment variables, if configured.
+
+        Returns:
+            The pool of the comma separated senders in ``TWILIO_SENDER_POOL``, or ``None`` if it's not set.
+
+        """
+        senders = os.getenv(TWILIO_SENDER_POOL)
+        if not senders:
+            return None
+        sender_pool = SenderPool.from_string(
+            senders,
+            messages_per_second=float(os.getenv(TWILIO_SENDER_RATE) or 1),
+        )
+        self.logger.debug(f"Loaded a pool of {len(sender_pool.senders)} senders")
+        return sender_pool
+
+    @property
+    def senders(self) -> list[str]:
+        """The senders the messages are sent from."""
+        if self.sender_pool:
+            return self.sender_pool.senders
+        return [self.alphanumeric_id if self.alphanumeric_id else self.twilio_number]
+
+    def get_sender(self, to: str) -> str:
+        """Get the sender to message the recipient from.
+
+        Args:
+            to: The recipient's phone number.
+
+        Returns:
+            The recipient's sticky sender in the sender pool if configured, otherwise the alphanumeric sender ID (if
+            set) or the number provided in the environment.
+
+        """
+        if self.sender_pool:
+            return self.sender_pool.get_sender(to)
+        return self.alphanumeric_id if self.alphanumeric_id else self.twilio_number
+
     def send_message(
         self,
         body: str,
         to: str,
         *,
         dry_run: bool,
+        status_callback: str | None = None,
     ) -> MessageResponse:
         """Send a text message with the string specified in the ``body`` to the number specified in ``to``.
 
@@ -116,19 +188,58 @@ class TwilioMessagingService:
             body: The message to be sent to the number specified in the ``to`` parameter.
             to: The number of the recipient of the message specified in the ``body`` parameter.
             dry_run: If True, the invocation would be a dry run, i.e. the service won't actually send the message.
+            status_callback: A URL Twilio will call back on every status change of the message, if provided.
+                (Defaults to None).
 
         Returns:
             A message response instance as a response of the message sent (or not sent in case of a dry run).
         """
         # Send the "body" message to the number specified in the "to" param
-        # If an alphanumeric sender ID has been set, use it as the sender ID,
+        # If a sender pool is configured, send it from the recipient's sticky sender in the pool (once the sender's
+        # rate budget allows), otherwise - If an alphanumeric sender ID has been set, use it as the sender ID,
         # otherwise - Use the number provided in the environment
         if dry_run:
             # No need to actually send a message
             return MessageResponse(status="Not executed (DRY RUN)")
+        sender = self.get_sender(to)
+        if self.sender_pool:
+            tracing.set_attributes(sender_wait_ms=self.sender_pool.acquire(sender) * 1000)
+        # Only pass the status callback if provided, leaving it unset (rather than empty) otherwise
+        optional_params = {"status_callback": status_callback} if status_callback else {}
+        request_started_at = time.perf_counter()
         response = self.twilio_client.messages.create(
             body=body,
             to=to,
-            from_=self.alphanumeric_id if self.alphanumeric_id else self.twilio_number,
+            from_=sender,
+            **optional_params,
         )
-        return MessageResponse(status=str(response.status))
+        tracing.set_attributes(sender=sender, http_latency_ms=(time.perf_counter() - request_started_at) * 1000)
+        return MessageResponse(status=str(response.status), sid=response.sid)
+
+    def list_messages(
+        self,
+        date_sent: date,
+        *,
+        sender: str | None = None,
+        page_size: int = 1000,
+    ) -> Iterator[MessageResponse]:
+        """Iterate over the messages sent from the service's senders on ``date_sent``, fetching them page by page.
+
+        Args:
+            date_sent: The (UTC) date the messages were sent on.
+            sender: If provided, only the messages sent from this sender are listed. (Defaults to None).
+            page_size: The number of messages fetched per request. (Defaults to 1000, Twilio's maximum).
+
+        Yields:
+            A message response of each message sent on ``date_sent``.
+
+        """
+        for from_number in [sender] if sender else self.senders:
+            for message in self.twilio_client.messages.stream(
+                from_=from_number, date_sent=date_sent, page_size=page_size
+            ):
+                yield MessageResponse(
+                    status=str(message.status),
+                    sid=message.sid,
+                    error_code=str(message.error_code) if message.error_code else None,
+                )
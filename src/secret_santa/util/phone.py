@@ -0,0 +1,51 @@
+"""Phone number utilities."""
+
+import functools
+import re
+
+# Characters people commonly use to format phone numbers, e.g. "+1 (234) 567-890" / "+1.234.567.890"
+PHONE_NUMBER_FORMATTING_PATTERN = re.compile(r"[\s\-.()/]")
+# The international call prefix used in most countries, e.g. "001234567890" -> "+1234567890"
+INTERNATIONAL_CALL_PREFIX_PATTERN = re.compile(r"^(?:00|011)")
+# A national number's trunk prefix, dropped when prefixed with the country code, e.g. "0501234567" -> "+972501234567"
+TRUNK_PREFIX_PATTERN = re.compile(r"^0")
+# E.164: a "+" followed by up to 15 digits. The country code's validity is left to the messaging provider to check.
+E164_PATTERN = re.compile(r"^\+\d{2,15}$")
+
+NORMALIZATION_CACHE_SIZE = 1 << 16
+
+
+class InvalidPhoneNumberError(ValueError):
+    """Raised when a phone number could not be normalized into the E.164 format."""
+
+
+@functools.lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)
+def normalize_phone_number(phone_number: str, default_country_code: str | None = None) -> str:
+    """Normalize the ``phone_number`` into its canonical E.164 form (e.g. ``+1 234-567`` -> ``+1234567``).
+
+    The results are memoized, as the same numbers are normalized over and over (loading, deduplication, dispatch).
+
+    Args:
+        phone_number: The phone number to normalize.
+        default_country_code: The country code (e.g. ``+1`` / ``1``) to prefix national numbers (numbers without an
+            international prefix) with. If omitted, national numbers are considered invalid. (Defaults to None).
+
+    Returns:
+        The phone number in the E.164 format.
+
+    Raises:
+        InvalidPhoneNumberError: If the phone number could not be normalized into the E.164 format.
+
+    """
+    normalized_phone_number = PHONE_NUMBER_FORMATTING_PATTERN.sub("", phone_number)
+    if not normalized_phone_number.startswith("+"):
+        if INTERNATIONAL_CALL_PREFIX_PATTERN.match(normalized_phone_number):
+            normalized_phone_number = INTERNATIONAL_CALL_PREFIX_PATTERN.sub("+", normalized_phone_number)
+        elif default_country_code:
+            normalized_phone_number = (
+                f"+{default_country_code.lstrip('+')}{TRUNK_PREFIX_PATTERN.sub('', normalized_phone_number)}"
+            )
+    if not E164_PATTERN.match(normalized_phone_number):
+        invalid_phone_number_err = f"{phone_number!r} is not a valid (E.164) phone number"
+        raise InvalidPhoneNumberError(invalid_phone_number_err)
+    return normalized_phone_number
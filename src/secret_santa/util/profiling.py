@@ -0,0 +1,229 @@
+"""Profiling utilities.
+
+The CPU profile is taken with ``cProfile`` and the memory allocations are traced with ``tracemalloc``, whose
+top allocations are reported at the stage boundaries of a run (e.g. after the participants are loaded, after the
+draw and after the messages are dispatched).
+
+Note:
+    ``cProfile`` monitors the whole interpreter (through ``sys.monitoring``), hence the work done on every thread
+    (e.g. the pipeline's render and send stages) is included in the CPU profile. Only a single profiler may be active
+    at a time, so all the threads share a profile: the functions' own times are reliable, while the cumulative times
+    of calls interleaved between threads are approximate.
+"""
+
+import cProfile
+import pstats
+import tracemalloc
+from pathlib import Path
+from typing import Self
+
+from secret_santa.const import ENCODING
+from secret_santa.util import logging
+
+# pstats' function key: (file name, line number, function name)
+type FunctionKey = tuple[str, int, str]
+
+MAX_COLLAPSED_STACK_DEPTH = 64
+
+
+def get_function_label(function_key: FunctionKey) -> str:
+    """Get the label of the function in a collapsed stack.
+
+    Args:
+        function_key: The function's pstats key.
+
+    Returns:
+        The function's label, e.g. ``secret_santa_module.py:run:226``.
+
+    """
+    file_name, line_number, function_name = function_key
+    if file_name == "~":
+        # Built-in functions, e.g. "<built-in method builtins.len>"
+        return function_name
+    return f"{Path(file_name).name}:{function_name}:{line_number}"
+
+
+def get_callees(raw_stats: dict[FunctionKey, tuple]) -> dict[FunctionKey, dict[FunctionKey, float]]:
+    """Invert the profile's caller edges into callee edges.
+
+    Args:
+        raw_stats: The profile's raw stats, mapping every function to its timings and callers.
+
+    Returns:
+        A mapping of every caller to its callees, and their cumulative time when called from the caller.
+
+    """
+    callees: dict[FunctionKey, dict[FunctionKey, float]] = {}
+    for function_key, function_stats in raw_stats.items():
+        for caller_key, caller_stats in function_stats[-1].items():
+            callees.setdefault(caller_key, {})[function_key] = caller_stats[-1]
+    return callees
+
+
+def collapse_stacks(stats: pstats.Stats) -> dict[str, float]:
+    """Collapse the profile's ``stats`` into stacks, and the (self) time spent at the top of each.
+
+    ``cProfile`` records the calls between every caller and callee rather than whole stacks, hence the stacks are
+    rebuilt by walking the call graph from its roots, splitting the time of a function called from several callers
+    by each caller's share of its cumulative time.
+
+    Args:
+        stats: The profile's stats.
+
+    Returns:
+        A mapping of the collapsed stacks (``a;b;c``) to the time (in seconds) spent at their top.
+
+    """
+    raw_stats: dict[FunctionKey, tuple] = stats.stats  # type: ignore[attr-defined]
+    callees = get_callees(raw_stats)
+    collapsed_stacks: dict[str, float] = {}
+
+    def collapse(stack: tuple[FunctionKey, ...], function_key: FunctionKey, share: float) -> None:
+        _, _, total_time, _, _ = raw_stats[function_key]
+        stack = (*stack, function_key)
+        collapsed_stack = ";".join(get_function_label(stack_function_key) for stack_function_key in stack)
+        collapsed_stacks[collapsed_stack] = collapsed_stacks.get(collapsed_stack, 0) + total_time * share
+        if len(stack) >= MAX_COLLAPSED_STACK_DEPTH:
+            return
+        for callee_key, callee_cumulative_time in callees.get(function_key, {}).items():
+            # Skip recursive calls, their time is already accounted for by the outermost call
+            if callee_key in stack or not (callee_total_cumulative_time := raw_stats[callee_key][3]):
+                continue
+            collapse(stack, callee_key, share * min(callee_cumulative_time / callee_total_cumulative_time, 1))
+
+    for function_key, function_stats in raw_stats.items():
+        if not function_stats[-1]:
+            collapse((), function_key, 1)
+    return collapsed_stacks
+
+
+def write_collapsed_stacks(stats: pstats.Stats, collapsed_stacks_path: Path) -> int:
+    """Write the profile's ``stats`` as collapsed stacks (``a;b;c <microseconds>`` lines), ready for a flamegraph.
+
+    Args:
+        stats: The profile's stats.
+        collapsed_stacks_path: Path to write the collapsed stacks to.
+
+    Returns:
+        The number of stacks written.
+
+    """
+    stacks_written = 0
+    with collapsed_stacks_path.open("w", encoding=ENCODING) as collapsed_stacks_file:
+        for collapsed_stack, stack_time in collapse_stacks(stats).items():
+            if (microseconds := round(stack_time * 1_000_000)) > 0:
+                collapsed_stacks_file.write(f"{collapsed_stack} {microseconds}\n")
+                stacks_written += 1
+    return stacks_written
+
+
+class Profiler:
+    """Profiles the CPU time and / or the memory allocations of a run.
+
+    Attributes:
+        logger: The class logger.
+        profile_path: Path to write the ``cProfile`` stats to, if the CPU time is profiled.
+        collapsed_stacks: Whether to write the CPU profile as collapsed stacks as well (next to the stats, with a
+            ``.collapsed`` suffix).
+        trace_malloc_path: Path to write the top allocations of every stage to, if the memory allocations are traced.
+        top_allocations: The number of top allocations reported per stage.
+        traceback_frames: The number of frames stored per allocation traced.
+
+    """
+
+    def __init__(
+        self,
+        profile_path: Path | None = None,
+        *,
+        collapsed_stacks: bool = False,
+        trace_malloc_path: Path | None = None,
+        top_allocations: int = 10,
+        traceback_frames: int = 1,
+    ) -> None:
+        """Initialize the profiler.
+
+        Args:
+            profile_path: If provided, the CPU time is profiled and its ``cProfile`` stats are written to this path
+                (readable with ``pstats`` / ``snakeviz``). (Defaults to None).
+            collapsed_stacks: If True, write the CPU profile as collapsed stacks as well, to be rendered by
+                ``flamegraph.pl`` / ``speedscope``. (Defaults to False).
+            trace_malloc_path: If provided, the memory allocations are traced and the top allocations of every stage
+                are written to this path. (Defaults to None).
+            top_allocations: The number of top allocations to report per stage. (Defaults to 10).
+            traceback_frames: The number of frames to store per allocation traced. (Defaults to 1).
+
+        """
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.profile_path = profile_path
+        self.collapsed_stacks = collapsed_stacks
+        self.trace_malloc_path = trace_malloc_path
+        self.top_allocations = top_allocations
+        self.traceback_frames = traceback_frames
+        self._profile = cProfile.Profile() if profile_path else None
+        self._previous_snapshot: tracemalloc.Snapshot | None = None
+        self._stages_report: list[str] = []
+
+    @property
+    def collapsed_stacks_path(self) -> Path | None:
+        """Path to write the collapsed stacks to, if written."""
+        return self.profile_path.with_suffix(".collapsed") if self.profile_path and self.collapsed_stacks else None
+
+    def start(self) -> None:
+        """Start profiling."""
+        if self.trace_malloc_path:
+            tracemalloc.start(self.traceback_frames)
+        if self._profile:
+            self._profile.enable()
+
+    def snapshot(self, stage: str) -> None:
+        """Report the top allocations at the end of the ``stage``, and the allocations grown since the last stage.
+
+        Args:
+            stage: The name of the stage which just ended.
+
+        """
+        if not self.trace_malloc_path or not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(inclusive=False, filename_pattern=tracemalloc.__file__),
+                tracemalloc.Filter(inclusive=False, filename_pattern=__file__),
+            ],
+        )
+        current_size, peak_size = tracemalloc.get_traced_memory()
+        stage_report = [f"== {stage}: current {current_size / 1024:.1f} KiB, peak {peak_size / 1024:.1f} KiB"]
+        stage_report.extend(f"  {statistic}" for statistic in snapshot.statistics("lineno")[: self.top_allocations])
+        if self._previous_snapshot:
+            stage_report.append("-- growth since the previous stage:")
+            stage_report.extend(
+                f"  {statistic}"
+                for statistic in snapshot.compare_to(self._previous_snapshot, "lineno")[: self.top_allocations]
+            )
+        self._stages_report.append("\n".join(stage_report))
+        self._previous_snapshot = snapshot
+        self.logger.debug(f"Memory snapshot taken after {stage}: current {current_size} B, peak {peak_size} B")
+
+    def stop(self) -> None:
+        """Stop profiling, and write the profile / the stages' allocations."""
+        if self._profile:
+            self._profile.disable()
+            assert self.profile_path
+            stats = pstats.Stats(self._profile)
+            stats.dump_stats(self.profile_path)
+            self.logger.info(f"CPU profile written to: {self.profile_path}")
+            if collapsed_stacks_path := self.collapsed_stacks_path:
+                write_collapsed_stacks(stats, collapsed_stacks_path)
+                self.logger.info(f"Collapsed stacks written to: {collapsed_stacks_path}")
+        if self.trace_malloc_path and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self.trace_malloc_path.write_text("\n\n".join(self._stages_report) + "\n", encoding=ENCODING)
+            self.logger.info(f"Memory allocations written to: {self.trace_malloc_path}")
+
+    def __enter__(self) -> Self:
+        """Start profiling on entering the profiler's context."""
+        self.start()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Stop profiling on exiting the profiler's context."""
+        self.stop()
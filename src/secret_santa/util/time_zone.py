@@ -0,0 +1,29 @@
+"""Time zone utilities."""
+
+import functools
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+class InvalidTimeZoneError(ValueError):
+    """Raised when a time zone name is not a known IANA time zone."""
+
+
+@functools.cache
+def get_time_zone(time_zone_name: str) -> ZoneInfo:
+    """Get the time zone named ``time_zone_name``.
+
+    Args:
+        time_zone_name: The IANA name of the time zone (e.g. ``Europe/London``).
+
+    Returns:
+        The time zone.
+
+    Raises:
+        InvalidTimeZoneError: If the time zone is unknown.
+
+    """
+    try:
+        return ZoneInfo(time_zone_name)
+    except (ZoneInfoNotFoundError, ValueError) as err:
+        invalid_time_zone_err = f"{time_zone_name!r} is not a known (IANA) time zone"
+        raise InvalidTimeZoneError(invalid_time_zone_err) from err
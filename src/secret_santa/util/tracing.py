@@ -0,0 +1,369 @@
+"""Tracing of a run's stages and messages, by OpenTelemetry compatible spans exported to a local file.
+
+A traced run has a root span, whose children span its stages (loading the participants, drawing the arrangement and
+dispatching the messages), and every message's rendering and sending. The spans are exported in the OTLP JSON
+encoding, a line per batch of spans (as written by the OpenTelemetry Collector's file exporter), hence the trace file
+can be loaded by any OTLP compatible tool without running a collector.
+
+The current span is held by a context variable, so code deep down the send path (e.g. the messaging client) annotates
+the span of the message it sends without the span being passed along. Threads don't inherit the context of the thread
+starting them, hence the work handed over to other threads (e.g. the pipeline's stages, or a thread pool's tasks) is
+bound to the current context by ``bind_context``, while ``asyncio`` tasks inherit it by themselves.
+
+Tracing is disabled unless a root span is started by a ``Tracer``: without a current span, ``start_span`` and
+``set_attributes`` only look the (missing) current span up, hence tracing costs next to nothing when disabled.
+"""
+
+import contextvars
+import json
+import secrets
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from enum import IntEnum
+from os import PathLike
+from pathlib import Path
+from typing import Any, Self
+
+from secret_santa import __version__
+from secret_santa.const import ENCODING
+from secret_santa.util import logging
+
+type AttributeValue = str | bool | int | float
+
+DEFAULT_SPAN_BATCH_SIZE = 512
+SERVICE_NAME = "secret-santa"
+TRACER_NAME = "secret_santa"
+
+
+class SpanKind(IntEnum):
+    """The OTLP kinds of the spans."""
+
+    internal = 1
+    client = 3
+
+
+class SpanStatusCode(IntEnum):
+    """The OTLP status codes of the spans."""
+
+    unset = 0
+    ok = 1
+    error = 2
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+# Entered instead of a span while tracing is disabled (a null context may be entered any number of times)
+_NO_SPAN: AbstractContextManager[None] = nullcontext()
+
+
+def to_otlp_value(value: AttributeValue) -> dict[str, Any]:
+    """Encode an attribute's value as an OTLP JSON ``AnyValue``.
+
+    Args:
+        value: The attribute's value. Values of other types are encoded as strings.
+
+    Returns:
+        The encoded value.
+
+    """
+    # A bool is an int as well, hence it's checked first
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP JSON encodes 64 bit integers as strings
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_attributes(attributes: dict[str, AttributeValue]) -> list[dict[str, Any]]:
+    """Encode the ``attributes`` as OTLP JSON key-values.
+
+    Args:
+        attributes: The attributes.
+
+    Returns:
+        The encoded attributes.
+
+    """
+    return [{"key": key, "value": to_otlp_value(value)} for key, value in attributes.items()]
+
+
+class Span:
+    """A timed operation of a trace, e.g. a stage of a run or a message sent.
+
+    Attributes:
+        tracer: The tracer the span was started by.
+        name: The span's name.
+        trace_id: The ID of the span's trace (32 hex digits).
+        span_id: The span's ID (16 hex digits).
+        parent_span_id: The ID of the span's parent, unless it's the trace's root span.
+        kind: The span's kind.
+        attributes: The span's attributes.
+        start_time: When the span started (UNIX time, in nanoseconds).
+        end_time: When the span ended (UNIX time, in nanoseconds), if it did.
+        status_code: The span's status code.
+        status_message: The span's error, if it failed.
+
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        tracer: Tracer,
+        name: str,
+        *,
+        trace_id: str,
+        parent_span_id: str | None,
+        kind: SpanKind,
+        attributes: dict[str, AttributeValue],
+    ) -> None:
+        """Start the span.
+
+        Args:
+            tracer: The tracer starting the span.
+            name: The span's name.
+            trace_id: The ID of the span's trace.
+            parent_span_id: The ID of the span's parent. If ``None``, the span is the trace's root span.
+            kind: The span's kind.
+            attributes: The span's initial attributes.
+
+        """
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes = attributes
+        self.start_time = time.time_ns()
+        self.end_time: int | None = None
+        self.status_code = SpanStatusCode.unset
+        self.status_message = ""
+
+    def set_attributes(self, **attributes: AttributeValue) -> None:
+        """Set the span's ``attributes``, overriding the attributes already set by the same keys."""
+        self.attributes.update(attributes)
+
+    def set_error(self, error: BaseException) -> None:
+        """Mark the span as failed by the ``error``."""
+        self.status_code = SpanStatusCode.error
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        """End the span, and export it."""
+        self.end_time = time.time_ns()
+        self.tracer.exporter.export(self)
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Encode the span as an OTLP JSON span.
+
+        Returns:
+            The encoded span.
+
+        """
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": int(self.kind),
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": to_otlp_attributes(self.attributes),
+            "status": {"code": int(self.status_code), "message": self.status_message},
+        }
+
+
+class FileSpanExporter:
+    """Exports the ended spans to a local file, a line of OTLP JSON (``ExportTraceServiceRequest``) per batch.
+
+    Attributes:
+        logger: The class logger.
+        trace_path: The path of the trace file.
+        batch_size: The number of ended spans which triggers a write.
+        exported_spans: The number of spans written.
+
+    """
+
+    def __init__(self, trace_path: PathLike, *, batch_size: int = DEFAULT_SPAN_BATCH_SIZE) -> None:
+        """Open the trace file.
+
+        Args:
+            trace_path: The path of the trace file. It's overwritten if it already exists.
+            batch_size: The number of ended spans which triggers a write. (Defaults to 512).
+
+        """
+        assert batch_size > 0, "The exported batches should hold at least one span"
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self.trace_path = Path(trace_path)
+        self.batch_size = batch_size
+        self.exported_spans = 0
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._file = self.trace_path.open("w", encoding=ENCODING)
+
+    def export(self, span: Span) -> None:
+        """Buffer the ended ``span``, writing the buffered spans in case the batch is full."""
+        with self._lock:
+            self._spans.append(span)
+            if len(self._spans) >= self.batch_size:
+                self.write_spans()
+
+    def write_spans(self) -> None:
+        """Write the buffered spans as a single line. Should be called while holding the lock."""
+        if not self._spans:
+            return
+        export_request = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": to_otlp_attributes({"service.name": SERVICE_NAME})},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": TRACER_NAME, "version": __version__},
+                            "spans": [span.to_otlp() for span in self._spans],
+                        },
+                    ],
+                },
+            ],
+        }
+        self._file.write(f"{json.dumps(export_request, separators=(',', ':'))}\n")
+        self._file.flush()
+        self.exported_spans += len(self._spans)
+        self._spans.clear()
+
+    def close(self) -> None:
+        """Write the buffered spans and close the trace file."""
+        with self._lock:
+            self.write_spans()
+            self._file.close()
+        self.logger.info(f"Exported {self.exported_spans} spans to {self.trace_path}")
+
+
+class Tracer:
+    """Starts the spans of the traces, and exports them once ended.
+
+    Attributes:
+        exporter: The exporter of the ended spans.
+
+    """
+
+    def __init__(self, exporter: FileSpanExporter) -> None:
+        """Initialize the tracer.
+
+        Args:
+            exporter: The exporter of the ended spans.
+
+        """
+        self.exporter = exporter
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        *,
+        kind: SpanKind = SpanKind.internal,
+        **attributes: AttributeValue,
+    ) -> Iterator[Span]:
+        """Start a span as the current span, a child of the previous current span (or a new trace's root span).
+
+        The span is ended once its context is exited, and is marked as failed in case the context raised.
+
+        Args:
+            name: The span's name.
+            kind: The span's kind. (Defaults to ``SpanKind.internal``).
+            **attributes: The span's initial attributes.
+
+        Yields:
+            The span.
+
+        """
+        parent_span = _current_span.get()
+        span = Span(
+            self,
+            name,
+            trace_id=parent_span.trace_id if parent_span else secrets.token_hex(16),
+            parent_span_id=parent_span.span_id if parent_span else None,
+            kind=kind,
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as error:
+            span.set_error(error)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def close(self) -> None:
+        """Close the tracer's exporter."""
+        self.exporter.close()
+
+    def __enter__(self) -> Self:
+        """Enter the tracer's context."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Close the tracer on exiting its context."""
+        self.close()
+
+
+def get_current_span() -> Span | None:
+    """Get the current span.
+
+    Returns:
+        The current span, or ``None`` if not tracing.
+
+    """
+    return _current_span.get()
+
+
+def start_span(
+    name: str,
+    *,
+    kind: SpanKind = SpanKind.internal,
+    **attributes: AttributeValue,
+) -> AbstractContextManager[Span | None]:
+    """Start a child span of the current span (see ``Tracer.start_span``), unless not tracing.
+
+    Args:
+        name: The span's name.
+        kind: The span's kind. (Defaults to ``SpanKind.internal``).
+        **attributes: The span's initial attributes.
+
+    Returns:
+        The span's context, yielding the span, or ``None`` if not tracing.
+
+    """
+    if (parent_span := _current_span.get()) is None:
+        return _NO_SPAN
+    return parent_span.tracer.start_span(name, kind=kind, **attributes)
+
+
+def set_attributes(**attributes: AttributeValue) -> None:
+    """Set the current span's ``attributes``, unless not tracing."""
+    if (span := _current_span.get()) is not None:
+        span.set_attributes(**attributes)
+
+
+def bind_context[**P, T](function: Callable[P, T]) -> Callable[P, T]:
+    """Bind the ``function`` to the current context, e.g. to run it on another thread within the current span.
+
+    Every call runs in a copy of the context, so the bound function may run on several threads at once.
+
+    Args:
+        function: The function to bind.
+
+    Returns:
+        The bound function.
+
+    """
+    context = contextvars.copy_context()
+
+    def run_in_context(*args: P.args, **kwargs: P.kwargs) -> T:
+        return context.copy().run(function, *args, **kwargs)
+
+    return run_in_context
@@ -0,0 +1,31 @@
+import pytest
+
+from secret_santa.delivery.channel import Channel, InvalidChannelError, get_participant_channel
+from secret_santa.model.participant import Participant
+
+
+@pytest.mark.parametrize(
+    ("participant", "expected_channel"),
+    [
+        (Participant(full_name="John Doe", phone_number="+123456789"), Channel.sms),
+        (Participant(full_name="John Doe", phone_number="+123456789", channel="SMS"), Channel.sms),
+        (
+            Participant(full_name="John Doe", phone_number="+123456789", email="john@example.com", channel=" email "),
+            Channel.email,
+        ),
+    ],
+)
+def test_get_participant_channel(participant: Participant, expected_channel: Channel) -> None:
+    assert get_participant_channel(participant) == expected_channel, "The participant's channel does not match."
+
+
+@pytest.mark.parametrize(
+    "participant",
+    [
+        Participant(full_name="John Doe", phone_number="+123456789", channel="pigeon"),
+        Participant(full_name="John Doe", phone_number="+123456789", channel="email"),
+    ],
+)
+def test_get_invalid_participant_channel(participant: Participant) -> None:
+    with pytest.raises(InvalidChannelError):
+        get_participant_channel(participant)
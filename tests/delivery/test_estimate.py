@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from secret_santa.delivery.estimate import (
+    Encoding,
+    classify_message,
+    count_segments,
+    estimate_messages,
+    get_sample_recipients,
+)
+from secret_santa.model.participant import Participant
+
+
+@pytest.mark.parametrize(
+    ("body", "expected_encoding", "expected_length"),
+    [
+        ("Hello John Doe", Encoding.gsm_7, 14),
+        ("Hello Zoé, Ñandor & Ødegaard", Encoding.gsm_7, 28),
+        ("Price: 10€ [gift]", Encoding.gsm_7, 20),
+        ("Hello Łukasz", Encoding.ucs_2, 12),
+        ("Ho ho ho 🎅", Encoding.ucs_2, 11),
+    ],
+)
+def test_classify_message(body: str, expected_encoding: Encoding, expected_length: int) -> None:
+    assert classify_message(body) == (expected_encoding, expected_length)
+
+
+@pytest.mark.parametrize(
+    ("encoding", "length", "expected_segments"),
+    [
+        (Encoding.gsm_7, 160, 1),
+        (Encoding.gsm_7, 161, 2),
+        (Encoding.gsm_7, 306, 2),
+        (Encoding.gsm_7, 307, 3),
+        (Encoding.ucs_2, 70, 1),
+        (Encoding.ucs_2, 71, 2),
+        (Encoding.ucs_2, 135, 3),
+    ],
+)
+def test_count_segments(encoding: Encoding, length: int, expected_segments: int) -> None:
+    assert count_segments(encoding, length) == expected_segments
+
+
+def test_get_sample_recipients() -> None:
+    participants = [Participant(full_name=f"Participant {index}", phone_number=f"+1{index:09}") for index in range(50)]
+
+    recipients = get_sample_recipients(participants, rng=random.Random(0))
+
+    assert sorted(recipient.phone_number for recipient in recipients) == sorted(
+        participant.phone_number for participant in participants
+    ), "The sample arrangement should be a permutation of the participants."
+    assert all(participant is not recipient for participant, recipient in zip(participants, recipients, strict=True)), (
+        "No one should give to themselves."
+    )
+
+
+def test_estimate_messages() -> None:
+    participants = [Participant(full_name=f"Participant {index}", phone_number=f"+1{index:09}") for index in range(5)]
+    messages = [(participant, "Ho" * 40) for participant in participants]
+    messages[1] = (participants[1], "Hello Łukasz, " + "Ho" * 40)
+    messages[3] = (participants[3], "Ho" * 81)
+
+    cost_estimate = estimate_messages(messages, price_per_segment=0.01, worst_offenders=2)
+
+    assert cost_estimate.messages == len(participants)
+    assert cost_estimate.encodings == {Encoding.gsm_7: 4, Encoding.ucs_2: 1}
+    assert cost_estimate.segments_histogram == {1: 3, 2: 2}
+    assert cost_estimate.segments == 7  # noqa: PLR2004
+    assert cost_estimate.cost == pytest.approx(0.07)
+    assert [message_estimate.participant for message_estimate in cost_estimate.worst_offenders] == [
+        participants[3],
+        participants[1],
+    ], "The messages taking the most segments should be reported, the worst first."
+    assert cost_estimate.worst_offenders[1].non_gsm_7_characters == "Ł"
@@ -0,0 +1,90 @@
+import csv
+import json
+from pathlib import Path
+
+import pytest
+
+from secret_santa.const import ENCODING
+from secret_santa.delivery.channel import Channel
+from secret_santa.delivery.export import (
+    EXPORT_FIELDS,
+    ExportError,
+    ExportEvent,
+    ExportFormat,
+    ExportSink,
+    detect_export_format,
+    open_export_sink,
+)
+from secret_santa.delivery.pipeline import OutgoingMessage
+from secret_santa.model.participant import Participant
+from secret_santa.twilio_messaging_service import MessageResponse
+
+GIVER = Participant(full_name="Giver", phone_number="+15550000001")
+RECIPIENT = Participant(full_name="Recipient", phone_number="+15550000002")
+
+
+def export_run(export_path: Path, *, batch_size: int = 2) -> None:
+    with open_export_sink(export_path, run_id="test-run", batch_size=batch_size) as export_sink:
+        export_sink.write_pair(GIVER.phone_number, GIVER, RECIPIENT)
+        export_sink.write_result(
+            OutgoingMessage(
+                phone_number=GIVER.phone_number,
+                participant=GIVER,
+                recipient=RECIPIENT,
+                body="Hello",
+                channel=Channel.sms,
+            ),
+            MessageResponse(status="queued", sid="SM1"),
+        )
+        export_sink.write_pair(RECIPIENT.phone_number, RECIPIENT, GIVER)
+
+
+def test_detect_export_format() -> None:
+    assert detect_export_format(Path("run.CSV")) == ExportFormat.csv
+    assert detect_export_format(Path("run.ndjson")) == ExportFormat.jsonl
+    with pytest.raises(ExportError):
+        detect_export_format(Path("run.xlsx"))
+
+
+def test_export_sink_is_abstract(tmp_path: Path) -> None:
+    with pytest.raises(TypeError):
+        ExportSink(tmp_path / "export.csv")  # type: ignore[abstract]
+
+
+def test_csv_export(tmp_path: Path) -> None:
+    export_path = tmp_path / "run.csv"
+    export_run(export_path)
+    with export_path.open(encoding=ENCODING, newline="") as export_file:
+        rows = list(csv.DictReader(export_file))
+    assert tuple(rows[0]) == EXPORT_FIELDS
+    assert [row["event"] for row in rows] == [ExportEvent.pair, ExportEvent.send, ExportEvent.pair]
+    assert rows[1]["status"] == "queued"
+    assert rows[1]["sid"] == "SM1"
+    assert rows[1]["channel"] == Channel.sms
+    assert all(row["run_id"] == "test-run" for row in rows)
+
+
+def test_jsonl_export_streams_batches(tmp_path: Path) -> None:
+    export_path = tmp_path / "run.jsonl"
+    export_sink = open_export_sink(export_path, batch_size=2)
+    export_sink.write_pair(GIVER.phone_number, GIVER, RECIPIENT)
+    assert export_path.read_text(encoding=ENCODING) == "", "A partial batch should stay buffered."
+    export_sink.write_pair(RECIPIENT.phone_number, RECIPIENT, GIVER)
+    assert len(export_path.read_text(encoding=ENCODING).splitlines()) == 2, "A full batch should be written."  # noqa: PLR2004
+    export_sink.write_pair(GIVER.phone_number, GIVER, RECIPIENT)
+    export_sink.close()
+
+    rows = [json.loads(line) for line in export_path.read_text(encoding=ENCODING).splitlines()]
+    assert [row["giver"] for row in rows] == ["Giver", "Recipient", "Giver"]
+    assert rows[0]["sid"] is None
+    assert export_sink.rows == 3  # noqa: PLR2004
+
+
+def test_parquet_export(tmp_path: Path) -> None:
+    parquet = pytest.importorskip("pyarrow.parquet")
+    export_path = tmp_path / "run.parquet"
+    export_run(export_path)
+    table = parquet.read_table(export_path)
+    assert table.column_names == list(EXPORT_FIELDS)
+    assert table.column("event").to_pylist() == [ExportEvent.pair, ExportEvent.send, ExportEvent.pair]
+    assert parquet.ParquetFile(export_path).num_row_groups == 2, "Every batch should be a row group."  # noqa: PLR2004
@@ -0,0 +1,207 @@
+import json
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import ReadTimeout
+from twilio.base.exceptions import TwilioRestException
+
+from secret_santa.delivery.failover import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    FailoverMessagingService,
+    NoHealthyProviderError,
+)
+from secret_santa.delivery.spool import SPOOLED_STATUS, SpoolMessagingService
+from secret_santa.twilio_messaging_service import MessageResponse
+from secret_santa.util.tracing import FileSpanExporter, Tracer
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def fail(*_: object, **__: object) -> None:
+    raise TwilioRestException(503, "https://api.twilio.com", msg="Service Unavailable")
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def circuit_breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker("Twilio", window_size=4, minimum_calls=4, open_seconds=30, latency_threshold=5, clock=clock)
+
+
+def test_circuit_opens_on_failure_rate(circuit_breaker: CircuitBreaker) -> None:
+    for _ in range(2):
+        circuit_breaker.call(lambda: None)
+        with pytest.raises(TwilioRestException):
+            circuit_breaker.call(fail)
+
+    assert circuit_breaker.state == CircuitState.open
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.call(lambda: None)
+
+
+def test_circuit_opens_on_latency(circuit_breaker: CircuitBreaker, clock: FakeClock) -> None:
+    def slow_call() -> None:
+        clock.now += 6
+
+    for _ in range(4):
+        circuit_breaker.call(slow_call)
+
+    assert circuit_breaker.state == CircuitState.open, "Slow calls should count as failed."
+
+
+def test_circuit_ignores_rejections(circuit_breaker: CircuitBreaker) -> None:
+    def reject() -> None:
+        raise TwilioRestException(400, "https://api.twilio.com", msg="Invalid 'To' Phone Number")
+
+    for _ in range(4):
+        with pytest.raises(TwilioRestException):
+            circuit_breaker.call(reject)
+
+    assert circuit_breaker.state == CircuitState.closed, "A rejected message is a healthy response of the provider."
+
+
+def test_half_open_probe(circuit_breaker: CircuitBreaker, clock: FakeClock) -> None:
+    for _ in range(4):
+        with pytest.raises(TwilioRestException):
+            circuit_breaker.call(fail)
+    clock.now += 30
+    assert circuit_breaker.state == CircuitState.half_open
+
+    with pytest.raises(TwilioRestException):
+        circuit_breaker.call(fail)
+    assert circuit_breaker.state == CircuitState.open, "A failed probe should open the circuit again."
+
+    clock.now += 30
+    assert circuit_breaker.allow(), "The probe call should be let through."
+    assert not circuit_breaker.allow(), "A single probe call should be let through at a time."
+    circuit_breaker.record(failed=False)
+    assert circuit_breaker.state == CircuitState.closed, "A successful probe should close the circuit."
+
+
+def test_failover_to_spool(mocker: MockerFixture, tmp_path: Path, circuit_breaker: CircuitBreaker) -> None:
+    twilio_client = mocker.MagicMock()
+    twilio_client.send_message.side_effect = RequestsConnectionError("Connection refused")
+    spool = SpoolMessagingService(tmp_path / "spool.jsonl")
+    failover_messaging_service = FailoverMessagingService(
+        [(twilio_client, circuit_breaker), (spool, CircuitBreaker("Spool"))],
+    )
+
+    responses = [
+        failover_messaging_service.send_message("Hello", f"+123456789{index}", dry_run=False) for index in range(10)
+    ]
+
+    assert all(response.status == SPOOLED_STATUS for response in responses)
+    assert [message["to"] for message in spool.load_messages()] == [f"+123456789{index}" for index in range(10)]
+    assert twilio_client.send_message.call_count == 4, "Twilio should be skipped once its circuit opened."  # noqa: PLR2004
+
+
+def test_failover_traces_attempt(mocker: MockerFixture, tmp_path: Path, circuit_breaker: CircuitBreaker) -> None:
+    twilio_client = mocker.MagicMock()
+    twilio_client.send_message.side_effect = RequestsConnectionError("Connection refused")
+    failover_messaging_service = FailoverMessagingService(
+        [(twilio_client, circuit_breaker), (SpoolMessagingService(tmp_path / "spool.jsonl"), CircuitBreaker("Spool"))],
+    )
+
+    with Tracer(FileSpanExporter(tmp_path / "trace.jsonl")) as tracer, tracer.start_span("send_message") as span:
+        failover_messaging_service.send_message("Hello", "+1234567890", dry_run=False)
+
+    assert (span.attributes["attempt"], span.attributes["provider"]) == (2, "Spool"), (
+        "The span should record the attempt the message was sent on, and its provider."
+    )
+
+
+def test_failover_ambiguous_failure(mocker: MockerFixture, tmp_path: Path, circuit_breaker: CircuitBreaker) -> None:
+    twilio_client = mocker.MagicMock()
+    twilio_client.send_message.side_effect = ReadTimeout("Read timed out")
+    spool = SpoolMessagingService(tmp_path / "spool.jsonl")
+    failover_messaging_service = FailoverMessagingService(
+        [(twilio_client, circuit_breaker), (spool, CircuitBreaker("Spool"))],
+    )
+
+    with pytest.raises(ReadTimeout):
+        failover_messaging_service.send_message("Hello", "+1234567890", dry_run=False)
+    assert not spool.load_messages(), "A message which might have been sent should not be failed over."
+
+
+def test_failover_no_healthy_provider(mocker: MockerFixture, circuit_breaker: CircuitBreaker) -> None:
+    twilio_client = mocker.MagicMock()
+    twilio_client.send_message.side_effect = fail
+    failover_messaging_service = FailoverMessagingService([(twilio_client, circuit_breaker)])
+
+    with pytest.raises(NoHealthyProviderError):
+        failover_messaging_service.send_message("Hello", "+1234567890", dry_run=False)
+
+
+def test_drain_spool(mocker: MockerFixture, tmp_path: Path) -> None:
+    spool = SpoolMessagingService(tmp_path / "spool.jsonl")
+    for index in range(3):
+        spool.send_message(f"Hello {index}", f"+123456789{index}", dry_run=False)
+    twilio_client = mocker.MagicMock()
+    twilio_client.send_message.side_effect = [
+        MessageResponse(status="queued", sid="SM1"),
+        TwilioRestException(503, "https://api.twilio.com", msg="Service Unavailable"),
+    ]
+
+    responses = spool.drain(twilio_client, dry_run=False)
+
+    assert responses == [MessageResponse(status="queued", sid="SM1")]
+    assert [message["to"] for message in spool.load_messages()] == ["+1234567891", "+1234567892"], (
+        "The messages which were not sent should remain spooled."
+    )
+
+
+def test_drain_spool_quarantines_rejected_message(mocker: MockerFixture, tmp_path: Path) -> None:
+    spool = SpoolMessagingService(tmp_path / "spool.jsonl")
+    for index in range(3):
+        spool.send_message(f"Hello {index}", f"+123456789{index}", dry_run=False)
+    twilio_client = mocker.MagicMock()
+    twilio_client.send_message.side_effect = [
+        TwilioRestException(400, "https://api.twilio.com", msg="Invalid 'To' Phone Number"),
+        MessageResponse(status="queued", sid="SM1"),
+        MessageResponse(status="queued", sid="SM2"),
+    ]
+
+    responses = spool.drain(twilio_client, dry_run=False)
+
+    assert [response.sid for response in responses] == ["SM1", "SM2"], (
+        "A rejected message should not block the messages spooled after it."
+    )
+    assert not spool.load_messages()
+    rejected_messages = [json.loads(line) for line in spool.rejected_path.read_text(encoding="utf-8").splitlines()]
+    assert [message["to"] for message in rejected_messages] == ["+1234567890"]
+    assert "Invalid 'To' Phone Number" in rejected_messages[0]["error"]
+
+
+def test_drain_spool_resumes_after_crash(mocker: MockerFixture, tmp_path: Path) -> None:
+    spool = SpoolMessagingService(tmp_path / "spool.jsonl")
+    for index in range(3):
+        spool.send_message(f"Hello {index}", f"+123456789{index}", dry_run=False)
+    crashing_client = mocker.MagicMock()
+    crashing_client.send_message.side_effect = [MessageResponse(status="queued", sid="SM1"), KeyboardInterrupt]
+
+    with pytest.raises(KeyboardInterrupt):
+        spool.drain(crashing_client, dry_run=False)
+    twilio_client = mocker.MagicMock()
+    twilio_client.send_message.return_value = MessageResponse(status="queued", sid="SM2")
+    responses = SpoolMessagingService(spool.spool_path).drain(twilio_client, dry_run=False)
+
+    assert len(responses) == 2  # noqa: PLR2004
+    assert [send_call.args[1] for send_call in twilio_client.send_message.call_args_list] == [
+        "+1234567891",
+        "+1234567892",
+    ], "The message sent before the crash should not be sent again."
+    assert not spool.load_messages()
+    assert not spool.drained_path.exists()
@@ -0,0 +1,179 @@
+import contextlib
+import threading
+import time
+from collections.abc import Callable, Iterator
+
+import pytest
+
+from secret_santa.delivery.fair_share import (
+    FairShareScheduler,
+    SchedulerClosedError,
+    TenantQueue,
+    TenantQuotaExceededError,
+)
+
+WAIT_TIMEOUT_SECONDS = 5
+
+
+def wait_until(condition: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + WAIT_TIMEOUT_SECONDS
+    while not condition():
+        assert time.monotonic() < deadline, "The condition was not met in time"
+        time.sleep(0.001)
+
+
+class GatedBudget:
+    """A budget whose send slots (after the first one) are only refilled once released by the test."""
+
+    def __init__(self) -> None:
+        self.slots = threading.Semaphore(0)
+
+    def sleep(self, _: float) -> None:
+        self.slots.acquire()
+
+
+@pytest.fixture
+def gated_budget() -> GatedBudget:
+    return GatedBudget()
+
+
+@pytest.fixture
+def gated_scheduler(gated_budget: GatedBudget) -> Iterator[FairShareScheduler]:
+    # The clock never advances, hence every send slot but the first waits for the test to release it
+    scheduler = FairShareScheduler(1, clock=lambda: 0.0, sleep=gated_budget.sleep)
+    yield scheduler
+    gated_budget.slots.release(1000)
+    scheduler.close()
+
+
+def acquire_until_closed(tenant: TenantQueue) -> None:
+    # The messages still queued once the test is done fail as the scheduler is closed
+    with contextlib.suppress(SchedulerClosedError):
+        tenant.acquire()
+
+
+def acquire_in_closed_loop(tenant: TenantQueue) -> None:
+    # A send worker, queueing its next message as soon as the previous one is granted its send slot
+    with contextlib.suppress(SchedulerClosedError):
+        while True:
+            tenant.acquire()
+
+
+def queue_messages(tenant: TenantQueue, messages: int) -> None:
+    queued = tenant.metrics().queued
+    for _ in range(messages):
+        threading.Thread(target=acquire_until_closed, args=(tenant,), daemon=True).start()
+    wait_until(lambda: tenant.metrics().queued == queued + messages)
+
+
+def get_sent(scheduler: FairShareScheduler) -> dict[str, int]:
+    return {metrics.tenant: metrics.sent for metrics in scheduler.metrics()}
+
+
+def grant(scheduler: FairShareScheduler, gated_budget: GatedBudget, slots: int) -> dict[str, int]:
+    sent = sum(get_sent(scheduler).values())
+    gated_budget.slots.release(slots)
+    wait_until(lambda: sum(get_sent(scheduler).values()) == sent + slots)
+    return get_sent(scheduler)
+
+
+def test_small_tenant_is_not_starved(gated_scheduler: FairShareScheduler, gated_budget: GatedBudget) -> None:
+    big_tenant = gated_scheduler.get_tenant("big")
+    small_tenant = gated_scheduler.get_tenant("small")
+    # The first message takes the budget's only token, the rest wait for the test to release the send slots
+    big_tenant.acquire()
+    queue_messages(big_tenant, 100)
+    queue_messages(small_tenant, 3)
+
+    assert grant(gated_scheduler, gated_budget, 6) == {"big": 4, "small": 3}, (
+        "The small tenant should get its share right away, rather than after the big tenant's queue."
+    )
+    assert grant(gated_scheduler, gated_budget, 10) == {"big": 14, "small": 3}, (
+        "The big tenant should get the whole budget once the small tenant is done."
+    )
+
+
+def test_weighted_shares(gated_scheduler: FairShareScheduler, gated_budget: GatedBudget) -> None:
+    heavy_tenant = gated_scheduler.get_tenant("heavy", weight=2)
+    light_tenant = gated_scheduler.get_tenant("light", weight=0.5)
+    heavy_tenant.acquire()
+    queue_messages(heavy_tenant, 50)
+    queue_messages(light_tenant, 50)
+
+    sent = grant(gated_scheduler, gated_budget, 40)
+    assert sent["heavy"] - 1 == 4 * sent["light"], "The tenants should send in proportion to their weights."
+
+
+def test_weighted_shares_of_closed_loop_senders(
+    gated_scheduler: FairShareScheduler,
+    gated_budget: GatedBudget,
+) -> None:
+    heavy_tenant = gated_scheduler.get_tenant("heavy", weight=3)
+    light_tenant = gated_scheduler.get_tenant("light")
+    for tenant in (heavy_tenant, light_tenant):
+        threading.Thread(target=acquire_in_closed_loop, args=(tenant,), daemon=True).start()
+    wait_until(lambda: sum(get_sent(gated_scheduler).values()) == 1)
+
+    initial_sent = get_sent(gated_scheduler)
+    for _ in range(40):
+        # Every tenant has a single message in flight, queued again right after its send slot is granted
+        wait_until(lambda: heavy_tenant.metrics().queued == light_tenant.metrics().queued == 1)
+        grant(gated_scheduler, gated_budget, 1)
+    sent = {tenant: count - initial_sent[tenant] for tenant, count in get_sent(gated_scheduler).items()}
+
+    assert sent["heavy"] == pytest.approx(3 * sent["light"], abs=3), (
+        "Senders with a single message in flight should still send in proportion to their weights."
+    )
+
+
+def test_quota() -> None:
+    scheduler = FairShareScheduler(10_000)
+    try:
+        tenant = scheduler.get_tenant("capped", quota=2)
+        tenant.acquire()
+        tenant.acquire()
+        with pytest.raises(TenantQuotaExceededError):
+            tenant.acquire()
+        metrics = tenant.metrics()
+        assert (metrics.sent, metrics.rejected, metrics.quota) == (2, 1, 2)
+    finally:
+        scheduler.close()
+
+
+def test_metrics_wait_times() -> None:
+    scheduler = FairShareScheduler(200)
+    try:
+        tenant = scheduler.get_tenant("tenant")
+        waits = [tenant.acquire() for _ in range(5)]
+        metrics = tenant.metrics()
+        assert metrics.sent == 5  # noqa: PLR2004
+        assert metrics.max_wait == pytest.approx(max(waits))
+        assert metrics.mean_wait == pytest.approx(sum(waits) / 5)
+        assert sum(waits) >= 3 / 200, "The messages should wait for the budget's rate."
+    finally:
+        scheduler.close()
+
+
+def test_close_fails_waiting_messages(gated_budget: GatedBudget) -> None:
+    scheduler = FairShareScheduler(1, clock=lambda: 0.0, sleep=gated_budget.sleep)
+    tenant = scheduler.get_tenant("tenant")
+    tenant.acquire()
+    errors: list[Exception] = []
+
+    def acquire() -> None:
+        try:
+            tenant.acquire()
+        except SchedulerClosedError as err:
+            errors.append(err)
+
+    waiting_thread = threading.Thread(target=acquire, daemon=True)
+    waiting_thread.start()
+    wait_until(lambda: tenant.metrics().queued == 1)
+    closing_thread = threading.Thread(target=scheduler.close, daemon=True)
+    closing_thread.start()
+    waiting_thread.join(WAIT_TIMEOUT_SECONDS)
+    gated_budget.slots.release()
+    closing_thread.join(WAIT_TIMEOUT_SECONDS)
+    assert len(errors) == 1, "The message waiting for a send slot should fail once the scheduler is closed."
+    with pytest.raises(SchedulerClosedError):
+        tenant.acquire()
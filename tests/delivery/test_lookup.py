@@ -0,0 +1,114 @@
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from secret_santa.delivery.lookup import (
+    LookupCache,
+    LookupClient,
+    LookupResult,
+    LookupStandInServer,
+    PhoneLookup,
+    PhoneLookupError,
+)
+from secret_santa.model.participant import Participant
+
+LINE_TYPES = {
+    "+15550000001": "mobile",
+    "+15550000002": "mobile",
+    "+15550000003": "landline",
+    "+15550000004": "nonFixedVoip",
+}
+
+
+@pytest.fixture
+def lookup_server() -> Iterator[LookupStandInServer]:
+    server = LookupStandInServer(("127.0.0.1", 0), LINE_TYPES)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def lookup_client(lookup_server: LookupStandInServer) -> LookupClient:
+    return LookupClient(lookup_server.url, account_sid="AC123", auth_token="not-so-secret")
+
+
+def test_lookup(lookup_client: LookupClient) -> None:
+    assert lookup_client.lookup("+15550000001").messageable
+    landline = lookup_client.lookup("+15550000003")
+    assert (landline.valid, landline.line_type, landline.messageable) == (True, "landline", False)
+    assert not lookup_client.lookup("+15559999999").valid, "Unknown numbers should be invalid."
+
+
+def test_lookup_unreachable() -> None:
+    with pytest.raises(PhoneLookupError):
+        LookupClient("http://127.0.0.1:9", timeout=1).lookup("+15550000001")
+
+
+def test_lookup_cache_ttl(tmp_path: Path) -> None:
+    now = 1_000_000.0
+    cache = LookupCache(tmp_path / "lookups.jsonl", ttl=60, clock=lambda: now)
+    cache.put_many([LookupResult(phone_number="+15550000001", valid=True, line_type="mobile", looked_up_at=now)])
+    assert cache.get("+15550000001") is not None
+    assert LookupCache(tmp_path / "lookups.jsonl", ttl=60, clock=lambda: now + 30).get("+15550000001") is not None, (
+        "The cached results should be kept across runs."
+    )
+    assert LookupCache(tmp_path / "lookups.jsonl", ttl=60, clock=lambda: now + 90).get("+15550000001") is None, (
+        "The expired results should not be served."
+    )
+
+
+def test_lookup_cache_compaction(tmp_path: Path) -> None:
+    cache_path = tmp_path / "lookups.jsonl"
+    cache = LookupCache(cache_path)
+    for _ in range(3):
+        cache.put_many([LookupResult(phone_number="+15550000001", valid=True, looked_up_at=cache.clock())])
+    assert len(cache_path.read_text().splitlines()) == 3  # noqa: PLR2004
+    assert len(LookupCache(cache_path)) == 1
+    assert len(cache_path.read_text().splitlines()) == 1, "The superseded results should be compacted away."
+
+
+def test_lookup_many_only_new_numbers(
+    lookup_client: LookupClient,
+    lookup_server: LookupStandInServer,
+    tmp_path: Path,
+) -> None:
+    phone_lookup = PhoneLookup(lookup_client, cache=LookupCache(tmp_path / "lookups.jsonl"), batch_size=2)
+    results = phone_lookup.lookup_many([*LINE_TYPES, "+15550000001"])
+    assert set(results) == set(LINE_TYPES)
+    assert sorted(lookup_server.lookups) == sorted(LINE_TYPES), "Every number should be looked up once."
+
+    phone_lookup = PhoneLookup(lookup_client, cache=LookupCache(tmp_path / "lookups.jsonl"))
+    phone_lookup.lookup_many([*LINE_TYPES, "+15559999999"])
+    assert lookup_server.lookups[len(LINE_TYPES) :] == ["+15559999999"], "Only the new number should be looked up."
+
+
+def test_filter_messageable(lookup_client: LookupClient) -> None:
+    participants = [
+        Participant(full_name=f"Participant {index}", phone_number=phone_number)
+        for index, phone_number in enumerate([*LINE_TYPES, "+15559999999"])
+    ]
+    emailed_participant = Participant(
+        full_name="Emailed",
+        phone_number="+15550000005",
+        email="emailed@example.com",
+        channel="email",
+    )
+    messageable_participants = PhoneLookup(lookup_client).filter_messageable([*participants, emailed_participant])
+    assert [participant.phone_number for participant in messageable_participants] == [
+        "+15550000001",
+        "+15550000002",
+        "+15550000004",
+        "+15550000005",
+    ], "The landline and invalid numbers should be left out, while emailed participants are not looked up."
+
+
+def test_filter_messageable_lookup_failed() -> None:
+    participants = [Participant(full_name="John Doe", phone_number="+15550000003")]
+    assert PhoneLookup(LookupClient("http://127.0.0.1:9", timeout=1)).filter_messageable(participants) == (
+        participants
+    ), "A failed lookup should not leave the participant out."
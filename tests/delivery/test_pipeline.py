@@ -0,0 +1,106 @@
+import threading
+import time
+from collections.abc import Iterator
+
+import pytest
+
+from secret_santa.delivery.channel import Channel
+from secret_santa.delivery.pipeline import MessagePipeline, OutgoingMessage
+from secret_santa.model.participant import Participant
+from secret_santa.twilio_messaging_service import MessageResponse
+
+PARTICIPANTS = [Participant(full_name=f"Participant {index}", phone_number=f"+1{index:09}") for index in range(100)]
+
+
+def iter_pairs(participants: list[Participant] = PARTICIPANTS) -> Iterator[tuple[str, Participant, Participant]]:
+    for index, participant in enumerate(participants):
+        yield participant.phone_number, participant, participants[index - 1]
+
+
+def render(phone_number: str, participant: Participant, recipient: Participant) -> OutgoingMessage:
+    return OutgoingMessage(
+        phone_number=phone_number,
+        participant=participant,
+        recipient=recipient,
+        body=f"{participant.full_name} -> {recipient.full_name}",
+        channel=Channel.sms,
+    )
+
+
+def get_route(message: OutgoingMessage) -> str:
+    return message.phone_number[-1]
+
+
+def test_pipeline() -> None:
+    sent_threads: dict[str, set[str]] = {}
+    recorded: list[str] = []
+
+    def send(message: OutgoingMessage) -> MessageResponse:
+        sent_threads.setdefault(get_route(message), set()).add(threading.current_thread().name)
+        return MessageResponse(status="queued", sid=message.phone_number)
+
+    pipeline = MessagePipeline(
+        render=render,
+        get_route=get_route,
+        send=send,
+        record=lambda _, response: recorded.append(response.sid),  # type: ignore[arg-type]
+        queue_size=4,
+    )
+
+    assert pipeline.run(iter_pairs()) == len(PARTICIPANTS)
+    assert sorted(recorded) == sorted(participant.phone_number for participant in PARTICIPANTS), (
+        "Every message should have been sent and recorded."
+    )
+    assert len(sent_threads) == 10  # noqa: PLR2004
+    assert all(len(threads) == 1 for threads in sent_threads.values()), "Every route should have its own worker."
+
+
+def test_pipeline_streams_with_backpressure() -> None:
+    drawn_pairs = 0
+    first_message_sent = threading.Event()
+    release_sends = threading.Event()
+
+    def draw() -> Iterator[tuple[str, Participant, Participant]]:
+        nonlocal drawn_pairs
+        for pair in iter_pairs():
+            drawn_pairs += 1
+            yield pair
+
+    def send(message: OutgoingMessage) -> MessageResponse:
+        first_message_sent.set()
+        release_sends.wait(timeout=5)
+        return MessageResponse(status="queued", sid=message.phone_number)
+
+    pipeline = MessagePipeline(
+        render=render,
+        get_route=lambda _: "sms",
+        send=send,
+        record=lambda *_: None,
+        queue_size=2,
+    )
+    pipeline_thread = threading.Thread(target=pipeline.run, args=(draw(),))
+    pipeline_thread.start()
+
+    assert first_message_sent.wait(timeout=5), "The first message should be sent before the draw is done."
+    # The send worker is blocked, hence the draw may only get ahead of it by the queues' capacity
+    time.sleep(0.3)
+    assert drawn_pairs <= 7, "The draw should have been held back by the full queues."  # noqa: PLR2004
+    release_sends.set()
+    pipeline_thread.join(timeout=5)
+    assert drawn_pairs == len(PARTICIPANTS)
+
+
+def test_pipeline_stops_on_error() -> None:
+    sent: list[str] = []
+
+    def send(message: OutgoingMessage) -> MessageResponse:
+        if len(sent) == 3:  # noqa: PLR2004
+            raise TimeoutError
+        sent.append(message.phone_number)
+        return MessageResponse(status="queued")
+
+    pipeline = MessagePipeline(render=render, get_route=lambda _: "sms", send=send, record=lambda *_: None)
+
+    with pytest.raises(TimeoutError):
+        pipeline.run(iter_pairs())
+    assert len(sent) == 3, "No message should be sent once a stage failed."  # noqa: PLR2004
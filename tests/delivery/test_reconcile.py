@@ -0,0 +1,91 @@
+from collections.abc import Iterator
+from datetime import date
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from secret_santa.delivery.reconcile import DeliveryReconciler
+from secret_santa.delivery.run_state import DeliveryCounts, RunStateStore
+from secret_santa.twilio_messaging_service import MessageResponse
+
+SENT_AT = "2025-12-24T12:00:00+00:00"
+
+
+@pytest.fixture
+def run_state(tmp_path: Path) -> Iterator[RunStateStore]:
+    with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+        run_state.record_message("SM1", "+1234567890", "queued")
+        run_state.record_message("SM2", "+0987654321", "queued")
+        run_state.record_message("SM3", "+1234509876", "queued")
+        run_state.record_status("SM3", "delivered")
+        for message in run_state.messages.values():
+            message.sent_at = SENT_AT
+        yield run_state
+
+
+def test_reconcile(mocker: MockerFixture, run_state: RunStateStore) -> None:
+    messages_by_sender = {
+        "+15550001": [MessageResponse(status="delivered", sid="SM0"), MessageResponse(status="delivered", sid="SM1")],
+        "+15550002": [
+            MessageResponse(status="undelivered", sid="SM2", error_code="30003"),
+            MessageResponse(status="delivered", sid="SM4"),
+        ],
+    }
+    messaging_client = mocker.MagicMock(senders=list(messages_by_sender))
+    messaging_client.list_messages.side_effect = lambda _, *, sender, page_size: iter(  # noqa: ARG005
+        messages_by_sender[sender],
+    )
+
+    result = DeliveryReconciler(messaging_client, run_state).reconcile()
+
+    assert sorted(
+        (list_call.args[0], list_call.kwargs["sender"]) for list_call in messaging_client.list_messages.call_args_list
+    ) == [(date(2025, 12, 24), "+15550001"), (date(2025, 12, 24), "+15550002")], (
+        "The messages of every sender should be listed separately."
+    )
+    assert result.fetched_days == 1, "All the messages were sent on the same day."
+    assert result.updated_messages == 2, "Only the pending messages should have been updated."  # noqa: PLR2004
+    assert result.counts == DeliveryCounts(delivered=2, failed=1, pending=0), "The counts do not match."
+    assert run_state.messages["SM2"].error_code == "30003", "The error code should have been recorded."
+
+
+def test_reconcile_stops_paging_once_matched(mocker: MockerFixture, run_state: RunStateStore) -> None:
+    def list_messages(date_sent: date, *, sender: str, page_size: int) -> Iterator[MessageResponse]:  # noqa: ARG001
+        yield MessageResponse(status="delivered", sid="SM1")
+        yield MessageResponse(status="delivered", sid="SM2")
+        pytest.fail("Messages should not be fetched once all the pending messages were matched.")
+
+    messaging_client = mocker.MagicMock(senders=["+15550001"])
+    messaging_client.list_messages.side_effect = list_messages
+
+    assert DeliveryReconciler(messaging_client, run_state).reconcile().counts.pending == 0, (
+        "All the pending messages should have been reconciled."
+    )
+
+
+def test_reconcile_near_midnight(mocker: MockerFixture, run_state: RunStateStore) -> None:
+    # Recorded just after midnight, though the provider sent it just before
+    run_state.messages["SM1"].sent_at = "2025-12-25T00:00:05+00:00"
+    run_state.record_status("SM2", "delivered")
+    messages_by_day = {date(2025, 12, 24): [MessageResponse(status="delivered", sid="SM1")], date(2025, 12, 25): []}
+    messaging_client = mocker.MagicMock(senders=["+15550001"])
+    messaging_client.list_messages.side_effect = lambda date_sent, *, sender, page_size: iter(  # noqa: ARG005
+        messages_by_day[date_sent],
+    )
+
+    result = DeliveryReconciler(messaging_client, run_state).reconcile()
+
+    assert result.fetched_days == 2, "A message recorded near midnight should be looked up on both days."  # noqa: PLR2004
+    assert result.counts.pending == 0, "The message should have been found on the previous day."
+
+
+def test_reconcile_skips_finished_messages(mocker: MockerFixture, run_state: RunStateStore) -> None:
+    run_state.record_status("SM1", "delivered")
+    run_state.record_status("SM2", "failed")
+    messaging_client = mocker.MagicMock()
+
+    result = DeliveryReconciler(messaging_client, run_state).reconcile()
+
+    messaging_client.list_messages.assert_not_called()
+    assert result.fetched_days == 0, "No messages should be fetched once all of them are finished."
@@ -0,0 +1,180 @@
+import http.client
+import json
+import re
+import threading
+from collections.abc import Iterator
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import urlencode
+
+import pytest
+
+from secret_santa.delivery.reveal import (
+    CODE_LENGTH,
+    AlreadyRevealedError,
+    InvalidCodeError,
+    RevealHTTPServer,
+    RevealLockedError,
+    RevealStore,
+    normalize_code,
+)
+
+SECRET = "not-so-secret"
+
+
+@pytest.fixture
+def reveal_store(tmp_path: Path) -> Iterator[RevealStore]:
+    with RevealStore(tmp_path / "reveal.jsonl", SECRET, max_attempts=3) as store:
+        yield store
+
+
+@pytest.fixture
+def reveal_server(reveal_store: RevealStore) -> Iterator[RevealHTTPServer]:
+    server = RevealHTTPServer(("127.0.0.1", 0), reveal_store)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(  # noqa: PLR0913
+    server: RevealHTTPServer,
+    method: str,
+    path: str,
+    body: str | None = None,
+    content_type: str = "application/json",
+    headers: dict[str, str] | None = None,
+) -> tuple[int, object]:
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+    try:
+        connection.request(method, path, body=body, headers={"Content-Type": content_type, **(headers or {})})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_seal_and_reveal(reveal_store: RevealStore) -> None:
+    code = reveal_store.seal("+1234567890", "Jane Doe")
+    assert re.fullmatch(rf"[A-Z2-9]{{{CODE_LENGTH}}}", code), "The code should be short and unambiguous."
+    assert reveal_store.reveal("+1 (234) 567-890", f" {code[:4].lower()}-{code[4:]} ") == "Jane Doe", (
+        "The assignment should be revealed by the phone number and the code, in any format."
+    )
+
+
+def test_reveal_once(reveal_store: RevealStore) -> None:
+    code = reveal_store.seal("+1234567890", "Jane Doe")
+    reveal_store.reveal("+1234567890", code)
+    with pytest.raises(AlreadyRevealedError):
+        reveal_store.reveal("+1234567890", code)
+
+
+def test_reveal_invalid_code(reveal_store: RevealStore) -> None:
+    code = reveal_store.seal("+1234567890", "Jane Doe")
+    with pytest.raises(InvalidCodeError):
+        reveal_store.reveal("+1234567890", "WRONGCODE")
+    with pytest.raises(InvalidCodeError):
+        reveal_store.reveal("+0987654321", code)
+    assert reveal_store.reveal("+1234567890", code) == "Jane Doe", "An invalid attempt should not use up the code."
+
+
+def test_reveal_locked(reveal_store: RevealStore) -> None:
+    code = reveal_store.seal("+1234567890", "Jane Doe")
+    for _ in range(reveal_store.max_attempts):
+        with pytest.raises(InvalidCodeError):
+            reveal_store.reveal("+1234567890", "WRONGCODE")
+    with pytest.raises(RevealLockedError):
+        reveal_store.reveal("+1234567890", code)
+
+
+def test_lockout_outlives_store(tmp_path: Path) -> None:
+    store_path = tmp_path / "reveal.jsonl"
+    with RevealStore(store_path, SECRET, max_attempts=1) as reveal_store:
+        code = reveal_store.seal("+1234567890", "Jane Doe")
+        with pytest.raises(InvalidCodeError):
+            reveal_store.reveal("+1234567890", "WRONGCODE")
+        # Reopened while the first store is still open, as after a crash
+        with RevealStore(store_path, SECRET, max_attempts=1) as restarted_store, pytest.raises(RevealLockedError):
+            restarted_store.reveal("+1234567890", code)
+
+
+def test_reseal(reveal_store: RevealStore) -> None:
+    first_code = reveal_store.seal("+1234567890", "Jane Doe")
+    second_code = reveal_store.seal("+1234567890", "Richard Roe")
+    with pytest.raises(InvalidCodeError):
+        reveal_store.reveal("+1234567890", first_code)
+    assert reveal_store.reveal("+1234567890", second_code) == "Richard Roe", "The latest assignment should be kept."
+
+
+def test_store_is_sealed(tmp_path: Path) -> None:
+    store_path = tmp_path / "reveal.jsonl"
+    with RevealStore(store_path, SECRET) as reveal_store:
+        code = reveal_store.seal("+1234567890", "Jane Doe")
+        reveal_store.seal("+0987654321", "Richard Roe")
+
+    stored = store_path.read_text()
+    for plaintext in ("Jane", "Richard", "1234567890", "0987654321", code):
+        assert plaintext not in stored, "Neither the names, the phone numbers nor the codes should be stored."
+
+    with RevealStore(store_path, "another-secret") as reveal_store, pytest.raises(InvalidCodeError):
+        reveal_store.reveal("+1234567890", code)
+    with RevealStore(store_path, SECRET) as reveal_store:
+        assert len(reveal_store) == 2, "The sealed assignments should be loaded from the store."  # noqa: PLR2004
+        assert reveal_store.reveal("+1234567890", code) == "Jane Doe", "The assignment should outlive the store."
+    with RevealStore(store_path, SECRET) as reveal_store, pytest.raises(AlreadyRevealedError):
+        reveal_store.reveal("+1234567890", code)
+
+
+def test_normalize_code() -> None:
+    assert normalize_code(" abcd-2345 ") == "ABCD2345"
+
+
+def test_serve_reveal(reveal_store: RevealStore, reveal_server: RevealHTTPServer) -> None:
+    code = reveal_store.seal("+1234567890", "Jane Doe")
+    body = json.dumps({"phone_number": "+1234567890", "code": code})
+    assert request(reveal_server, "POST", "/reveal", body) == (HTTPStatus.OK, {"recipient": "Jane Doe"})
+    assert request(reveal_server, "POST", "/reveal", body)[0] == HTTPStatus.GONE, "The code should be one-time."
+
+
+def test_serve_reveal_form(reveal_store: RevealStore, reveal_server: RevealHTTPServer) -> None:
+    code = reveal_store.seal("+1234567890", "Jane Doe")
+    body = urlencode({"phone_number": "+1234567890", "code": code})
+    assert request(reveal_server, "POST", "/reveal", body, "application/x-www-form-urlencoded") == (
+        HTTPStatus.OK,
+        {"recipient": "Jane Doe"},
+    )
+
+
+@pytest.mark.parametrize(
+    ("body", "status"),
+    [
+        ("not json", HTTPStatus.BAD_REQUEST),
+        (json.dumps({"phone_number": "+1234567890"}), HTTPStatus.BAD_REQUEST),
+        (json.dumps({"phone_number": "+1234567890", "code": "WRONGCODE"}), HTTPStatus.FORBIDDEN),
+        (json.dumps({"phone_number": "+0987654321", "code": "WRONGCODE"}), HTTPStatus.FORBIDDEN),
+        (json.dumps({"phone_number": "not a number", "code": "WRONGCODE"}), HTTPStatus.FORBIDDEN),
+    ],
+)
+def test_serve_invalid_reveal(
+    reveal_store: RevealStore,
+    reveal_server: RevealHTTPServer,
+    body: str,
+    status: HTTPStatus,
+) -> None:
+    reveal_store.seal("+1234567890", "Jane Doe")
+    assert request(reveal_server, "POST", "/reveal", body)[0] == status
+
+
+@pytest.mark.parametrize("content_length", ["not a number", "-1"])
+def test_serve_invalid_content_length(reveal_server: RevealHTTPServer, content_length: str) -> None:
+    body = json.dumps({"phone_number": "+1234567890", "code": "WRONGCODE"})
+    assert request(reveal_server, "POST", "/reveal", body, headers={"Content-Length": content_length}) == (
+        HTTPStatus.BAD_REQUEST,
+        {"error": "Invalid Content-Length"},
+    )
+
+
+def test_serve_health(reveal_store: RevealStore, reveal_server: RevealHTTPServer) -> None:
+    reveal_store.seal("+1234567890", "Jane Doe")
+    assert request(reveal_server, "GET", "/health") == (HTTPStatus.OK, {"status": "ok", "assignments": 1})
@@ -0,0 +1,129 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from secret_santa.delivery.run_state import (
+    BatchedEventWriter,
+    DeliveryCounts,
+    DrawOptions,
+    RunStateStore,
+    get_idempotency_key,
+)
+
+
+@pytest.fixture
+def run_state(tmp_path: Path) -> RunStateStore:
+    return RunStateStore("test-run", state_dir=tmp_path)
+
+
+def test_new_run_id() -> None:
+    assert RunStateStore.new_run_id() != RunStateStore.new_run_id(), "Run IDs should be unique."
+
+
+def test_record_status(run_state: RunStateStore) -> None:
+    run_state.record_message("SM1", "+1234567890", "queued")
+    run_state.record_message("SM2", "+0987654321", "queued")
+    run_state.record_message("SM3", "+1234509876", "queued")
+
+    assert run_state.record_status("SM1", "delivered"), "A forward status update should be applied."
+    assert run_state.record_status("SM2", "failed", "30003"), "A forward status update should be applied."
+    assert not run_state.record_status("SM1", "sent"), "A stale (out of order) status update should be ignored."
+
+    assert run_state.messages["SM1"].status == "delivered", "The stale update should not have been applied."
+    assert run_state.messages["SM2"].error_code == "30003", "The error code should have been recorded."
+    assert run_state.counts() == DeliveryCounts(delivered=1, failed=1, pending=1), "The counts do not match."
+
+
+def test_record_status_before_message(tmp_path: Path, run_state: RunStateStore) -> None:
+    assert run_state.record_status("SM1", "sent"), "An update of a message not recorded yet should be kept."
+    assert run_state.record_status("SM1", "failed", "30003"), "A later update should replace the kept one."
+    assert not run_state.record_status("SM1", "queued"), "A stale update should not replace the kept one."
+    assert run_state.counts() == DeliveryCounts(delivered=0, failed=0, pending=0)
+
+    run_state.record_message("SM1", "+1234567890", "queued")
+
+    assert run_state.messages["SM1"].status == "failed", "The kept update should be applied once recorded."
+    assert run_state.messages["SM1"].error_code == "30003"
+    assert run_state.counts() == DeliveryCounts(delivered=0, failed=1, pending=0), "The counts do not match."
+    run_state.close()
+    with RunStateStore("test-run", state_dir=tmp_path) as replayed_run_state:
+        assert replayed_run_state.messages == run_state.messages, "Replaying the log should rebuild the state."
+
+
+def test_replay(tmp_path: Path, run_state: RunStateStore) -> None:
+    run_state.record_message("SM1", "+1234567890", "queued")
+    run_state.record_status("SM1", "sent")
+    run_state.record_status("SM1", "delivered")
+    run_state.close()
+
+    events = [json.loads(line) for line in run_state.log_path.read_text().splitlines()]
+    assert [event["event"] for event in events] == ["message", "status", "status"], "All events should be logged."
+
+    with RunStateStore("test-run", state_dir=tmp_path) as replayed_run_state:
+        assert replayed_run_state.messages == run_state.messages, "Replaying the log should rebuild the state."
+        assert replayed_run_state.counts() == DeliveryCounts(delivered=1, failed=0, pending=0), (
+            "Replaying the log should rebuild the counts."
+        )
+
+
+def test_batched_event_writer(tmp_path: Path) -> None:
+    log_path = tmp_path / "events.jsonl"
+    batch_size = 3
+    writer = BatchedEventWriter(log_path, batch_size=batch_size, flush_interval=60)
+    for event_number in range(batch_size - 1):
+        writer.append({"event": event_number})
+    assert not log_path.exists(), "The events should be buffered until the batch is full."
+    writer.append({"event": batch_size - 1})
+    assert len(log_path.read_text().splitlines()) == batch_size, "A full batch should be written at once."
+    writer.append({"event": batch_size})
+    writer.close()
+    assert len(log_path.read_text().splitlines()) == batch_size + 1, (
+        "Closing the writer should write the buffered events."
+    )
+
+
+def test_claim(tmp_path: Path, run_state: RunStateStore) -> None:
+    first_key = get_idempotency_key(run_state.run_id, "+1234567890")
+    second_key = get_idempotency_key(run_state.run_id, "+0987654321")
+    assert first_key == get_idempotency_key("test-run", "+1234567890"), "The idempotency keys should be deterministic."
+    assert first_key != get_idempotency_key("another-run", "+1234567890"), "The keys should differ between runs."
+
+    assert run_state.claim(first_key, "+1234567890"), "An unclaimed message should be claimed."
+    assert not run_state.claim(first_key, "+1234567890"), "A claimed message should not be claimed again."
+    assert run_state.claim(second_key, "+0987654321"), "An unclaimed message should be claimed."
+    run_state.release(second_key)
+
+    # The claims are written ahead, hence they're visible to a concurrent reader even before closing the run state
+    replayed_run_state = RunStateStore("test-run", state_dir=tmp_path)
+    assert replayed_run_state.claimed_keys == {first_key}, "Only the unreleased claims should be replayed."
+    replayed_run_state.close()
+
+
+def test_record_arrangement_options(tmp_path: Path, run_state: RunStateStore) -> None:
+    draw_options = DrawOptions(min_cycle_length=3, mixing_attributes=("team",))
+    run_state.record_arrangement({"+1": "+2", "+2": "+3", "+3": "+1"}, draw_options)
+    run_state.close()
+
+    with RunStateStore("test-run", state_dir=tmp_path) as replayed_run_state:
+        assert replayed_run_state.draw_options == draw_options, "The draw options should be replayed."
+
+
+def test_record_repair(tmp_path: Path, run_state: RunStateStore) -> None:
+    run_state.record_arrangement({"+1": "+2", "+2": "+3", "+3": "+1"})
+    original_key = run_state.get_message_key("+1")
+    assert original_key == get_idempotency_key(run_state.run_id, "+1"), (
+        "The original draw's keys should not depend on the revision."
+    )
+
+    # "+3" drops out, and "+4" joins between "+2" and "+1"
+    assert run_state.record_repair({"+2": "+4", "+4": "+1"}, ["+3"]) == 1, "The first repair should be revision 1."
+
+    replayed_run_state = RunStateStore("test-run", state_dir=tmp_path)
+    assert replayed_run_state.arrangement == {"+1": "+2", "+2": "+4", "+4": "+1"}, "The repair should be replayed."
+    assert replayed_run_state.arrangement_revision == 1
+    assert replayed_run_state.get_message_key("+1") == original_key, "A giver not reassigned keeps its key."
+    assert replayed_run_state.get_message_key("+2") == get_idempotency_key(run_state.run_id, "+2", 1), (
+        "A reassigned giver should be messaged again, under the revision it was reassigned at."
+    )
+    replayed_run_state.close()
@@ -0,0 +1,101 @@
+from datetime import UTC, datetime
+from datetime import time as time_of_day
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from secret_santa.delivery.schedule import DeliveryScheduler, DeliveryWindow
+
+# 2025-12-24 12:00 UTC
+NOW = datetime(2025, 12, 24, 12, tzinfo=UTC)
+
+
+class FakeClock:
+    def __init__(self, now: datetime) -> None:
+        self.timestamp = now.timestamp()
+
+    def __call__(self) -> float:
+        return self.timestamp
+
+    def sleep(self, seconds: float) -> None:
+        self.timestamp += seconds
+
+
+@pytest.mark.parametrize(
+    ("time_zone", "expected_start", "expected_end"),
+    [
+        # 14:00 local, the window is open
+        ("Asia/Jerusalem", datetime(2025, 12, 24, 12, tzinfo=UTC), datetime(2025, 12, 24, 18, tzinfo=UTC)),
+        # 07:00 local, the window opens at 09:00
+        ("America/New_York", datetime(2025, 12, 24, 14, tzinfo=UTC), datetime(2025, 12, 25, 1, tzinfo=UTC)),
+        # 21:00 local, the window opens on the next day at 09:00
+        ("Asia/Tokyo", datetime(2025, 12, 25, 0, tzinfo=UTC), datetime(2025, 12, 25, 11, tzinfo=UTC)),
+    ],
+)
+def test_delivery_window_opening(time_zone: str, expected_start: datetime, expected_end: datetime) -> None:
+    assert DeliveryWindow().get_opening(NOW, ZoneInfo(time_zone)) == (expected_start, expected_end), (
+        f"The delivery window in {time_zone} does not match the window expected."
+    )
+
+
+def test_plan_spreads_messages_evenly() -> None:
+    clock = FakeClock(NOW)
+    scheduler = DeliveryScheduler(
+        DeliveryWindow(start=time_of_day(9), end=time_of_day(17)),
+        default_time_zone="America/New_York",
+        clock=clock,
+    )
+    schedule = scheduler.plan([("+1", None), ("+2", None), ("+3", "America/New_York"), ("+4", "Asia/Tokyo")])
+
+    window_start = datetime(2025, 12, 24, 14, tzinfo=UTC).timestamp()
+    assert [schedule["+1"], schedule["+2"], schedule["+3"]] == [
+        window_start,
+        window_start + 8 * 3600 / 3,
+        window_start + 2 * 8 * 3600 / 3,
+    ], "The messages sharing a delivery window should be spread evenly across it."
+    assert schedule["+4"] == datetime(2025, 12, 25, 0, tzinfo=UTC).timestamp(), (
+        "A message should be scheduled within its participant's time zone window."
+    )
+
+
+def test_dispatch_in_send_time_order() -> None:
+    clock = FakeClock(NOW)
+    scheduler = DeliveryScheduler(clock=clock, sleep=clock.sleep)
+    schedule = {"+3": NOW.timestamp() + 300, "+1": NOW.timestamp() - 10, "+2": NOW.timestamp() + 60}
+    sent: list[tuple[str, float]] = []
+
+    scheduler.dispatch(schedule, lambda phone_number: sent.append((phone_number, clock())))
+
+    assert [phone_number for phone_number, _ in sent] == ["+1", "+2", "+3"], "The messages should be sent in order."
+    assert all(sent_at >= schedule[phone_number] for phone_number, sent_at in sent), (
+        "No message should be sent before its send time."
+    )
+
+
+def test_reschedule_overdue_messages() -> None:
+    clock = FakeClock(NOW)
+    scheduler = DeliveryScheduler(clock=clock)
+    schedule = {"+1": NOW.timestamp() - 3600, "+2": NOW.timestamp() + 600, "+3": NOW.timestamp() + 900}
+
+    rescheduled = scheduler.reschedule(schedule, [("+1", "Asia/Tokyo"), ("+2", "Asia/Tokyo")])
+
+    assert rescheduled == {"+1": datetime(2025, 12, 25, 0, tzinfo=UTC).timestamp(), "+2": schedule["+2"]}, (
+        "Only the overdue message should be planned again, within its participant's next delivery window."
+    )
+
+
+def test_dispatch_dry_run_does_not_wait() -> None:
+    clock = FakeClock(NOW)
+    scheduler = DeliveryScheduler(clock=clock, sleep=clock.sleep)
+    schedule = {"+2": NOW.timestamp() + 3600, "+1": NOW.timestamp() + 60}
+    sent: list[str] = []
+
+    scheduler.dispatch(schedule, sent.append, dry_run=True)
+
+    assert sent == ["+1", "+2"], "The messages should be shown in order of their send times."
+    assert clock() == NOW.timestamp(), "A dry run should not wait for the messages' send times."
+
+
+def test_invalid_delivery_window() -> None:
+    with pytest.raises(AssertionError):
+        DeliveryScheduler(DeliveryWindow(start=time_of_day(20), end=time_of_day(9)))
@@ -0,0 +1,66 @@
+from collections import Counter
+
+import pytest
+
+from secret_santa.delivery.sender_pool import ConsistentHashRing, SenderPool, TokenBucket
+
+RECIPIENTS = [f"+1555{index:07}" for index in range(10_000)]
+
+
+def test_hash_ring_is_sticky() -> None:
+    ring = ConsistentHashRing(["+15550001", "+15550002", "+15550003"])
+    same_ring = ConsistentHashRing(["+15550003", "+15550001", "+15550002"])
+
+    assert all(ring.get_node(recipient) == same_ring.get_node(recipient) for recipient in RECIPIENTS), (
+        "A recipient's node should not depend on the order of the nodes."
+    )
+
+
+def test_hash_ring_is_balanced() -> None:
+    senders = [f"+1555000{index}" for index in range(4)]
+    ring = ConsistentHashRing(senders)
+
+    recipients_per_sender = Counter(ring.get_node(recipient) for recipient in RECIPIENTS)
+
+    assert set(recipients_per_sender) == set(senders)
+    assert max(recipients_per_sender.values()) < 1.25 * len(RECIPIENTS) / len(senders), (
+        "The recipients should be spread evenly between the senders."
+    )
+
+
+def test_hash_ring_minimal_reassignment() -> None:
+    senders = [f"+1555000{index}" for index in range(4)]
+    ring = ConsistentHashRing(senders)
+    grown_ring = ConsistentHashRing([*senders, "+15550009"])
+
+    moved_recipients = [
+        recipient for recipient in RECIPIENTS if ring.get_node(recipient) != grown_ring.get_node(recipient)
+    ]
+
+    assert all(grown_ring.get_node(recipient) == "+15550009" for recipient in moved_recipients), (
+        "Only recipients of the new sender should have been moved."
+    )
+    assert len(moved_recipients) < 1.5 * len(RECIPIENTS) / 5, "About a fifth of the recipients should have moved."
+
+
+def test_token_bucket() -> None:
+    now = 0.0
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        nonlocal now
+        sleeps.append(seconds)
+        now += seconds
+
+    token_bucket = TokenBucket(2, clock=lambda: now, sleep=sleep)
+    for _ in range(5):
+        token_bucket.acquire()
+
+    assert sleeps == pytest.approx([0.5] * 4), "A full bucket should send at once, and then at the bucket's rate."
+
+
+def test_sender_pool_from_string() -> None:
+    sender_pool = SenderPool.from_string(" +15550001, +15550002,,+15550001 ", messages_per_second=10)
+
+    assert sender_pool.senders == ["+15550001", "+15550002"]
+    assert sender_pool.get_sender(RECIPIENTS[0]) in sender_pool.senders
@@ -0,0 +1,88 @@
+import http.client
+from collections.abc import Iterator
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import urlencode
+
+import pytest
+from twilio.request_validator import RequestValidator
+
+from secret_santa.delivery.run_state import DeliveryCounts, RunStateStore
+from secret_santa.delivery.status_callback import StatusCallbackReceiver
+
+PUBLIC_URL = "https://example.com/status"
+AUTH_TOKEN = "DummyTwilioAuthToken"
+
+
+@pytest.fixture
+def run_state(tmp_path: Path) -> Iterator[RunStateStore]:
+    with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+        run_state.record_message("SM1", "+1234567890", "queued")
+        run_state.record_message("SM2", "+0987654321", "queued")
+        yield run_state
+
+
+@pytest.fixture
+def receiver(run_state: RunStateStore) -> Iterator[StatusCallbackReceiver]:
+    receiver = StatusCallbackReceiver(run_state, public_url=PUBLIC_URL, auth_token=AUTH_TOKEN)
+    receiver.start()
+    yield receiver
+    receiver.stop()
+
+
+def post_status(receiver: StatusCallbackReceiver, params: dict[str, str], signature: str | None = None) -> int:
+    connection = http.client.HTTPConnection(receiver.host, receiver.port, timeout=10)
+    try:
+        connection.request(
+            "POST",
+            "/status",
+            body=urlencode(params),
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+                "X-Twilio-Signature": signature or RequestValidator(AUTH_TOKEN).compute_signature(PUBLIC_URL, params),
+            },
+        )
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def test_receive_status_callbacks(receiver: StatusCallbackReceiver, run_state: RunStateStore) -> None:
+    assert post_status(receiver, {"MessageSid": "SM1", "MessageStatus": "delivered"}) == HTTPStatus.NO_CONTENT
+    assert post_status(receiver, {"MessageSid": "SM2", "MessageStatus": "undelivered", "ErrorCode": "30003"}) == (
+        HTTPStatus.NO_CONTENT
+    )
+
+    assert receiver.wait_for_delivery(timeout=1) == DeliveryCounts(delivered=1, failed=1, pending=0), (
+        "Both status updates should have been recorded."
+    )
+    assert run_state.messages["SM2"].error_code == "30003", "The error code should have been recorded."
+
+
+def test_reject_invalid_signature(receiver: StatusCallbackReceiver, run_state: RunStateStore) -> None:
+    status = post_status(receiver, {"MessageSid": "SM1", "MessageStatus": "delivered"}, signature="invalid")
+    assert status == HTTPStatus.FORBIDDEN, "A callback with an invalid signature should be rejected."
+    assert run_state.messages["SM1"].status == "queued", "A rejected callback should not be recorded."
+
+
+def test_reject_malformed_callback(receiver: StatusCallbackReceiver) -> None:
+    assert post_status(receiver, {"MessageSid": "SM1"}) == HTTPStatus.BAD_REQUEST, (
+        "A callback without a status should be rejected."
+    )
+
+
+def test_wait_for_delivery_timeout(receiver: StatusCallbackReceiver) -> None:
+    assert receiver.wait_for_delivery(timeout=0.01) == DeliveryCounts(delivered=0, failed=0, pending=2), (
+        "Waiting should time out while messages are pending."
+    )
+
+
+def test_receive_status_callback_before_record(receiver: StatusCallbackReceiver, run_state: RunStateStore) -> None:
+    assert post_status(receiver, {"MessageSid": "SM3", "MessageStatus": "failed"}) == HTTPStatus.NO_CONTENT
+    run_state.record_message("SM3", "+1234509876", "queued")
+    post_status(receiver, {"MessageSid": "SM1", "MessageStatus": "delivered"})
+    post_status(receiver, {"MessageSid": "SM2", "MessageStatus": "delivered"})
+
+    assert receiver.wait_for_delivery(timeout=1) == DeliveryCounts(delivered=2, failed=1, pending=0), (
+        "A status callback arriving before its message is recorded should be applied once it's recorded."
+    )
@@ -0,0 +1,77 @@
+import itertools
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from secret_santa.draw.cycles import (
+    draw_derangement,
+    draw_single_cycle,
+    get_arrangement_weights,
+    get_cycle_lengths,
+    get_cycle_stats,
+)
+
+
+def assert_valid_arrangement(recipient_indices: list[int]) -> None:
+    assert sorted(recipient_indices) == list(range(len(recipient_indices))), "Every participant should be a recipient."
+    assert all(index != recipient for index, recipient in enumerate(recipient_indices)), (
+        "No one should give to themselves."
+    )
+
+
+@pytest.mark.parametrize("participants", [2, 3, 10, 1000])
+def test_draw_single_cycle(participants: int) -> None:
+    recipient_indices = draw_single_cycle(participants, rng=random.Random(participants))
+    assert_valid_arrangement(recipient_indices)
+    assert get_cycle_lengths(recipient_indices) == [participants], "Everyone should be in a single cycle."
+
+
+@pytest.mark.parametrize(("participants", "min_cycle_length"), [(2, 2), (3, 3), (10, 2), (10, 3), (1000, 5), (7, 7)])
+def test_draw_derangement(participants: int, min_cycle_length: int) -> None:
+    rng = random.Random(participants * min_cycle_length)
+    for _ in range(20):
+        recipient_indices = draw_derangement(participants, min_cycle_length=min_cycle_length, rng=rng)
+        assert_valid_arrangement(recipient_indices)
+        assert min(get_cycle_lengths(recipient_indices)) >= min_cycle_length, "No cycle should be too short."
+
+
+@pytest.mark.parametrize("min_cycle_length", [2, 3, 4])
+def test_arrangement_weights(min_cycle_length: int) -> None:
+    weights = get_arrangement_weights(7, min_cycle_length)
+    for participants in range(1, 8):
+        arrangements = sum(
+            min(get_cycle_lengths(list(permutation))) >= min_cycle_length
+            for permutation in itertools.permutations(range(participants))
+        )
+        assert weights[participants] * math.factorial(participants) == pytest.approx(arrangements), (
+            "The weights should count the arrangements with long enough cycles."
+        )
+
+
+def test_draw_derangement_uniformly() -> None:
+    # 6 participants have 5! = 120 single cycles and 10 * 2 * 2 = 40 arrangements of two cycles of 3, but no
+    # arrangements of cycles of 3 or more otherwise
+    rng = random.Random(0)
+    draws = 40_000
+    counts = Counter(tuple(draw_derangement(6, min_cycle_length=3, rng=rng)) for _ in range(draws))
+    assert len(counts) == 160, "Every arrangement should be drawn."  # noqa: PLR2004
+    two_cycles_draws = sum(
+        count for arrangement, count in counts.items() if get_cycle_lengths(list(arrangement)) == [3, 3]
+    )
+    assert two_cycles_draws / draws == pytest.approx(40 / 160, abs=0.02), "The arrangements should be drawn uniformly."
+    assert max(counts.values()) < 2 * min(counts.values()), "The arrangements should be drawn uniformly."
+
+
+def test_draw_derangement_too_few_participants() -> None:
+    with pytest.raises(AssertionError):
+        draw_derangement(3, min_cycle_length=4)
+
+
+def test_cycle_stats() -> None:
+    # Two swaps and a cycle of three
+    cycle_stats = get_cycle_stats([1, 0, 3, 2, 5, 6, 4])
+    assert (cycle_stats.cycles, cycle_stats.shortest, cycle_stats.longest) == (3, 2, 3)
+    assert cycle_stats.lengths == {2: 2, 3: 1}
+    assert str(cycle_stats) == "3 cycles (shortest: 2, longest: 3; 2 x 2, 1 x 3)"
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from secret_santa.draw.cycles import get_cycle_lengths
+from secret_santa.draw.engine import DrawEngine
+from secret_santa.model.participant import Participant
+
+
+@pytest.fixture
+def participants() -> list[Participant]:
+    return [Participant(full_name=f"Participant {index}", phone_number=f"+1555000{index:04d}") for index in range(10)]
+
+
+def assert_valid_arrangement(participants: list[Participant], recipients: list[Participant]) -> None:
+    assert sorted(map(id, recipients)) == sorted(map(id, participants)), "Every participant should be a recipient."
+    assert all(giver is not recipient for giver, recipient in zip(participants, recipients, strict=True)), (
+        "No one should give to themselves."
+    )
+
+
+def test_draw(participants: list[Participant]) -> None:
+    draw_engine = DrawEngine(participants, rng=random.Random(0))
+    assert_valid_arrangement(participants, draw_engine.draw())
+
+
+def test_draw_many(participants: list[Participant]) -> None:
+    arrangements = DrawEngine(participants, min_cycle_length=3, rng=random.Random(0)).draw_many(50)
+    assert len(arrangements) == 50  # noqa: PLR2004
+    for recipients in arrangements:
+        assert_valid_arrangement(participants, recipients)
+    assert len({tuple(map(id, recipients)) for recipients in arrangements}) > 1, "The draws should be independent."
+
+
+def test_iter_pairs(participants: list[Participant]) -> None:
+    pairs = list(DrawEngine(participants, single_cycle=True, rng=random.Random(0)).iter_pairs())
+    assert [giver for giver, _ in pairs] == participants, "Every participant should give once, in the roster's order."
+    assert_valid_arrangement(participants, [recipient for _, recipient in pairs])
+    index_by_participant = {id(participant): index for index, participant in enumerate(participants)}
+    assert get_cycle_lengths([index_by_participant[id(recipient)] for _, recipient in pairs]) == [len(participants)]
+
+
+def test_draw_reproducible(participants: list[Participant]) -> None:
+    assert DrawEngine(participants, rng=random.Random(1)).draw_many(5) == DrawEngine(
+        participants,
+        rng=random.Random(1),
+    ).draw_many(5), "A seeded engine should draw the same arrangements."
+
+
+def test_cycle_stats(participants: list[Participant]) -> None:
+    draw_engine = DrawEngine(participants, single_cycle=True)
+    cycle_stats = draw_engine.get_cycle_stats(draw_engine.draw())
+    assert (cycle_stats.cycles, cycle_stats.longest) == (1, len(participants))
+
+
+def test_too_few_participants(participants: list[Participant]) -> None:
+    with pytest.raises(AssertionError):
+        DrawEngine(participants[:1])
+    with pytest.raises(AssertionError):
+        DrawEngine(participants[:3], min_cycle_length=4)
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from secret_santa.draw.cycles import get_cycle_lengths
+from secret_santa.draw.engine import DrawEngine
+from secret_santa.draw.mixing import (
+    MixingAttribute,
+    chain_groups,
+    get_group_keys,
+    get_mixing_score,
+    mix_arrangement,
+)
+from secret_santa.model.participant import Participant
+
+
+def get_participants(teams: int, offices: int, count: int, seed: int = 0) -> list[Participant]:
+    rng = random.Random(seed)
+    return [
+        Participant(
+            full_name=f"Participant {index}",
+            phone_number=f"+1555{index:07d}",
+            team=f"Team {rng.randrange(teams)}",
+            office=f"Office {rng.randrange(offices)}",
+        )
+        for index in range(count)
+    ]
+
+
+def test_group_keys() -> None:
+    participants = [
+        Participant(full_name="A", phone_number="+1", team="Red", office="London"),
+        Participant(full_name="B", phone_number="+2", team="Red"),
+        Participant(full_name="C", phone_number="+3", office="London"),
+        Participant(full_name="D", phone_number="+4"),
+    ]
+    group_keys = get_group_keys(participants, [MixingAttribute.team, MixingAttribute.office])
+    assert group_keys[0][0] == group_keys[1][0], "Participants of the same team should share the team's key."
+    assert group_keys[0][1] == group_keys[2][1], "Participants of the same office should share the office's key."
+    assert len({key[0] for key in group_keys[2:]} | {group_keys[0][0]}) == 3, (  # noqa: PLR2004
+        "Participants without a team should mix with anyone."
+    )
+
+
+@pytest.mark.parametrize("cycle_lengths", [[200], [3] * 60 + [20], [2] * 100])
+def test_mix_arrangement_keeps_cycles(cycle_lengths: list[int]) -> None:
+    participants = get_participants(teams=4, offices=2, count=200)
+    group_keys = get_group_keys(participants, [MixingAttribute.team])
+    rng = random.Random(0)
+    order = list(range(len(participants)))
+    rng.shuffle(order)
+
+    recipient_indices = mix_arrangement(order, cycle_lengths, group_keys, rng=rng)
+
+    assert sorted(recipient_indices) == list(range(len(participants))), "Every participant should be a recipient."
+    assert sorted(get_cycle_lengths(recipient_indices)) == sorted(cycle_lengths), "The cycles should be kept."
+    assert get_mixing_score(recipient_indices, group_keys) == 1, "Every pair should be across teams."
+
+
+def test_chain_groups() -> None:
+    participants = get_participants(teams=5, offices=1, count=100)
+    group_keys = get_group_keys(participants, [MixingAttribute.team])
+    order = chain_groups(list(range(100)), [100], group_keys, rng=random.Random(0))
+    assert sorted(order) == list(range(100)), "Every participant should be chained once."
+
+
+def test_mixing_draw() -> None:
+    participants = get_participants(teams=10, offices=3, count=2000)
+    draw_engine = DrawEngine(
+        participants,
+        min_cycle_length=3,
+        mixing_attributes=[MixingAttribute.team, MixingAttribute.office],
+        rng=random.Random(0),
+    )
+    first_draw, second_draw = draw_engine.draw_many(2)
+    assert draw_engine.get_mixing_score(first_draw) == 1, "Every giver should get a recipient of other groups."
+    assert first_draw != second_draw, "The mixing draw should stay random."
+    assert draw_engine.get_cycle_stats(first_draw).shortest >= 3, "The cycle structure should be kept."  # noqa: PLR2004
+
+
+def test_mixing_draw_unavoidable_pairs() -> None:
+    # 3 of the 4 participants are in the same team, hence at least two of them give within the team
+    participants = [
+        Participant(full_name=name, phone_number=f"+{index}", team=team)
+        for index, (name, team) in enumerate([("A", "Red"), ("B", "Red"), ("C", "Red"), ("D", "Blue")])
+    ]
+    draw_engine = DrawEngine(participants, mixing_attributes=[MixingAttribute.team], rng=random.Random(0))
+    for recipients in draw_engine.draw_many(20):
+        assert draw_engine.get_mixing_score(recipients) == 0.5  # noqa: PLR2004
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from secret_santa.draw.repair import repair_arrangement
+
+
+def get_cycles(arrangement: dict[str, str]) -> list[list[str]]:
+    cycles, visited = [], set()
+    for start in arrangement:
+        cycle, giver = [], start
+        while giver not in visited:
+            visited.add(giver)
+            cycle.append(giver)
+            giver = arrangement[giver]
+        if cycle:
+            cycles.append(cycle)
+    return cycles
+
+
+def assert_valid_arrangement(arrangement: dict[str, str], participants: set[str]) -> None:
+    assert set(arrangement) == participants, "Every participant should be a giver."
+    assert set(arrangement.values()) == participants, "Every participant should be a recipient."
+    assert all(giver != recipient for giver, recipient in arrangement.items()), "No one should give to themselves."
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_repair_arrangement(seed: int) -> None:
+    rng = random.Random(seed)
+    participants = [f"+{index}" for index in range(10)]
+    recipients = participants[1:] + participants[:1]
+    arrangement = dict(zip(participants, recipients, strict=True))
+    leavers, joiners = rng.sample(participants, 3), ["+100", "+101"]
+
+    changes = repair_arrangement(arrangement, leavers=leavers, joiners=joiners, rng=rng)
+
+    repaired_arrangement = {
+        giver: recipient for giver, recipient in {**arrangement, **changes}.items() if giver not in leavers
+    }
+    assert_valid_arrangement(repaired_arrangement, set(participants) - set(leavers) | set(joiners))
+    assert set(joiners) <= set(changes), "The joiners should get recipients."
+    assert len(changes) <= 3 * len(leavers) + 2 * len(joiners), "Only the givers around the changes should change."
+
+
+def test_repair_arrangement_two_cycle() -> None:
+    # "+1" and "+2" give to each other, hence when "+1" drops out "+2" has to be spliced into the other cycle
+    arrangement = {"+1": "+2", "+2": "+1", "+3": "+4", "+4": "+5", "+5": "+3"}
+
+    changes = repair_arrangement(arrangement, leavers=["+1"], rng=random.Random(0))
+
+    repaired_arrangement = {
+        giver: recipient for giver, recipient in {**arrangement, **changes}.items() if giver != "+1"
+    }
+    assert_valid_arrangement(repaired_arrangement, {"+2", "+3", "+4", "+5"})
+    assert len(get_cycles(repaired_arrangement)) == 1, "The left-alone giver should join the remaining cycle."
+    assert len(changes) == 2, "Only the left-alone giver and the giver it was spliced after should change."  # noqa: PLR2004
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_repair_arrangement_keeps_min_cycle_length(seed: int) -> None:
+    rng = random.Random(seed)
+    participants = [f"+{index}" for index in range(12)]
+    # Four cycles of three
+    arrangement = {
+        giver: participants[start + (offset + 1) % 3]
+        for start in range(0, 12, 3)
+        for offset, giver in enumerate(participants[start : start + 3])
+    }
+    leavers = rng.sample(participants, 3)
+
+    changes = repair_arrangement(arrangement, leavers=leavers, joiners=["+100"], min_cycle_length=3, rng=rng)
+
+    repaired_arrangement = {
+        giver: recipient for giver, recipient in {**arrangement, **changes}.items() if giver not in leavers
+    }
+    assert_valid_arrangement(repaired_arrangement, set(participants) - set(leavers) | {"+100"})
+    assert all(len(cycle) >= 3 for cycle in get_cycles(repaired_arrangement)), (  # noqa: PLR2004
+        "A cycle left too short by a leaver should be spliced into the other cycles."
+    )
+
+
+def test_repair_arrangement_mixes_groups() -> None:
+    # The teams follow each other around the cycle: "a" -> "b" -> "c" -> "a" -> "b" -> "c"
+    participants = [f"+{index}" for index in range(6)]
+    arrangement = dict(zip(participants, participants[1:] + participants[:1], strict=True))
+    group_keys = {participant: (index % 3,) for index, participant in enumerate(participants)} | {"+100": (0,)}
+
+    changes = repair_arrangement(arrangement, joiners=["+100"], group_keys=group_keys, rng=random.Random(0))
+
+    repaired_arrangement = {**arrangement, **changes}
+    giver = next(giver for giver, recipient in repaired_arrangement.items() if recipient == "+100")
+    assert group_keys[giver] != group_keys["+100"] != group_keys[repaired_arrangement["+100"]], (
+        "The joiner should be spliced between participants of other teams."
+    )
+
+
+def test_repair_arrangement_no_changes() -> None:
+    assert repair_arrangement({"+1": "+2", "+2": "+3", "+3": "+1"}) == {}, "Nothing should change without changes."
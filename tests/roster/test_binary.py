@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+
+from secret_santa.model.participant import Participant
+from secret_santa.roster import loader
+from secret_santa.roster.binary import MappedRoster, is_binary_roster, write_binary_roster
+
+
+@pytest.fixture
+def participants() -> list[Participant]:
+    return [
+        Participant(full_name="John Doe", phone_number="+1234567890", nickname="Johnny"),
+        Participant(full_name="Jane Doe", phone_number="+0987654321"),
+        Participant(full_name="Ríchard Röe", phone_number="+1234509876", nickname="Rich 🎅"),
+    ]
+
+
+@pytest.fixture
+def binary_roster_path(tmp_path: Path, participants: list[Participant]) -> Path:
+    binary_roster_path = tmp_path / "participants.ssrb"
+    write_binary_roster(participants, binary_roster_path)
+    return binary_roster_path
+
+
+def test_binary_roster_round_trip(binary_roster_path: Path, participants: list[Participant]) -> None:
+    assert is_binary_roster(binary_roster_path), "The file written should be detected as a binary roster."
+    with MappedRoster(binary_roster_path) as mapped_roster:
+        assert len(mapped_roster) == len(participants)
+        assert list(mapped_roster) == participants, "The participants read do not match the participants written."
+
+
+@pytest.mark.parametrize("index", [0, 2, -1, -3])
+def test_binary_roster_index_access(binary_roster_path: Path, participants: list[Participant], index: int) -> None:
+    with MappedRoster(binary_roster_path) as mapped_roster:
+        assert mapped_roster[index] == participants[index], "The participant decoded by index does not match."
+
+
+def test_binary_roster_index_out_of_range(binary_roster_path: Path) -> None:
+    with MappedRoster(binary_roster_path) as mapped_roster, pytest.raises(IndexError):
+        mapped_roster[3]
+
+
+def test_load_binary_roster(binary_roster_path: Path, participants: list[Participant]) -> None:
+    assert loader.load_participants(binary_roster_path) == participants, (
+        "The participants loaded from the binary roster do not match the participants written."
+    )
@@ -0,0 +1,72 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from secret_santa.model.participant import Participant
+from secret_santa.roster.cache import RosterCache
+
+
+@pytest.fixture
+def roster_path(tests_directory: Path, tmp_path: Path) -> Path:
+    return Path(shutil.copy(tests_directory / "data" / "participants_example.json", tmp_path / "participants.json"))
+
+
+@pytest.fixture
+def roster_cache(tmp_path: Path) -> RosterCache:
+    return RosterCache(tmp_path / "cache")
+
+
+@pytest.fixture
+def participants() -> list[Participant]:
+    return [
+        Participant(full_name="John Doe", phone_number="+1234567890", nickname="Johnny"),
+        Participant(full_name="Jane Doe", phone_number="+0987654321"),
+        Participant(full_name="Richard Roe", phone_number="+1234509876", nickname="Rich"),
+    ]
+
+
+def test_cache_miss(roster_cache: RosterCache, roster_path: Path) -> None:
+    assert roster_cache.get(roster_path) is None, "A roster which was never cached should not be found in the cache."
+
+
+def test_cache_hit(roster_cache: RosterCache, roster_path: Path, participants: list[Participant]) -> None:
+    roster_cache.put(roster_path, participants)
+    assert roster_cache.get(roster_path) == participants, "The cached participants do not match the participants put."
+
+
+def test_cache_invalidated_on_content_change(
+    roster_cache: RosterCache,
+    roster_path: Path,
+    participants: list[Participant],
+) -> None:
+    roster_cache.put(roster_path, participants)
+    roster_path.write_text(roster_path.read_text().replace("Johnny", "Jonny"))
+    assert roster_cache.get(roster_path) is None, "A changed roster should not be served from the cache."
+    assert roster_cache.get(roster_path, allow_stale=True) == participants, (
+        "The previous version of a changed roster should still be available."
+    )
+
+
+def test_cache_hit_on_mtime_only_change(
+    roster_cache: RosterCache,
+    roster_path: Path,
+    participants: list[Participant],
+) -> None:
+    roster_cache.put(roster_path, participants)
+    roster_stat = roster_path.stat()
+    os.utime(roster_path, ns=(roster_stat.st_atime_ns, roster_stat.st_mtime_ns + 1_000_000_000))
+    assert roster_cache.get(roster_path) == participants, (
+        "A roster whose content did not change should be served from the cache."
+    )
+
+
+def test_cache_stats_and_clear(roster_cache: RosterCache, roster_path: Path, participants: list[Participant]) -> None:
+    assert roster_cache.stats().entries == 0
+    roster_cache.put(roster_path, participants)
+    stats = roster_cache.stats()
+    assert stats.entries == 1, "The cache should hold exactly one entry."
+    assert stats.total_bytes > 0, "The cache entry should not be empty."
+    assert roster_cache.clear() == 1, "Exactly one cache entry should have been removed."
+    assert roster_cache.get(roster_path) is None, "The roster should not be served from a cleared cache."
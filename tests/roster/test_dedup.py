@@ -0,0 +1,56 @@
+from typing import TYPE_CHECKING
+
+import pytest
+
+from secret_santa.model.participant import Participant
+from secret_santa.roster.dedup import DuplicatePolicy, PhoneNumberIndex, deduplicate_participants
+
+if TYPE_CHECKING:
+    from secret_santa.roster.ingest import MalformedRow
+
+
+@pytest.fixture
+def participants_with_duplicates() -> list[Participant]:
+    return [
+        Participant(full_name="John Doe", phone_number="+1 234-567-890"),
+        Participant(full_name="Jane Doe", phone_number="+0987654321"),
+        Participant(full_name="John Doe", phone_number="+1234567890", nickname="Johnny"),
+    ]
+
+
+def test_deduplicate_participants_merge(participants_with_duplicates: list[Participant]) -> None:
+    assert deduplicate_participants(participants_with_duplicates, duplicate_policy=DuplicatePolicy.merge) == [
+        Participant(full_name="John Doe", phone_number="+1234567890", nickname="Johnny"),
+        Participant(full_name="Jane Doe", phone_number="+0987654321"),
+    ], "The participants sharing the same phone number should have been merged into the first one."
+
+
+def test_deduplicate_participants_reject(participants_with_duplicates: list[Participant]) -> None:
+    with pytest.raises(AssertionError) as exception_info:
+        deduplicate_participants(participants_with_duplicates, duplicate_policy=DuplicatePolicy.reject)
+    assert "Participants should not share the same phone number" in str(exception_info.value)
+
+
+def test_deduplicate_participants_invalid_phone_number() -> None:
+    malformed_rows: list[MalformedRow] = []
+    participants = deduplicate_participants(
+        [
+            Participant(full_name="John Doe", phone_number="+1234567890"),
+            Participant(full_name="Jane Doe", phone_number="not a number"),
+        ],
+        malformed_rows=malformed_rows,
+    )
+    assert participants == [Participant(full_name="John Doe", phone_number="+1234567890")]
+    assert [malformed_row.location for malformed_row in malformed_rows] == ["participant 'Jane Doe'"]
+
+
+def test_phone_number_index() -> None:
+    phone_number_index = PhoneNumberIndex(default_country_code="+1")
+    john = Participant(full_name="John Doe", phone_number="+1 234-567-890")
+    assert phone_number_index.add(john) is None, "The first participant with a number should be indexed."
+    assert phone_number_index.add(Participant(full_name="J. Doe", phone_number="(234) 567-890")) == john, (
+        "A participant with an already indexed number should not be indexed."
+    )
+    assert "+1234567890" in phone_number_index
+    assert phone_number_index.get("234.567.890") == john
+    assert len(phone_number_index) == 1
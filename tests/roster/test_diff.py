@@ -0,0 +1,110 @@
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+from pytest_mock import MockerFixture
+
+from secret_santa.model.participant import Participant
+from secret_santa.roster.cache import RosterCache
+from secret_santa.roster.dedup import DuplicatePolicy
+from secret_santa.roster.diff import RosterWatcher, diff_rosters
+from secret_santa.roster.loader import RosterOptions
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+ROWS = [
+    {"full_name": "John Doe", "phone_number": "+1 234-567-890", "nickname": "Johnny"},
+    {"full_name": "Jane Doe", "phone_number": "+0987654321"},
+    {"full_name": "Richard Roe", "phone_number": "+1234509876"},
+]
+
+
+def write_roster(roster_path: Path, rows: list[dict[str, str]]) -> None:
+    roster_path.write_text("".join(f"{json.dumps(row)}\n" for row in rows))
+    # Make sure the change is noticed even if the file is rewritten within the file system's mtime granularity
+    roster_stat = roster_path.stat()
+    os.utime(roster_path, ns=(roster_stat.st_atime_ns, roster_stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def roster_path(tmp_path: Path) -> Path:
+    roster_path = tmp_path / "participants.jsonl"
+    write_roster(roster_path, ROWS)
+    return roster_path
+
+
+def test_diff_rosters() -> None:
+    john = Participant(full_name="John Doe", phone_number="+1234567890")
+    jane = Participant(full_name="Jane Doe", phone_number="+0987654321")
+    richard = Participant(full_name="Richard Roe", phone_number="+1234509876")
+    mary = Participant(full_name="Mary Major", phone_number="+1234500000")
+    roster_diff = diff_rosters([john, jane, richard], [mary, richard, Participant(**{**john.__dict__, "team": "Red"})])
+    assert roster_diff.added == [mary]
+    assert roster_diff.removed == [jane]
+    assert [change.current.full_name for change in roster_diff.modified] == ["John Doe"]
+    assert roster_diff.modified[0].changed_fields == ["team"]
+    assert str(roster_diff) == "1 added, 1 removed, 1 modified"
+    assert not diff_rosters([john, jane], [jane, john]), "Reordering the roster should not change it."
+
+
+def test_watcher_revalidates_changed_rows_only(roster_path: Path, mocker: MockerFixture) -> None:
+    roster_watcher = RosterWatcher(roster_path)
+    assert len(roster_watcher.reload().added) == 3, "The first version should be diffed against an empty roster."  # noqa: PLR2004
+    assert not roster_watcher.has_changed()
+
+    validate_row_spy = mocker.spy(roster_watcher, "validate_row")
+    write_roster(
+        roster_path,
+        [*ROWS[:2], {**ROWS[2], "nickname": "Rich"}, {"full_name": "Mary Major", "phone_number": "+1234500000"}],
+    )
+    assert roster_watcher.has_changed()
+    roster_diff = roster_watcher.reload()
+
+    assert [validate_call.args[0].full_name for validate_call in validate_row_spy.call_args_list] == [
+        "Richard Roe",
+        "Mary Major",
+    ], "Only the edited and the new rows should be validated again."
+    assert [participant.full_name for participant in roster_diff.added] == ["Mary Major"]
+    assert [change.changed_fields for change in roster_diff.modified] == [["nickname"]]
+    assert roster_watcher.participants[0].phone_number == "+1234567890", "The unchanged rows should stay normalized."
+
+
+def test_watcher_reports_invalid_rows(roster_path: Path) -> None:
+    roster_watcher = RosterWatcher(roster_path, options=RosterOptions(duplicate_policy=DuplicatePolicy.reject))
+    write_roster(
+        roster_path,
+        [*ROWS, {"full_name": "J. Doe", "phone_number": "+1234567890"}, {"full_name": "Nobody", "phone_number": "?"}],
+    )
+    roster_diff = roster_watcher.reload()
+    assert len(roster_diff.added) == 3, "The valid rows should still be loaded."  # noqa: PLR2004
+    assert [malformed_row.location for malformed_row in roster_watcher.malformed_rows] == [
+        "participant 'J. Doe'",
+        "participant 'Nobody'",
+    ]
+
+
+def test_watcher_diffs_against_cached_version(roster_path: Path, tmp_path: Path) -> None:
+    roster_cache = RosterCache(tmp_path / "cache")
+    RosterWatcher(roster_path, roster_cache=roster_cache).reload()
+    write_roster(roster_path, [*ROWS[1:], {"full_name": "Mary Major", "phone_number": "+1234500000"}])
+
+    roster_diff = RosterWatcher(roster_path, roster_cache=roster_cache).reload()
+    assert [participant.full_name for participant in roster_diff.removed] == ["John Doe"]
+    assert [participant.full_name for participant in roster_diff.added] == ["Mary Major"], (
+        "The unchanged participants should be matched with the cached version."
+    )
+    assert RosterWatcher(roster_path, roster_cache=roster_cache).participants == roster_cache.get(roster_path), (
+        "The current version should have been cached."
+    )
+
+
+def test_watch(roster_path: Path) -> None:
+    roster_watcher = RosterWatcher(roster_path)
+    roster_diffs: Iterator = roster_watcher.watch(interval=0)
+    assert len(next(roster_diffs).added) == 3  # noqa: PLR2004
+    write_roster(roster_path, ROWS[:2])
+    assert [participant.full_name for participant in next(roster_diffs).removed] == ["Richard Roe"]
@@ -0,0 +1,133 @@
+from pathlib import Path
+
+import pytest
+
+from secret_santa.model.participant import Participant
+from secret_santa.roster.ingest import (
+    MalformedRow,
+    MalformedRowError,
+    RosterFormat,
+    detect_roster_format,
+    iter_participants,
+)
+
+
+@pytest.fixture
+def participants() -> list[Participant]:
+    return [
+        Participant(full_name="John Doe", phone_number="+1234567890", nickname="Johnny"),
+        Participant(full_name="Jane Doe", phone_number="+0987654321"),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("file_name", "expected_format"),
+    [
+        ("participants.json", RosterFormat.json),
+        ("participants.jsonl", RosterFormat.jsonl),
+        ("participants.NDJSON", RosterFormat.jsonl),
+        ("participants.csv", RosterFormat.csv),
+        ("participants", RosterFormat.json),
+    ],
+)
+def test_detect_roster_format(file_name: str, expected_format: RosterFormat) -> None:
+    assert detect_roster_format(Path(file_name)) == expected_format
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig"])
+@pytest.mark.parametrize(
+    ("file_name", "content"),
+    [
+        (
+            "participants.json",
+            '[{"full_name": "John Doe", "phone_number": "+1234567890", "nickname": "Johnny"},'
+            '{"full_name": "Jane Doe", "phone_number": "+0987654321"}]',
+        ),
+        (
+            "participants.jsonl",
+            '{"full_name": "John Doe", "phone_number": "+1234567890", "nickname": "Johnny"}\n\n'
+            '{"full_name": "Jane Doe", "phone_number": "+0987654321"}\n',
+        ),
+        (
+            "participants.csv",
+            "full_name,phone_number,nickname\nJohn Doe,+1234567890,Johnny\nJane Doe,+0987654321,\n",
+        ),
+    ],
+)
+def test_iter_participants(
+    tmp_path: Path,
+    participants: list[Participant],
+    file_name: str,
+    content: str,
+    encoding: str,
+) -> None:
+    roster_path = tmp_path / file_name
+    roster_path.write_text(content, encoding=encoding)
+    assert list(iter_participants(roster_path)) == participants, (
+        f"The participants read from {file_name} ({encoding}) do not match the expected participants."
+    )
+
+
+def test_iter_participants_csv_column_mapping(tmp_path: Path, participants: list[Participant]) -> None:
+    roster_path = tmp_path / "participants.csv"
+    roster_path.write_text(
+        "Employee,Mobile,Department,Nickname\nJohn Doe,+1234567890,R&D,Johnny\nJane Doe,+0987654321,HR,\n",
+        encoding="utf-8",
+    )
+    column_mapping = {"full_name": "Employee", "phone_number": "Mobile", "nickname": "Nickname"}
+    assert list(iter_participants(roster_path, column_mapping=column_mapping)) == participants, (
+        "The participants read through the column mapping do not match the expected participants."
+    )
+
+
+def test_iter_participants_csv_missing_mapped_column(tmp_path: Path) -> None:
+    roster_path = tmp_path / "participants.csv"
+    roster_path.write_text("full_name,phone_number,Nickname\nJohn Doe,+1234567890,Johnny\n", encoding="utf-8")
+    with pytest.raises(MalformedRowError) as exception_info:
+        list(iter_participants(roster_path, column_mapping={"nickname": "Nick"}))
+    assert "missing the mapped columns: ['Nick']" in str(exception_info.value)
+
+
+@pytest.mark.parametrize(
+    ("file_name", "content", "expected_locations"),
+    [
+        (
+            "participants.jsonl",
+            '{"full_name": "John Doe", "phone_number": "+1234567890", "nickname": "Johnny"}\n'
+            '{"full_name": "Broken", \n'
+            '{"full_name": "No Phone"}\n'
+            '{"full_name": "Jane Doe", "phone_number": "+0987654321"}\n',
+            ["line 2", "line 3"],
+        ),
+        (
+            "participants.csv",
+            "full_name,phone_number,nickname\nJohn Doe,+1234567890,Johnny\nToo,Many,Cells,Here\n"
+            ",+1111111111,\nJane Doe,+0987654321,\n",
+            ["line 3", "line 4"],
+        ),
+    ],
+)
+def test_iter_participants_collects_malformed_rows(
+    tmp_path: Path,
+    participants: list[Participant],
+    file_name: str,
+    content: str,
+    expected_locations: list[str],
+) -> None:
+    roster_path = tmp_path / file_name
+    roster_path.write_text(content, encoding="utf-8")
+    malformed_rows: list[MalformedRow] = []
+    assert list(iter_participants(roster_path, malformed_rows=malformed_rows)) == participants, (
+        "The well-formed rows should have been loaded despite the malformed rows."
+    )
+    assert [malformed_row.location for malformed_row in malformed_rows] == expected_locations, (
+        "The malformed rows reported do not match the expected malformed rows."
+    )
+
+
+def test_iter_participants_raises_on_malformed_row(tmp_path: Path) -> None:
+    roster_path = tmp_path / "participants.jsonl"
+    roster_path.write_text('{"full_name": "John Doe", "phone": "+1234567890"}\n', encoding="utf-8")
+    with pytest.raises(MalformedRowError) as exception_info:
+        list(iter_participants(roster_path))
+    assert "Malformed roster row at line 1" in str(exception_info.value)
@@ -0,0 +1,237 @@
+import http.client
+import json
+import logging
+import socket
+import threading
+import time
+from collections.abc import Iterator
+from http import HTTPStatus
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from secret_santa.delivery.fair_share import FairShareScheduler
+from secret_santa.draw_service import DrawHTTPServer, DrawJobStatus, DrawService, DrawUnixHTTPServer
+
+DRAW_JOB_TIMEOUT_SECONDS = 10
+
+
+@pytest.fixture
+def participants_payload() -> list[dict[str, str]]:
+    return [
+        {"full_name": "John Doe", "phone_number": "+1234567890", "nickname": "Johnny"},
+        {"full_name": "Jane Doe", "phone_number": "+0987654321"},
+        {"full_name": "Richard Roe", "phone_number": "+1234509876", "nickname": "Rich"},
+    ]
+
+
+@pytest.fixture
+def messaging_client(mocker: MockerFixture) -> object:
+    return mocker.MagicMock()
+
+
+@pytest.fixture
+def draw_server(messaging_client: object) -> Iterator[DrawHTTPServer]:
+    draw_service = DrawService(messaging_client, max_workers=2)  # type: ignore[arg-type]
+    server = DrawHTTPServer(("127.0.0.1", 0), draw_service)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    draw_service.shutdown()
+
+
+def request(
+    server: DrawHTTPServer,
+    method: str,
+    path: str,
+    body: object = None,
+    headers: dict[str, str] | None = None,
+) -> tuple[int, object]:
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=DRAW_JOB_TIMEOUT_SECONDS)
+    try:
+        connection.request(method, path, body=None if body is None else json.dumps(body), headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def wait_for_job(server: DrawHTTPServer, job_id: str) -> dict:
+    deadline = time.monotonic() + DRAW_JOB_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        _, job = request(server, "GET", f"/draws/{job_id}")
+        assert isinstance(job, dict)
+        if job["status"] in {DrawJobStatus.succeeded, DrawJobStatus.failed}:
+            return job
+        time.sleep(0.01)
+    pytest.fail(f"Draw job {job_id} did not finish in time")
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: Path) -> None:
+        super().__init__("localhost", timeout=DRAW_JOB_TIMEOUT_SECONDS)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(str(self.socket_path))
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix domain sockets are not supported")
+@pytest.mark.parametrize("logging_level", [logging.DEBUG, logging.INFO])
+def test_health_over_unix_socket(
+    messaging_client: object,
+    tmp_path: Path,
+    caplog: pytest.LogCaptureFixture,
+    logging_level: int,
+) -> None:
+    draw_service = DrawService(messaging_client, max_workers=1)  # type: ignore[arg-type]
+    socket_path = tmp_path / "draws.sock"
+    server = DrawUnixHTTPServer(str(socket_path), draw_service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connection = UnixHTTPConnection(socket_path)
+    try:
+        with caplog.at_level(logging_level, logger=draw_service.logger.name):
+            connection.request("GET", "/health")
+            response = connection.getresponse()
+            assert response.status == HTTPStatus.OK, "The service should serve requests over a Unix domain socket."
+            assert json.loads(response.read()) == {"status": "ok"}
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+        draw_service.shutdown()
+
+
+def test_health(draw_server: DrawHTTPServer) -> None:
+    assert request(draw_server, "GET", "/health") == (HTTPStatus.OK, {"status": "ok"}), (
+        "The draw service should report being healthy."
+    )
+
+
+def test_submit_draw(
+    draw_server: DrawHTTPServer,
+    messaging_client: object,
+    participants_payload: list[dict[str, str]],
+) -> None:
+    status, job = request(draw_server, "POST", "/draws", {"participants": participants_payload, "dry_run": True})
+    assert status == HTTPStatus.ACCEPTED, "A valid draw job should be accepted."
+    assert isinstance(job, dict)
+    assert job["participants_count"] == len(participants_payload), "The job should hold all the participants."
+
+    finished_job = wait_for_job(draw_server, job["job_id"])
+    assert finished_job["status"] == DrawJobStatus.succeeded, f"The draw job should succeed: {finished_job['error']}"
+    assert messaging_client.send_message.call_count == len(participants_payload), (  # type: ignore[attr-defined]
+        "Every participant should have been messaged through the shared messaging client."
+    )
+    _, jobs = request(draw_server, "GET", "/draws")
+    assert jobs == [finished_job], "The finished job should be listed."
+
+
+def test_draws_share_messaging_client(
+    draw_server: DrawHTTPServer,
+    messaging_client: object,
+    participants_payload: list[dict[str, str]],
+) -> None:
+    job_ids = [
+        request(draw_server, "POST", "/draws", {"participants": participants_payload})[1]["job_id"]  # type: ignore[index]
+        for _ in range(3)
+    ]
+    for job_id in job_ids:
+        assert wait_for_job(draw_server, job_id)["status"] == DrawJobStatus.succeeded, "Every draw job should succeed."
+    assert messaging_client.send_message.call_count == 3 * len(participants_payload), (  # type: ignore[attr-defined]
+        "All the draw jobs should have used the same messaging client."
+    )
+
+
+def test_draws_share_rate_between_tenants(
+    messaging_client: object,
+    participants_payload: list[dict[str, str]],
+) -> None:
+    draw_service = DrawService(
+        messaging_client,  # type: ignore[arg-type]
+        max_workers=3,
+        fair_share_scheduler=FairShareScheduler(1000),
+        tenant_weights={"sales": 2},
+        tenant_quota=len(participants_payload),
+    )
+    server = DrawHTTPServer(("127.0.0.1", 0), draw_service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        job_ids = [
+            request(server, "POST", "/draws", {"participants": participants_payload, "tenant": tenant})[1]["job_id"]  # type: ignore[index]
+            for tenant in ["sales", "support"]
+        ]
+        finished_jobs = [wait_for_job(server, job_id) for job_id in job_ids]
+        # Submitted once the first job used up the quota, so the two jobs of the tenant don't split it
+        _, over_quota_job = request(server, "POST", "/draws", {"participants": participants_payload, "tenant": "sales"})
+        finished_jobs.append(wait_for_job(server, over_quota_job["job_id"]))  # type: ignore[index]
+        _, tenants = request(server, "GET", "/tenants")
+    finally:
+        server.shutdown()
+        server.server_close()
+        draw_service.shutdown()
+
+    assert [job["status"] for job in finished_jobs].count(DrawJobStatus.failed) == 1, (
+        "The sales tenant's second job should exceed its quota."
+    )
+    assert isinstance(tenants, list)
+    assert {metrics["tenant"]: (metrics["weight"], metrics["sent"]) for metrics in tenants} == {
+        "sales": (2, len(participants_payload)),
+        "support": (1, len(participants_payload)),
+    }
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        [],
+        {"participants": "John Doe"},
+        {"participants": [{"full_name": "John Doe"}]},
+        {"participants": [{"full_name": "John Doe", "phone_number": "+1234567890"}]},
+    ],
+)
+def test_submit_invalid_draw(draw_server: DrawHTTPServer, body: object) -> None:
+    status, response = request(draw_server, "POST", "/draws", body)
+    assert status == HTTPStatus.BAD_REQUEST, "An invalid draw job should be rejected."
+    assert isinstance(response, dict)
+    assert response["error"], "The rejection should state the reason."
+
+
+@pytest.mark.parametrize("content_length", ["not a number", "-1"])
+def test_submit_invalid_content_length(
+    draw_server: DrawHTTPServer,
+    participants_payload: list[dict[str, str]],
+    content_length: str,
+) -> None:
+    status, _ = request(
+        draw_server,
+        "POST",
+        "/draws",
+        {"participants": participants_payload},
+        headers={"Content-Length": content_length},
+    )
+    assert status == HTTPStatus.BAD_REQUEST, "A draw job with an invalid Content-Length should be rejected."
+
+
+def test_finished_jobs_are_forgotten(messaging_client: object, participants_payload: list[dict[str, str]]) -> None:
+    draw_service = DrawService(messaging_client, max_workers=1, max_finished_jobs=2)  # type: ignore[arg-type]
+    try:
+        job_ids = [
+            draw_service.submit({"participants": participants_payload, "dry_run": True}).job_id for _ in range(3)
+        ]
+    finally:
+        draw_service.shutdown()
+    assert [job.job_id for job in draw_service.list_jobs()] == job_ids[1:], (
+        "Only the latest finished jobs should be kept."
+    )
+    assert draw_service.get(job_ids[0]) is None, "The oldest finished job should be forgotten."
+
+
+def test_unknown_draw(draw_server: DrawHTTPServer) -> None:
+    status, _ = request(draw_server, "GET", "/draws/unknown")
+    assert status == HTTPStatus.NOT_FOUND, "An unknown draw job should not be found."
@@ -0,0 +1,164 @@
+import smtplib
+import socket
+from collections.abc import Iterator
+from email import message_from_bytes, policy
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Sink
+from aiosmtpd.smtp import SMTP, Envelope, Session
+from pytest_mock import MockerFixture
+
+from secret_santa.const import SMTP_HOST, SMTP_PORT, SMTP_SENDER
+from secret_santa.email_messaging_service import EmailMessagingService, SMTPConnectionPool, quote_message_data
+
+SENDER = "santa@example.com"
+
+
+class RecordingHandler(Sink):
+    def __init__(self) -> None:
+        self.envelopes: list[Envelope] = []
+        self.sessions: set[int] = set()
+
+    async def handle_RCPT(  # noqa: N802
+        self,
+        server: SMTP,  # noqa: ARG002
+        session: Session,  # noqa: ARG002
+        envelope: Envelope,
+        address: str,
+        rcpt_options: list[str],  # noqa: ARG002
+    ) -> str:
+        if address.startswith("refused@"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server: SMTP, session: Session, envelope: Envelope) -> str:  # noqa: ARG002, N802
+        self.envelopes.append(envelope)
+        self.sessions.add(id(session))
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture
+def smtp_handler() -> RecordingHandler:
+    return RecordingHandler()
+
+
+@pytest.fixture
+def smtp_server(smtp_handler: RecordingHandler) -> Iterator[Controller]:
+    with socket.socket() as free_port_socket:
+        free_port_socket.bind(("127.0.0.1", 0))
+        port = free_port_socket.getsockname()[1]
+    controller = Controller(smtp_handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+@pytest.fixture(params=[False, True], ids=["without-pipelining", "with-pipelining"])
+def pipelining(request: pytest.FixtureRequest, mocker: MockerFixture) -> bool:
+    # The local SMTP server handles pipelined commands, even though it doesn't advertise the extension
+    mocker.patch.object(
+        smtplib.SMTP, "has_extn", side_effect=lambda extension: request.param and extension == "pipelining"
+    )
+    return bool(request.param)
+
+
+@pytest.fixture
+def email_messaging_service(smtp_server: Controller) -> Iterator[EmailMessagingService]:
+    email_messaging_service = EmailMessagingService(
+        SMTPConnectionPool(smtp_server.hostname, smtp_server.port, size=1),
+        sender=SENDER,
+    )
+    yield email_messaging_service
+    email_messaging_service.close()
+
+
+@pytest.mark.usefixtures("pipelining")
+def test_send_message(
+    smtp_handler: RecordingHandler,
+    email_messaging_service: EmailMessagingService,
+) -> None:
+    recipients = [f"participant{index}@example.com" for index in range(5)]
+
+    responses = [
+        email_messaging_service.send_message(f"Hello {recipient}\n.Ho ho ho", recipient, dry_run=False)
+        for recipient in recipients
+    ]
+
+    assert all(response.status == "sent" for response in responses), "All the messages should have been sent."
+    assert [envelope.rcpt_tos for envelope in smtp_handler.envelopes] == [[recipient] for recipient in recipients]
+    assert len(smtp_handler.sessions) == 1, "All the messages should have been sent over a single connection."
+    message = message_from_bytes(
+        smtp_handler.envelopes[0].original_content,  # type: ignore[arg-type]
+        policy=policy.default,
+    )
+    assert message["From"] == SENDER
+    assert message["Subject"] == "Secret Santa"
+    assert message.get_content().splitlines() == [f"Hello {recipients[0]}", ".Ho ho ho"], (
+        "The message body should have been transparently delivered."
+    )
+
+
+@pytest.mark.usefixtures("pipelining")
+def test_send_message_refused(
+    smtp_handler: RecordingHandler,
+    email_messaging_service: EmailMessagingService,
+) -> None:
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        email_messaging_service.send_message("Hello", "refused@example.com", dry_run=False)
+    email_messaging_service.send_message("Hello", "accepted@example.com", dry_run=False)
+
+    assert [envelope.rcpt_tos for envelope in smtp_handler.envelopes] == [["accepted@example.com"]]
+    assert len(smtp_handler.sessions) == 1, "A refused message should not cost the pool its connection."
+
+
+def test_send_message_dry_run(smtp_handler: RecordingHandler, email_messaging_service: EmailMessagingService) -> None:
+    response = email_messaging_service.send_message("Hello", "participant@example.com", dry_run=True)
+
+    assert response.status == "Not executed (DRY RUN)"
+    assert not smtp_handler.envelopes, "No message should be sent on a dry run."
+
+
+def test_connection_replaced_after_max_messages(smtp_server: Controller, smtp_handler: RecordingHandler) -> None:
+    with SMTPConnectionPool(smtp_server.hostname, smtp_server.port, max_messages_per_connection=2) as pool:
+        email_messaging_service = EmailMessagingService(pool, sender=SENDER)
+        for index in range(5):
+            email_messaging_service.send_message("Hello", f"participant{index}@example.com", dry_run=False)
+
+    assert len(smtp_handler.sessions) == 3, "Each connection should send up to 2 messages."  # noqa: PLR2004
+
+
+def test_load_smtp_config(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv(SMTP_HOST, "smtp.example.com")
+    monkeypatch.setenv(SMTP_PORT, "2525")
+    monkeypatch.setenv(SMTP_SENDER, SENDER)
+
+    email_messaging_service = EmailMessagingService()
+
+    assert email_messaging_service.sender == SENDER
+    assert (email_messaging_service.connection_pool.host, email_messaging_service.connection_pool.port) == (
+        "smtp.example.com",
+        2525,
+    )
+
+
+def test_load_smtp_config_missing(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.delenv(SMTP_HOST, raising=False)
+    monkeypatch.setenv(SMTP_SENDER, SENDER)
+
+    with pytest.raises(AssertionError):
+        EmailMessagingService()
+
+
+@pytest.mark.parametrize(
+    ("message", "expected_data"),
+    [
+        (b"Hello\r\n", b"Hello\r\n.\r\n"),
+        (b"Hello", b"Hello\r\n.\r\n"),
+        (b".Hello\r\n.\r\nBye\r\n", b"..Hello\r\n..\r\nBye\r\n.\r\n"),
+    ],
+)
+def test_quote_message_data(message: bytes, expected_data: bytes) -> None:
+    assert quote_message_data(message) == expected_data
@@ -1,20 +1,33 @@
 import itertools
 import json
 import os
+import threading
+import time
 from pathlib import Path
 
+import attr
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
 from pytest_lazy_fixtures import lf
 from pytest_mock import MockerFixture
+from twilio.base.exceptions import TwilioRestException
 
 from secret_santa import __version__
 from secret_santa.client import app
 from secret_santa.const import ENCODING, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_NUMBER
+from secret_santa.delivery.export import ExportEvent, open_export_sink
+from secret_santa.delivery.lookup import LookupClient, LookupStandInServer, PhoneLookup
+from secret_santa.delivery.reveal import RevealStore
+from secret_santa.delivery.run_state import DrawOptions, RunStateStore
+from secret_santa.delivery.schedule import DeliveryScheduler
 from secret_santa.model.participant import Participant
+from secret_santa.roster.dedup import DuplicatePolicy
+from secret_santa.roster.loader import RosterOptions
 from secret_santa.secret_santa_module import SecretSanta, load_env
+from secret_santa.twilio_messaging_service import MessageResponse
 from secret_santa.util import misc
 from secret_santa.util.logging import LoggingLevel
+from secret_santa.util.tracing import FileSpanExporter, Tracer
 
 
 # TODO: Remove in refactor and get rid of env load as this has some unintended side effects
@@ -201,9 +214,10 @@ def test_load_env_without_env_file_with_predefined_env(
     ("dry_run", "show_arrangement"),
     itertools.product([False, True], [False, True]),
 )
-def test_module_main(
+def test_module_main(  # noqa: PLR0913
     mocker: MockerFixture,
     monkeypatch: MonkeyPatch,
+    tmp_path: Path,
     test_participants_file_path: Path,
     dry_run: bool,
     show_arrangement: bool,
@@ -212,6 +226,8 @@ def test_module_main(
     monkeypatch.setenv(TWILIO_AUTH_TOKEN, "DummyTwilioAuthToken")
     monkeypatch.setenv(TWILIO_NUMBER, "+1234567890")
     create_message_mock = mocker.patch("twilio.rest.api.v2010.account.message.MessageList.create")
+    create_message_mock.return_value.sid = "SM0123456789"
+    create_message_mock.return_value.status = "queued"
 
     num_of_participants = len(json.loads(test_participants_file_path.read_text(ENCODING)))
     # TODO: Capture the output and check the "->" of the show arrangement appears in the log
@@ -223,6 +239,7 @@ def test_module_main(
             logging_level=LoggingLevel.info,
             dry_run=dry_run,
             show_arrangement=show_arrangement,
+            state_dir=tmp_path,
         )
         == 0
     ), "The module main did not return a zero exit status as expected."
@@ -394,3 +411,523 @@ def test_run(
             f"The `create` method of the Twilio API was not called the number of times expected "
             f"({len(secret_santa_obj.participants)})."
         )
+
+
+def test_parse_column_mapping() -> None:
+    assert app.parse_column_mapping(["full_name=Employee", "nickname=Nick"]) == {
+        "full_name": "Employee",
+        "nickname": "Nick",
+    }
+    with pytest.raises(AssertionError, match="nick"):
+        app.parse_column_mapping(["nick=Nickname"])
+
+
+def test_validate(test_participants_file_path: Path, tmp_path: Path) -> None:
+    for _ in range(2):
+        assert (
+            app.validate(
+                participants_path=test_participants_file_path,
+                logging_level=LoggingLevel.info,
+                use_cache=True,
+                cache_dir=tmp_path,
+            )
+            == 0
+        ), "The validate command did not return a zero exit status as expected."
+    assert app.cache_stats(cache_dir=tmp_path) == 0
+    assert app.cache_clear(cache_dir=tmp_path) == 0
+
+
+def test_validate_profiled(test_participants_file_path: Path, tmp_path: Path) -> None:
+    profile_path, trace_malloc_path = tmp_path / "validate.pstats", tmp_path / "validate.tracemalloc.txt"
+    assert (
+        app.validate(
+            participants_path=test_participants_file_path,
+            profile=profile_path,
+            collapsed_stacks=True,
+            trace_malloc=trace_malloc_path,
+        )
+        == 0
+    ), "The validate command did not return a zero exit status as expected."
+    assert profile_path.exists(), "The CPU profile should have been written."
+    assert profile_path.with_suffix(".collapsed").exists(), "The collapsed stacks should have been written."
+    assert trace_malloc_path.read_text(encoding=ENCODING).startswith("== load:"), (
+        "The allocations after the load should have been reported."
+    )
+
+
+def test_estimate(test_participants_file_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    assert app.estimate(participants_path=test_participants_file_path, price_per_segment=0.01) == 0, (
+        "The estimate command did not return a zero exit status as expected."
+    )
+    output = capsys.readouterr().out
+    assert "Messages: " in output
+    assert "Estimated cost: " in output
+
+
+def test_convert(test_participants_file_path: Path, tmp_path: Path) -> None:
+    binary_roster_path = tmp_path / "participants.ssrb"
+    assert app.convert(input_path=test_participants_file_path, output_path=binary_roster_path) == 0
+    assert app.validate(participants_path=binary_roster_path) == 0
+
+
+def test_run_messages_each_number_once(
+    mocker: MockerFixture,
+    participants_in_participants_file: list[Participant],
+) -> None:
+    duplicate_participant = Participant(full_name="Johnny Doe", phone_number="+1 234 567 890")
+    participants = [*participants_in_participants_file, duplicate_participant]
+    messaging_client = mocker.MagicMock()
+
+    with pytest.raises(AssertionError):
+        SecretSanta(participants=participants, messaging_client=messaging_client, dry_run=True)
+    secret_santa_obj = SecretSanta(
+        participants=participants,
+        messaging_client=messaging_client,
+        roster_options=RosterOptions(duplicate_policy=DuplicatePolicy.merge),
+        dry_run=True,
+    )
+    assert secret_santa_obj.run() == 0
+    assert sorted(send_call.args[1] for send_call in messaging_client.send_message.call_args_list) == sorted(
+        participant.phone_number for participant in participants_in_participants_file
+    ), "Each phone number should have been messaged exactly once."
+
+
+@pytest.mark.parametrize(
+    ("send_error", "resent"),
+    [
+        # A timeout may happen after Twilio accepted the message, hence it's never sent again
+        (TimeoutError("Timed out"), False),
+        # A rejected message was definitely not sent, hence it's sent again
+        (TwilioRestException(status=400, uri="/Messages", msg="Invalid number"), True),
+    ],
+)
+def test_resume_run(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    participants_in_participants_file: list[Participant],
+    send_error: Exception,
+    resent: bool,
+) -> None:
+    messaging_client = mocker.MagicMock()
+    messaging_client.send_message.side_effect = [
+        MessageResponse(status="queued", sid="SM1"),
+        send_error,
+    ]
+    with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+        secret_santa_obj = SecretSanta(
+            participants=participants_in_participants_file,
+            messaging_client=messaging_client,
+            run_state=run_state,
+            dry_run=False,
+        )
+        with pytest.raises(type(send_error)):
+            secret_santa_obj.run()
+    first_messages = [send_call.args for send_call in messaging_client.send_message.call_args_list]
+
+    messaging_client.send_message.reset_mock(side_effect=True)
+    messaging_client.send_message.return_value = MessageResponse(status="queued", sid="SM2")
+    with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+        secret_santa_obj = SecretSanta(
+            participants=participants_in_participants_file,
+            messaging_client=messaging_client,
+            run_state=run_state,
+            dry_run=False,
+        )
+        assert secret_santa_obj.run() == 0
+    resumed_messages = [send_call.args for send_call in messaging_client.send_message.call_args_list]
+
+    assert first_messages[0] not in resumed_messages, "A message sent should not be sent again on resume."
+    assert (first_messages[1] in resumed_messages) == resent, "The failed message was handled unexpectedly."
+    assert len(resumed_messages) == len(participants_in_participants_file) - 2 + resent, (
+        "Only the participants not yet messaged should be messaged on resume."
+    )
+
+
+def test_scheduled_run(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    participants_in_participants_file: list[Participant],
+) -> None:
+    messaging_client = mocker.MagicMock()
+    messaging_client.send_message.return_value = MessageResponse(status="queued", sid="SM1")
+    # Advance the scheduler's clock on sleep, rather than actually waiting for the delivery window
+    # A whole second, so the send times planned (as datetimes) convert back to timestamps exactly
+    clock = mocker.MagicMock(return_value=float(int(time.time())))
+    delivery_scheduler = DeliveryScheduler(
+        clock=clock,
+        sleep=lambda seconds: setattr(clock, "return_value", clock.return_value + seconds),
+    )
+    plan_spy = mocker.spy(delivery_scheduler, "plan")
+    dispatch_spy = mocker.spy(delivery_scheduler, "dispatch")
+
+    with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+        SecretSanta(
+            participants=participants_in_participants_file,
+            messaging_client=messaging_client,
+            run_state=run_state,
+            delivery_scheduler=delivery_scheduler,
+            dry_run=False,
+        ).run()
+    with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+        assert run_state.schedule == plan_spy.spy_return, "The schedule should be persisted in the run's state."
+        SecretSanta(
+            participants=participants_in_participants_file,
+            messaging_client=messaging_client,
+            run_state=run_state,
+            delivery_scheduler=delivery_scheduler,
+            dry_run=False,
+        ).run()
+
+    assert plan_spy.call_count == 1, "A resumed run should keep the original schedule."
+    assert dispatch_spy.call_args_list[-1].args[0] == {}, "A resumed run should not reschedule sent messages."
+    assert messaging_client.send_message.call_count == len(participants_in_participants_file), (
+        "Every participant should have been messaged exactly once."
+    )
+
+
+def test_run_messages_through_preferred_channel(
+    mocker: MockerFixture,
+    participants_in_participants_file: list[Participant],
+) -> None:
+    participants = [
+        attr.evolve(participant, email=f"participant{index}@example.com", channel="email") if index % 2 else participant
+        for index, participant in enumerate(participants_in_participants_file)
+    ]
+    messaging_client = mocker.MagicMock()
+    messaging_client.send_message.return_value = MessageResponse(status="queued", sid="SM1")
+    email_client = mocker.MagicMock()
+    email_client.send_message.return_value = MessageResponse(status="sent")
+
+    SecretSanta(
+        participants=participants,
+        messaging_client=messaging_client,
+        email_client=email_client,
+        dry_run=False,
+    ).run()
+
+    assert sorted(send_call.args[1] for send_call in email_client.send_message.call_args_list) == sorted(
+        participant.email for participant in participants if participant.channel == "email" and participant.email
+    ), "The participants preferring email should have been emailed."
+    assert sorted(send_call.args[1] for send_call in messaging_client.send_message.call_args_list) == sorted(
+        participant.phone_number for participant in participants if participant.channel is None
+    ), "The rest of the participants should have been messaged by SMS."
+
+
+def test_run_shards_messages_by_sender(
+    mocker: MockerFixture,
+    participants_in_participants_file: list[Participant],
+) -> None:
+    sender_threads: dict[str, set[str]] = {}
+    # Both senders' first messages wait for each other, which only succeeds if the senders send concurrently
+    senders_started = threading.Barrier(2, timeout=5)
+    lock = threading.Lock()
+
+    def send_message(_body: str, to: str, **_: object) -> MessageResponse:
+        sender = get_sender(to)
+        with lock:
+            is_first_message = sender not in sender_threads
+            sender_threads.setdefault(sender, set()).add(threading.current_thread().name)
+        if is_first_message:
+            senders_started.wait()
+        return MessageResponse(status="queued")
+
+    def get_sender(to: str) -> str:
+        return "+15550001" if int(to[-1]) % 2 else "+15550002"
+
+    messaging_client = mocker.MagicMock()
+    messaging_client.get_sender.side_effect = get_sender
+    messaging_client.send_message.side_effect = send_message
+
+    SecretSanta(participants=participants_in_participants_file, messaging_client=messaging_client, dry_run=False).run()
+
+    assert messaging_client.send_message.call_count == len(participants_in_participants_file)
+    assert set(sender_threads) == {"+15550001", "+15550002"}
+    assert all(len(threads) == 1 for threads in sender_threads.values()), (
+        "Every sender's messages should be sent on a single worker."
+    )
+    assert len(set().union(*sender_threads.values())) == 2, "Every sender should have its own worker."  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(("single_cycle", "min_cycle_length"), [(True, 2), (False, 3)])
+def test_run_cycle_structure(
+    mocker: MockerFixture,
+    participants_in_participants_file: list[Participant],
+    single_cycle: bool,
+    min_cycle_length: int,
+) -> None:
+    messaging_client = mocker.MagicMock()
+    messaging_client.send_message.return_value = MessageResponse(status="queued")
+    secret_santa_obj = SecretSanta(
+        participants=participants_in_participants_file,
+        messaging_client=messaging_client,
+        single_cycle=single_cycle,
+        min_cycle_length=min_cycle_length,
+        dry_run=False,
+    )
+    log_spy = mocker.spy(secret_santa_obj.logger, "info")
+    assert secret_santa_obj.run() == 0
+    # Three participants without swaps could only form a single cycle
+    assert mocker.call("The arrangement has 1 cycles (shortest: 3, longest: 3; 1 x 3)") in log_spy.call_args_list, (
+        "The run should log the arrangement's cycle statistics."
+    )
+
+
+def test_run_reveals_on_demand(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    participants_in_participants_file: list[Participant],
+) -> None:
+    messaging_client = mocker.MagicMock()
+    messaging_client.send_message.return_value = MessageResponse(status="queued")
+    with RevealStore(tmp_path / "reveal.jsonl", "not-so-secret") as reveal_store:
+        secret_santa_obj = SecretSanta(
+            participants=participants_in_participants_file,
+            messaging_client=messaging_client,
+            reveal_store=reveal_store,
+            reveal_url="https://example.com/reveal",
+            dry_run=False,
+        )
+        assert secret_santa_obj.run() == 0
+
+        recipients = set()
+        for send_call in messaging_client.send_message.call_args_list:
+            body, to = send_call.args
+            assert "https://example.com/reveal" in body, "Every participant should be sent the reveal link."
+            assert not any(
+                participant.full_name.split()[0] in body.split(",", 1)[1]
+                for participant in participants_in_participants_file
+            ), "The message should not hold the assignment."
+            recipients.add(reveal_store.reveal(to, body.rsplit("code: ", 1)[1].rstrip(")")))
+    assert recipients == {participant.full_name for participant in participants_in_participants_file}, (
+        "Every participant should reveal their own recipient with their code."
+    )
+
+
+def test_repair_keeps_draw_options(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    participant_jane_doe: Participant,
+) -> None:
+    participants = [
+        attr.evolve(participant_jane_doe, full_name=f"Jane Doe {index}", phone_number=f"+123456780{index}")
+        for index in range(6)
+    ]
+    phone_numbers = [participant.phone_number for participant in participants]
+    messaging_client = mocker.MagicMock()
+    messaging_client.send_message.return_value = MessageResponse(status="queued", sid="SM1")
+    with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+        # Two cycles of three, drawn without swaps
+        run_state.record_arrangement(
+            {giver: phone_numbers[(index + 1) % 3 + index // 3 * 3] for index, giver in enumerate(phone_numbers)},
+            DrawOptions(min_cycle_length=3),
+        )
+        SecretSanta(
+            participants=participants[1:],
+            messaging_client=messaging_client,
+            run_state=run_state,
+            dry_run=False,
+        ).repair()
+        arrangement = run_state.arrangement
+
+    assert arrangement is not None
+    assert set(arrangement) == set(phone_numbers[1:])
+    assert all(arrangement[arrangement[giver]] != giver for giver in arrangement), (
+        "The repair should not leave participants swapping gifts, as the run was drawn without swaps."
+    )
+
+
+def test_run_skips_unmessageable_numbers(
+    mocker: MockerFixture,
+    participants_in_participants_file: list[Participant],
+) -> None:
+    landline_participant = Participant(full_name="Landline", phone_number="+15550000003")
+    lookup_server = LookupStandInServer(
+        ("127.0.0.1", 0),
+        {participant.phone_number: "mobile" for participant in participants_in_participants_file}
+        | {landline_participant.phone_number: "landline"},
+    )
+    threading.Thread(target=lookup_server.serve_forever, daemon=True).start()
+    messaging_client = mocker.MagicMock()
+    messaging_client.send_message.return_value = MessageResponse(status="queued")
+    try:
+        SecretSanta(
+            participants=[*participants_in_participants_file, landline_participant],
+            messaging_client=messaging_client,
+            phone_lookup=PhoneLookup(LookupClient(lookup_server.url)),
+            dry_run=False,
+        ).run()
+    finally:
+        lookup_server.shutdown()
+        lookup_server.server_close()
+    assert sorted(send_call.args[1] for send_call in messaging_client.send_message.call_args_list) == sorted(
+        participant.phone_number for participant in participants_in_participants_file
+    ), "The landline participant should not be messaged."
+    assert not any("Landline" in send_call.args[0] for send_call in messaging_client.send_message.call_args_list), (
+        "The landline participant should not be drawn."
+    )
+
+
+def test_run_exports_pairs_and_results(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    participants_in_participants_file: list[Participant],
+) -> None:
+    messaging_client = mocker.MagicMock()
+    messaging_client.send_message.return_value = MessageResponse(status="queued", sid="SM1")
+    export_path = tmp_path / "run.jsonl"
+    with open_export_sink(export_path, batch_size=2) as export_sink:
+        SecretSanta(
+            participants=participants_in_participants_file,
+            messaging_client=messaging_client,
+            export_sink=export_sink,
+            dry_run=False,
+        ).run()
+    rows = [json.loads(line) for line in export_path.read_text(encoding=ENCODING).splitlines()]
+    for event in ExportEvent:
+        assert sorted(row["giver"] for row in rows if row["event"] == event) == sorted(
+            participant.full_name for participant in participants_in_participants_file
+        ), f"Every participant should have a {event} row."
+    assert all(row["sid"] == "SM1" for row in rows if row["event"] == ExportEvent.send)
+
+
+def test_run_traces_every_message(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    participants_in_participants_file: list[Participant],
+) -> None:
+    messaging_client = mocker.MagicMock()
+    messaging_client.get_sender.return_value = "+15550009999"
+    messaging_client.send_message.return_value = MessageResponse(status="queued", sid="SM1")
+    trace_path = tmp_path / "trace.jsonl"
+    with Tracer(FileSpanExporter(trace_path)) as tracer, tracer.start_span("run"):
+        SecretSanta(
+            participants=participants_in_participants_file, messaging_client=messaging_client, dry_run=False
+        ).run()
+
+    spans = [
+        span
+        for line in trace_path.read_text(encoding=ENCODING).splitlines()
+        for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ]
+    span_ids = {span["name"]: span["spanId"] for span in spans}
+    assert {span["name"]: span["parentSpanId"] for span in spans if span["name"] in {"load", "draw", "dispatch"}} == {
+        "load": span_ids["run"],
+        "draw": span_ids["run"],
+        "dispatch": span_ids["run"],
+    }, "The run's stages should be children of the run's span."
+    send_spans = [span for span in spans if span["name"] == "send_message"]
+    assert len(send_spans) == len(participants_in_participants_file), "Every message sent should have a span."
+    assert len([span for span in spans if span["name"] == "render"]) == len(participants_in_participants_file)
+    assert all(span["parentSpanId"] == span_ids["dispatch"] for span in send_spans), (
+        "The messages should be traced within the dispatch, across the pipeline's threads."
+    )
+    send_attributes = {attribute["key"]: attribute["value"] for attribute in send_spans[0]["attributes"]}
+    assert send_attributes["sender"] == {"stringValue": "+15550009999"}
+    assert "attempt" not in send_attributes, "The attempt should only be recorded by a failover chain."
+    assert send_attributes["status"] == {"stringValue": "queued"}
+    assert "queue_wait_ms" in send_attributes
+
+
+def test_repair(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    participants_in_participants_file: list[Participant],
+    participant_howard: Participant,
+) -> None:
+    messaging_client = mocker.MagicMock()
+    messaging_client.send_message.return_value = MessageResponse(status="queued", sid="SM1")
+    with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+        SecretSanta(
+            participants=participants_in_participants_file,
+            messaging_client=messaging_client,
+            run_state=run_state,
+            dry_run=False,
+        ).run()
+    messaging_client.send_message.reset_mock()
+
+    leaver, *staying_participants = participants_in_participants_file
+    joiner = attr.evolve(participant_howard, phone_number="+1112223334")
+    updated_participants = [*staying_participants, joiner]
+    for _ in range(2):
+        with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+            SecretSanta(
+                participants=updated_participants,
+                messaging_client=messaging_client,
+                run_state=run_state,
+                dry_run=False,
+            ).repair()
+            arrangement = run_state.arrangement
+
+    assert arrangement is not None
+    assert set(arrangement) == {participant.phone_number for participant in updated_participants}
+    assert sorted(arrangement.values()) == sorted(arrangement), "The repaired arrangement should be a permutation."
+    assert all(giver != recipient for giver, recipient in arrangement.items()), "No one should give to themselves."
+    messaged_numbers = [send_call.args[1] for send_call in messaging_client.send_message.call_args_list]
+    assert joiner.phone_number in messaged_numbers, "The joiner should have been messaged."
+    assert leaver.phone_number not in messaged_numbers, "The leaver should not have been messaged."
+    assert len(messaged_numbers) == len(set(messaged_numbers)) <= 3, (  # noqa: PLR2004
+        "Only the reassigned givers should have been messaged, once (even when repairing again)."
+    )
+
+
+def test_resumed_schedule_replans_overdue_messages(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    participants_in_participants_file: list[Participant],
+) -> None:
+    # A whole second, so the send times planned (as datetimes) convert back to timestamps exactly
+    clock = mocker.MagicMock(return_value=float(int(time.time())))
+    sent_at: list[float] = []
+
+    def send_message(*_: object, **__: object) -> MessageResponse:
+        sent_at.append(clock.return_value)
+        return MessageResponse(status="queued", sid="SM1")
+
+    messaging_client = mocker.MagicMock()
+    messaging_client.send_message.side_effect = send_message
+    delivery_scheduler = DeliveryScheduler(
+        clock=clock,
+        sleep=lambda seconds: setattr(clock, "return_value", clock.return_value + seconds),
+    )
+    resumed_at = clock.return_value
+    # The original run planned its messages hours ago, and crashed before sending them
+    overdue_schedule = {
+        participant.phone_number: resumed_at - 6 * 3600 for participant in participants_in_participants_file
+    }
+
+    with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+        run_state.record_schedule(overdue_schedule)
+        SecretSanta(
+            participants=participants_in_participants_file,
+            messaging_client=messaging_client,
+            run_state=run_state,
+            delivery_scheduler=delivery_scheduler,
+            dry_run=False,
+        ).run()
+
+    with RunStateStore("test-run", state_dir=tmp_path) as run_state:
+        assert run_state.schedule is not None
+        assert all(send_at >= resumed_at for send_at in run_state.schedule.values()), (
+            "The overdue messages should be planned again, and the new schedule recorded."
+        )
+        assert sorted(sent_at) == pytest.approx(sorted(run_state.schedule.values())), (
+            "The overdue messages should be sent at their new send times."
+        )
+
+
+def test_scheduled_dry_run_does_not_wait(
+    mocker: MockerFixture,
+    participants_in_participants_file: list[Participant],
+) -> None:
+    messaging_client = mocker.MagicMock()
+    sleep = mocker.MagicMock()
+
+    SecretSanta(
+        participants=participants_in_participants_file,
+        messaging_client=messaging_client,
+        delivery_scheduler=DeliveryScheduler(clock=lambda: 0, sleep=sleep),
+        dry_run=True,
+    ).run()
+
+    sleep.assert_not_called()
+    assert messaging_client.send_message.call_count == len(participants_in_participants_file)
@@ -1,12 +1,19 @@
 import itertools
 from collections.abc import Callable
+from datetime import date
 
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
 from pytest_lazy_fixtures import lf
 from pytest_mock import MockerFixture
 
-from secret_santa.const import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_NUMBER
+from secret_santa.const import (
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_NUMBER,
+    TWILIO_SENDER_POOL,
+    TWILIO_SENDER_RATE,
+)
 from secret_santa.twilio_messaging_service import MessageResponse, TwilioMessagingService
 
 
@@ -148,3 +155,78 @@ def test_send_message(
                 else twilio_messaging_service_.twilio_number
             ),
         )
+
+
+def test_send_message_with_status_callback(
+    mocker: MockerFixture,
+    twilio_messaging_service: TwilioMessagingService,
+) -> None:
+    create_message_mock = mocker.patch("twilio.rest.api.v2010.account.message.MessageList.create")
+    create_message_mock.return_value.status = "queued"
+    create_message_mock.return_value.sid = "SM0123456789"
+    response = twilio_messaging_service.send_message(
+        body="Hello there :) This is the service send message test...",
+        to="+0123456789",
+        dry_run=False,
+        status_callback="https://example.com/status",
+    )
+
+    assert create_message_mock.call_args.kwargs["status_callback"] == "https://example.com/status", (
+        "The status callback should have been registered on the message."
+    )
+    assert response == MessageResponse(status="queued", sid="SM0123456789"), (
+        "The response should hold the message's SID."
+    )
+
+
+def test_list_messages(mocker: MockerFixture, twilio_messaging_service: TwilioMessagingService) -> None:
+    stream_messages_mock = mocker.patch("twilio.rest.api.v2010.account.message.MessageList.stream")
+    stream_messages_mock.return_value = [
+        mocker.MagicMock(sid="SM1", status="delivered", error_code=None),
+        mocker.MagicMock(sid="SM2", status="undelivered", error_code=30003),
+    ]
+
+    messages = list(twilio_messaging_service.list_messages(date(2025, 12, 24)))
+
+    stream_messages_mock.assert_called_once_with(
+        from_=twilio_messaging_service.twilio_number,
+        date_sent=date(2025, 12, 24),
+        page_size=1000,
+    )
+    assert messages == [
+        MessageResponse(status="delivered", sid="SM1"),
+        MessageResponse(status="undelivered", sid="SM2", error_code="30003"),
+    ], "The messages listed do not match the messages expected."
+
+
+def test_list_messages_of_sender(mocker: MockerFixture, twilio_messaging_service: TwilioMessagingService) -> None:
+    stream_messages_mock = mocker.patch("twilio.rest.api.v2010.account.message.MessageList.stream", return_value=[])
+
+    list(twilio_messaging_service.list_messages(date(2025, 12, 24), sender="+15550001"))
+
+    stream_messages_mock.assert_called_once_with(from_="+15550001", date_sent=date(2025, 12, 24), page_size=1000)
+
+
+def test_send_message_from_sender_pool(mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv(TWILIO_ACCOUNT_SID, "DummyValue1")
+    monkeypatch.setenv(TWILIO_AUTH_TOKEN, "DummyValue2")
+    monkeypatch.setenv(TWILIO_NUMBER, "DummyValue3")
+    monkeypatch.setenv(TWILIO_SENDER_POOL, "+15550001,+15550002,+15550003")
+    monkeypatch.setenv(TWILIO_SENDER_RATE, "1000")
+    create_message_mock = mocker.patch("twilio.rest.api.v2010.account.message.MessageList.create")
+    twilio_messaging_service = TwilioMessagingService(alphanumeric_id="SecretSanta")
+    recipients = [f"+1234567{index:03}" for index in range(30)]
+
+    for recipient in recipients * 2:
+        twilio_messaging_service.send_message(body="Hello", to=recipient, dry_run=False)
+
+    senders: dict[str, set[str]] = {}
+    for create_call in create_message_mock.call_args_list:
+        senders.setdefault(create_call.kwargs["to"], set()).add(create_call.kwargs["from_"])
+    assert all(len(recipient_senders) == 1 for recipient_senders in senders.values()), (
+        "Every recipient should be messaged from a single, sticky sender."
+    )
+    assert set().union(*senders.values()) == {"+15550001", "+15550002", "+15550003"}, (
+        "The recipients should be sharded across the pool's senders."
+    )
+    assert twilio_messaging_service.senders == ["+15550001", "+15550002", "+15550003"]
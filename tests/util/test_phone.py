@@ -0,0 +1,32 @@
+import pytest
+
+from secret_santa.util.phone import InvalidPhoneNumberError, normalize_phone_number
+
+
+@pytest.mark.parametrize(
+    ("phone_number", "default_country_code", "expected_phone_number"),
+    [
+        ("+1234567890", None, "+1234567890"),
+        ("+1 234-567", None, "+1234567"),
+        ("+1 (234) 567.890", None, "+1234567890"),
+        ("001234567890", None, "+1234567890"),
+        ("0111234567890", None, "+1234567890"),
+        ("050-123-4567", "+972", "+972501234567"),
+        ("234 567 890", "1", "+1234567890"),
+    ],
+)
+def test_normalize_phone_number(
+    phone_number: str,
+    default_country_code: str | None,
+    expected_phone_number: str,
+) -> None:
+    assert normalize_phone_number(phone_number, default_country_code) == expected_phone_number, (
+        f"The phone number {phone_number!r} was not normalized as expected."
+    )
+
+
+@pytest.mark.parametrize("phone_number", ["", "+", "1234567890", "+123-abc-456", "+1234567890123456"])
+def test_normalize_invalid_phone_number(phone_number: str) -> None:
+    with pytest.raises(InvalidPhoneNumberError) as exception_info:
+        normalize_phone_number(phone_number)
+    assert "is not a valid (E.164) phone number" in str(exception_info.value)
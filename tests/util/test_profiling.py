@@ -0,0 +1,75 @@
+import pstats
+import threading
+from pathlib import Path
+
+from secret_santa.const import ENCODING
+from secret_santa.util.profiling import Profiler, collapse_stacks
+
+
+def fibonacci(n: int) -> int:
+    return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)  # noqa: PLR2004
+
+
+def allocate() -> list[bytes]:
+    return [bytes(1024) for _ in range(1000)]
+
+
+def test_profile(tmp_path: Path) -> None:
+    profile_path = tmp_path / "run.pstats"
+    with Profiler(profile_path, collapsed_stacks=True):
+        fibonacci(15)
+
+    stats = pstats.Stats(str(profile_path))
+    assert any(function_name == "fibonacci" for _, _, function_name in stats.stats), (  # type: ignore[attr-defined]
+        "The profiled function should appear in the CPU profile."
+    )
+    collapsed_stacks = profile_path.with_suffix(".collapsed").read_text(encoding=ENCODING).splitlines()
+    assert collapsed_stacks, "The collapsed stacks should have been written."
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed_stacks), (
+        "Each collapsed stack should end with its time (in microseconds)."
+    )
+
+
+def test_profile_every_thread(tmp_path: Path) -> None:
+    profile_path = tmp_path / "run.pstats"
+    with Profiler(profile_path):
+        thread = threading.Thread(target=fibonacci, args=(15,))
+        thread.start()
+        thread.join()
+
+    stats = pstats.Stats(str(profile_path))
+    assert any(function_name == "fibonacci" for _, _, function_name in stats.stats), (  # type: ignore[attr-defined]
+        "The functions run on other threads should appear in the CPU profile."
+    )
+
+
+def test_collapse_stacks_skips_recursion(tmp_path: Path) -> None:
+    profile_path = tmp_path / "run.pstats"
+    with Profiler(profile_path):
+        fibonacci(10)
+
+    collapsed_stacks = collapse_stacks(pstats.Stats(str(profile_path)))
+    assert all(collapsed_stack.count("fibonacci") <= 1 for collapsed_stack in collapsed_stacks), (
+        "Recursive calls should be folded into the outermost call."
+    )
+
+
+def test_trace_malloc(tmp_path: Path) -> None:
+    trace_malloc_path = tmp_path / "run.tracemalloc.txt"
+    with Profiler(trace_malloc_path=trace_malloc_path) as profiler:
+        allocations = allocate()
+        profiler.snapshot("allocate")
+        allocations.extend(allocate())
+        profiler.snapshot("allocate more")
+
+    report = trace_malloc_path.read_text(encoding=ENCODING)
+    assert report.startswith("== allocate:"), "The first stage should have been reported."
+    assert "== allocate more:" in report, "The second stage should have been reported."
+    assert "-- growth since the previous stage:" in report, "The growth between the stages should have been reported."
+    assert "test_profiling.py" in report, "The top allocations should point at the allocating line."
+
+
+def test_disabled_profiler(tmp_path: Path) -> None:
+    with Profiler() as profiler:
+        profiler.snapshot("load")
+    assert not list(tmp_path.iterdir()), "A disabled profiler should not write anything."
@@ -0,0 +1,16 @@
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from secret_santa.util.time_zone import InvalidTimeZoneError, get_time_zone
+
+
+def test_get_time_zone() -> None:
+    assert get_time_zone("Europe/London") == ZoneInfo("Europe/London"), "The time zone does not match."
+
+
+@pytest.mark.parametrize("time_zone_name", ["", "Middle/Earth", "../etc/passwd"])
+def test_get_invalid_time_zone(time_zone_name: str) -> None:
+    with pytest.raises(InvalidTimeZoneError) as exception_info:
+        get_time_zone(time_zone_name)
+    assert "is not a known (IANA) time zone" in str(exception_info.value)
@@ -0,0 +1,91 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from secret_santa.const import ENCODING
+from secret_santa.util import tracing
+from secret_santa.util.tracing import FileSpanExporter, SpanStatusCode, Tracer
+
+
+def load_spans(trace_path: Path) -> dict[str, dict[str, Any]]:
+    spans: dict[str, dict[str, Any]] = {}
+    for line in trace_path.read_text(encoding=ENCODING).splitlines():
+        for resource_spans in json.loads(line)["resourceSpans"]:
+            for scope_spans in resource_spans["scopeSpans"]:
+                spans.update((span["name"], span) for span in scope_spans["spans"])
+    return spans
+
+
+def get_attributes(span: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    return {attribute["key"]: attribute["value"] for attribute in span["attributes"]}
+
+
+def test_spans_are_nested(tmp_path: Path) -> None:
+    trace_path = tmp_path / "trace.jsonl"
+    with Tracer(FileSpanExporter(trace_path, batch_size=2)) as tracer:
+        with tracer.start_span("run", run_id="test-run"), tracing.start_span("draw") as draw_span:
+            assert draw_span is tracing.get_current_span()
+            tracing.set_attributes(participants=3, mixed=True, score=0.5)
+        assert tracing.get_current_span() is None, "The previous current span should be restored."
+
+    spans = load_spans(trace_path)
+    assert spans["draw"]["parentSpanId"] == spans["run"]["spanId"]
+    assert spans["draw"]["traceId"] == spans["run"]["traceId"]
+    assert spans["run"]["parentSpanId"] == "", "The run's span should be the trace's root span."
+    assert get_attributes(spans["draw"]) == {
+        "participants": {"intValue": "3"},
+        "mixed": {"boolValue": True},
+        "score": {"doubleValue": 0.5},
+    }
+    assert int(spans["draw"]["startTimeUnixNano"]) <= int(spans["draw"]["endTimeUnixNano"])
+
+
+def test_failed_span(tmp_path: Path) -> None:
+    trace_path = tmp_path / "trace.jsonl"
+    boom_err = "boom"
+    with (
+        Tracer(FileSpanExporter(trace_path)) as tracer,
+        pytest.raises(ValueError, match=boom_err),
+        tracer.start_span("run"),
+    ):
+        raise ValueError(boom_err)
+
+    status = load_spans(trace_path)["run"]["status"]
+    assert status == {"code": SpanStatusCode.error, "message": "ValueError: boom"}
+
+
+def test_context_propagates_to_workers(tmp_path: Path) -> None:
+    async def handle_request(index: int) -> None:
+        with tracing.start_span(f"request-{index}"):
+            await asyncio.sleep(0)
+
+    async def serve() -> None:
+        await asyncio.gather(*(handle_request(index) for index in range(3)))
+
+    def send(index: int) -> None:
+        with tracing.start_span(f"send-{index}"):
+            pass
+
+    trace_path = tmp_path / "trace.jsonl"
+    with Tracer(FileSpanExporter(trace_path)) as tracer, tracer.start_span("run"):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(tracing.bind_context(send), range(8)))
+            # Unbound work runs out of the trace
+            executor.submit(send, 8).result()
+        asyncio.run(serve())
+
+    spans = load_spans(trace_path)
+    run_span_id = spans["run"]["spanId"]
+    assert all(spans[f"send-{index}"]["parentSpanId"] == run_span_id for index in range(8))
+    assert all(spans[f"request-{index}"]["parentSpanId"] == run_span_id for index in range(3))
+    assert "send-8" not in spans, "Work handed over to a thread without its context should not be traced."
+
+
+def test_disabled_tracing() -> None:
+    with tracing.start_span("draw") as span:
+        tracing.set_attributes(participants=3)
+    assert span is None, "Spans should not be started without a root span."